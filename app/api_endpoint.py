@@ -6,6 +6,7 @@ Provides REST-like API endpoints for:
 - Queue management
 - Metadata retrieval
 - Results access
+- Cache metrics
 """
 
 import json
@@ -17,6 +18,8 @@ from datetime import datetime
 from typing import Any, Dict, Optional
 
 import streamlit as st
+from app_shared import require_login_and_domain
+from utils.cache_metrics import metrics_snapshot, render_prometheus
 from utils.gcs_utils import get_cet_now
 from utils.validation import validate_training_config
 
@@ -268,6 +271,39 @@ def handle_metadata_api():
     st.stop()
 
 
+def handle_cache_metrics_api():
+    """
+    Handle cache metrics API requests.
+
+    The metrics are rendered in the Streamlit page for a logged-in user; a
+    plain HTTP GET only gets the app's HTML shell. Scrapers read /metrics
+    on CACHE_METRICS_PORT (see start_metrics_server).
+
+    Query parameters:
+        - api=cache_metrics: Trigger cache metrics endpoint
+        - format: "prometheus" (default) or "json"
+
+    Response:
+        Prometheus text exposition, or JSON with the metrics snapshot
+    """
+    if st.query_params.get("api") != "cache_metrics":
+        return
+
+    require_login_and_domain()
+
+    try:
+        if st.query_params.get("format", "prometheus") == "json":
+            st.json(_create_success_response(metrics_snapshot()))
+        else:
+            st.text(render_prometheus())
+
+    except Exception as e:
+        logger.exception("Cache metrics API request failed")
+        st.json(_create_error_response("Internal error", str(e)))
+
+    st.stop()
+
+
 def handle_api_request():
     """
     Main API request handler.
@@ -278,11 +314,13 @@ def handle_api_request():
         - train: Submit training job
         - status: Get job status
         - metadata: Retrieve metadata
+        - cache_metrics: Cache hit/miss/latency metrics
 
     Example usage:
         GET /?api=train&country=fr&iterations=2000
         GET /?api=status&job_id=abc123
         GET /?api=metadata&country=fr&version=latest
+        GET /?api=cache_metrics&format=json
     """
     api_type = st.query_params.get("api")
 
@@ -297,11 +335,14 @@ def handle_api_request():
         handle_status_api()
     elif api_type == "metadata":
         handle_metadata_api()
+    elif api_type == "cache_metrics":
+        handle_cache_metrics_api()
     else:
         st.json(
             _create_error_response(
                 "Unknown API endpoint",
-                f"Supported endpoints: train, status, metadata. Got: {api_type}",
+                "Supported endpoints: train, status, metadata, "
+                f"cache_metrics. Got: {api_type}",
             )
         )
         st.stop()
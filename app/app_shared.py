@@ -5,7 +5,6 @@ import json
 import logging
 import os
 import re
-import tempfile
 import time
 from contextlib import contextmanager
 from datetime import datetime, timezone
@@ -24,10 +23,32 @@ from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from data_processor import DataProcessor
 from google.api_core.exceptions import PreconditionFailed
-from google.cloud import run_v2, secretmanager, storage
-from utils.gcs_utils import format_cet_timestamp, get_cet_now
-from utils.snowflake_cache import get_cached_query_result
+from google.cloud import run_v2, secretmanager
+from utils.bigquery_cache import init_cache as init_bigquery_cache
+from utils.blob_cache import cached_blob_path
+from utils.cache_metrics import start_metrics_server
+from utils.gcs_client import get_storage_client, track_gcs_op
+from utils.gcs_utils import (
+    format_cet_timestamp,
+    get_cet_now,
+    read_blob_if_changed,
+    read_parquet_from_gcs,
+    upload_large_file,
+)
+from utils.parquet_decode import read_parquet
+from utils.run_catalog import record_run
+from utils.shared_cache import init_shared_cache
+from utils.snowflake_async import QueryBatch
+from utils.snowflake_cache import cache_query_result, get_cached_query_result
 from utils.snowflake_cache import init_cache as init_snowflake_cache
+from utils.snowflake_cache import lookup_cached_result
+from utils.snowflake_incremental import (
+    SchemaChanged,
+    apply_refresh,
+    plan_refresh,
+)
+from utils.snowflake_pool import cached_private_key, lease_connection
+from utils.version_index import list_versions
 
 # Environment constants
 PROJECT_ID = os.getenv("PROJECT_ID")
@@ -40,8 +61,12 @@ SAFE_LAG_SECONDS_AFTER_RUNNING = int(
     os.getenv("SAFE_LAG_SECONDS_AFTER_RUNNING", "5")
 )
 
-# Initialize Snowflake query cache
+# Initialize Snowflake and BigQuery query caches
 init_snowflake_cache(GCS_BUCKET)
+init_bigquery_cache(GCS_BUCKET)
+# Cache tier shared by the processes on this host, coherent across instances
+init_shared_cache(GCS_BUCKET)
+start_metrics_server()
 
 # Canonical job_history schema & normalization
 JOB_HISTORY_COLUMNS = [
@@ -142,7 +167,7 @@ def _safe_tick_once(
     Returns {ok, message, changed}.
     """
     bucket_name = bucket_name or GCS_BUCKET
-    client = storage.Client()
+    client = get_storage_client()
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(_queue_blob_path(queue_name))
 
@@ -225,6 +250,9 @@ def _safe_tick_once(
                     message = entry["message"]
                     changed = True
 
+                    if entry.get("gcs_prefix"):
+                        record_run(bucket_name, entry["gcs_prefix"])
+
                     # Update job_history when job completes
                     try:
                         # Find the matching job in job_history and update its status
@@ -718,16 +746,30 @@ def _fmt_secs(s: float) -> str:
 
 @contextmanager
 def timed_step(name: str, bucket: list):
+    """
+    Time a step and record it in ``bucket``.
+
+    Yields a dict; set ``step["bytes"]`` inside the block to also report
+    the step's throughput.
+    """
     start = time.perf_counter()
     ph = st.empty()
     ph.info(f"⏳ {name}…")
+    step: Dict[str, Any] = {}
     try:
-        yield
+        yield step
     finally:
         dt = time.perf_counter() - start
-        ph.success(f"✅ {name} – {_fmt_secs(dt)}")
-        bucket.append({"Step": name, "Time (s)": round(dt, 2)})
-        logger.info(f"Step '{name}' completed in {dt:.2f}s")
+        row = {"Step": name, "Time (s)": round(dt, 2)}
+        label = _fmt_secs(dt)
+        if step.get("bytes"):
+            mb = step["bytes"] / 1024 / 1024
+            row["Size (MB)"] = round(mb, 2)
+            row["Throughput (MB/s)"] = round(mb / max(dt, 1e-6), 2)
+            label += f", {mb:.1f} MB at {row['Throughput (MB/s)']} MB/s"
+        ph.success(f"✅ {name} – {label}")
+        bucket.append(row)
+        logger.info(f"Step '{name}' completed in {label}")
         # Clear the success message after 2 seconds to prevent it from appearing in other tabs
         time.sleep(2)
         ph.empty()
@@ -773,7 +815,14 @@ def _load_private_key_bytes_from_gsm(secret_id: str) -> bytes:
     """
     Reads a PEM (or already PKCS#8 DER) private key from GSM and returns PKCS#8 DER bytes,
     as required by snowflake-connector-python (private_key=...).
+    The decoded key is cached for SF_KEY_CACHE_TTL_SECONDS.
     """
+    return cached_private_key(
+        secret_id, lambda: _fetch_private_key_bytes_from_gsm(secret_id)
+    )
+
+
+def _fetch_private_key_bytes_from_gsm(secret_id: str) -> bytes:
     client = secretmanager.SecretManagerServiceClient()
     name = _gsm_secret_latest_resource(secret_id)
     payload = client.access_secret_version(name=name).payload.data
@@ -868,22 +917,34 @@ def _connect_snowflake(
         )
 
 
-def ensure_sf_conn() -> sf.SnowflakeConnection:
-    conn = st.session_state.get("sf_conn")
-    params = st.session_state.get("sf_params") or {}
+def _load_persistent_private_key() -> bytes:
+    """PKCS#8 DER bytes of the key saved from Connect Data, if any."""
+    from gcp_secrets import access_secret
 
-    if conn is not None:
-        try:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-                cur.fetchall()
-            return conn
-        except Exception:
-            try:
-                conn.close()
-            except Exception:
-                pass
-            st.session_state["sf_conn"] = None
+    PERSISTENT_KEY_SECRET_ID = os.getenv(
+        "SF_PERSISTENT_KEY_SECRET", "sf-private-key-persistent"
+    )
+
+    def _load() -> bytes:
+        pem_bytes = access_secret(PERSISTENT_KEY_SECRET_ID, PROJECT_ID)
+        if not pem_bytes:
+            raise RuntimeError("No persisted Snowflake key")
+        # Convert PEM -> PKCS#8 DER bytes
+        key = serialization.load_pem_private_key(
+            pem_bytes, password=None, backend=default_backend()
+        )
+        return key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+
+    return cached_private_key(PERSISTENT_KEY_SECRET_ID, _load)
+
+
+def _sf_connect_params() -> dict:
+    """Connection parameters (including key or password) of this session."""
+    params = st.session_state.get("sf_params") or {}
 
     # Try to get key bytes from session state, or load from Secret Manager
     pk_bytes = st.session_state.get("_sf_private_key_bytes")
@@ -891,28 +952,13 @@ def ensure_sf_conn() -> sf.SnowflakeConnection:
     # If no key in session but we have params, try loading from persistent storage
     if not pk_bytes and params:
         try:
-            from gcp_secrets import access_secret
-
-            PERSISTENT_KEY_SECRET_ID = os.getenv(
-                "SF_PERSISTENT_KEY_SECRET", "sf-private-key-persistent"
-            )
-            pem_bytes = access_secret(PERSISTENT_KEY_SECRET_ID, PROJECT_ID)
-            if pem_bytes:
-                # Convert PEM -> PKCS#8 DER bytes
-                key = serialization.load_pem_private_key(
-                    pem_bytes, password=None, backend=default_backend()
-                )
-                pk_bytes = key.private_bytes(
-                    encoding=serialization.Encoding.DER,
-                    format=serialization.PrivateFormat.PKCS8,
-                    encryption_algorithm=serialization.NoEncryption(),
-                )
-                st.session_state["_sf_private_key_bytes"] = pk_bytes
+            pk_bytes = _load_persistent_private_key()
+            st.session_state["_sf_private_key_bytes"] = pk_bytes
         except Exception:
             pass  # Fall through to other methods
 
     if pk_bytes and params:
-        conn = _connect_snowflake(
+        return dict(
             user=params["user"],
             account=params["account"],
             warehouse=params["warehouse"],
@@ -921,36 +967,53 @@ def ensure_sf_conn() -> sf.SnowflakeConnection:
             role=params.get("role"),
             private_key=pk_bytes,
         )
-        st.session_state["sf_conn"] = conn
-        st.session_state["sf_connected"] = True
-        return conn
 
     # fall back to env/Secret Manager (old behavior), if you still keep it
     envp = _sf_params_from_env()
     if envp:
-        conn = _connect_snowflake(**envp)
-        st.session_state["sf_conn"] = conn
-        st.session_state["sf_connected"] = True
         # don't store private bytes in sf_params
         st.session_state["sf_params"] = {
             k: v for k, v in envp.items() if k != "private_key"
         }
-        return conn
+        return envp
 
     raise RuntimeError("No Snowflake params. Use the UI to connect.")
 
 
+@contextmanager
+def sf_connection():
+    """
+    Lease a Snowflake connection for this session's credentials.
+
+    Connections come from the process-wide pool (utils.snowflake_pool), so
+    sessions with the same credentials share them. Use for running queries;
+    the connection goes back to the pool when the block exits.
+    """
+    with lease_connection(_sf_connect_params(), _connect_snowflake) as conn:
+        st.session_state["sf_connected"] = True
+        yield conn
+
+
+def ensure_sf_conn() -> None:
+    """
+    Make sure the pool has a connection for this session's credentials.
+
+    Doesn't query Snowflake: pooled connections are health-checked on a
+    background thread, and a new one is only opened when none is idle.
+    The connection stays in the pool; run queries with sf_connection().
+    """
+    with sf_connection():
+        pass
+
+
 # Pick ONE of these depending on your stack:
 USE_CONNECTOR = True  # set False if you use Snowpark Session
 
-if USE_CONNECTOR:
-    import snowflake.connector as sf
-else:
+# snowflake.connector is imported as sf at the top
+if not USE_CONNECTOR:
     # Avoid hard dependency on Snowpark when not used; import lazily only if you switch.
     Session = None  # placeholder; do `from snowflake.snowpark import Session` at call site if needed
 
-KEEPALIVE_SECONDS = 10 * 60  # ping every 10 min of inactivity
-
 
 def _fetch_private_key_from_secret(project_id: str, secret_id: str) -> str:
     """Fetch RSA private key from Secret Manager at runtime."""
@@ -991,8 +1054,7 @@ def get_snowflake_connection(**kwargs):
         try:
             pk_bytes = _load_private_key_bytes_from_gsm(
                 secret_id
-            )  # DER PKCS#8 bytes
-            st.write("Loaded key bytes:", len(pk_bytes))
+            )  # DER PKCS#8 bytes, cached
             return _connect_snowflake(
                 user=kwargs["user"],
                 account=kwargs["account"],
@@ -1028,43 +1090,19 @@ def get_snowflake_connection(**kwargs):
 
 def keepalive_ping(conn):
     """
-    Run a lightweight query if we've been idle for a bit.
-    Avoids extra chatter yet prevents idle timeouts.
-    """
-    now = time.time()
-    last = st.session_state.get("_sf_last_ping", 0)
-    if now - last < KEEPALIVE_SECONDS:
-        return
+    Replace the session's connection if it was closed.
 
+    Doesn't query Snowflake: pooled connections are pinged (and dead ones
+    dropped) by the pool's background health check, so pages can call
+    this on every render.
+    """
     try:
-        if USE_CONNECTOR:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-                cur.fetchall()
-        else:
-            # Snowpark
-            conn.sql("SELECT 1").collect()
-        st.session_state["_sf_last_ping"] = now
+        closed = conn is None or conn.is_closed()
     except Exception:
-        # Attempt a transparent reconnect once
-        st.session_state.pop("_sf_last_ping", None)
-        # Rebuild connection with the SAME params used originally
-        # If you pass kwargs into get_snowflake_connection, capture them in session_state at login.
-        params = st.session_state.get("_sf_conn_kwargs", {})
-        new_conn = get_snowflake_connection(**params)
-        # one immediate ping
-        try:
-            if USE_CONNECTOR:
-                with new_conn.cursor() as cur:
-                    cur.execute("SELECT 1")
-                    cur.fetchall()
-            else:
-                new_conn.sql("SELECT 1").collect()  # type: ignore
-            st.session_state["_sf_last_ping"] = time.time()
-        except Exception as e:
-            # Surface a concise error while letting the page continue rendering
-            st.error(f"Snowflake connection could not be restored: {e}")
-            raise
+        closed = True
+    if closed:
+        ensure_sf_conn()
+    st.session_state["_sf_last_ping"] = time.time()
 
 
 def run_sql(sql: str, use_cache: bool = True) -> pd.DataFrame:
@@ -1084,23 +1122,182 @@ def run_sql(sql: str, use_cache: bool = True) -> pd.DataFrame:
         Cache TTL: 1 hour in-memory, 24 hours in GCS.
     """
 
+    # Resolved now: cached results may be refreshed on a background thread,
+    # which can't read this session's state
+    try:
+        params = _sf_connect_params()
+    except RuntimeError:
+        params = None
+
     def _execute_query(query: str) -> pd.DataFrame:
         """Internal function to execute query without cache."""
-        conn = ensure_sf_conn()
+        with lease_connection(
+            params or _sf_connect_params(), _connect_snowflake
+        ) as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(query)
+                return cur.fetch_pandas_all()
+            finally:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+
+    if use_cache:
+        return get_cached_query_result(sql, _execute_query)
+    else:
+        return _execute_query(sql)
+
+
+def run_sql_incremental(
+    sql: str,
+    date_column: str,
+    lookback_days: Optional[int] = None,
+    full: bool = False,
+    bucket_name: Optional[str] = None,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Run a date-partitioned query, fetching only rows since the last refresh.
+
+    The stored result of the query is extended with the rows from its max
+    date minus ``lookback_days`` on (see utils.snowflake_incremental); the
+    first refresh, or one after the columns changed, runs the whole query.
+
+    Args:
+        sql: Simple SELECT ... FROM table [WHERE ...] including date_column
+        date_column: Date column to track
+        lookback_days: Days before the stored max date to fetch again
+        full: Run the whole query and replace the stored result
+        bucket_name: Bucket holding the stored results (GCS_BUCKET)
+
+    Returns:
+        (full result, info dict with mode, cutoff, delta_rows, rows and
+        watermark)
+    """
+    bucket_name = bucket_name or GCS_BUCKET
+    plan = plan_refresh(bucket_name, sql, date_column, lookback_days, full)
+    delta = run_sql(plan.sql, use_cache=False)
+    try:
+        return apply_refresh(bucket_name, plan, delta)
+    except SchemaChanged as e:
+        logger.info(f"{e}; running a full refresh")
+        plan = plan_refresh(bucket_name, sql, date_column, full=True)
+        return apply_refresh(bucket_name, plan, run_sql(plan.sql, False))
+
+
+@contextmanager
+def sf_query_batch(queries: Dict[str, str], use_cache: bool = True):
+    """
+    Run several queries concurrently on Snowflake.
+
+    Cached results are resolved up front; the other queries are submitted
+    asynchronously and run on the warehouse at the same time. Iterate
+    ``batch.as_completed()`` to handle each result as it arrives. Queries
+    still running when the block exits (including when Streamlit stops
+    the script because the user navigated away) are cancelled.
+
+    Args:
+        queries: Mapping of key (e.g. country) to SQL
+        use_cache: Check and fill the query result cache
+
+    Yields:
+        utils.snowflake_async.QueryBatch
+    """
+    batch = QueryBatch(
+        sf_connection,
+        on_result=(
+            (lambda q: cache_query_result(q.sql, q.result))
+            if use_cache
+            else None
+        ),
+    )
+    to_submit = {}
+    for key, sql in queries.items():
+        cached = (
+            lookup_cached_result(sql, use_gcs_cache=True) if use_cache else None
+        )
+        if cached is not None:
+            batch.add_result(key, sql, cached)
+        else:
+            to_submit[key] = sql
+    try:
+        batch.submit(to_submit)
+        yield batch
+    finally:
+        try:
+            batch.cancel()
+        except Exception as e:
+            logger.warning(f"Could not cancel Snowflake queries: {e}")
+
+
+def run_sql_to_parquet(sql: str, output_path: str) -> int:
+    """
+    Stream a query's result into a local Parquet file.
+
+    Reads the result as Arrow batches and writes them as they arrive, so
+    memory stays bounded by one batch however many rows the query
+    returns. Doesn't add the result to the query result cache, which would
+    hold the whole frame in memory, but reuses a result already cached in
+    memory (e.g. the same country table just loaded in Map Data).
+
+    Args:
+        sql: SQL query to execute
+        output_path: Local path for the Parquet file
+
+    Returns:
+        Number of rows written
+    """
+    cached = lookup_cached_result(sql)
+    if cached is not None:
+        get_data_processor().csv_to_parquet(cached, output_path)
+        return len(cached)
+
+    with sf_connection() as conn:
         cur = conn.cursor()
         try:
-            cur.execute(query)
-            return cur.fetch_pandas_all()
+            cur.execute(sql)
+            stats = get_data_processor().arrow_batches_to_parquet(
+                cur.fetch_arrow_batches(), output_path
+            )
+            if not stats["batches"]:
+                # No rows: still write a file with the result's columns
+                columns = [c[0] for c in (cur.description or [])]
+                get_data_processor().csv_to_parquet(
+                    pd.DataFrame(columns=columns), output_path
+                )
+            return stats["rows"]
         finally:
             try:
                 cur.close()
             except Exception:
                 pass
 
-    if use_cache:
-        return get_cached_query_result(sql, _execute_query)
-    else:
-        return _execute_query(sql)
+
+def describe_sql_columns(sql: str) -> List[str]:
+    """
+    Column names a query returns, without fetching any rows.
+
+    Runs the query wrapped in ``LIMIT 0``, which Snowflake compiles but
+    answers without scanning data.
+
+    Args:
+        sql: SQL query to describe
+
+    Returns:
+        Column names in result order
+    """
+    inner = sql.strip().rstrip(";")
+    with sf_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT * FROM ({inner}) LIMIT 0")
+            return [c[0] for c in (cur.description or [])]
+        finally:
+            try:
+                cur.close()
+            except Exception:
+                pass
 
 
 # ─────────────────────────────
@@ -1122,11 +1319,9 @@ def _norm_blob_path(p: str) -> str:
 
 
 def upload_to_gcs(bucket_name: str, local_path: str, dest_blob: str) -> str:
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
     blob_path = _norm_blob_path(dest_blob)  # <-- normalize here
-    blob = bucket.blob(blob_path)
-    blob.upload_from_filename(local_path)
+    # Large files go up in concurrent parts, others resumably
+    upload_large_file(bucket_name, local_path, blob_path)
     return f"gs://{bucket_name}/{blob_path}"
 
 
@@ -1134,15 +1329,7 @@ def _get_job_history_object() -> str:
     return os.getenv("JOBS_JOB_HISTORY_OBJECT", "robyn-jobs/job_history.csv")
 
 
-def read_job_history_from_gcs(bucket_name: str) -> pd.DataFrame:
-    from google.cloud import storage
-
-    client = storage.Client()
-    blob = client.bucket(bucket_name).blob("robyn-jobs/job_history.csv")
-    if not blob.exists():
-        return _empty_job_history_df()  # your function with JOB_HISTORY_COLUMNS
-
-    raw = blob.download_as_bytes()
+def _parse_job_history(raw: bytes) -> pd.DataFrame:
     if not raw:
         return _empty_job_history_df()
 
@@ -1154,11 +1341,28 @@ def read_job_history_from_gcs(bucket_name: str) -> pd.DataFrame:
     return normalize_job_history_df(df)
 
 
+def read_job_history_if_changed(
+    bucket_name: str, scope: Any = None
+) -> Tuple[pd.DataFrame, bool]:
+    """Job history plus whether it changed since the last read in scope."""
+    df, changed = read_blob_if_changed(
+        bucket_name,
+        "robyn-jobs/job_history.csv",
+        _parse_job_history,
+        scope=scope,
+    )
+    if df is None:
+        return _empty_job_history_df(), changed
+    return df, changed
+
+
+def read_job_history_from_gcs(bucket_name: str) -> pd.DataFrame:
+    return read_job_history_if_changed(bucket_name)[0]
+
+
 def save_job_history_to_gcs(df, bucket_name: str):
     import io
 
-    from google.cloud import storage
-
     logger.info(
         f"[JOB_HISTORY] Saving job_history to GCS bucket: {bucket_name}"
     )
@@ -1169,9 +1373,10 @@ def save_job_history_to_gcs(df, bucket_name: str):
         b = io.BytesIO()
         df.to_csv(b, index=False)
         b.seek(0)
-        client = storage.Client()
+        client = get_storage_client()
         blob = client.bucket(bucket_name).blob("robyn-jobs/job_history.csv")
-        blob.upload_from_file(b, content_type="text/csv")
+        with track_gcs_op("write_job_history"):
+            blob.upload_from_file(b, content_type="text/csv")
         logger.info(
             f"[JOB_HISTORY] Successfully saved to gs://{bucket_name}/robyn-jobs/job_history.csv"
         )
@@ -1243,12 +1448,9 @@ def append_row_to_job_history(row_dict: dict, bucket_name: str):
 
 def read_status_json(bucket_name: str, prefix: str) -> Optional[dict]:
     try:
-        client = storage.Client()
-        b = client.bucket(bucket_name)
-        blob = b.blob(f"{prefix}/status.json")
-        if not blob.exists():
-            return None
-        return json.loads(blob.download_as_text())
+        return read_blob_if_changed(
+            bucket_name, f"{prefix}/status.json", json.loads
+        )[0]
     except Exception:
         return None
 
@@ -1351,6 +1553,10 @@ def build_job_config_from_params(
     if "column_agg_strategies" in params and params["column_agg_strategies"]:
         config["column_agg_strategies"] = params["column_agg_strategies"]
 
+    # Data already aggregated to resample_freq periods in SQL
+    if params.get("resampled_in_sql"):
+        config["resampled_in_sql"] = True
+
     # Add budget allocation parameters if present
     if "budget_scenario" in params:
         config["budget_scenario"] = params["budget_scenario"]
@@ -1382,22 +1588,23 @@ def load_queue_from_gcs(
     Also refresh st.session_state.job_queue and st.session_state.queue_running.
     """
     bucket_name = bucket_name or st.session_state.get("gcs_bucket", GCS_BUCKET)
-    bucket = storage.Client().bucket(bucket_name)
-    blob = bucket.blob(_queue_blob_path(queue_name))
-
-    if not blob.exists():
-        doc = {
-            "version": 1,
-            "saved_at": get_cet_now().isoformat(),
-            "entries": [],
-            "queue_running": True,  # default to running
-        }
-        st.session_state.job_queue = []
-        st.session_state.queue_running = True
-        return doc
 
     try:
-        payload = json.loads(blob.download_as_text())
+        # Conditional GET: polling an unchanged queue costs no body download
+        payload, _ = read_blob_if_changed(
+            bucket_name, _queue_blob_path(queue_name), json.loads
+        )
+        if payload is None:
+            doc = {
+                "version": 1,
+                "saved_at": get_cet_now().isoformat(),
+                "entries": [],
+                "queue_running": True,  # default to running
+            }
+            st.session_state.job_queue = []
+            st.session_state.queue_running = True
+            return doc
+
         # Back-compat: if payload is a list, wrap it as a doc and assume running
         if isinstance(payload, list):
             payload = {
@@ -1436,7 +1643,7 @@ def save_queue_to_gcs(
     Save the full queue doc back to GCS. Returns saved_at timestamp.
     """
     bucket_name = bucket_name or st.session_state.get("gcs_bucket", GCS_BUCKET)
-    bucket = storage.Client().bucket(bucket_name)
+    bucket = get_storage_client().bucket(bucket_name)
     blob = bucket.blob(_queue_blob_path(queue_name))
 
     # Use session defaults if not provided
@@ -1466,17 +1673,17 @@ def load_queue_payload(
 ) -> dict:
     """Return {'version':1, 'saved_at': str|None, 'queue_running': bool, 'entries': list}."""
     bucket_name = bucket_name or st.session_state.get("gcs_bucket", GCS_BUCKET)
-    bucket = storage.Client().bucket(bucket_name)
-    blob = bucket.blob(_queue_blob_path(queue_name))
-    if not blob.exists():
-        return {
-            "version": 1,
-            "saved_at": None,
-            "queue_running": False,
-            "entries": [],
-        }
     try:
-        payload = json.loads(blob.download_as_text())
+        payload, _ = read_blob_if_changed(
+            bucket_name, _queue_blob_path(queue_name), json.loads
+        )
+        if payload is None:
+            return {
+                "version": 1,
+                "saved_at": None,
+                "queue_running": False,
+                "entries": [],
+            }
         if isinstance(payload, list):  # legacy format
             return {
                 "version": 1,
@@ -1927,9 +2134,10 @@ def meta_latest_blob_universal() -> str:
 
 # --- small helper
 def _blob_exists(bucket: str, blob_path: str) -> bool:
-    client = storage.Client()
+    client = get_storage_client()
     blob = client.bucket(bucket).blob(blob_path)
-    return blob.exists()
+    with track_gcs_op("blob_exists"):
+        return blob.exists()
 
 
 @st.cache_data(show_spinner=False)
@@ -1958,15 +2166,9 @@ def sorted_versions_newest_first(ts_list: List[str]) -> List[str]:
 def list_data_versions(
     bucket: str, country: str, refresh_key: str = ""
 ) -> List[str]:
-    client = storage.Client()
-    prefix = f"{data_root(country)}/"
-    blobs = client.list_blobs(bucket, prefix=prefix)
-    ts = set()
-    for b in blobs:
-        parts = b.name.split("/")
-        if len(parts) >= 4 and parts[-1] == "raw.parquet":
-            ts.add(parts[-2])
-    out = sorted_versions_newest_first(list(ts))
+    # One GET of datasets/<country>/_index.json instead of a listing
+    ts = list_versions(bucket, data_root(country))
+    out = sorted_versions_newest_first(ts)
     return ["Latest"] + out
 
 
@@ -1978,21 +2180,11 @@ def list_mapped_data_versions(
 
     Expected blob structure: mapped-datasets/{country}/{timestamp}/raw.parquet
     Example: mapped-datasets/de/20231201_120000/raw.parquet
+
+    Versions come from the mapped-datasets/{country}/_index.json manifest.
     """
-    client = storage.Client()
-    prefix = f"{mapped_data_root(country)}/"
-    blobs = client.list_blobs(bucket, prefix=prefix)
-    ts = set()
-    for b in blobs:
-        parts = b.name.split("/")
-        # Expect exactly 4 parts: ['mapped-datasets', '{country}', '{timestamp}', 'raw.parquet']
-        # This ensures we only get files directly in {timestamp}/ directories
-        if len(parts) == 4 and parts[-1] == "raw.parquet":
-            timestamp = parts[-2]
-            # Filter out empty timestamps (from double slashes)
-            if timestamp:
-                ts.add(timestamp)
-    out = sorted_versions_newest_first(list(ts))
+    ts = list_versions(bucket, mapped_data_root(country))
+    out = sorted_versions_newest_first(ts)
     return ["Latest"] + out
 
 
@@ -2005,27 +2197,12 @@ def list_meta_versions(
       ["Latest", "Universal - <ts1>", "Universal - <ts2>", ..., "<CC> - <ts1>", "<CC> - <ts2>", ...]
     Universal entries are listed first (newest → oldest), then country entries (newest → oldest).
     """
-    client = storage.Client()
     cc = country.upper().strip()
-    country_prefix = f"metadata/{country.lower().strip()}/"
-    universal_prefix = "metadata/universal/"
-
-    ts_country, ts_universal = set(), set()
-
-    # country-scoped
-    for b in client.list_blobs(bucket, prefix=country_prefix):
-        parts = b.name.split("/")
-        if len(parts) >= 4 and parts[-1] == "mapping.json":
-            ts_country.add(parts[-2])
+    ts_country = list_versions(bucket, f"metadata/{country.lower().strip()}")
+    ts_universal = list_versions(bucket, "metadata/universal")
 
-    # universal
-    for b in client.list_blobs(bucket, prefix=universal_prefix):
-        parts = b.name.split("/")
-        if len(parts) >= 4 and parts[-1] == "mapping.json":
-            ts_universal.add(parts[-2])
-
-    country_sorted = sorted_versions_newest_first(list(ts_country))
-    universal_sorted = sorted_versions_newest_first(list(ts_universal))
+    country_sorted = sorted_versions_newest_first(ts_country)
+    universal_sorted = sorted_versions_newest_first(ts_universal)
 
     labels = ["Latest"]
     labels += [f"Universal - {t}" for t in universal_sorted]
@@ -2113,70 +2290,22 @@ def resolve_meta_blob_from_selection(
 
 
 def _download_parquet_from_gcs(bucket: str, blob_path: str) -> pd.DataFrame:
-    import pyarrow as pa
-    import pyarrow.parquet as pq
-
-    client = storage.Client()
-    blob = client.bucket(bucket).blob(blob_path)
-    if not blob.exists():
-        raise FileNotFoundError(f"gs://{bucket}/{blob_path} not found")
-    with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tmp:
-        blob.download_to_filename(tmp.name)
-        try:
-            # Read parquet file using PyArrow first to handle database-specific types
-            table = pq.read_table(tmp.name)
-
-            # Check for database-specific types and convert them
-            schema = table.schema
-            db_type_columns = []
-            for i, field in enumerate(schema):
-                field_type_str = str(field.type).lower()
-                # Check if the type string contains database-specific type indicators
-                if "db" in field_type_str and any(
-                    db_type in field_type_str
-                    for db_type in [
-                        "dbdate",
-                        "dbtime",
-                        "dbdecimal",
-                        "dbtimestamp",
-                    ]
-                ):
-                    db_type_columns.append(field.name)
-                    logger.warning(
-                        f"Column '{field.name}' has database-specific type '{field.type}'"
-                    )
-
-            # Convert to pandas with type mapping for database-specific types
-            if db_type_columns:
-                logger.info(
-                    f"Converting database-specific types in columns: {db_type_columns}"
-                )
-
-                # Create a types_mapper that converts unknown types to string
-                def types_mapper(pa_type):
-                    type_str = str(pa_type).lower()
-                    if "db" in type_str:
-                        # Map database types to string for safe conversion
-                        return pd.StringDtype()
-                    return None  # Use default mapping for other types
-
-                df = table.to_pandas(types_mapper=types_mapper)
-            else:
-                # No database-specific types, use standard conversion
-                df = table.to_pandas()
-
-            # Log data types for debugging
-            logger.info(
-                f"Loaded parquet from gs://{bucket}/{blob_path}: "
-                f"{len(df)} rows, {len(df.columns)} columns"
-            )
+    # Served from the generation-keyed disk cache; only re-downloaded when
+    # the object changes in GCS
+    local_path = cached_blob_path(bucket, blob_path)
+    try:
+        df = safe_read_parquet(local_path)
+    except Exception as e:
+        logger.error(
+            f"Error reading parquet file from gs://{bucket}/{blob_path}: {e}"
+        )
+        raise
 
-            return df
-        except Exception as e:
-            logger.error(
-                f"Error reading parquet file from gs://{bucket}/{blob_path}: {e}"
-            )
-            raise
+    logger.info(
+        f"Loaded parquet from gs://{bucket}/{blob_path}: "
+        f"{len(df)} rows, {len(df.columns)} columns"
+    )
+    return df
 
 
 def safe_read_parquet(file_path: str) -> pd.DataFrame:
@@ -2193,74 +2322,141 @@ def safe_read_parquet(file_path: str) -> pd.DataFrame:
     Returns:
         DataFrame with the parquet data
     """
-    import pyarrow as pa
-    import pyarrow.parquet as pq
-
     try:
-        # Read parquet file using PyArrow first to handle database-specific types
-        table = pq.read_table(file_path)
-
-        # Check for database-specific types and convert them
-        schema = table.schema
-        db_type_columns = []
-        for i, field in enumerate(schema):
-            field_type_str = str(field.type).lower()
-            # Check if the type string contains database-specific type indicators
-            if "db" in field_type_str and any(
-                db_type in field_type_str
-                for db_type in ["dbdate", "dbtime", "dbdecimal", "dbtimestamp"]
-            ):
-                db_type_columns.append(field.name)
-                logger.warning(
-                    f"Column '{field.name}' has database-specific type '{field.type}'"
-                )
-
-        # Convert to pandas with type mapping for database-specific types
-        if db_type_columns:
-            logger.info(
-                f"Converting database-specific types in columns: {db_type_columns}"
-            )
-
-            # Create a types_mapper that converts unknown types to string
-            def types_mapper(pa_type):
-                type_str = str(pa_type).lower()
-                if "db" in type_str:
-                    # Map database types to string for safe conversion
-                    return pd.StringDtype()
-                return None  # Use default mapping for other types
-
-            df = table.to_pandas(types_mapper=types_mapper)
-        else:
-            # No database-specific types, use standard conversion
-            df = table.to_pandas()
-
-        return df
+        return read_parquet(file_path)
     except Exception as e:
         logger.error(f"Error reading parquet file from {file_path}: {e}")
         raise
 
 
 def _download_json_from_gcs(bucket: str, blob_path: str) -> dict:
-    client = storage.Client()
-    blob = client.bucket(bucket).blob(blob_path)
-    if not blob.exists():
-        raise FileNotFoundError(f"gs://{bucket}/{blob_path} not found")
-    return json.loads(blob.download_as_bytes())
+    with open(cached_blob_path(bucket, blob_path), "rb") as f:
+        return json.load(f)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _read_parquet_file_cached(local_path: str) -> pd.DataFrame:
+    # Cache files are named by object generation, so the path is a
+    # content key: a new generation in GCS means a new entry here.
+    return safe_read_parquet(local_path)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _read_json_file_cached(local_path: str) -> dict:
+    with open(local_path, "rb") as f:
+        return json.load(f)
 
 
-@st.cache_data(show_spinner=False)
 def download_parquet_from_gcs_cached(
     bucket: str, blob_path: str
 ) -> pd.DataFrame:
-    return _download_parquet_from_gcs(bucket, blob_path)
+    return _read_parquet_file_cached(cached_blob_path(bucket, blob_path))
 
 
-@st.cache_data(show_spinner=False)
 def download_json_from_gcs_cached(bucket: str, blob_path: str) -> dict:
-    return _download_json_from_gcs(bucket, blob_path)
+    return _read_json_file_cached(cached_blob_path(bucket, blob_path))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _read_parquet_subset_cached(
+    bucket: str,
+    blob_path: str,
+    generation: int,
+    columns: Optional[Tuple[str, ...]],
+    date_col: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+) -> pd.DataFrame:
+    # ``generation`` is part of the cache key so a rewritten object is
+    # never served from a stale entry.
+    return read_parquet_from_gcs(
+        bucket,
+        blob_path,
+        columns=list(columns) if columns is not None else None,
+        date_col=date_col,
+        start=start,
+        end=end,
+    )
+
+
+def load_parquet_subset_from_gcs(
+    bucket: str,
+    blob_path: str,
+    columns: Optional[List[str]] = None,
+    date_col: Optional[str] = None,
+    start: Optional[Any] = None,
+    end: Optional[Any] = None,
+) -> pd.DataFrame:
+    """
+    Load only some columns and/or a date window of a parquet file in GCS.
+
+    Uses ranged reads (footer + needed column chunks/row groups) instead of
+    downloading the whole object. Without columns or a window this falls
+    back to the full, disk-cached download.
+    """
+    if columns is None and start is None and end is None:
+        return download_parquet_from_gcs_cached(bucket, blob_path)
+
+    with track_gcs_op("blob_generation"):
+        blob = get_storage_client().bucket(bucket).get_blob(blob_path)
+    if blob is None:
+        raise FileNotFoundError(f"gs://{bucket}/{blob_path} not found")
+
+    df = _read_parquet_subset_cached(
+        bucket,
+        blob_path,
+        blob.generation,
+        tuple(columns) if columns is not None else None,
+        date_col,
+        str(pd.Timestamp(start).date()) if start is not None else None,
+        str(pd.Timestamp(end).date()) if end is not None else None,
+    )
+    logger.info(
+        f"Loaded parquet subset from gs://{bucket}/{blob_path}: "
+        f"{len(df)} rows, {len(df.columns)} columns"
+    )
+    return df
+
+
+LOAD_HISTORY_OPTIONS: Dict[str, Optional[int]] = {
+    "All history": None,
+    "Last 3 years": 3,
+    "Last 2 years": 2,
+    "Last 12 months": 1,
+}
+
+
+def history_window_start(label: str) -> Optional[pd.Timestamp]:
+    """First day to load for a LOAD_HISTORY_OPTIONS label (None = all)."""
+    years = LOAD_HISTORY_OPTIONS.get(label)
+    if not years:
+        return None
+    return pd.Timestamp.today().normalize() - pd.DateOffset(years=years)
+
+
+def metadata_columns(meta: dict) -> List[str]:
+    """
+    Columns a metadata file refers to: date field, COUNTRY, goals, mapped
+    variables and every column with a declared type/channel/aggregation.
+    """
+    if not isinstance(meta, dict):
+        return []
+    cols: List[str] = [
+        str(meta.get("data", {}).get("date_field") or "DATE"),
+        "COUNTRY",
+    ]
+    for arr in (meta.get("mapping") or {}).values():
+        cols.extend(map(str, arr or []))
+    cols.extend(str(g["var"]) for g in meta.get("goals") or [] if g.get("var"))
+    for key in ("data_types", "channels", "agg_strategies"):
+        cols.extend(map(str, (meta.get(key) or {}).keys()))
+    for arr in (meta.get("paid_media_mapping") or {}).values():
+        cols.extend(map(str, arr or []))
+    if meta.get("dep_var"):
+        cols.append(str(meta["dep_var"]))
+    return list(dict.fromkeys(cols))
 
 
-@st.cache_data(show_spinner=False)
 def load_data_from_gcs(
     bucket: str, country: str, data_ts: str, meta_ts: str
 ) -> Tuple[pd.DataFrame, dict, str]:
@@ -2278,11 +2474,11 @@ def load_data_from_gcs(
         if data_ts == "Latest"
         else data_blob(country, str(data_ts))
     )
-    df = _download_parquet_from_gcs(bucket, db)
+    df = download_parquet_from_gcs_cached(bucket, db)
 
     # meta (use the resolver so display labels never leak into paths)
     mb = resolve_meta_blob_from_selection(bucket, country, str(meta_ts))
-    meta = _download_json_from_gcs(bucket, mb)
+    meta = download_json_from_gcs_cached(bucket, mb)
 
     df, date_col = parse_date(df, meta)
     return df, meta, date_col
@@ -2811,7 +3007,11 @@ def total_with_prev(
     return cur, (cur - prev) if pd.notna(prev) else None
 
 
-def validate_against_metadata(df: pd.DataFrame, meta: dict) -> dict:
+def validate_against_metadata(
+    df: pd.DataFrame, meta: dict, all_columns: Optional[List[str]] = None
+) -> dict:
+    # all_columns: full column list of the source file, for when df was
+    # loaded with a column projection
     if not isinstance(meta, dict):
         meta = {}
 
@@ -2841,7 +3041,7 @@ def validate_against_metadata(df: pd.DataFrame, meta: dict) -> dict:
     ]
 
     meta_vars_norm = {v.strip().lower() for v in declared_vars}
-    df_cols = list(map(str, df.columns))
+    df_cols = list(map(str, all_columns if all_columns else df.columns))
     df_cols_norm = {c.strip().lower() for c in df_cols}
 
     # show only "extra in df"
@@ -6,6 +6,7 @@ import tempfile
 import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional
+from uuid import uuid4
 
 import pandas as pd
 import snowflake.connector as sf
@@ -33,6 +34,7 @@ from app_shared import (  # Env / constants (already read from env in app_shared
     _sf_params_from_env,
     append_row_to_job_history,
     build_job_config_from_params,
+    describe_sql_columns,
     effective_sql,
     ensure_sf_conn,
     get_data_processor,
@@ -43,8 +45,10 @@ from app_shared import (  # Env / constants (already read from env in app_shared
     parse_train_size,
     queue_tick_once_headless,
     read_job_history_from_gcs,
+    read_job_history_if_changed,
     require_login_and_domain,
     run_sql,
+    run_sql_to_parquet,
     save_job_history_to_gcs,
     save_queue_to_gcs,
     timed_step,
@@ -54,6 +58,7 @@ from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from google.cloud import storage
 from utils.gcs_utils import format_cet_timestamp, get_cet_now
+from utils.resample_sql import build_resample_sql
 
 __all__ = [
     # public constants & classes...
@@ -197,6 +202,41 @@ def prepare_and_launch_job(params: dict) -> dict:
     country = params.get("country", "")
     gcs_prefix = f"robyn/{revision}/{country}/{timestamp}"
 
+    # Load metadata to get column_agg_strategies for resampling
+    # This ensures queue jobs use per-column aggregations from metadata
+    resample_metadata = None
+    if params.get("resample_freq", "none") != "none":
+        try:
+            country = params.get("country", "").lower()
+            # Try to load latest metadata for this country
+            client = storage.Client()
+            bucket = client.bucket(gcs_bucket)
+            metadata_blob_path = f"metadata/{country}/latest/mapping.json"
+            blob = bucket.blob(metadata_blob_path)
+
+            if blob.exists():
+                metadata = json.loads(blob.download_as_bytes())
+                resample_metadata = metadata
+                column_agg_strategies = metadata.get("agg_strategies", {})
+                if column_agg_strategies:
+                    params["column_agg_strategies"] = column_agg_strategies
+                    logger.info(
+                        f"Loaded {len(column_agg_strategies)} column aggregation strategies from metadata for country {country}"
+                    )
+                else:
+                    logger.warning(
+                        f"No column_agg_strategies found in metadata for country {country}"
+                    )
+            else:
+                logger.warning(
+                    f"Metadata not found at {metadata_blob_path}, using default aggregations"
+                )
+        except Exception as e:
+            logger.warning(
+                f"Could not load metadata for column aggregations: {e}"
+            )
+            # Continue without column_agg_strategies - R script will default to sum
+
     # Check if data already exists in GCS (Issue #4 GCS-based workflow)
     data_gcs_path_provided = params.get("data_gcs_path")
 
@@ -212,31 +252,41 @@ def prepare_and_launch_job(params: dict) -> dict:
         if not sql_eff:
             raise ValueError("Missing SQL/Table for job.")
 
+        # Let Snowflake aggregate to weeks/months instead of returning days
+        if params.get("resample_in_sql") and resample_metadata:
+            sql_eff = build_resample_sql(
+                sql_eff,
+                resample_metadata.get("data", {}).get("date_field")
+                or params.get("date_var", "date"),
+                params["resample_freq"],
+                resample_metadata.get("agg_strategies", {}),
+                resample_metadata.get("aggregation_sources"),
+                columns=describe_sql_columns(sql_eff),
+                data_types=resample_metadata.get("data_types"),
+                # Same window (and defaults) as the job config R reads
+                start_date=params.get("start_date", "2024-01-01"),
+                end_date=params.get("end_date", time.strftime("%Y-%m-%d")),
+            )
+            # Tells run_all.R the rows are periods, not days
+            params["resampled_in_sql"] = True
+            logger.info(f"Resampling to {params['resample_freq']} in SQL")
+
         with tempfile.TemporaryDirectory() as td:
             timings: List[dict] = []
 
-            # 1) Query Snowflake
-            with timed_step("Query Snowflake", timings):
-                df = run_sql(sql_eff)
-            """with timed_step("Optional resample (queue job)", timings):
-                df = _maybe_resample_df(
-                    df,
-                    params.get("date_var"),
-                    params.get("resample_freq", "none"),
-                    params.get("resample_agg", "sum"),
-                )"""
-
-            # 2) Parquet
-            with timed_step("Convert to Parquet", timings):
+            # 1+2) Query Snowflake, streaming batches into Parquet
+            with timed_step("Query Snowflake to Parquet", timings) as step:
                 parquet_path = os.path.join(td, "input_data.parquet")
-                data_processor.csv_to_parquet(df, parquet_path)
+                run_sql_to_parquet(sql_eff, parquet_path)
+                step["bytes"] = os.path.getsize(parquet_path)
 
             # 3) Upload data
-            with timed_step("Upload data to GCS", timings):
+            with timed_step("Upload data to GCS", timings) as step:
                 data_blob = f"training-data/{timestamp}/input_data.parquet"
                 data_gcs_path = upload_to_gcs(
                     gcs_bucket, parquet_path, data_blob
                 )
+                step["bytes"] = os.path.getsize(parquet_path)
 
             # Seed timings.csv (web-side steps) if not present
             if timings:
@@ -254,39 +304,6 @@ def prepare_and_launch_job(params: dict) -> dict:
     # Optional annotations (batch: pass a gs:// in params)
     annotations_gcs_path = params.get("annotations_gcs_path") or None
 
-    # Load metadata to get column_agg_strategies for resampling
-    # This ensures queue jobs use per-column aggregations from metadata
-    if params.get("resample_freq", "none") != "none":
-        try:
-            country = params.get("country", "").lower()
-            # Try to load latest metadata for this country
-            client = storage.Client()
-            bucket = client.bucket(gcs_bucket)
-            metadata_blob_path = f"metadata/{country}/latest/mapping.json"
-            blob = bucket.blob(metadata_blob_path)
-
-            if blob.exists():
-                metadata = json.loads(blob.download_as_bytes())
-                column_agg_strategies = metadata.get("agg_strategies", {})
-                if column_agg_strategies:
-                    params["column_agg_strategies"] = column_agg_strategies
-                    logger.info(
-                        f"Loaded {len(column_agg_strategies)} column aggregation strategies from metadata for country {country}"
-                    )
-                else:
-                    logger.warning(
-                        f"No column_agg_strategies found in metadata for country {country}"
-                    )
-            else:
-                logger.warning(
-                    f"Metadata not found at {metadata_blob_path}, using default aggregations"
-                )
-        except Exception as e:
-            logger.warning(
-                f"Could not load metadata for column aggregations: {e}"
-            )
-            # Continue without column_agg_strategies - R script will default to sum
-
     # 4) Create config (timestamped + latest)
     with tempfile.TemporaryDirectory() as td:
         timings: List[dict] = []
@@ -648,6 +665,7 @@ def render_jobs_job_history(key_prefix: str = "single") -> None:
                     st.success(f"✅ Updated {updated} completed job(s)")
 
             # Clear any cached data and bump nonce
+            st.session_state.pop(f"_job_history_view_{key_prefix}", None)
             st.session_state["job_history_nonce"] = (
                 st.session_state.get("job_history_nonce", 0) + 1
             )
@@ -662,15 +680,27 @@ def render_jobs_job_history(key_prefix: str = "single") -> None:
         except Exception as e:
             logger.warning(f"Failed to auto-update job history: {e}")
 
+        # Changes are tracked per session and view, so polls by other
+        # readers don't hide them
+        view_key = f"_job_history_view_{key_prefix}"
+        scope = (
+            st.session_state.setdefault("_job_history_scope", uuid4().hex),
+            key_prefix,
+        )
         try:
-            df_job_history = read_job_history_from_gcs(
-                st.session_state.get("gcs_bucket", GCS_BUCKET)
+            df_job_history, changed = read_job_history_if_changed(
+                st.session_state.get("gcs_bucket", GCS_BUCKET), scope=scope
             )
         except Exception as e:
             st.error(f"Failed to read job_history from GCS: {e}")
             return
 
-        df_job_history = df_job_history.reindex(columns=JOB_HISTORY_COLUMNS)
+        # Reshape only when the history changed since this view's last poll
+        if changed or view_key not in st.session_state:
+            st.session_state[view_key] = df_job_history.reindex(
+                columns=JOB_HISTORY_COLUMNS
+            )
+        df_job_history = st.session_state[view_key]
         st.dataframe(
             df_job_history,
             width="stretch",
@@ -1036,6 +1066,7 @@ _builder_defaults = dict(
     hyperparameter_preset="Meshed recommend",  # New field
     resample_freq="none",
     resample_agg="sum",
+    resample_in_sql=False,  # Aggregate in Snowflake (Snowflake jobs only)
     gcs_bucket=st.session_state.get("gcs_bucket", GCS_BUCKET),
     budget_scenario="max_historical_response",  # Budget allocation mode
 )
@@ -1187,6 +1218,12 @@ def _make_normalizer(defaults: dict):
             "resample_agg": _normalize_resample_agg(
                 str(_g("resample_agg", defaults["resample_agg"]))
             ),
+            "resample_in_sql": str(
+                _g("resample_in_sql", defaults.get("resample_in_sql", False))
+            )
+            .strip()
+            .lower()
+            in ("1", "true", "yes"),
             "annotations_gcs_path": str(_g("annotations_gcs_path", "")),
         }
 
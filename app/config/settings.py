@@ -13,6 +13,7 @@ scattered across multiple files. It provides a single source of truth for:
 """
 
 import os
+import tempfile
 from typing import Dict, List, Optional
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -48,6 +49,86 @@ GCS_BUCKET: str = os.getenv("GCS_BUCKET", "mmm-app-output")
 ARTIFACT_REPO: str = os.getenv("ARTIFACT_REPO", "mmm-repo")
 """Artifact Registry repository name"""
 
+GCS_HTTP_POOL_SIZE: int = int(os.getenv("GCS_HTTP_POOL_SIZE", "32"))
+"""Max keep-alive HTTP connections held by the shared GCS client"""
+
+GCS_BULK_FETCH_WORKERS: int = int(os.getenv("GCS_BULK_FETCH_WORKERS", "16"))
+"""Thread pool size for concurrent bulk blob downloads"""
+
+BLOB_CACHE_DIR: str = os.getenv(
+    "BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "mmm-blob-cache")
+)
+"""Local directory for the generation-keyed GCS blob cache"""
+
+BLOB_CACHE_MAX_MB: int = int(os.getenv("BLOB_CACHE_MAX_MB", "512"))
+"""Size budget for the on-disk blob cache (LRU eviction above this)"""
+
+GCS_SUBDIR_CACHE_TTL_SECONDS: int = int(
+    os.getenv("GCS_SUBDIR_CACHE_TTL_SECONDS", "30")
+)
+"""Seconds a cached folder listing (countries, revisions) stays fresh"""
+
+GCS_PARALLEL_UPLOAD_THRESHOLD_MB: int = int(
+    os.getenv("GCS_PARALLEL_UPLOAD_THRESHOLD_MB", "64")
+)
+"""Files at least this large are uploaded in concurrent parts"""
+
+GCS_UPLOAD_CHUNK_MB: int = int(os.getenv("GCS_UPLOAD_CHUNK_MB", "32"))
+"""Part size for parallel uploads and chunk size for resumable uploads"""
+
+GCS_UPLOAD_WORKERS: int = int(os.getenv("GCS_UPLOAD_WORKERS", "8"))
+"""Concurrent part uploads per large file"""
+
+RUN_CATALOG_PATH: str = os.getenv(
+    "RUN_CATALOG_PATH", "run-catalog/robyn_runs.jsonl"
+)
+"""GCS path of the run catalog (one JSON line per robyn/ run)"""
+
+RUN_CATALOG_SETTLE_HOURS: float = float(
+    os.getenv("RUN_CATALOG_SETTLE_HOURS", "24")
+)
+"""Hours without new objects after which a revision is no longer re-listed"""
+
+CACHE_LEDGER_FLUSH_SECONDS: int = int(
+    os.getenv("CACHE_LEDGER_FLUSH_SECONDS", "60")
+)
+"""Seconds between writes of cache hit counts to the cache ledgers"""
+
+CACHE_MAX_MB: int = int(os.getenv("CACHE_MAX_MB", "512"))
+"""Size budget of the in-memory cache; least recently used entries go first"""
+
+CACHE_SWEEP_SECONDS: int = int(os.getenv("CACHE_SWEEP_SECONDS", "60"))
+"""Seconds between sweeps of expired in-memory cache entries"""
+
+SHARED_CACHE_PATH: str = os.getenv(
+    "SHARED_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "mmm-shared-cache.sqlite"),
+)
+"""SQLite file of the cache tier shared by all processes on a host"""
+
+SHARED_CACHE_MAX_MB: int = int(os.getenv("SHARED_CACHE_MAX_MB", "128"))
+"""
+Size budget of the host-shared cache tier (0 disables the tier).
+
+/tmp is memory-backed on Cloud Run, so this, BLOB_CACHE_MAX_MB and
+CACHE_MAX_MB all count against the web service's 2Gi memory limit.
+"""
+
+SHARED_CACHE_POLL_SECONDS: int = int(
+    os.getenv("SHARED_CACHE_POLL_SECONDS", "15")
+)
+"""Seconds between polls for invalidations from other processes/instances"""
+
+CACHE_METRICS_PORT: int = int(os.getenv("CACHE_METRICS_PORT", "0"))
+"""
+Extra port serving cache metrics at /metrics (Prometheus text) and
+/metrics.json; 0 = off.
+
+This is the only scrape target: the app's own port serves Streamlit pages,
+not plain text. Cloud Run only routes the app's port, so there the metrics
+are only on the Cache Management page.
+"""
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Snowflake Settings
 # ─────────────────────────────────────────────────────────────────────────────
@@ -83,6 +164,36 @@ SF_PERSISTENT_KEY_SECRET: str = os.getenv(
 )
 """Secret Manager secret ID for persistent Snowflake private key"""
 
+SF_POOL_SIZE: int = int(os.getenv("SF_POOL_SIZE", "4"))
+"""Max open Snowflake connections per credential set (per process)"""
+
+SF_POOL_IDLE_SECONDS: int = int(os.getenv("SF_POOL_IDLE_SECONDS", "1800"))
+"""Close pooled Snowflake connections unused for this long"""
+
+SF_POOL_HEALTH_INTERVAL_SECONDS: int = int(
+    os.getenv("SF_POOL_HEALTH_INTERVAL_SECONDS", "120")
+)
+"""Interval of the background health check of idle pooled connections"""
+
+SF_POOL_WAIT_SECONDS: int = int(os.getenv("SF_POOL_WAIT_SECONDS", "60"))
+"""Max wait for a free pooled connection when the pool is full"""
+
+SF_KEY_CACHE_TTL_SECONDS: int = int(
+    os.getenv("SF_KEY_CACHE_TTL_SECONDS", "900")
+)
+"""TTL of decoded Snowflake private keys fetched from Secret Manager"""
+
+SF_ASYNC_POLL_SECONDS: float = float(os.getenv("SF_ASYNC_POLL_SECONDS", "1.0"))
+"""Interval between status polls of asynchronously submitted queries"""
+
+SF_INCREMENTAL_LOOKBACK_DAYS: int = int(
+    os.getenv("SF_INCREMENTAL_LOOKBACK_DAYS", "7")
+)
+"""Days before the stored max date that incremental refreshes fetch again"""
+
+SF_CACHE_GCS_MAX_MB: int = int(os.getenv("SF_CACHE_GCS_MAX_MB", "2048"))
+"""Size budget of cached query results in GCS; LRU entries are evicted above"""
+
 
 def get_snowflake_config() -> Optional[Dict[str, str]]:
     """
@@ -106,6 +217,19 @@ def get_snowflake_config() -> Optional[Dict[str, str]]:
     }
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# BigQuery Settings
+# ─────────────────────────────────────────────────────────────────────────────
+
+BQ_MAX_BYTES_SCANNED: int = int(
+    os.getenv("BQ_MAX_BYTES_SCANNED", str(50 * 1024**3))
+)
+"""Queries whose dry run estimates more bytes are refused (0 = no limit)"""
+
+BQ_CACHE_GCS_MAX_MB: int = int(os.getenv("BQ_CACHE_GCS_MAX_MB", "2048"))
+"""Size budget of cached BigQuery results in GCS"""
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Queue Settings
 # ─────────────────────────────────────────────────────────────────────────────
@@ -3,6 +3,7 @@ Data processing utilities for the MMM application.
 
 Provides optimized data processing capabilities including:
 - CSV to Parquet conversion with compression
+- Streaming Arrow batches to Parquet with bounded memory
 - Data type optimization for memory efficiency
 - GCS upload/download integration
 """
@@ -10,16 +11,83 @@ Provides optimized data processing capabilities including:
 import io
 import logging
 import os
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional, Sequence, Union
 
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 from config import settings
-from google.cloud import storage
+from utils.gcs_client import get_storage_client
+from utils.gcs_utils import read_parquet_table_from_gcs, upload_large_file
+from utils.parquet_decode import table_to_pandas
 
 logger = logging.getLogger(__name__)
 
+# Same writer settings as csv_to_parquet
+PARQUET_WRITE_OPTIONS = dict(
+    compression="snappy",  # Good balance of speed vs compression
+    use_dictionary=True,  # Better for categorical data
+    use_byte_stream_split=True,  # Better compression for floats
+)
+PARQUET_ROW_GROUP_SIZE = 50000  # Optimize for typical MMM dataset sizes
+
+
+def _stream_type(t: pa.DataType) -> pa.DataType:
+    """
+    Batch-independent output type for a streamed column.
+
+    The writer's schema comes from the first batch, so every batch must
+    cast to it: Snowflake picks the narrowest int width per chunk (an int8
+    chunk can be followed by an int16 one for the same NUMBER column), so
+    ints and floats are widened to 64 bits. Value-based narrowing (Int8,
+    float32, category) isn't applied either; Parquet's bit-packing and
+    dictionary encodings already store small ints and repeated strings
+    compactly.
+    """
+    if pa.types.is_decimal(t):
+        return pa.int64() if t.scale == 0 else pa.float64()
+    if pa.types.is_integer(t):
+        return pa.int64()
+    if pa.types.is_floating(t):
+        return pa.float64()
+    if pa.types.is_large_string(t):
+        return pa.string()
+    if pa.types.is_large_binary(t):
+        return pa.binary()
+    return t
+
+
+def stream_schema(schema: pa.Schema) -> pa.Schema:
+    """Output schema used when streaming batches of ``schema`` to Parquet."""
+    return pa.schema(
+        [f.with_type(_stream_type(f.type)) for f in schema],
+        metadata=schema.metadata,
+    )
+
+
+def _cast_to_stream(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """
+    Cast a batch to the stream schema.
+
+    Raises:
+        ValueError: If a column's values don't fit its stream type, e.g. a
+            NUMBER(38,0) beyond the int64 range
+    """
+    try:
+        return table.cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        for field in schema:
+            column = table.column(field.name)
+            try:
+                column.cast(field.type)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                raise ValueError(
+                    f"Column '{field.name}' ({column.type}) can't be "
+                    f"written as {field.type}: {e}. Cast it in the query, "
+                    "e.g. to FLOAT."
+                ) from e
+        raise
+
 
 class DataProcessor:
     """
@@ -38,7 +106,7 @@ class DataProcessor:
             gcs_bucket: GCS bucket name (defaults to settings.GCS_BUCKET)
         """
         self.gcs_bucket = gcs_bucket or settings.GCS_BUCKET
-        self.storage_client = storage.Client()
+        self.storage_client = get_storage_client()
 
     def csv_to_parquet(
         self, csv_data: pd.DataFrame, output_path: Optional[str] = None
@@ -70,10 +138,8 @@ class DataProcessor:
         pq.write_table(
             table,
             buffer,
-            compression="snappy",  # Good balance of speed vs compression
-            use_dictionary=True,  # Better for categorical data
-            row_group_size=50000,  # Optimize for typical MMM dataset sizes
-            use_byte_stream_split=True,  # Better compression for floats
+            row_group_size=PARQUET_ROW_GROUP_SIZE,
+            **PARQUET_WRITE_OPTIONS,
         )
 
         buffer.seek(0)
@@ -91,6 +157,62 @@ class DataProcessor:
 
         return buffer
 
+    def arrow_batches_to_parquet(
+        self,
+        batches: Iterable[Union[pa.RecordBatch, pa.Table]],
+        output_path: str,
+    ) -> Dict[str, int]:
+        """
+        Write Arrow batches to a Parquet file one row group at a time.
+
+        Each batch is cast to the stream schema (see stream_schema) and
+        written as soon as it arrives, so memory is bounded by one batch
+        instead of the whole result.
+
+        Args:
+            batches: Arrow record batches or tables sharing one schema
+                (e.g. cursor.fetch_arrow_batches())
+            output_path: Local file path for the Parquet file
+
+        Returns:
+            Dictionary with rows, batches and bytes written (bytes is 0 and
+            no file is written when there were no batches)
+
+        Raises:
+            ValueError: If a batch doesn't fit the stream schema (see
+                _cast_to_stream)
+        """
+        writer = None
+        rows = n_batches = 0
+        try:
+            for batch in batches:
+                table = (
+                    pa.Table.from_batches([batch])
+                    if isinstance(batch, pa.RecordBatch)
+                    else batch
+                )
+                if writer is None:
+                    schema = stream_schema(table.schema)
+                    writer = pq.ParquetWriter(
+                        output_path, schema, **PARQUET_WRITE_OPTIONS
+                    )
+                writer.write_table(
+                    _cast_to_stream(table, schema),
+                    row_group_size=PARQUET_ROW_GROUP_SIZE,
+                )
+                rows += table.num_rows
+                n_batches += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+        size = os.path.getsize(output_path) if writer is not None else 0
+        logger.info(
+            f"Streamed {rows:,} rows in {n_batches} batches to Parquet "
+            f"({size / 1024**2:.1f} MB)"
+        )
+        return {"rows": rows, "batches": n_batches, "bytes": size}
+
     def _optimize_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Optimize DataFrame data types for better performance and compression.
@@ -241,12 +363,12 @@ class DataProcessor:
         Returns:
             Full GCS URI (gs://bucket/path)
         """
-        bucket = self.storage_client.bucket(self.gcs_bucket)
-        blob = bucket.blob(gcs_path)
-
-        data_buffer.seek(0)
-        blob.upload_from_file(
-            data_buffer, content_type="application/octet-stream"
+        # Large buffers go up in concurrent parts, others resumably
+        upload_large_file(
+            self.gcs_bucket,
+            data_buffer,
+            gcs_path,
+            content_type="application/octet-stream",
         )
 
         logger.info(
@@ -254,69 +376,45 @@ class DataProcessor:
         )
         return f"gs://{self.gcs_bucket}/{gcs_path}"
 
-    def read_parquet_from_gcs(self, gcs_path: str) -> pd.DataFrame:
+    def read_parquet_from_gcs(
+        self,
+        gcs_path: str,
+        columns: Optional[Sequence[str]] = None,
+        date_col: Optional[str] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        countries: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
         """
         Read Parquet file from GCS.
 
+        Uses ranged reads, so only the footer and the column chunks and row
+        groups needed for ``columns`` and the date/country filters are
+        fetched.
+
         Args:
             gcs_path: Path to Parquet file in GCS bucket
+            columns: Optional columns to read (default: all)
+            date_col: Optional date column for the start/end window
+            start: First day to keep (inclusive)
+            end: Last day to keep (inclusive)
+            countries: Optional country codes to keep (COUNTRY column)
 
         Returns:
             DataFrame loaded from Parquet file
         """
-        import pyarrow as pa
-        import pyarrow.parquet as pq
-
-        bucket = self.storage_client.bucket(self.gcs_bucket)
-        blob = bucket.blob(gcs_path)
-
-        # Download to memory buffer
-        buffer = io.BytesIO()
-        blob.download_to_file(buffer)
-        buffer.seek(0)
+        table = read_parquet_table_from_gcs(
+            self.gcs_bucket,
+            gcs_path,
+            columns=columns,
+            date_col=date_col,
+            start=start,
+            end=end,
+            countries=countries,
+        )
 
         try:
-            # Read Parquet from buffer using PyArrow to handle database-specific types
-            table = pq.read_table(buffer)
-
-            # Check for database-specific types and convert them
-            schema = table.schema
-            db_type_columns = []
-            for i, field in enumerate(schema):
-                field_type_str = str(field.type).lower()
-                # Check if the type string contains database-specific type indicators
-                if "db" in field_type_str and any(
-                    db_type in field_type_str
-                    for db_type in [
-                        "dbdate",
-                        "dbtime",
-                        "dbdecimal",
-                        "dbtimestamp",
-                    ]
-                ):
-                    db_type_columns.append(field.name)
-                    logger.warning(
-                        f"Column '{field.name}' has database-specific type '{field.type}'"
-                    )
-
-            # Convert to pandas with type mapping for database-specific types
-            if db_type_columns:
-                logger.info(
-                    f"Converting database-specific types in columns: {db_type_columns}"
-                )
-
-                # Create a types_mapper that converts unknown types to string
-                def types_mapper(pa_type):
-                    type_str = str(pa_type).lower()
-                    if "db" in type_str:
-                        # Map database types to string for safe conversion
-                        return pd.StringDtype()
-                    return None  # Use default mapping for other types
-
-                df = table.to_pandas(types_mapper=types_mapper)
-            else:
-                # No database-specific types, use standard conversion
-                df = table.to_pandas()
+            df = table_to_pandas(table)
 
             logger.info(
                 f"Loaded Parquet file from GCS: {len(df):,} rows, "
@@ -5,8 +5,13 @@ Provides interface for viewing and managing Snowflake query cache.
 Helps users understand cache performance and manually clear cache when needed.
 """
 
+import pandas as pd
 import streamlit as st
 from app_shared import require_login_and_domain
+from utils.bigquery_cache import clear_bigquery_cache, format_bytes
+from utils.cache import get_hot_entries
+from utils.cache_metrics import dump_metrics_json, metrics_snapshot
+from utils.query_cache import get_source_stats
 from utils.snowflake_cache import clear_snowflake_cache, get_cache_stats
 
 # Authentication
@@ -48,9 +53,135 @@ with col3:
     st.metric(
         "GCS Storage",
         f"{stats['gcs_total_size_mb']} MB",
-        help="Total size of cached query results in GCS",
+        help=f"Total size of cached query results in GCS. Least recently "
+        f"used results are evicted beyond {stats['gcs_max_size_mb']} MB; "
+        f"{stats['gcs_entry_hits']} hits on the stored results",
     )
 
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    st.metric(
+        "Coalesced Calls",
+        stats["coalesced"],
+        help="Calls that waited for an identical query already running "
+        "instead of running it again",
+    )
+
+with col2:
+    st.metric(
+        "Stale Results Served",
+        stats["stale_hits"],
+        help="Expired results returned immediately while being refreshed",
+    )
+
+with col3:
+    st.metric(
+        "Background Refreshes",
+        stats["background_refreshes"],
+        help=f"{stats['background_failures']} failed",
+    )
+
+# Hit rates and savings per data source
+st.markdown("**By Data Source**")
+source_stats = get_source_stats()
+st.dataframe(
+    pd.DataFrame(
+        [
+            {
+                "Source": src["source"].title(),
+                "Hit Rate": f"{src['hit_rate']:.0%}",
+                "Hits": src["hits"],
+                "Misses": src["misses"],
+                "Est. Bytes Saved": format_bytes(src["bytes_saved"]),
+                "GCS Results": src["gcs_count"],
+                "GCS Size (MB)": src["gcs_total_size_mb"],
+            }
+            for src in source_stats
+        ]
+    ),
+    hide_index=True,
+    width="stretch",
+)
+st.caption(
+    "Hit rate counts calls served without running the query since the app "
+    "started. Bytes saved add up what each served result cost to produce: "
+    "bytes scanned for BigQuery (from the dry run/job), result size for "
+    "Snowflake."
+)
+
+# Hits, misses and compute time per cache namespace
+st.markdown("**By Namespace**")
+snapshot = metrics_snapshot()
+namespace_rows = [
+    {
+        "Namespace": name,
+        "Hits": ns["hits"],
+        "Misses": ns["misses"],
+        "Hit Rate": ns["hit_rate"],
+        "Mean Compute (s)": round(ns["mean_compute_seconds"], 3),
+        "Est. Time Saved (s)": round(ns["est_seconds_saved"], 1),
+        "Memory": format_bytes(ns["tiers"].get("memory", {}).get("bytes", 0)),
+        "Shared": format_bytes(ns["tiers"].get("shared", {}).get("bytes", 0)),
+        "Evictions": sum(
+            tier.get("evictions", 0) for tier in ns["tiers"].values()
+        ),
+    }
+    for name, ns in snapshot["namespaces"].items()
+]
+if namespace_rows:
+    namespace_df = pd.DataFrame(namespace_rows)
+    st.bar_chart(
+        namespace_df.set_index("Namespace")[["Hits", "Misses"]],
+        stack=True,
+    )
+    st.dataframe(
+        namespace_df,
+        hide_index=True,
+        width="stretch",
+        column_config={
+            "Hit Rate": st.column_config.ProgressColumn(
+                "Hit Rate", format="percent", min_value=0, max_value=1
+            ),
+        },
+    )
+    st.caption(
+        "Namespaces are the cached function names and the query sources. "
+        "Time saved is hits times the mean compute time of a miss. "
+        "Counts are for this process since it started."
+    )
+
+    with st.expander("🔥 Hottest In-Memory Entries"):
+        hot = get_hot_entries(20)
+        if hot:
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "Namespace": entry["namespace"],
+                            "Key": entry["key"][:16],
+                            "Hits": entry["hits"],
+                            "Size": format_bytes(entry["bytes"]),
+                            "Age (min)": round(entry["age"] / 60, 1),
+                        }
+                        for entry in hot
+                    ]
+                ),
+                hide_index=True,
+                width="stretch",
+            )
+        else:
+            st.info("No in-memory cache entries")
+
+    st.download_button(
+        "📥 Download Metrics (JSON)",
+        data=dump_metrics_json(),
+        file_name="cache_metrics.json",
+        mime="application/json",
+    )
+else:
+    st.info("No cache lookups recorded yet")
+
 st.divider()
 
 # Cache explanation
@@ -90,10 +221,46 @@ with st.expander("ℹ️ How Query Caching Works"):
     
     ### Cache Key
     
-    Queries are matched based on normalized SQL:
-    - Whitespace differences are ignored
-    - Case differences are ignored
+    Queries are matched based on canonical SQL:
+    - Whitespace and comments are ignored
+    - Keyword and identifier case is ignored; string literals are not
+      (`'DE'` and `'de'` are different queries)
     - `SELECT * FROM table` and `select * from table` use the same cache
+    - Column order and redundant aliases don't matter for simple queries
+
+    A simple query (`SELECT cols FROM table WHERE col op value AND ...`)
+    can also be answered from a cached result of the same table with more
+    columns or a wider filter, e.g. a narrower date window.
+
+    ### Concurrent and Expired Queries
+
+    - When several users run the same uncached query at once, it runs on
+      Snowflake once and the others wait for its result
+    - A result that expired less than 6 hours ago is still returned
+      immediately, while the query re-runs in the background to update
+      the cache
+
+    ### BigQuery Queries
+
+    Custom BigQuery SQL uses the same two tiers (`cache/bigquery-queries/`).
+    Before a query that isn't cached runs, a free dry run estimates the
+    bytes it will scan; queries above `BQ_MAX_BYTES_SCANNED` are refused.
+
+    ### Size Limit
+
+    The GCS cache keeps a ledger (`_ledger.json`) with the size, last
+    access and hit count of each result. When new results push it over
+    its size budget (`SF_CACHE_GCS_MAX_MB`), the least recently used
+    results are deleted. `scripts/snowflake_cache_janitor.py` deletes
+    expired results in batches (`--prefix cache/bigquery-queries/` for
+    BigQuery).
+
+    ### Metrics
+
+    Hits, misses and compute times per namespace can be scraped as
+    Prometheus text at `/metrics` (JSON at `/metrics.json`) on
+    `CACHE_METRICS_PORT` when it is set. Cloud Run routes only the app's
+    port, so there they are only available on this page.
     """)
 
 st.divider()
@@ -107,6 +274,7 @@ with col1:
     if st.button("🗑️ Clear All Cache", type="primary", width="stretch"):
         with st.spinner("Clearing cache..."):
             clear_snowflake_cache()
+            clear_bigquery_cache()
             st.success("✅ All cache cleared successfully!")
             st.rerun()
 
@@ -15,6 +15,11 @@ from app_split_helpers import *  # bring in all helper functions/constants
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from gcp_secrets import access_secret, upsert_secret
+from utils.snowflake_pool import (
+    clear_private_key_cache,
+    close_connections,
+    lease_connection,
+)
 
 require_login_and_domain()
 ensure_session_defaults()
@@ -209,16 +214,21 @@ if data_source_type == "Snowflake":
                             "⚠️ Failed to save key to Secret Manager, but we'll continue with the connection attempt."
                         )
 
-            # Build connection using the key
-            conn = _connect_snowflake(
-                user=sf_user,
-                account=sf_account,
-                warehouse=sf_wh,
-                database=sf_db,
-                schema=sf_schema,
-                role=sf_role,
-                private_key=pk_der,
-            )
+            # Open (or reuse) a pooled connection to check the credentials;
+            # it goes back to the pool, shared by sessions with the same key
+            with lease_connection(
+                dict(
+                    user=sf_user,
+                    account=sf_account,
+                    warehouse=sf_wh,
+                    database=sf_db,
+                    schema=sf_schema,
+                    role=sf_role,
+                    private_key=pk_der,
+                ),
+                _connect_snowflake,
+            ):
+                pass
 
             # Store non-sensitive params and keep key bytes in-session
             st.session_state["sf_params"] = dict(
@@ -230,7 +240,6 @@ if data_source_type == "Snowflake":
                 role=sf_role,
             )
             st.session_state["_sf_private_key_bytes"] = pk_der
-            st.session_state["sf_conn"] = conn
             st.session_state["sf_connected"] = True
             st.success(
                 f"Connected to Snowflake as `{sf_user}` on `{sf_account}`."
@@ -274,9 +283,13 @@ if data_source_type == "Snowflake":
                     st.error(f"Reconnect failed: {e}")
             if dc2.button("⏏️ Disconnect"):
                 try:
-                    conn = st.session_state.get("sf_conn")
-                    if conn:
-                        conn.close()
+                    # Other sessions may share the pooled connections:
+                    # only close the idle ones for these credentials
+                    key = st.session_state.get("_sf_private_key_bytes")
+                    if key:
+                        close_connections(
+                            {**st.session_state.sf_params, "private_key": key}
+                        )
                 finally:
                     st.session_state["sf_conn"] = None
                     st.session_state["sf_connected"] = False
@@ -293,6 +306,7 @@ if data_source_type == "Snowflake":
                         client.delete_secret(request={"name": name})
                         st.session_state.pop("_sf_private_key_bytes", None)
                         st.session_state["_checked_persisted_key"] = False
+                        clear_private_key_cache(PERSISTENT_KEY_SECRET_ID)
                         st.success(
                             "✅ Your saved private key has been removed from Secret Manager."
                         )
@@ -327,6 +341,7 @@ elif data_source_type == "BigQuery":
                 st.session_state["_bq_credentials_json"] = creds_json.decode(
                     "utf-8"
                 )
+                st.session_state["_bq_creds_from_secret"] = True
                 persisted_creds_available = True
                 st.info(
                     "✅ Found previously saved credentials. You can use "
@@ -384,6 +399,7 @@ elif data_source_type == "BigQuery":
     if submitted_bq:
         try:
             creds_json = None
+            creds_secret_id = None
 
             # Priority 1: newly uploaded file
             if bq_creds_file is not None:
@@ -394,18 +410,31 @@ elif data_source_type == "BigQuery":
             # Priority 3: use existing persisted credentials
             elif st.session_state.get("_bq_credentials_json"):
                 creds_json = st.session_state["_bq_credentials_json"]
+                if st.session_state.get("_bq_creds_from_secret"):
+                    # Client is cached by secret for the process, so later
+                    # sessions connect without reading the secret again
+                    creds_secret_id = BQ_PERSISTENT_CREDS_SECRET_ID
             else:
                 raise ValueError(
                     "Provide BigQuery service account credentials (JSON) or ensure saved credentials exist."
                 )
 
             # Test connection by creating a client
-            from utils.bigquery_connector import create_bigquery_client
-
-            bq_client = create_bigquery_client(
-                bq_project_id, credentials_json=creds_json
+            from utils.bigquery_connector import (
+                clear_client_cache,
+                create_bigquery_client,
             )
 
+            if creds_secret_id:
+                bq_client = create_bigquery_client(
+                    bq_project_id, secret_id=creds_secret_id
+                )
+            else:
+                bq_client = create_bigquery_client(
+                    bq_project_id, credentials_json=creds_json
+                )
+                st.session_state["_bq_creds_from_secret"] = False
+
             # Save to Secret Manager if requested and we have new credentials
             if save_creds and (bq_creds_file or bq_creds_json.strip()):
                 try:
@@ -414,6 +443,8 @@ elif data_source_type == "BigQuery":
                         creds_json.encode("utf-8"),
                         PROJECT_ID,
                     )
+                    # Drop clients cached for the old secret value
+                    clear_client_cache()
                     st.success(
                         "✅ Your BigQuery credentials have been saved securely for future sessions."
                     )
@@ -473,7 +504,11 @@ elif data_source_type == "BigQuery":
                     name = f"projects/{PROJECT_ID}/secrets/{BQ_PERSISTENT_CREDS_SECRET_ID}"
                     try:
                         client.delete_secret(request={"name": name})
+                        from utils.bigquery_connector import clear_client_cache
+
+                        clear_client_cache()
                         st.session_state.pop("_bq_credentials_json", None)
+                        st.session_state.pop("_bq_creds_from_secret", None)
                         st.session_state["_checked_persisted_bq_creds"] = False
                         st.success(
                             "✅ Your saved BigQuery credentials have been removed."
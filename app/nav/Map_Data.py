@@ -15,18 +15,31 @@ from app_shared import (
     GCS_BUCKET,
     PROJECT_ID,
     _require_sf_session,
+    download_json_from_gcs_cached,
+    download_parquet_from_gcs_cached,
     effective_sql,
     get_data_processor,
     list_data_versions,
     list_meta_versions,
     require_login_and_domain,
-    run_sql,
+    run_sql_incremental,
+    sf_query_batch,
     sync_session_state_keys,
     upload_to_gcs,
 )
 from app_split_helpers import *  # bring in all helper functions/constants
 from google.cloud import storage
-from utils.gcs_utils import format_cet_timestamp, get_cet_now
+from utils.gcs_utils import (
+    format_cet_timestamp,
+    get_cet_now,
+    list_subdirs,
+    publish_gcs_write,
+)
+from utils.version_index import (
+    list_versions,
+    record_version_blob,
+    record_versions,
+)
 
 # ──────────────────────────────────────────────────────────────
 # Constants
@@ -86,120 +99,27 @@ def _meta_latest_blob(country: str) -> str:
 
 def _list_country_versions(bucket: str, country: str) -> List[str]:
     """Return timestamp folder names available in datasets/<country>/."""
-    client = storage.Client()
-    b = client.bucket(bucket)
-    prefix = f"{_data_root(country)}/"
-    blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
-    # Extract "<ts>/" directory part between country/ and /raw.parquet
-    ts = set()
-    for blob in blobs:
-        # want datasets/country/<ts>/raw.parquet
-        parts = blob.name.split("/")
-        if len(parts) >= 4 and parts[-1] == "raw.parquet":
-            ts.add(parts[-2])
-    return sorted(ts, reverse=True)
+    # Read from the datasets/<country>/_index.json manifest
+    return sorted(list_versions(bucket, _data_root(country)), reverse=True)
 
 
 def _list_metadata_versions(bucket: str, country: str) -> List[str]:
     """Return timestamp folder names available in metadata/<country>/."""
-    client = storage.Client()
-    prefix = f"metadata/{country.lower().strip()}/"
-    blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
-    # Extract "<ts>/" directory part from metadata/country/<ts>/mapping.json
-    ts = set()
-    for blob in blobs:
-        # want metadata/country/<ts>/mapping.json
-        parts = blob.name.split("/")
-        if (
-            len(parts) >= 4
-            and parts[-1] == "mapping.json"
-            and parts[-2] != "latest"
-        ):
-            ts.add(parts[-2])
-    return sorted(ts, reverse=True)
-
-
-def _download_parquet_from_gcs(gs_bucket: str, blob_path: str) -> pd.DataFrame:
-    """Download parquet file from GCS with database-specific type handling."""
-    import logging
-
-    import pyarrow as pa
-    import pyarrow.parquet as pq
-
-    logger = logging.getLogger(__name__)
-    client = storage.Client()
-    b = client.bucket(gs_bucket)
-    blob = b.blob(blob_path)
-    if not blob.exists():
-        raise FileNotFoundError(f"gs://{gs_bucket}/{blob_path} not found")
-    with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tmp:
-        blob.download_to_filename(tmp.name)
-        try:
-            # Read parquet file using PyArrow first to handle database-specific types
-            table = pq.read_table(tmp.name)
-
-            # Check for database-specific types and convert them
-            schema = table.schema
-            db_type_columns = []
-            for i, field in enumerate(schema):
-                field_type_str = str(field.type).lower()
-                # Check if the type string contains database-specific type indicators
-                if "db" in field_type_str and any(
-                    db_type in field_type_str
-                    for db_type in [
-                        "dbdate",
-                        "dbtime",
-                        "dbdecimal",
-                        "dbtimestamp",
-                    ]
-                ):
-                    db_type_columns.append(field.name)
-                    logger.warning(
-                        f"Column '{field.name}' has database-specific type '{field.type}'"
-                    )
-
-            # Convert to pandas with type mapping for database-specific types
-            if db_type_columns:
-                logger.info(
-                    f"Converting database-specific types in columns: {db_type_columns}"
-                )
-
-                # Create a types_mapper that converts unknown types to string
-                def types_mapper(pa_type):
-                    type_str = str(pa_type).lower()
-                    if "db" in type_str:
-                        # Map database types to string for safe conversion
-                        return pd.StringDtype()
-                    return None  # Use default mapping for other types
-
-                df = table.to_pandas(types_mapper=types_mapper)
-            else:
-                # No database-specific types, use standard conversion
-                df = table.to_pandas()
-
-            # Log data types for debugging
-            logger.info(
-                f"Loaded parquet from gs://{gs_bucket}/{blob_path}: "
-                f"{len(df)} rows, {len(df.columns)} columns"
-            )
-
-            return df
-        except Exception as e:
-            logger.error(
-                f"Error reading parquet file from gs://{gs_bucket}/{blob_path}: {e}"
-            )
-            raise
+    ts = list_versions(bucket, f"metadata/{country.lower().strip()}")
+    return sorted((t for t in ts if t != "latest"), reverse=True)
 
 
 def _save_raw_to_gcs(
     df: pd.DataFrame, bucket: str, country: str, timestamp: str = None
 ) -> Dict[str, str]:
     ts = timestamp or format_cet_timestamp()
+    # upload_to_gcs invalidates cached reads of both objects
     with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tmp:
         df.to_parquet(tmp.name, index=False)
         data_gcs_path = upload_to_gcs(bucket, tmp.name, _data_blob(country, ts))
         # maintain "latest" copy
         upload_to_gcs(bucket, tmp.name, _latest_symlink_blob(country))
+    record_versions(bucket, _data_root(country), [ts, "latest"])
     return {"timestamp": ts, "data_gcs_path": data_gcs_path}
 
 
@@ -208,6 +128,7 @@ def _save_mapped_to_gcs(
 ) -> Dict[str, str]:
     """Save mapped dataset to mapped-datasets/ path (separate from raw datasets)."""
     ts = timestamp or format_cet_timestamp()
+    # upload_to_gcs invalidates cached reads of both objects
     with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tmp:
         df.to_parquet(tmp.name, index=False)
         data_gcs_path = upload_to_gcs(
@@ -215,6 +136,7 @@ def _save_mapped_to_gcs(
         )
         # maintain "latest" copy
         upload_to_gcs(bucket, tmp.name, _mapped_latest_symlink_blob(country))
+    record_versions(bucket, _mapped_data_root(country), [ts, "latest"])
     return {"timestamp": ts, "data_gcs_path": data_gcs_path}
 
 
@@ -224,6 +146,8 @@ def _safe_json_dump_to_gcs(payload: dict, bucket: str, dest_blob: str):
     blob.upload_from_string(
         json.dumps(payload, indent=2), content_type="application/json"
     )
+    publish_gcs_write(bucket, dest_blob)
+    record_version_blob(bucket, dest_blob)
 
 
 # --- Cache I/O ---
@@ -237,17 +161,96 @@ def _list_metadata_versions_cached(bucket: str, country: str) -> list[str]:
     return _list_metadata_versions(bucket, country)
 
 
-@st.cache_data(show_spinner=False)
 def _download_parquet_from_gcs_cached(
     gs_bucket: str, blob_path: str
 ) -> pd.DataFrame:
-    return _download_parquet_from_gcs(gs_bucket, blob_path)
+    # Generation-keyed blob cache: re-downloads only when the object changes
+    return download_parquet_from_gcs_cached(gs_bucket, blob_path)
 
 
-@st.cache_data(show_spinner=False)
-def _load_from_snowflake_cached(sql: str) -> pd.DataFrame:
+def _snowflake_country_sql(country: str) -> Optional[str]:
+    """Snowflake SQL for one country (table + country filter, or custom SQL)."""
+    base_sql = effective_sql(
+        st.session_state["sf_table"],
+        st.session_state["sf_sql"],
+    )
+    if not base_sql:
+        return None
+    # Add country filter if not using custom SQL
+    if not st.session_state["sf_sql"].strip():
+        country_field = st.session_state.get(
+            "sf_country_field", "COUNTRY"
+        ).strip()
+        return f"{base_sql} WHERE {country_field} = '{country.upper()}'"
+    # Custom SQL - user must include country filter themselves
+    # Replace placeholder if present
+    return st.session_state["sf_sql"].replace("{country}", country.upper())
+
+
+def _load_from_snowflake_concurrently(
+    countries: List[str],
+) -> Dict[str, object]:
+    """
+    Run the per-country queries at the same time.
+
+    Returns:
+        Mapping of country to its DataFrame, or to the exception its
+        query raised
+    """
     _require_sf_session()
-    return run_sql(sql)
+    queries = {}
+    for country in countries:
+        sql = _snowflake_country_sql(country)
+        if sql:
+            queries[country] = sql
+    results = {}
+    progress = st.progress(0.0, text="Querying Snowflake...")
+    with sf_query_batch(queries) as batch:
+        for q in batch.as_completed():
+            results[q.key] = q.error if q.error is not None else q.result
+            progress.progress(
+                len(results) / len(queries),
+                text=f"{q.key.upper()} finished after {q.elapsed:.1f}s "
+                f"({len(results)}/{len(queries)})",
+            )
+    progress.empty()
+    return results
+
+
+def _load_from_snowflake_incrementally(
+    countries: List[str],
+) -> Dict[str, object]:
+    """
+    Refresh the per-country table queries, fetching only rows newer than
+    the last refresh (minus the look-back window).
+
+    Returns:
+        Mapping of country to its full DataFrame, or to the exception its
+        refresh raised. The refresh info of each country is kept in
+        st.session_state["sf_refresh_info"].
+    """
+    _require_sf_session()
+    date_field = st.session_state.get("sf_date_field", "DATE").strip()
+    lookback = int(st.session_state.get("sf_lookback_days", 7))
+    results, infos = {}, {}
+    progress = st.progress(0.0, text="Refreshing from Snowflake...")
+    for i, country in enumerate(countries, start=1):
+        sql = _snowflake_country_sql(country)
+        if not sql:
+            continue
+        try:
+            results[country], infos[country] = run_sql_incremental(
+                sql, date_field, lookback_days=lookback
+            )
+        except Exception as e:
+            results[country] = e
+        progress.progress(
+            i / len(countries),
+            text=f"{country.upper()} refreshed ({i}/{len(countries)})",
+        )
+    progress.empty()
+    st.session_state["sf_refresh_info"] = infos
+    return results
 
 
 def _simplify_error_message(
@@ -570,11 +573,7 @@ def _initial_goals_from_columns() -> pd.DataFrame:
 
 
 def _download_json_from_gcs(gs_bucket: str, blob_path: str) -> dict:
-    client = storage.Client()
-    blob = client.bucket(gs_bucket).blob(blob_path)
-    if not blob.exists():
-        raise FileNotFoundError(f"gs://{gs_bucket}/{blob_path} not found")
-    return json.loads(blob.download_as_bytes())
+    return download_json_from_gcs_cached(gs_bucket, blob_path)
 
 
 def _infer_category(col: str, rules: dict[str, list[str]]) -> str:
@@ -1113,13 +1112,13 @@ def _iso2_countries_gcs_first(bucket: str) -> list[str]:
             ]
         )
 
-    has_data, no_data = [], []
-    for code in all_iso2:
-        try:
-            versions = _list_country_versions_cached(bucket, code)
-            (has_data if versions else no_data).append(code)
-        except Exception:
-            no_data.append(code)
+    # One folder listing of datasets/ instead of a version lookup per code
+    try:
+        with_data = {c.lower() for c in list_subdirs(bucket, "datasets/")}
+    except Exception:
+        with_data = set()
+    has_data = [c for c in all_iso2 if c in with_data]
+    no_data = [c for c in all_iso2 if c not in with_data]
     return has_data + no_data
 
 
@@ -1136,6 +1135,9 @@ st.title("Map Data & Define Goals")
 st.session_state.setdefault("sf_table", "DB.SCHEMA.TABLE")
 st.session_state.setdefault("sf_sql", "")
 st.session_state.setdefault("sf_country_field", "COUNTRY")
+st.session_state.setdefault("sf_incremental", False)
+st.session_state.setdefault("sf_date_field", "DATE")
+st.session_state.setdefault("sf_lookback_days", 7)
 st.session_state.setdefault("bq_table", "")
 st.session_state.setdefault("bq_sql", "")
 st.session_state.setdefault("bq_country_field", "country")
@@ -1283,6 +1285,24 @@ with st.expander("📊 Choose the data you want to analyze.", expanded=False):
                 )
                 st.text_area("Or: Write a custom SQL", key="sf_sql")
                 st.text_input("Select country field:", key="sf_country_field")
+                st.checkbox(
+                    "Incremental refresh (only fetch new days)",
+                    key="sf_incremental",
+                    help="Table mode only. Reuses the rows loaded by the "
+                    "previous refresh and queries only days from its last "
+                    "date minus the look-back window; the merged data is "
+                    "saved as a new dataset version.",
+                )
+                if st.session_state["sf_incremental"]:
+                    st.text_input("Date field:", key="sf_date_field")
+                    st.number_input(
+                        "Look-back days",
+                        key="sf_lookback_days",
+                        min_value=0,
+                        step=1,
+                        help="Days before the last loaded date that are "
+                        "fetched again to pick up late corrections.",
+                    )
 
         elif source_choice == "BigQuery":
             with st.expander("🔍 BigQuery Query", expanded=True):
@@ -1474,6 +1494,22 @@ with st.expander("📊 Choose the data you want to analyze.", expanded=False):
             with st.spinner(
                 f"Loading data for {len(selected_countries)} countries..."
             ):
+                # All Snowflake countries are queried up front
+                sf_incremental = (
+                    choice == "Snowflake"
+                    and st.session_state.get("sf_incremental", False)
+                    and not st.session_state["sf_sql"].strip()
+                )
+                if sf_incremental:
+                    sf_results = _load_from_snowflake_incrementally(
+                        selected_countries
+                    )
+                elif choice == "Snowflake":
+                    sf_results = _load_from_snowflake_concurrently(
+                        selected_countries
+                    )
+                else:
+                    sf_results = {}
                 for country in selected_countries:
                     try:
                         df = None
@@ -1481,31 +1517,16 @@ with st.expander("📊 Choose the data you want to analyze.", expanded=False):
 
                         if choice == "Snowflake":
                             # Load from Snowflake with country-specific WHERE clause
-                            _require_sf_session()
-                            base_sql = effective_sql(
-                                st.session_state["sf_table"],
-                                st.session_state["sf_sql"],
-                            )
-                            if base_sql:
-                                # Add country filter if not using custom SQL
-                                if not st.session_state["sf_sql"].strip():
-                                    country_field = st.session_state.get(
-                                        "sf_country_field", "COUNTRY"
-                                    ).strip()
-                                    sql = f"{base_sql} WHERE {country_field} = '{country.upper()}'"
-                                else:
-                                    # Custom SQL - user must include country filter themselves
-                                    # Replace placeholder if present
-                                    sql = st.session_state["sf_sql"].replace(
-                                        "{country}", country.upper()
-                                    )
-
+                            sql = _snowflake_country_sql(country)
+                            if sql:
                                 # Log the SQL for debugging
                                 st.write(
-                                    f"Executing SQL for {country.upper()}: {sql}"
+                                    f"Executed SQL for {country.upper()}: {sql}"
                                 )
 
-                                df = _load_from_snowflake_cached(sql)
+                                df = sf_results.get(country)
+                                if isinstance(df, Exception):
+                                    raise df
 
                                 # Validate that country field exists in the data (case-insensitive)
                                 if (
@@ -1531,10 +1552,25 @@ with st.expander("📊 Choose the data you want to analyze.", expanded=False):
                                         )
 
                                 load_method = f"Snowflake ({len(df) if df is not None else 0} rows)"
+                                refresh = st.session_state.get(
+                                    "sf_refresh_info", {}
+                                ).get(country)
+                                if sf_incremental and refresh:
+                                    if refresh["mode"] == "delta":
+                                        load_method += (
+                                            f", {refresh['delta_rows']} rows "
+                                            f"fetched since {refresh['cutoff']}"
+                                        )
+                                    else:
+                                        load_method += ", full refresh"
 
                         elif choice == "BigQuery":
                             # Load from BigQuery with country-specific WHERE clause
-                            from utils.bigquery_connector import execute_query
+                            from utils.bigquery_cache import (
+                                format_bytes,
+                                run_query,
+                            )
+                            from utils.bigquery_connector import read_table
 
                             bq_client = st.session_state.get("bq_client")
                             if not bq_client:
@@ -1550,21 +1586,30 @@ with st.expander("📊 Choose the data you want to analyze.", expanded=False):
                                 sql = bq_sql.replace(
                                     "{country}", country.upper()
                                 )
+                                # Cached; misses are dry-run first and
+                                # refused above BQ_MAX_BYTES_SCANNED
+                                estimates = []
+                                df = run_query(
+                                    bq_client,
+                                    sql,
+                                    on_estimate=estimates.append,
+                                )
                             elif bq_table.strip():
-                                # Use table with country filter
+                                # Read the country's rows with the Storage
+                                # Read API (no query job)
                                 country_field = st.session_state.get(
                                     "bq_country_field", "country"
                                 ).strip()
-                                sql = f"SELECT * FROM `{bq_table}` WHERE {country_field} = '{country.upper()}'"
+                                df = read_table(
+                                    bq_client,
+                                    bq_table,
+                                    row_restriction=f"{country_field} = '{country.upper()}'",
+                                )
                             else:
                                 raise ValueError(
                                     "Please provide either a BigQuery table ID or custom SQL query."
                                 )
 
-                            df = execute_query(
-                                bq_client, sql, fetch_pandas=True
-                            )
-
                             # Validate that country field exists in the data (case-insensitive)
                             if (
                                 df is not None
@@ -1589,6 +1634,12 @@ with st.expander("📊 Choose the data you want to analyze.", expanded=False):
                                     )
 
                             load_method = f"BigQuery ({len(df) if df is not None else 0} rows)"
+                            if bq_sql.strip():
+                                load_method += (
+                                    f", scanned ~{format_bytes(estimates[0])}"
+                                    if estimates
+                                    else ", from cache"
+                                )
 
                         elif choice == "CSV Upload":
                             # Load from uploaded CSV (same data for all countries)
@@ -1706,6 +1757,25 @@ with st.expander("📊 Choose the data you want to analyze.", expanded=False):
                     }
                 )
 
+            # Incremental refreshes publish the merged data as a new version
+            if sf_incremental and df_by_country:
+                shared_ts = format_cet_timestamp()
+                saved_paths = [
+                    _save_raw_to_gcs(df, BUCKET, c, timestamp=shared_ts)[
+                        "data_gcs_path"
+                    ]
+                    for c, df in df_by_country.items()
+                ]
+                st.session_state["picked_ts"] = shared_ts
+                st.session_state["shared_save_timestamp"] = shared_ts
+                st.session_state["data_origin"] = "gcs_latest"
+                st.session_state["last_saved_raw_path"] = saved_paths[0]
+                _list_country_versions_cached.clear()
+                list_data_versions.clear()
+                load_details.append(
+                    f"💾 Saved refreshed data as version {shared_ts}"
+                )
+
             # Show results
             if loaded_count > 0:
                 st.success(f"✅ Loaded data for {loaded_count} countries.")
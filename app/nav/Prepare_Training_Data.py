@@ -34,15 +34,16 @@ from app_shared import (
     data_blob,
     data_latest_blob,
     download_json_from_gcs_cached,
-    download_parquet_from_gcs_cached,
     filter_range,
     freq_to_rule,
     list_data_versions,
     list_mapped_data_versions,
     list_meta_versions,
+    load_parquet_subset_from_gcs,
     mapped_data_blob,
     mapped_data_latest_blob,
     mapped_data_root,
+    metadata_columns,
     parse_date,
     period_label,
     pretty,
@@ -60,7 +61,12 @@ from scipy import stats
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_absolute_error, r2_score
 from statsmodels.stats.outliers_influence import variance_inflation_factor
-from utils.gcs_utils import format_cet_timestamp
+from utils.gcs_utils import (
+    format_cet_timestamp,
+    list_subdirs,
+    read_parquet_schema_from_gcs,
+)
+from utils.version_index import record_version_blob
 
 # Authentication
 require_login_and_domain()
@@ -192,24 +198,16 @@ with st.expander("Step 1) Select Data", expanded=False):
     else:
         # Try to get countries from latest saved mapped data
         try:
-            from google.cloud import storage
-
-            client = storage.Client()
             # Look in mapped-datasets first, fallback to datasets
-            blobs = client.list_blobs(GCS_BUCKET, prefix="mapped-datasets/")
-            found_countries = set()
-            for blob in blobs:
-                parts = blob.name.split("/")
-                if len(parts) >= 2 and parts[1]:
-                    found_countries.add(parts[1].lower())
+            found_countries = {
+                c.lower() for c in list_subdirs(GCS_BUCKET, "mapped-datasets/")
+            }
 
             # Fallback to raw datasets if no mapped data found
             if not found_countries:
-                blobs = client.list_blobs(GCS_BUCKET, prefix="datasets/")
-                for blob in blobs:
-                    parts = blob.name.split("/")
-                    if len(parts) >= 2 and parts[1]:
-                        found_countries.add(parts[1].lower())
+                found_countries = {
+                    c.lower() for c in list_subdirs(GCS_BUCKET, "datasets/")
+                }
 
             available_countries = (
                 sorted(list(found_countries)) if found_countries else []
@@ -330,9 +328,12 @@ with st.expander("Step 1) Select Data", expanded=False):
                 GCS_BUCKET, country, str(meta_ts)
             )
 
-            # Download
-            df = download_parquet_from_gcs_cached(GCS_BUCKET, db)
+            # Download metadata first, then only the columns it refers to
             meta = download_json_from_gcs_cached(GCS_BUCKET, mb)
+            df = load_parquet_subset_from_gcs(
+                GCS_BUCKET, db, columns=metadata_columns(meta)
+            )
+            all_columns = read_parquet_schema_from_gcs(GCS_BUCKET, db).names
 
             # Parse dates using metadata
             df, date_col = parse_date(df, meta)
@@ -374,7 +375,7 @@ with st.expander("Step 1) Select Data", expanded=False):
             )
 
             # Validate & notify
-            report = validate_against_metadata(df, meta)
+            report = validate_against_metadata(df, meta, all_columns)
             st.success(
                 f"✅ Successfully loaded {len(df):,} rows from gs://{GCS_BUCKET}/{db} and metadata gs://{GCS_BUCKET}/{mb}"
             )
@@ -2613,6 +2614,7 @@ with st.expander(
                     country=country, goal=goal, timestamp=timestamp
                 )
                 upload_to_gcs(GCS_BUCKET, tmp_path, gcs_path)
+                record_version_blob(GCS_BUCKET, gcs_path)
                 st.session_state["last_exported_columns_path"] = gcs_path
                 # Store timestamp, country, AND goal for auto-selection in Run Models page
                 st.session_state["just_exported_training_timestamp"] = timestamp
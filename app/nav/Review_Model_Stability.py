@@ -16,6 +16,13 @@ from app_shared import (
 from app_split_helpers import ensure_session_defaults
 from google.cloud import storage
 from plotly.subplots import make_subplots
+from utils.gcs_utils import fetch_json_bulk
+from utils.run_catalog import (
+    RUNS_ROOT,
+    catalog_goals,
+    catalog_runs,
+    refresh_run_catalog,
+)
 
 require_login_and_domain()
 ensure_session_defaults()
@@ -146,6 +153,21 @@ def group_runs(blobs):
     return runs
 
 
+def load_runs(bucket_name: str, prefix: str, refresh: bool = False):
+    """Runs under prefix as {(rev, country, stamp): [blobs]}, from the run catalog."""
+    if not prefix.startswith(f"{RUNS_ROOT}/"):
+        return group_runs(list_blobs(bucket_name, prefix))
+    try:
+        rows = refresh_run_catalog(
+            bucket_name, max_age=0 if refresh else None, relist=refresh
+        )
+    except Exception as e:
+        st.error(f"❌ Failed to load run catalog for gs://{bucket_name} — {e}")
+        return {}
+    st.session_state["run_goals_cache"] = catalog_goals(rows)
+    return catalog_runs(bucket_name, rows, prefix)
+
+
 def parse_stamp(stamp: str):
     """Parse timestamp string."""
     try:
@@ -162,80 +184,57 @@ def parse_rev_key(rev: str):
     return (1, (rev or "").lower())
 
 
-def extract_goal_from_config(bucket_name: str, stamp: str, run_key=None):
-    """Extract the goal (dep_var) from job_config.json or model_summary.json for a given timestamp.
-    
-    Args:
-        bucket_name: GCS bucket name
-        stamp: Timestamp string
-        run_key: Optional tuple of (rev, country, stamp) for fallback to robyn folder
-    
-    Returns:
-        str or None: The goal/dep_var if found
-    """
-    import json
-    
-    # First try: training-configs/{stamp}/job_config.json
-    try:
-        config_blob_path = f"training-configs/{stamp}/job_config.json"
-        client_instance = gcs_client()
-        blob = client_instance.bucket(bucket_name).blob(config_blob_path)
-        if blob.exists():
-            config_data = blob.download_as_bytes()
-            config = json.loads(config_data.decode("utf-8"))
-            goal = config.get("dep_var")
-            if goal:
-                return goal
-    except Exception:
-        pass
-    
-    # Second try: robyn/{rev}/{country}/{stamp}/model_summary.json
-    if run_key:
-        try:
-            rev, country, _ = run_key
-            model_summary_path = f"robyn/{rev}/{country}/{stamp}/model_summary.json"
-            client_instance = gcs_client()
-            blob = client_instance.bucket(bucket_name).blob(model_summary_path)
-            if blob.exists():
-                summary_data = blob.download_as_bytes()
-                summary = json.loads(summary_data.decode("utf-8"))
-                # Extract dep_var from input_metadata
-                if "input_metadata" in summary and "dep_var" in summary["input_metadata"]:
-                    return summary["input_metadata"]["dep_var"]
-        except Exception:
-            pass
-    
-    return None
-
-
 def get_goals_for_runs(bucket_name: str, run_keys):
     """Extract goals for a set of runs. Returns dict mapping (rev, country, stamp) to goal.
-    
-    Tries two methods:
+
+    Tries two sources, each fetched concurrently for all runs:
     1. training-configs/{stamp}/job_config.json (for runs with training configs)
     2. robyn/{rev}/{country}/{stamp}/model_summary.json (for runs without training configs)
+    Goals already known from the run catalog are not fetched again.
     """
-    goals_map = {}
-    
-    for key in run_keys:
-        rev, country, stamp = key
-        # Try to extract goal with fallback to model_summary.json
-        goal = extract_goal_from_config(bucket_name, stamp, run_key=key)
+    run_keys = list(run_keys)
+    known = st.session_state.get("run_goals_cache", {})
+    goals_map = {k: known[k] for k in run_keys if k in known}
+    run_keys = [k for k in run_keys if k not in goals_map]
+
+    configs = fetch_json_bulk(
+        [
+            (bucket_name, f"training-configs/{stamp}/job_config.json")
+            for _, _, stamp in run_keys
+        ]
+    )
+    missing = []
+    for key, config in zip(run_keys, configs):
+        goal = config.get("dep_var") if isinstance(config, dict) else None
+        if goal:
+            goals_map[key] = goal
+        else:
+            missing.append(key)
+
+    # Fallback: dep_var from model_summary.json input_metadata
+    summaries = fetch_json_bulk(
+        [
+            (bucket_name, f"robyn/{rev}/{country}/{stamp}/model_summary.json")
+            for rev, country, stamp in missing
+        ]
+    )
+    for key, summary in zip(missing, summaries):
+        if not isinstance(summary, dict):
+            continue
+        goal = (summary.get("input_metadata") or {}).get("dep_var")
         if goal:
             goals_map[key] = goal
-    
+
     return goals_map
 
 
 # ---------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------
-@st.cache_data
 def load_parquet_from_gcs(blob_path: str) -> pd.DataFrame:
     return download_parquet_from_gcs_cached(GCS_BUCKET, blob_path)
 
 
-@st.cache_data
 def load_raw_spend(path: str) -> pd.DataFrame | None:
     """
     Load raw spend data from either GCS (gs://...) or local filesystem.
@@ -508,8 +507,7 @@ if (
     or st.session_state.get("model_stability_last_prefix") != DEFAULT_PREFIX
 ):
     with st.spinner("Loading available model runs from GCS..."):
-        blobs = list_blobs(GCS_BUCKET, DEFAULT_PREFIX)
-        runs = group_runs(blobs)
+        runs = load_runs(GCS_BUCKET, DEFAULT_PREFIX)
         st.session_state["model_stability_runs_cache"] = runs
         st.session_state["model_stability_last_bucket"] = GCS_BUCKET
         st.session_state["model_stability_last_prefix"] = DEFAULT_PREFIX
@@ -18,6 +18,7 @@ from app_shared import (
     REGION,
     TRAINING_JOB_NAME,
     _require_sf_session,
+    download_json_from_gcs_cached,
     get_data_processor,
     get_job_manager,
     list_mapped_data_versions,
@@ -30,7 +31,11 @@ from app_shared import (
     upload_to_gcs,
 )
 from google.cloud import storage
-from utils.gcs_utils import format_cet_timestamp, get_cet_now
+from utils.gcs_utils import format_cet_timestamp, get_cet_now, list_subdirs
+from utils.resample_sql import (
+    apply_custom_aggregations as _apply_aggregations_from_metadata,
+)
+from utils.version_index import list_versions
 
 data_processor = get_data_processor()
 job_manager = get_job_manager()
@@ -74,16 +79,11 @@ tab_single, tab_queue, tab_status = st.tabs(
 def _list_available_countries(bucket: str) -> List[str]:
     """List all countries that have mapped-datasets in GCS."""
     try:
-        client = storage.Client()
-        prefix = "mapped-datasets/"
-        blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
-        countries = set()
-        for blob in blobs:
-            parts = blob.name.split("/")
-            # mapped-datasets/<country>/<version>/raw.parquet
-            if len(parts) >= 2 and parts[1]:
-                countries.add(parts[1].lower())
-        return sorted(list(countries)) if countries else []
+        # mapped-datasets/<country>/<version>/raw.parquet
+        countries = {
+            c.lower() for c in list_subdirs(bucket, "mapped-datasets/")
+        }
+        return sorted(countries)
     except Exception as e:
         logging.warning(f"Could not list available countries from GCS: {e}")
         return []
@@ -101,19 +101,15 @@ def _list_training_data_versions(
     If goal is None, list all timestamps for all goals under the country.
     """
     try:
-        client = storage.Client()
-        if goal:
-            prefix = f"training_data/{country.lower().strip()}/{goal}/"
-        else:
-            prefix = f"training_data/{country.lower().strip()}/"
-        blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
         versions = []
-        for blob in blobs:
-            if blob.name.endswith("selected_columns.json"):
-                parts = blob.name.split("/")
-                # training_data/<country>/<goal>/<timestamp>/selected_columns.json
-                if len(parts) >= 5:
-                    versions.append(parts[3])
+        # Manifest entries are "<country>/<goal>/<timestamp>"
+        for entry in list_versions(bucket, "training_data"):
+            e_country, e_goal, timestamp = entry.split("/")
+            if e_country != country.lower().strip():
+                continue
+            if goal and e_goal != goal:
+                continue
+            versions.append(timestamp)
         # Sort newest first
         return sorted(versions, reverse=True) if versions else []
     except Exception as e:
@@ -128,12 +124,10 @@ def _load_training_data_json(
 ) -> Optional[Dict]:
     """Load selected_columns.json from Prepare Training Data page."""
     try:
-        client = storage.Client()
         blob_path = f"training_data/{country.lower().strip()}/{goal}/{version}/selected_columns.json"
-        blob = client.bucket(bucket).blob(blob_path)
-        if not blob.exists():
-            return None
-        return json.loads(blob.download_as_bytes())
+        return download_json_from_gcs_cached(bucket, blob_path)
+    except FileNotFoundError:
+        return None
     except Exception as e:
         st.warning(f"Could not load training data config: {e}")
         return None
@@ -146,28 +140,18 @@ def _list_all_training_data_configs(bucket: str) -> List[Dict[str, str]]:
     Path pattern: training_data/{country}/{goal}/{timestamp}/selected_columns.json
     """
     try:
-        client = storage.Client()
-        prefix = "training_data/"
-        blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
         configs = []
-        for blob in blobs:
-            if blob.name.endswith("selected_columns.json"):
-                parts = blob.name.split("/")
-                # training_data/<country>/<goal>/<timestamp>/selected_columns.json
-                if len(parts) >= 5:
-                    country = parts[1].strip()
-                    goal = parts[2].strip()
-                    timestamp = parts[3].strip()
-                    # Validate that country, goal, and timestamp are non-empty
-                    if country and goal and timestamp:
-                        configs.append(
-                            {
-                                "country": country,
-                                "goal": goal,
-                                "timestamp": timestamp,
-                                "display_name": f"{country.upper()} - {goal} - {timestamp}",
-                            }
-                        )
+        # Manifest entries are "<country>/<goal>/<timestamp>"
+        for entry in list_versions(bucket, "training_data"):
+            country, goal, timestamp = entry.split("/")
+            configs.append(
+                {
+                    "country": country,
+                    "goal": goal,
+                    "timestamp": timestamp,
+                    "display_name": f"{country.upper()} - {goal} - {timestamp}",
+                }
+            )
         # Sort by timestamp descending (newest first)
         return sorted(configs, key=lambda x: x["timestamp"], reverse=True)
     except Exception as e:
@@ -181,18 +165,12 @@ def _list_available_goals(bucket: str, country: str) -> List[str]:
     Returns list of goal names found in training_data/{country}/{goal}/ paths.
     """
     try:
-        client = storage.Client()
-        prefix = f"training_data/{country.lower().strip()}/"
-        blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
         goals = set()
-        for blob in blobs:
-            if blob.name.endswith("selected_columns.json"):
-                parts = blob.name.split("/")
-                # training_data/<country>/<goal>/<timestamp>/selected_columns.json
-                if len(parts) >= 5:
-                    goal = parts[2].strip()
-                    if goal:
-                        goals.add(goal)
+        # Manifest entries are "<country>/<goal>/<timestamp>"
+        for entry in list_versions(bucket, "training_data"):
+            e_country, goal, _ = entry.split("/")
+            if e_country == country.lower().strip():
+                goals.add(goal)
         return sorted(list(goals))
     except Exception as e:
         logging.warning(f"Could not list available goals for {country}: {e}")
@@ -201,15 +179,8 @@ def _list_available_goals(bucket: str, country: str) -> List[str]:
 
 def _list_country_versions(bucket: str, country: str) -> List[str]:
     """Return timestamp folder names available in mapped-datasets/<country>/."""
-    client = storage.Client()
     # Use mapped-datasets for Run Models (data processed through Map Data Step 3)
-    prefix = f"mapped-datasets/{country.lower().strip()}/"
-    blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
-    ts = set()
-    for blob in blobs:
-        parts = blob.name.split("/")
-        if len(parts) >= 4 and parts[-1] == "raw.parquet":
-            ts.add(parts[-2])
+    ts = list_versions(bucket, f"mapped-datasets/{country.lower().strip()}")
     versions = sorted(ts, reverse=True)
     # Replace "latest" with "Latest" if present
     return ["Latest" if v.lower() == "latest" else v for v in versions]
@@ -217,19 +188,8 @@ def _list_country_versions(bucket: str, country: str) -> List[str]:
 
 def _list_metadata_versions(bucket: str, country: str) -> List[str]:
     """Return timestamp folder names available in metadata/<country>/."""
-    client = storage.Client()
-    prefix = f"metadata/{country.lower().strip()}/"
-    blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
-    ts = set()
-    for blob in blobs:
-        parts = blob.name.split("/")
-        if (
-            len(parts) >= 4
-            and parts[-1] == "mapping.json"
-            and parts[-2] != "latest"
-        ):
-            ts.add(parts[-2])
-    versions = sorted(ts, reverse=True)
+    ts = list_versions(bucket, f"metadata/{country.lower().strip()}")
+    versions = sorted((t for t in ts if t != "latest"), reverse=True)
     # Replace "latest" with "Latest" if present
     return ["Latest" if v.lower() == "latest" else v for v in versions]
 
@@ -262,12 +222,11 @@ def _load_metadata_from_gcs(
 ) -> Optional[Dict]:
     """Load metadata.json from GCS."""
     try:
-        client = storage.Client()
-        blob_path = _get_meta_blob(country, version)
-        blob = client.bucket(bucket).blob(blob_path)
-        if not blob.exists():
-            return None
-        return json.loads(blob.download_as_bytes())
+        return download_json_from_gcs_cached(
+            bucket, _get_meta_blob(country, version)
+        )
+    except FileNotFoundError:
+        return None
     except Exception as e:
         st.warning(f"Could not load metadata: {e}")
         return None
@@ -276,16 +235,12 @@ def _load_metadata_from_gcs(
 def _get_revision_tags(bucket: str) -> List[str]:
     """Get all unique revision tags from GCS."""
     try:
-        client = storage.Client()
-        prefix = f"robyn/"
-        blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
         # Extract revision folders (format: TAG_NUMBER)
         revision_tags = set()
-        for blob in blobs:
-            parts = blob.name.split("/")
-            if len(parts) >= 2 and "_" in parts[1]:
+        for rev in list_subdirs(bucket, "robyn/"):
+            if "_" in rev:
                 # Extract tag from TAG_NUMBER format
-                tag = parts[1].rsplit("_", 1)[0]
+                tag = rev.rsplit("_", 1)[0]
                 revision_tags.add(tag)
 
         return sorted(list(revision_tags))
@@ -296,17 +251,13 @@ def _get_revision_tags(bucket: str) -> List[str]:
 def _get_next_revision_number(bucket: str, tag: str) -> int:
     """Get the next revision number for a given tag."""
     try:
-        client = storage.Client()
-        prefix = f"robyn/"
-        blobs = client.list_blobs(bucket, prefix=prefix, delimiter=None)
-        # Find all numbers for this tag
+        # Always list fresh so a just-created revision isn't handed out twice
         numbers = []
-        for blob in blobs:
-            parts = blob.name.split("/")
-            if len(parts) >= 2 and parts[1].startswith(f"{tag}_"):
+        for rev in list_subdirs(bucket, "robyn/", max_age=0):
+            if rev.startswith(f"{tag}_"):
                 # Extract number from TAG_NUMBER format
                 try:
-                    num_str = parts[1].split("_")[-1]
+                    num_str = rev.split("_")[-1]
                     numbers.append(int(num_str))
                 except (ValueError, IndexError):
                     continue
@@ -317,72 +268,6 @@ def _get_next_revision_number(bucket: str, tag: str) -> int:
         return 1
 
 
-def _apply_aggregations_from_metadata(
-    df: pd.DataFrame, metadata: Dict
-) -> tuple[pd.DataFrame, List[str]]:
-    """
-    Apply custom aggregations from metadata to create missing _CUSTOM columns.
-
-    If aggregation_sources is in metadata and the _CUSTOM column is missing
-    but source columns exist, create the aggregated column.
-
-    Returns: (updated_df, list of created columns)
-    """
-    aggregation_sources = metadata.get("aggregation_sources", {})
-    if not aggregation_sources:
-        return df, []
-
-    created_columns = []
-    skipped_columns = []
-    df = df.copy()
-
-    for custom_col, source_info in aggregation_sources.items():
-        # Skip if column already exists
-        if custom_col in df.columns:
-            continue
-
-        source_columns = source_info.get("source_columns", [])
-        agg_method = source_info.get("agg_method", "sum")
-
-        # Check if all source columns exist
-        available_sources = [c for c in source_columns if c in df.columns]
-        if not available_sources:
-            # Track skipped columns for potential debugging
-            skipped_columns.append(
-                f"{custom_col} (missing sources: {source_columns})"
-            )
-            continue
-
-        # Apply aggregation
-        try:
-            if agg_method == "sum":
-                df[custom_col] = df[available_sources].sum(axis=1)
-            elif agg_method == "mean":
-                df[custom_col] = df[available_sources].mean(axis=1)
-            elif agg_method == "max":
-                df[custom_col] = df[available_sources].max(axis=1)
-            elif agg_method == "min":
-                df[custom_col] = df[available_sources].min(axis=1)
-            else:
-                # Default to sum
-                df[custom_col] = df[available_sources].sum(axis=1)
-
-            created_columns.append(custom_col)
-        except (ValueError, TypeError) as e:
-            # Log specific errors that might occur during aggregation
-            logging.warning(
-                f"Failed to create {custom_col} from {available_sources}: {e}"
-            )
-
-    # Log skipped columns for debugging if any
-    if skipped_columns:
-        logging.info(
-            f"Skipped {len(skipped_columns)} custom column(s) due to missing source columns"
-        )
-
-    return df, created_columns
-
-
 # Extracted from streamlit_app.py tab_single (Single run):
 with tab_single:
     st.subheader("Setup an Experiment Run")
@@ -3260,7 +3145,7 @@ with tab_single:
                         with timed_step(
                             "Upload data with auto-created columns to GCS",
                             timings,
-                        ):
+                        ) as step:
                             temp_data_path = os.path.join(
                                 td, "training_data.parquet"
                             )
@@ -3275,6 +3160,7 @@ with tab_single:
                                 temp_data_path,
                                 data_blob,
                             )
+                            step["bytes"] = os.path.getsize(temp_data_path)
                             st.success(
                                 f"✅ Uploaded training data with {len(df_with_custom_cols.columns)} columns "
                                 f"(including auto-created custom columns) to GCS"
@@ -13,6 +13,7 @@ import streamlit as st
 from app_shared import (  # colors (if exported; otherwise define locally)
     BASE_PLATFORM_COLORS,
     GREEN,
+    LOAD_HISTORY_OPTIONS,
     RED,
     build_meta_views,
     build_plat_map_df,
@@ -20,16 +21,17 @@ from app_shared import (  # colors (if exported; otherwise define locally)
     data_blob,
     data_latest_blob,
     download_json_from_gcs_cached,
-    download_parquet_from_gcs_cached,
     filter_range,
     fmt_num,
     freq_to_rule,
+    history_window_start,
     kpi_box,
     kpi_grid,
     kpi_grid_fixed,
     list_data_versions,
     list_meta_versions,
     load_data_from_gcs,
+    load_parquet_subset_from_gcs,
     meta_blob,
     meta_latest_blob,
     parse_date,
@@ -119,6 +121,13 @@ with tab_load:
     meta_ts = c3.selectbox(
         "Metadata version", options=meta_versions, index=0, key="picked_meta_ts"
     )
+    history = c1.selectbox(
+        "History to load",
+        options=list(LOAD_HISTORY_OPTIONS),
+        index=0,
+        key="picked_load_history",
+        help="Only the parquet row groups inside this window are downloaded.",
+    )
 
     load_clicked = st.button("Select & Load", type="primary")
 
@@ -138,9 +147,17 @@ with tab_load:
                     GCS_BUCKET, country, str(meta_ts)
                 )
 
-                # Download
-                df = download_parquet_from_gcs_cached(GCS_BUCKET, db)
+                # Download metadata first; its date field drives the
+                # row-group filter for the selected history window
                 meta = download_json_from_gcs_cached(GCS_BUCKET, mb)
+                df = load_parquet_subset_from_gcs(
+                    GCS_BUCKET,
+                    db,
+                    date_col=str(
+                        meta.get("data", {}).get("date_field") or "DATE"
+                    ),
+                    start=history_window_start(history),
+                )
 
                 # Parse dates using metadata
                 df, date_col = parse_date(df, meta)
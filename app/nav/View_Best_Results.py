@@ -10,20 +10,18 @@ from urllib.parse import quote
 
 import pandas as pd
 import streamlit as st
+from app_shared import require_login_and_domain
 from google.auth import default as google_auth_default
 from google.auth.iam import Signer as IAMSigner
 from google.auth.transport.requests import Request
 from google.cloud import storage
-
-try:
-    from app_shared import (
-        ensure_sf_conn,
-        keepalive_ping,
-        require_login_and_domain,
-    )
-except Exception:
-    ensure_sf_conn = None
-    keepalive_ping = None
+from utils.gcs_utils import fetch_blobs_bulk, fetch_json_bulk
+from utils.run_catalog import (
+    RUNS_ROOT,
+    catalog_goals,
+    catalog_runs,
+    refresh_run_catalog,
+)
 
 require_login_and_domain()
 
@@ -56,30 +54,6 @@ st.session_state.setdefault("alpha", DEFAULT_ALPHA)
 st.session_state.setdefault("beta", DEFAULT_BETA)
 
 
-def _sf_keepalive(throttle_sec: int = 60) -> None:
-    """Ping the shared Snowflake session so it stays warm while users browse."""
-    if ensure_sf_conn is None or keepalive_ping is None:
-        return
-    try:
-        import time
-
-        now = time.time()
-        last = st.session_state.get("_sf_last_ping", 0)
-        if now - last < throttle_sec:
-            return
-        conn = ensure_sf_conn()  # reuses st.session_state["sf_conn"] if present
-        if conn:
-            keepalive_ping(conn)  # cheap SELECT 1 / ping
-            st.session_state["_sf_last_ping"] = now
-            st.session_state["sf_connected"] = True
-    except Exception:
-        # Never block/break this page if Snowflake isn't configured/available
-        pass
-
-
-_sf_keepalive()
-
-
 # ---------- Clients / cached ----------
 @st.cache_resource
 def gcs_client():
@@ -174,6 +148,21 @@ def group_runs(blobs):
     return runs
 
 
+def load_runs(bucket_name: str, prefix: str, refresh: bool = False):
+    """Runs under prefix as {(rev, country, stamp): [blobs]}, from the run catalog."""
+    if not prefix.startswith(f"{RUNS_ROOT}/"):
+        return group_runs(list_blobs(bucket_name, prefix))
+    try:
+        rows = refresh_run_catalog(
+            bucket_name, max_age=0 if refresh else None, relist=refresh
+        )
+    except Exception as e:
+        st.error(f"❌ Failed to load run catalog for gs://{bucket_name} — {e}")
+        return {}
+    st.session_state["run_goals_cache"] = catalog_goals(rows)
+    return catalog_runs(bucket_name, rows, prefix)
+
+
 def parse_stamp(stamp: str):
     try:
         return dt.datetime.strptime(stamp, "%m%d_%H%M%S")
@@ -245,68 +234,47 @@ def latest_run_key(runs, rev_filter=None, country_filter=None):
     return keys[0]
 
 
-def extract_goal_from_config(bucket_name: str, stamp: str, run_key=None):
-    """Extract the goal (dep_var) from job_config.json or model_summary.json for a given timestamp.
-    
-    Args:
-        bucket_name: GCS bucket name
-        stamp: Timestamp string
-        run_key: Optional tuple of (rev, country, stamp) for fallback to robyn folder
-    
-    Returns:
-        str or None: The goal/dep_var if found
-    """
-    import json
-    
-    # First try: training-configs/{stamp}/job_config.json
-    try:
-        config_blob_path = f"training-configs/{stamp}/job_config.json"
-        blob = client.bucket(bucket_name).blob(config_blob_path)
-        if blob.exists():
-            config_data = blob.download_as_bytes()
-            config = json.loads(config_data.decode("utf-8"))
-            goal = config.get("dep_var")
-            if goal:
-                return goal
-    except Exception as e:
-        # Silently continue to fallback
-        pass
-    
-    # Second try: robyn/{rev}/{country}/{stamp}/model_summary.json
-    if run_key:
-        try:
-            rev, country, _ = run_key
-            model_summary_path = f"robyn/{rev}/{country}/{stamp}/model_summary.json"
-            blob = client.bucket(bucket_name).blob(model_summary_path)
-            if blob.exists():
-                summary_data = blob.download_as_bytes()
-                summary = json.loads(summary_data.decode("utf-8"))
-                # Extract dep_var from input_metadata
-                if "input_metadata" in summary and "dep_var" in summary["input_metadata"]:
-                    return summary["input_metadata"]["dep_var"]
-        except Exception:
-            # Silently continue if fallback fails
-            pass
-    
-    return None
-
-
 def get_goals_for_runs(bucket_name: str, run_keys):
     """Extract goals for a set of runs. Returns dict mapping (rev, country, stamp) to goal.
-    
-    Tries two methods:
+
+    Tries two sources, each fetched concurrently for all runs:
     1. training-configs/{stamp}/job_config.json (for runs with training configs)
     2. robyn/{rev}/{country}/{stamp}/model_summary.json (for runs without training configs)
+    Goals already known from the run catalog are not fetched again.
     """
-    goals_map = {}
-    
-    for key in run_keys:
-        rev, country, stamp = key
-        # Try to extract goal with fallback to model_summary.json
-        goal = extract_goal_from_config(bucket_name, stamp, run_key=key)
+    run_keys = list(run_keys)
+    known = st.session_state.get("run_goals_cache", {})
+    goals_map = {k: known[k] for k in run_keys if k in known}
+    run_keys = [k for k in run_keys if k not in goals_map]
+
+    configs = fetch_json_bulk(
+        [
+            (bucket_name, f"training-configs/{stamp}/job_config.json")
+            for _, _, stamp in run_keys
+        ]
+    )
+    missing = []
+    for key, config in zip(run_keys, configs):
+        goal = config.get("dep_var") if isinstance(config, dict) else None
         if goal:
             goals_map[key] = goal
-    
+        else:
+            missing.append(key)
+
+    # Fallback: dep_var from model_summary.json input_metadata
+    summaries = fetch_json_bulk(
+        [
+            (bucket_name, f"robyn/{rev}/{country}/{stamp}/model_summary.json")
+            for rev, country, stamp in missing
+        ]
+    )
+    for key, summary in zip(missing, summaries):
+        if not isinstance(summary, dict):
+            continue
+        goal = (summary.get("input_metadata") or {}).get("dep_var")
+        if goal:
+            goals_map[key] = goal
+
     return goals_map
 
 
@@ -1031,6 +999,18 @@ def _try_read_csv(blob) -> pd.DataFrame | None:  # type: ignore
         return None
 
 
+def _read_csv_blobs(blobs: list) -> list:
+    """Download CSV blobs concurrently; returns DataFrames (or None) in order."""
+    raw = fetch_blobs_bulk([(b.bucket.name, b.name) for b in blobs])
+    out = []
+    for data in raw:
+        try:
+            out.append(pd.read_csv(io.BytesIO(data)) if data else None)
+        except Exception:
+            out.append(None)
+    return out
+
+
 def extract_core_metrics_from_blobs(blobs: list) -> dict:
     """
     Try to find a CSV that contains r2 / nrmse / decomp_rssd across train/val/test.
@@ -1045,22 +1025,23 @@ def extract_core_metrics_from_blobs(blobs: list) -> dict:
         for b in csvs
         if re.search(r"(metrics|summary|performance)", b.name.lower())
     ]
-    candidates = preferred + [b for b in csvs if b not in preferred]
+    others = [b for b in csvs if b not in preferred]
 
-    for b in candidates:
-        df = _try_read_csv(b)
-        if df is None:
-            continue
-        extracted = {}
-        cols_l = [c.lower() for c in df.columns]
-        if any(c in cols_l for c in ("split", "set", "phase")):
-            extracted = _extract_from_long(df)
-        else:
-            extracted = _extract_from_wide(df)
-        if any(k.startswith("r2_") for k in extracted.keys()) or any(
-            k.startswith("nrmse_") for k in extracted.keys()
-        ):
-            return extracted
+    # Download each group concurrently; only touch the others if needed
+    for group in (preferred, others):
+        for df in _read_csv_blobs(group):
+            if df is None:
+                continue
+            extracted = {}
+            cols_l = [c.lower() for c in df.columns]
+            if any(c in cols_l for c in ("split", "set", "phase")):
+                extracted = _extract_from_long(df)
+            else:
+                extracted = _extract_from_wide(df)
+            if any(k.startswith("r2_") for k in extracted.keys()) or any(
+                k.startswith("nrmse_") for k in extracted.keys()
+            ):
+                return extracted
 
     # Fallback: allocator_metrics.csv
     alloc = find_blob(blobs, "/allocator_metrics.csv")
@@ -1270,8 +1251,7 @@ if (
     or st.session_state.get("last_prefix") != prefix
 ):
     with st.spinner("Loading runs from GCS..."):
-        blobs = list_blobs(bucket_name, prefix)
-        runs = group_runs(blobs)
+        runs = load_runs(bucket_name, prefix, refresh=do_scan)
         st.session_state["runs_cache"] = runs
         st.session_state["last_bucket"] = bucket_name
         st.session_state["last_prefix"] = prefix
@@ -0,0 +1,158 @@
+"""
+BigQuery query caching with GCS backend and dry-run cost checks.
+
+The BigQuery instance of the source-agnostic QueryCache (see
+query_cache): identical queries are served from memory or
+``cache/bigquery-queries/`` instead of being billed again.
+
+On a cache miss, run_query() first dry-runs the query (free) to get the
+bytes it would scan, reports the estimate and refuses queries above
+BQ_MAX_BYTES_SCANNED. The query then runs with that limit as
+``maximum_bytes_billed``.
+
+Cache keys are the whitespace-normalized SQL scoped by the client's
+project, since unqualified table names resolve against it.
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Callable, Optional
+
+import pandas as pd
+from google.cloud import bigquery
+
+from .parquet_decode import table_to_pandas
+from .query_cache import QueryCache
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTooLarge(ValueError):
+    """A query's dry run estimates more bytes than allowed."""
+
+    def __init__(self, estimated_bytes: int, max_bytes: int):
+        super().__init__(
+            f"Query would scan {format_bytes(estimated_bytes)}, more than "
+            f"the limit of {format_bytes(max_bytes)} (BQ_MAX_BYTES_SCANNED). "
+            f"Select fewer columns or filter on the partition column."
+        )
+        self.estimated_bytes = estimated_bytes
+        self.max_bytes = max_bytes
+
+
+def format_bytes(n: float) -> str:
+    """Human-readable byte count (1024-based)."""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(n) < 1024 or unit == "TB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def _get_query_hash(scoped_query: str) -> str:
+    """MD5 of a project-scoped query with whitespace collapsed."""
+    return hashlib.md5(" ".join(scoped_query.split()).encode()).hexdigest()
+
+
+_query_cache = QueryCache(
+    "bigquery",
+    _get_query_hash,
+    max_mb=lambda: settings.BQ_CACHE_GCS_MAX_MB,
+)
+
+
+def init_cache(bucket_name: str):
+    """Initialize the cache with GCS bucket name."""
+    _query_cache.bucket = bucket_name
+    logger.info(f"BigQuery query cache initialized with bucket: {bucket_name}")
+
+
+def _scoped(client: bigquery.Client, query: str) -> str:
+    return f"-- project: {client.project}\n{query.strip().rstrip(';')}"
+
+
+def estimate_query_bytes(client: bigquery.Client, query: str) -> int:
+    """
+    Bytes a query would scan, from a dry run (not billed).
+
+    Raises:
+        google.api_core.exceptions.BadRequest: If the query is invalid
+    """
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+    job = client.query(query, job_config=job_config)
+    return int(job.total_bytes_processed or 0)
+
+
+def run_query(
+    client: bigquery.Client,
+    query: str,
+    use_cache: bool = True,
+    max_bytes: Optional[int] = None,
+    on_estimate: Optional[Callable[[int], None]] = None,
+) -> pd.DataFrame:
+    """
+    Run a query through the cache, checking its cost before executing it.
+
+    Args:
+        client: BigQuery client instance
+        query: SQL query
+        use_cache: Look up and store the result in the query cache
+        max_bytes: Refuse queries estimated to scan more
+            (default: BQ_MAX_BYTES_SCANNED; 0 = no limit)
+        on_estimate: Called with the dry run's byte estimate before the
+            query runs (cache misses only, not for background refreshes)
+
+    Returns:
+        DataFrame with query results; ``df.attrs["bytes_scanned"]`` holds
+        the bytes the execution processed
+
+    Raises:
+        QueryTooLarge: If the estimate exceeds max_bytes
+    """
+    limit = settings.BQ_MAX_BYTES_SCANNED if max_bytes is None else max_bytes
+    caller = threading.current_thread()
+
+    def _execute(_scoped_query: str) -> pd.DataFrame:
+        estimate = estimate_query_bytes(client, query)
+        logger.info(f"BigQuery dry run: query would scan {estimate} bytes")
+        if on_estimate is not None and threading.current_thread() is caller:
+            on_estimate(estimate)
+        if limit and estimate > limit:
+            raise QueryTooLarge(estimate, limit)
+        job_config = bigquery.QueryJobConfig(maximum_bytes_billed=limit or None)
+        job = client.query(query, job_config=job_config)
+        df = table_to_pandas(job.result().to_arrow())
+        df.attrs["bytes_scanned"] = int(job.total_bytes_processed or estimate)
+        return df
+
+    if not use_cache:
+        return _execute(query)
+    return _query_cache.get(_scoped(client, query), _execute)
+
+
+def clear_bigquery_cache(query_hash: Optional[str] = None):
+    """
+    Clear BigQuery query cache.
+
+    Args:
+        query_hash: If provided, clear only this specific query.
+                   If None, clear all cached queries.
+    """
+    _query_cache.clear(query_hash)
+
+
+def get_cache_stats() -> dict:
+    """
+    Get statistics about the BigQuery query cache.
+
+    Returns:
+        Dictionary with cache statistics
+    """
+    return _query_cache.get_stats()
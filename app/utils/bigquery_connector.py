@@ -4,17 +4,30 @@ BigQuery connection and query utilities.
 Provides secure connection management with support for:
 - Service account authentication via Secret Manager
 - JSON key file authentication
+- Process-wide client cache, keyed by project and credentials
 - Query execution with pandas integration
+- Table reads through the BigQuery Storage Read API: Arrow record batches
+  with column selection and row restriction, without a query job (falls
+  back to a query if google-cloud-bigquery-storage isn't installed)
+- Free table previews with list_rows
+- Logical views, which neither list_rows nor the Storage Read API can
+  read, are queried instead
 """
 
+import hashlib
 import json
 import logging
-from typing import Optional
+import threading
+import weakref
+from typing import Dict, Iterator, Optional, Sequence, Tuple
 
 import pandas as pd
+import pyarrow as pa
 from google.cloud import bigquery, secretmanager
 from google.oauth2 import service_account
 
+from .parquet_decode import table_to_pandas
+
 # Import from parent config module (app.config)
 try:
     from config import settings
@@ -23,6 +36,12 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Clients by (project, credentials digest) and Storage Read API clients by
+# BigQuery client
+_clients: Dict[Tuple[str, str], bigquery.Client] = {}
+_read_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
 
 def load_credentials_from_secret_manager(secret_id: str) -> dict:
     """
@@ -71,37 +90,61 @@ def create_bigquery_client(
     project_id: str,
     credentials_json: Optional[str] = None,
     credentials_dict: Optional[dict] = None,
+    secret_id: Optional[str] = None,
 ) -> bigquery.Client:
     """
     Create a BigQuery client with service account credentials.
 
+    Clients are cached for the process: the same project and credentials
+    return the same client, and credentials from Secret Manager are only
+    fetched the first time a secret is used.
+
     Args:
         project_id: GCP project ID
         credentials_json: Service account JSON as string
         credentials_dict: Service account credentials as dict
+        secret_id: Secret Manager secret holding the service account JSON,
+            used if neither of the above is given
 
     Returns:
         BigQuery client instance
 
     Raises:
-        RuntimeError: If neither credentials_json nor credentials_dict is
-        provided
+        RuntimeError: If no credentials are provided
     """
-    if credentials_dict is not None:
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict
-        )
-    elif credentials_json is not None:
+    if credentials_dict is None and credentials_json is not None:
         credentials_dict = json.loads(credentials_json)
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict
-        )
+    if credentials_dict is not None:
+        digest = hashlib.sha256(
+            json.dumps(credentials_dict, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+    elif secret_id is not None:
+        digest = f"secret:{secret_id}"
     else:
         raise RuntimeError(
             "Either credentials_json or credentials_dict must be provided"
         )
 
-    return bigquery.Client(project=project_id, credentials=credentials)
+    key = (project_id, digest)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+        if credentials_dict is None:
+            credentials_dict = load_credentials_from_secret_manager(secret_id)
+        credentials = service_account.Credentials.from_service_account_info(
+            credentials_dict
+        )
+        client = bigquery.Client(project=project_id, credentials=credentials)
+        _clients[key] = client
+        return client
+
+
+def clear_client_cache() -> None:
+    """Drop cached clients (e.g. after credentials were rotated)."""
+    with _clients_lock:
+        _clients.clear()
+        _read_clients.clear()
 
 
 def execute_query(
@@ -134,6 +177,9 @@ def get_table_preview(
     """
     Get a preview of a BigQuery table.
 
+    Rows are read with list_rows (tabledata.list), which isn't billed and
+    doesn't wait for a query job. Views are previewed with a query.
+
     Args:
         client: BigQuery client instance
         table_id: Fully qualified table ID (project.dataset.table)
@@ -142,5 +188,162 @@ def get_table_preview(
     Returns:
         DataFrame with table preview
     """
-    query = f"SELECT * FROM `{table_id}` LIMIT {limit}"
-    return execute_query(client, query)
+    table_ref = _table_ref(client, table_id)
+    if _is_view(client, table_ref):
+        query = f"{_fallback_query(table_ref, None, None)} LIMIT {int(limit)}"
+        return table_to_pandas(client.query(query).result().to_arrow())
+    rows = client.list_rows(table_ref, max_results=limit)
+    return table_to_pandas(rows.to_arrow(create_bqstorage_client=False))
+
+
+def _table_ref(client: bigquery.Client, table_id: str) -> str:
+    """project.dataset.table, with the client's project if omitted."""
+    table_id = table_id.strip().strip("`")
+    parts = table_id.split(".")
+    if len(parts) == 2:
+        parts.insert(0, client.project)
+    if len(parts) != 3 or not all(parts):
+        raise ValueError(
+            f"Invalid table ID {table_id!r}, expected project.dataset.table"
+        )
+    return ".".join(parts)
+
+
+def _is_view(client: bigquery.Client, table_ref: str) -> bool:
+    """True for logical views (table metadata lookups aren't billed)."""
+    return client.get_table(table_ref).table_type == "VIEW"
+
+
+def _read_client(client: bigquery.Client):
+    """Storage Read API client using the client's credentials, or None."""
+    try:
+        from google.cloud import bigquery_storage
+    except ImportError:
+        return None
+    with _clients_lock:
+        read_client = _read_clients.get(client)
+        if read_client is None:
+            read_client = bigquery_storage.BigQueryReadClient(
+                credentials=client._credentials
+            )
+            _read_clients[client] = read_client
+        return read_client
+
+
+def _fallback_query(
+    table_ref: str,
+    columns: Optional[Sequence[str]],
+    row_restriction: Optional[str],
+) -> str:
+    cols = ", ".join(f"`{c}`" for c in columns) if columns else "*"
+    query = f"SELECT {cols} FROM `{table_ref}`"
+    if row_restriction:
+        query += f" WHERE {row_restriction}"
+    return query
+
+
+def _open_read_session(
+    client: bigquery.Client,
+    read_client,
+    table_ref: str,
+    columns: Optional[Sequence[str]],
+    row_restriction: Optional[str],
+    max_streams: int,
+):
+    from google.cloud.bigquery_storage_v1 import types
+
+    project, dataset, table = table_ref.split(".")
+    session = types.ReadSession(
+        table=f"projects/{project}/datasets/{dataset}/tables/{table}",
+        data_format=types.DataFormat.ARROW,
+        read_options=types.ReadSession.TableReadOptions(
+            selected_fields=list(columns or []),
+            row_restriction=row_restriction or "",
+        ),
+    )
+    return read_client.create_read_session(
+        parent=f"projects/{client.project}",
+        read_session=session,
+        max_stream_count=max_streams,
+    )
+
+
+def _session_batches(read_client, session) -> Iterator[pa.RecordBatch]:
+    for stream in session.streams:
+        reader = read_client.read_rows(stream.name)
+        for page in reader.rows(session).pages:
+            yield page.to_arrow()
+
+
+def iter_record_batches(
+    client: bigquery.Client,
+    table_id: str,
+    columns: Optional[Sequence[str]] = None,
+    row_restriction: Optional[str] = None,
+    max_streams: int = 1,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Stream a table as Arrow record batches with the Storage Read API.
+
+    Only the selected columns are read and rows are filtered server-side;
+    there is no query job to schedule. Views, and reads without
+    google-cloud-bigquery-storage, run the same read as a query.
+
+    Args:
+        client: BigQuery client instance
+        table_id: Table ID (project.dataset.table or dataset.table)
+        columns: Columns to read (default: all)
+        row_restriction: SQL filter, e.g. ``country = 'DE'``
+        max_streams: Streams of the read session (read one after another)
+
+    Yields:
+        pyarrow RecordBatches
+    """
+    table_ref = _table_ref(client, table_id)
+    read_client = _read_client(client)
+    if read_client is None or _is_view(client, table_ref):
+        logger.info(f"Reading {table_ref} with a query")
+        query = _fallback_query(table_ref, columns, row_restriction)
+        rows = client.query(query).result()
+        yield from rows.to_arrow_iterable()
+        return
+
+    session = _open_read_session(
+        client, read_client, table_ref, columns, row_restriction, max_streams
+    )
+    yield from _session_batches(read_client, session)
+
+
+def read_table(
+    client: bigquery.Client,
+    table_id: str,
+    columns: Optional[Sequence[str]] = None,
+    row_restriction: Optional[str] = None,
+    max_streams: int = 1,
+) -> pd.DataFrame:
+    """
+    Read a table (or a slice of it) into a DataFrame without a query job.
+
+    See iter_record_batches() for the arguments.
+
+    Returns:
+        DataFrame with the selected columns and matching rows
+    """
+    table_ref = _table_ref(client, table_id)
+    read_client = _read_client(client)
+    if read_client is None or _is_view(client, table_ref):
+        query = _fallback_query(table_ref, columns, row_restriction)
+        return table_to_pandas(client.query(query).result().to_arrow())
+
+    session = _open_read_session(
+        client, read_client, table_ref, columns, row_restriction, max_streams
+    )
+    schema = pa.ipc.read_schema(
+        pa.py_buffer(session.arrow_schema.serialized_schema)
+    )
+    batches = list(_session_batches(read_client, session))
+    logger.info(
+        f"Read {sum(b.num_rows for b in batches)} rows of {table_ref} "
+        f"with the Storage Read API"
+    )
+    return table_to_pandas(pa.Table.from_batches(batches, schema=schema))
@@ -0,0 +1,224 @@
+"""
+On-disk GCS blob cache keyed by object generation.
+
+Keeps local copies of GCS objects so every Streamlit session in the
+process (and, with a persistent BLOB_CACHE_DIR, every restart) can reuse
+them:
+- Entries are keyed by (bucket, path, generation)
+- Freshness is checked with a metadata-only GET; the body is downloaded
+  only when the generation has changed
+- Total size is bounded by BLOB_CACHE_MAX_MB with LRU eviction
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Tuple
+
+from google.api_core.exceptions import PreconditionFailed
+
+from .gcs_client import get_storage_client, track_gcs_op
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_PART_SUFFIX = ".part"
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _cache_dir() -> str:
+    os.makedirs(settings.BLOB_CACHE_DIR, exist_ok=True)
+    return settings.BLOB_CACHE_DIR
+
+
+def _object_key(bucket_name: str, blob_path: str) -> str:
+    """Stable file-name prefix for a GCS object (all generations)."""
+    return hashlib.sha1(f"{bucket_name}/{blob_path}".encode()).hexdigest()
+
+
+def _entry_path(bucket_name: str, blob_path: str, generation: int) -> str:
+    ext = os.path.splitext(blob_path)[1]
+    name = f"{_object_key(bucket_name, blob_path)}.{generation}{ext}"
+    return os.path.join(_cache_dir(), name)
+
+
+def _discard(path: str) -> None:
+    """Remove a file that may already be gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _list_entries() -> List[Tuple[str, float, int]]:
+    """Return (path, last_access, size) for every complete cache entry."""
+    entries = []
+    with os.scandir(_cache_dir()) as it:
+        for e in it:
+            if not e.is_file() or e.name.endswith(_PART_SUFFIX):
+                continue
+            try:
+                st = e.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((e.path, st.st_mtime, st.st_size))
+    return entries
+
+
+def _drop_other_generations(
+    bucket_name: str, blob_path: str, keep_path: str
+) -> None:
+    """Remove cached copies of older generations of the same object."""
+    key = _object_key(bucket_name, blob_path)
+    for path, _, _ in _list_entries():
+        if os.path.basename(path).startswith(key + ".") and path != keep_path:
+            _discard(path)
+
+
+def _enforce_budget(keep_path: str) -> None:
+    """Evict least-recently-used entries until the cache fits its budget."""
+    budget = settings.BLOB_CACHE_MAX_MB * 1024 * 1024
+    entries = _list_entries()
+    total = sum(size for _, _, size in entries)
+    if total <= budget:
+        return
+
+    for path, _, size in sorted(entries, key=lambda e: e[1]):
+        if total <= budget:
+            break
+        if path == keep_path:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            _stats["evictions"] += 1
+        except FileNotFoundError:
+            pass
+
+
+def cached_blob_path(bucket_name: str, blob_path: str) -> str:
+    """
+    Get a local path holding the current generation of a GCS object.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        blob_path: Path to the blob
+
+    Returns:
+        Path to a local file with the object contents
+
+    Raises:
+        FileNotFoundError: If the blob doesn't exist
+    """
+    client = get_storage_client()
+    bucket = client.bucket(bucket_name)
+
+    for _ in range(2):
+        with track_gcs_op("blob_cache_check"):
+            blob = bucket.get_blob(blob_path)  # metadata only
+        if blob is None:
+            raise FileNotFoundError(f"gs://{bucket_name}/{blob_path} not found")
+
+        local_path = _entry_path(bucket_name, blob_path, blob.generation)
+        if os.path.exists(local_path):
+            try:
+                os.utime(local_path)  # mark as recently used
+                with _lock:
+                    _stats["hits"] += 1
+                return local_path
+            except FileNotFoundError:
+                pass  # evicted concurrently; download again
+
+        fd, tmp_path = tempfile.mkstemp(dir=_cache_dir(), suffix=_PART_SUFFIX)
+        os.close(fd)
+        try:
+            with track_gcs_op("blob_cache_fill"):
+                blob.download_to_filename(
+                    tmp_path, if_generation_match=blob.generation
+                )
+            os.replace(tmp_path, local_path)
+            # download_to_filename sets the mtime to blob.updated; LRU
+            # order needs the download time
+            os.utime(local_path)
+        except PreconditionFailed:
+            # Object was overwritten between the metadata GET and download
+            _discard(tmp_path)
+            continue
+        except Exception:
+            # The client deletes the partial file itself on NotFound
+            _discard(tmp_path)
+            raise
+
+        with _lock:
+            _stats["misses"] += 1
+            _drop_other_generations(bucket_name, blob_path, local_path)
+            _enforce_budget(local_path)
+        logger.debug(
+            f"Cached gs://{bucket_name}/{blob_path} "
+            f"(generation {blob.generation})"
+        )
+        return local_path
+
+    raise RuntimeError(
+        f"gs://{bucket_name}/{blob_path} kept changing while downloading"
+    )
+
+
+def read_cached_blob(bucket_name: str, blob_path: str) -> bytes:
+    """
+    Read a GCS object through the on-disk cache.
+
+    Raises:
+        FileNotFoundError: If the blob doesn't exist
+    """
+    with open(cached_blob_path(bucket_name, blob_path), "rb") as f:
+        return f.read()
+
+
+def clear_blob_cache() -> int:
+    """
+    Delete every cached blob.
+
+    Returns:
+        Number of entries removed
+    """
+    count = 0
+    with _lock:
+        for path, _, _ in _list_entries():
+            try:
+                os.remove(path)
+                count += 1
+            except FileNotFoundError:
+                pass
+    logger.info(f"Cleared {count} blob cache entries")
+    return count
+
+
+def get_blob_cache_stats() -> Dict[str, Any]:
+    """
+    Get statistics about the on-disk blob cache.
+
+    Returns:
+        Dictionary with entry count, size, budget and hit/miss counters
+    """
+    entries = _list_entries()
+    with _lock:
+        stats = dict(_stats)
+    stats.update(
+        {
+            "entries": len(entries),
+            "size_mb": round(sum(e[2] for e in entries) / 1024 / 1024, 2),
+            "max_mb": settings.BLOB_CACHE_MAX_MB,
+            "directory": settings.BLOB_CACHE_DIR,
+        }
+    )
+    return stats
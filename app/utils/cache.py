@@ -5,19 +5,491 @@ Provides in-memory caching with TTL (time-to-live) for:
 - GCS list operations
 - Metadata reads
 - Query results
+
+All entries live in one MemoryCache (``_cache``):
+- Entries belong to a namespace (the @cached function, or the query
+  source) so they can be counted and cleared together
+- The total size is kept under CACHE_MAX_MB; DataFrames are sized from
+  their Arrow buffers, and the least recently used entries are evicted
+  first
+- Expired entries are swept every CACHE_SWEEP_SECONDS by a background
+  thread instead of lingering until their next lookup
+- All access is lock-protected
+- Entries can be tagged with the resources they were derived from
+  (``gcs://bucket/metadata/de/*``, ``sf://TABLE``); publish_invalidation()
+  drops only the entries whose tags match a written resource, and the GCS
+  write helpers publish these events themselves
+
+@cached keys hash non-scalar arguments by content (see content_hash), so
+they are correct for DataFrames and identical across worker processes.
+Once a shared tier is set (see shared_cache), @cached checks it after an
+in-memory miss and stores its results there too.
+
+Hits, misses and compute times of @cached functions are recorded in
+cache_metrics under their namespace.
 """
 
 import hashlib
 import json
 import logging
+import sys
+import threading
 import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
 from functools import wraps
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+from .cache_metrics import metrics
+from .content_hash import content_hash
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_NAMESPACE = "default"
+
+_SAMPLE_ROWS = 1000  # Values converted to size object columns
+
+_COUNTER_NAMES = ("evictions", "expirations", "invalidations")
+
+
+def _column_size(values: Any) -> int:
+    """Arrow buffer size of a column (object columns are sampled)."""
+    if hasattr(values, "__arrow_array__"):
+        # Arrow-backed (pd.ArrowDtype, string[pyarrow]): no copy
+        return pa.array(values).nbytes
+    if getattr(values, "dtype", None) is not None and values.dtype != object:
+        return int(getattr(values, "nbytes", 0))
+    n = len(values)
+    if n == 0:
+        return 0
+    sample = values[:_SAMPLE_ROWS] if n > _SAMPLE_ROWS else values
+    try:
+        size = pa.array(sample, from_pandas=True).nbytes
+    except (pa.ArrowException, TypeError, ValueError):
+        size = sum(sys.getsizeof(v) for v in sample)
+    return int(size * n / len(sample))
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate bytes held by a cached value.
+
+    DataFrames and Series are sized from the Arrow buffers of their
+    columns; containers from a sample of their items.
+    """
+    if isinstance(value, pd.DataFrame):
+        return sum(
+            _column_size(value.iloc[:, i].array) for i in range(value.shape[1])
+        ) + int(value.index.nbytes)
+    if isinstance(value, pd.Series):
+        return _column_size(value.array) + int(value.index.nbytes)
+    if isinstance(value, (pa.Table, pa.RecordBatch, pa.Array)):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        items = list(value.items())
+        sample = items[:100]
+        per_item = sum(
+            estimate_size(k) + estimate_size(v) for k, v in sample
+        ) / max(len(sample), 1)
+        return sys.getsizeof(value) + int(per_item * len(items))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = list(value)
+        sample = items[:100]
+        per_item = sum(estimate_size(v) for v in sample) / max(len(sample), 1)
+        return sys.getsizeof(value) + int(per_item * len(items))
+    return sys.getsizeof(value)
+
+
+@dataclass
+class _Slot:
+    """Bookkeeping of one entry."""
+
+    entry: Dict[str, Any]
+    namespace: str
+    size: int
+    ttl: Optional[float]
+    tags: Tuple[str, ...] = ()
+    hits: int = 0
+
+
+def gcs_tag(bucket_name: str, blob_path: str = "*") -> str:
+    """Resource tag of a GCS object, or of a prefix ending in ``*``."""
+    return f"gcs://{bucket_name}/{blob_path.lstrip('/')}"
+
+
+def sf_tag(table: str) -> str:
+    """Resource tag of a Snowflake table (names are case-insensitive)."""
+    return f"sf://{table.upper()}"
+
+
+def tags_match(tag: str, resource: str) -> bool:
+    """
+    Whether an entry tagged ``tag`` depends on ``resource``.
+
+    Either side may be a glob: a listing tagged ``gcs://b/metadata/de/*``
+    depends on ``gcs://b/metadata/de/x.json``, and invalidating
+    ``gcs://b/metadata/*`` covers both.
+    """
+    return fnmatchcase(resource, tag) or fnmatchcase(tag, resource)
+
+
+class MemoryCache:
+    """
+    Byte-budgeted, namespaced LRU cache of entry dicts.
+
+    Entries are dicts with at least ``timestamp`` and ``value``; their age
+    is taken from ``timestamp`` so callers can keep their own expiry
+    checks. Dict-style access (``cache[key]``, ``key in cache``, ``del``)
+    works as before and counts as use for LRU.
+
+    Args:
+        max_bytes: Size budget; least recently used entries are evicted
+            beyond it (None = settings.CACHE_MAX_MB)
+        sweep_seconds: Interval of the background expiry sweep
+            (None = settings.CACHE_SWEEP_SECONDS, 0 = no sweeper thread)
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        sweep_seconds: Optional[float] = None,
+    ):
+        self.max_bytes = (
+            settings.CACHE_MAX_MB * 1024 * 1024
+            if max_bytes is None
+            else max_bytes
+        )
+        self.sweep_seconds = (
+            settings.CACHE_SWEEP_SECONDS
+            if sweep_seconds is None
+            else sweep_seconds
+        )
+        self._slots: "OrderedDict[str, _Slot]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._sweeper: Optional[threading.Thread] = None
+
+    # ── Dict-style access ────────────────────────────────────────────────
+    def get(self, key: str, default: Any = None) -> Any:
+        """Entry dict for a key (marked as recently used), or default."""
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                return default
+            self._slots.move_to_end(key)
+            slot.hits += 1
+            return slot.entry
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __setitem__(self, key: str, entry: Dict[str, Any]) -> None:
+        self.put(key, entry)
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._slots
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def keys(self) -> List[str]:
+        """Snapshot of the keys, least recently used first."""
+        with self._lock:
+            return list(self._slots)
+
+    def values(self) -> List[Dict[str, Any]]:
+        """Snapshot of the entry dicts."""
+        with self._lock:
+            return [slot.entry for slot in self._slots.values()]
+
+    # ── Storing and eviction ─────────────────────────────────────────────
+    def _count(self, namespace: str, name: str, n: int = 1) -> None:
+        counters = self._counters.setdefault(
+            namespace, dict.fromkeys(_COUNTER_NAMES, 0)
+        )
+        counters[name] += n
+
+    def _remove(self, key: str) -> _Slot:
+        slot = self._slots.pop(key)
+        self._bytes -= slot.size
+        return slot
+
+    def put(
+        self,
+        key: str,
+        entry: Dict[str, Any],
+        namespace: str = DEFAULT_NAMESPACE,
+        ttl: Optional[float] = None,
+        size: Optional[int] = None,
+        tags: Iterable[str] = (),
+    ) -> bool:
+        """
+        Store an entry dict, evicting least recently used entries if needed.
+
+        Args:
+            key: Cache key
+            entry: Dict with ``timestamp`` and ``value``
+            namespace: Namespace the entry is counted and cleared under
+            ttl: Seconds after ``timestamp`` at which the sweep drops it
+                (None = only removed by eviction or clearing)
+            size: Size in bytes, if known (default: estimate_size(value))
+            tags: Resources the entry depends on (see invalidate)
+
+        Returns:
+            Whether the entry was stored (False if larger than the budget)
+        """
+        if size is None:
+            size = estimate_size(entry.get("value"))
+        with self._lock:
+            if key in self._slots:
+                self._remove(key)
+            if size > self.max_bytes:
+                logger.info(
+                    f"Not caching {namespace} entry of {size} bytes "
+                    f"(budget {self.max_bytes})"
+                )
+                return False
+            while self._slots and self._bytes + size > self.max_bytes:
+                victim_key, victim = self._slots.popitem(last=False)
+                self._bytes -= victim.size
+                self._count(victim.namespace, "evictions")
+                logger.debug(f"Evicted {victim.namespace} entry {victim_key}")
+            self._slots[key] = _Slot(entry, namespace, size, ttl, tuple(tags))
+            self._bytes += size
+        self._ensure_sweeper()
+        return True
+
+    def sweep(self) -> int:
+        """Drop entries past their TTL; returns how many were dropped."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                key
+                for key, slot in self._slots.items()
+                if slot.ttl is not None
+                and now - slot.entry.get("timestamp", now) >= slot.ttl
+            ]
+            for key in expired:
+                self._count(self._remove(key).namespace, "expirations")
+        if expired:
+            logger.debug(f"Swept {len(expired)} expired cache entries")
+        return len(expired)
+
+    def invalidate(self, resources: Iterable[str]) -> int:
+        """
+        Drop entries tagged with any of the resources (see tags_match).
+
+        Returns:
+            Number of entries dropped
+        """
+        resources = list(resources)
+        with self._lock:
+            keys = [
+                key
+                for key, slot in self._slots.items()
+                if any(
+                    tags_match(tag, resource)
+                    for tag in slot.tags
+                    for resource in resources
+                )
+            ]
+            for key in keys:
+                self._count(self._remove(key).namespace, "invalidations")
+        return len(keys)
+
+    def _ensure_sweeper(self) -> None:
+        if not self.sweep_seconds or (
+            self._sweeper is not None and self._sweeper.is_alive()
+        ):
+            return
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+
+            def _run():
+                while True:
+                    time.sleep(self.sweep_seconds)
+                    try:
+                        self.sweep()
+                    except Exception as e:
+                        logger.warning(f"Cache sweep failed: {e}")
+
+            self._sweeper = threading.Thread(
+                target=_run, name="cache-sweeper", daemon=True
+            )
+            self._sweeper.start()
+
+    # ── Clearing and stats ───────────────────────────────────────────────
+    def clear(
+        self, namespace: Optional[str] = None, pattern: Optional[str] = None
+    ) -> int:
+        """
+        Remove entries of a namespace and/or whose key or namespace
+        contains pattern (all entries if neither is given).
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = [
+                key
+                for key, slot in self._slots.items()
+                if (namespace is None or slot.namespace == namespace)
+                and (
+                    pattern is None
+                    or pattern in key
+                    or pattern in slot.namespace
+                )
+            ]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def hottest(self, n: int = 20) -> List[Dict[str, Any]]:
+        """The n entries read most often, with namespace, hits and size."""
+        with self._lock:
+            slots = sorted(
+                self._slots.items(), key=lambda kv: kv[1].hits, reverse=True
+            )[:n]
+            return [
+                {
+                    "key": key,
+                    "namespace": slot.namespace,
+                    "hits": slot.hits,
+                    "bytes": slot.size,
+                    "age": time.time() - slot.entry.get("timestamp", 0),
+                }
+                for key, slot in slots
+            ]
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated bytes held by all entries."""
+        with self._lock:
+            return self._bytes
+
+    def namespace_stats(self) -> Dict[str, Dict[str, int]]:
+        """Entries, bytes and eviction counters per namespace."""
+        with self._lock:
+            stats: Dict[str, Dict[str, int]] = {}
+            for namespace, counters in self._counters.items():
+                stats[namespace] = {"entries": 0, "bytes": 0, **counters}
+            for slot in self._slots.values():
+                ns = stats.setdefault(
+                    slot.namespace,
+                    {
+                        "entries": 0,
+                        "bytes": 0,
+                        **dict.fromkeys(_COUNTER_NAMES, 0),
+                    },
+                )
+                ns["entries"] += 1
+                ns["bytes"] += slot.size
+            return stats
+
+
 # Global cache storage
-_cache: Dict[str, Dict[str, Any]] = {}
+_cache = MemoryCache()
+metrics.add_source("memory", _cache.namespace_stats)
+
+# Second tier shared with other processes (see shared_cache), if enabled
+_shared_tier: Optional[Any] = None
+
+
+def set_shared_tier(tier: Optional[Any]) -> None:
+    """Use a shared tier (get/put like MemoryCache) behind _cache."""
+    global _shared_tier
+    _shared_tier = tier
+
+
+def get_shared_tier() -> Optional[Any]:
+    """The shared tier, or None if not enabled."""
+    return _shared_tier
+
+
+def shared_get(key: str) -> Optional[Dict[str, Any]]:
+    """Entry from the shared tier, or None (errors count as misses)."""
+    if _shared_tier is None:
+        return None
+    try:
+        return _shared_tier.get(key)
+    except Exception as e:
+        logger.warning(f"Shared cache read failed: {e}")
+        return None
+
+
+def shared_put(key: str, entry: Dict[str, Any], **kwargs) -> None:
+    """Store an entry in the shared tier, if enabled (errors are logged)."""
+    if _shared_tier is None:
+        return
+    try:
+        _shared_tier.put(key, entry, **kwargs)
+    except Exception as e:
+        logger.warning(f"Shared cache write failed: {e}")
+
+
+# Callbacks told about every invalidation, e.g. caches outside _cache
+_invalidation_listeners: List[Callable[[List[str]], None]] = []
+
+
+def subscribe_invalidations(callback: Callable[[List[str]], None]) -> None:
+    """Call callback(resources) on every publish_invalidation()."""
+    if callback not in _invalidation_listeners:
+        _invalidation_listeners.append(callback)
+
+
+def publish_invalidation(*resources: str) -> int:
+    """
+    Announce that resources were written.
+
+    Entries tagged with a matching resource are dropped from the cache and
+    every subscriber is notified; other entries stay warm.
+
+    Args:
+        *resources: Written resources (``gcs://bucket/path``, ``sf://T``),
+            optionally ending in ``*`` to cover a prefix
+
+    Returns:
+        Number of in-memory entries dropped
+    """
+    resources = [r for r in resources if r]
+    if not resources:
+        return 0
+    count = _cache.invalidate(resources)
+    for callback in list(_invalidation_listeners):
+        try:
+            callback(resources)
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener failed: {e}")
+    logger.debug(
+        f"Invalidated {count} cache entries for {', '.join(resources)}"
+    )
+    return count
 
 
 def _get_cache_key(func_name: str, *args, **kwargs) -> str:
@@ -40,27 +512,35 @@ def _get_cache_key(func_name: str, *args, **kwargs) -> str:
         if isinstance(arg, (str, int, float, bool)):
             key_parts.append(str(arg))
         else:
-            # For complex types, use hash
-            key_parts.append(str(hash(str(arg))))
+            # For complex types, hash the content (stable across processes)
+            key_parts.append(content_hash(arg))
 
     # Add keyword args (sorted for stability)
     for k, v in sorted(kwargs.items()):
         if isinstance(v, (str, int, float, bool)):
             key_parts.append(f"{k}={v}")
         else:
-            key_parts.append(f"{k}={hash(str(v))}")
+            key_parts.append(f"{k}={content_hash(v)}")
 
     # Create hash of all parts
     key_str = "|".join(key_parts)
     return hashlib.md5(key_str.encode()).hexdigest()
 
 
-def cached(ttl_seconds: int = 300):
+def cached(
+    ttl_seconds: int = 300,
+    namespace: Optional[str] = None,
+    tags: Optional[Callable[..., Iterable[str]]] = None,
+):
     """
     Decorator to cache function results with a time-to-live.
 
     Args:
         ttl_seconds: Time-to-live in seconds (default: 5 minutes)
+        namespace: Cache namespace (default: the function's name)
+        tags: Called with the function's arguments; returns the resources
+            a result depends on, so publish_invalidation() of any of them
+            drops it before its TTL
 
     Example:
         @cached(ttl_seconds=600)
@@ -70,29 +550,49 @@ def cached(ttl_seconds: int = 300):
     """
 
     def decorator(func: Callable) -> Callable:
+        ns = namespace or func.__name__
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key
             cache_key = _get_cache_key(func.__name__, *args, **kwargs)
 
             # Check if cached value exists and is not expired
-            if cache_key in _cache:
-                entry = _cache[cache_key]
+            entry = _cache.get(cache_key)
+            if entry is not None:
                 age = time.time() - entry["timestamp"]
                 if age < ttl_seconds:
                     logger.debug(
                         f"Cache hit for {func.__name__} (age: {age:.1f}s)"
                     )
+                    metrics.record_hit(ns, "memory")
                     return entry["value"]
                 else:
                     logger.debug(
                         f"Cache expired for {func.__name__} (age: {age:.1f}s)"
                     )
 
+            entry_tags = list(tags(*args, **kwargs)) if tags else []
+            options = {"namespace": ns, "ttl": ttl_seconds, "tags": entry_tags}
+
+            # Another process on the host may have computed it already
+            entry = shared_get(cache_key)
+            if entry is not None and (
+                time.time() - entry["timestamp"] < ttl_seconds
+            ):
+                logger.debug(f"Shared cache hit for {func.__name__}")
+                metrics.record_hit(ns, "shared")
+                _cache.put(cache_key, entry, **options)
+                return entry["value"]
+
             # Call function and cache result
             logger.debug(f"Cache miss for {func.__name__}, executing function")
+            start = time.perf_counter()
             result = func(*args, **kwargs)
-            _cache[cache_key] = {"timestamp": time.time(), "value": result}
+            metrics.record_miss(ns, time.perf_counter() - start)
+            entry = {"timestamp": time.time(), "value": result}
+            _cache.put(cache_key, entry, **options)
+            shared_put(cache_key, entry, **options)
 
             return result
 
@@ -106,29 +606,18 @@ def clear_cache(pattern: Optional[str] = None):
     Clear cached entries.
 
     Args:
-        pattern: If provided, only clear keys containing this substring.
-                 If None, clear all cache entries.
+        pattern: If provided, only clear entries whose key or namespace
+                 contains this substring. If None, clear all cache entries.
 
     Returns:
         Number of entries cleared
     """
-    global _cache
-
+    count = _cache.clear(pattern=pattern)
     if pattern is None:
-        count = len(_cache)
-        _cache.clear()
         logger.info(f"Cleared all {count} cache entries")
-        return count
-
-    # Clear entries matching pattern
-    keys_to_remove = [k for k in _cache.keys() if pattern in k]
-    for key in keys_to_remove:
-        del _cache[key]
-
-    logger.info(
-        f"Cleared {len(keys_to_remove)} cache entries matching '{pattern}'"
-    )
-    return len(keys_to_remove)
+    else:
+        logger.info(f"Cleared {count} cache entries matching '{pattern}'")
+    return count
 
 
 def get_cache_stats() -> Dict[str, Any]:
@@ -138,44 +627,87 @@ def get_cache_stats() -> Dict[str, Any]:
     Returns:
         Dictionary with cache statistics
     """
-    if not _cache:
+    usage = {
+        "total_bytes": _cache.total_bytes,
+        "max_bytes": _cache.max_bytes,
+        "namespaces": _cache.namespace_stats(),
+    }
+    entries = _cache.values()
+    if not entries:
         return {
             "size": 0,
             "oldest_age": 0,
             "newest_age": 0,
             "average_age": 0,
+            **usage,
         }
 
     current_time = time.time()
-    ages = [current_time - entry["timestamp"] for entry in _cache.values()]
+    ages = [current_time - entry["timestamp"] for entry in entries]
 
     return {
-        "size": len(_cache),
+        "size": len(entries),
         "oldest_age": max(ages),
         "newest_age": min(ages),
         "average_age": sum(ages) / len(ages),
+        **usage,
     }
 
 
-def invalidate_on_write(func: Callable) -> Callable:
+def get_hot_entries(n: int = 20) -> List[Dict[str, Any]]:
     """
-    Decorator to automatically clear cache when a write operation occurs.
+    The most read in-memory entries.
 
-    Use this on functions that modify data to ensure cache stays consistent.
+    Args:
+        n: Number of entries to return
+
+    Returns:
+        Dicts with key, namespace, hits, bytes and age, most hits first
+    """
+    return _cache.hottest(n)
+
+
+def invalidate_on_write(
+    func: Optional[Callable] = None,
+    *,
+    tags: Optional[Callable[..., Iterable[str]]] = None,
+) -> Callable:
+    """
+    Decorator to invalidate cached entries when a write operation occurs.
+
+    With ``tags``, only entries depending on the written resources are
+    dropped (see publish_invalidation); without, the whole cache is
+    cleared.
+
+    Args:
+        func: Decorated function (when used without arguments)
+        tags: Called with the function's arguments; returns the resources
+            it writes
 
     Example:
-        @invalidate_on_write
-        def save_metadata(data):
+        @invalidate_on_write(
+            tags=lambda bucket, country, data: [
+                gcs_tag(bucket, f"metadata/{country}/*")
+            ]
+        )
+        def save_metadata(bucket, country, data):
             # Save data to GCS
             ...
     """
 
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        result = func(*args, **kwargs)
-        # Clear cache after write
-        clear_cache()
-        logger.info(f"Cache invalidated after {func.__name__}")
-        return result
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            if tags is None:
+                clear_cache()
+                logger.info(f"Cache invalidated after {func.__name__}")
+            else:
+                publish_invalidation(*tags(*args, **kwargs))
+            return result
+
+        return wrapper
 
-    return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
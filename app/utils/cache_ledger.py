@@ -0,0 +1,372 @@
+"""
+Ledger of a GCS result cache prefix (e.g. cache/snowflake-queries/).
+
+One JSON object per prefix (``<prefix>_ledger.json``) records each cached
+entry's size, creation time, last access and hit count. It serves two
+purposes:
+
+- Cache statistics come from one GET of the ledger instead of listing the
+  prefix
+- The prefix stays under a byte budget: when a write pushes the total
+  over it, the least recently used entries are deleted
+
+Hits are counted in memory and flushed at most every
+CACHE_LEDGER_FLUSH_SECONDS; writes and deletions are flushed immediately.
+Flushes merge into the stored ledger guarded by its generation, so
+instances in several processes don't lose each other's updates.
+run_janitor() reconciles the ledger with a listing and deletes expired
+entries in batches.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from .gcs_client import get_storage_client, track_gcs_op
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+LEDGER_NAME = "_ledger.json"
+DELETE_BATCH_SIZE = 100  # Max calls per GCS batch request
+
+_MAX_UPDATE_ATTEMPTS = 8
+
+
+class CacheLedger:
+    """
+    Size and access bookkeeping of the entries under one cache prefix.
+
+    Entries are keyed by the object name relative to the prefix (e.g.
+    ``<hash>.parquet``).
+
+    Args:
+        bucket_name: Bucket holding the cache
+        prefix: Cache prefix, ending in "/"
+        max_bytes: Byte budget of the prefix (None = unbounded)
+    """
+
+    def __init__(
+        self, bucket_name: str, prefix: str, max_bytes: Optional[int] = None
+    ):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.path = f"{prefix}{LEDGER_NAME}"
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at = 0.0
+        self._written: Dict[str, Dict[str, Any]] = {}
+        self._hits: Dict[str, int] = {}
+        self._accessed: Dict[str, float] = {}
+        self._deleted: set = set()
+        self._flushed_at = time.time()
+
+    # ── Stored ledger ────────────────────────────────────────────────────
+    def _blob(self):
+        return get_storage_client().bucket(self.bucket_name).blob(self.path)
+
+    def _read(self, blob) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Return (entries, generation) of the ledger; generation 0 = none."""
+        try:
+            with track_gcs_op("cache_ledger_read"):
+                raw = blob.download_as_bytes()
+        except NotFound:
+            return {}, 0
+        data = json.loads(raw or b"{}")
+        return dict(data.get("entries", {})), int(blob.generation or 0)
+
+    def _apply(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Apply the pending local changes to a copy of the stored entries."""
+        for key in self._deleted:
+            entries.pop(key, None)
+        for key, entry in self._written.items():
+            entries[key] = dict(entry, hits=entries.get(key, {}).get("hits", 0))
+        for key, count in self._hits.items():
+            if key in entries:
+                entries[key]["hits"] = entries[key].get("hits", 0) + count
+        for key, ts in self._accessed.items():
+            if key in entries:
+                entries[key]["last_access"] = max(
+                    entries[key].get("last_access", 0), ts
+                )
+
+    def flush(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Merge pending changes into the stored ledger.
+
+        Args:
+            reset: Replace the stored ledger with the pending writes only
+
+        Returns:
+            The merged entries
+        """
+        with self._lock:
+            for _ in range(_MAX_UPDATE_ATTEMPTS):
+                blob = self._blob()
+                stored, generation = self._read(blob)
+                entries = (
+                    {} if reset else {k: dict(v) for k, v in stored.items()}
+                )
+                self._apply(entries)
+                if generation and entries == stored:
+                    break
+                payload = {
+                    "entries": entries,
+                    "updated_at": time.time(),
+                }
+                try:
+                    with track_gcs_op("cache_ledger_write"):
+                        blob.upload_from_string(
+                            json.dumps(payload, separators=(",", ":")),
+                            content_type="application/json",
+                            if_generation_match=generation,
+                        )
+                    break
+                except PreconditionFailed:
+                    logger.debug(f"{self.path} changed, retrying")
+            else:
+                raise RuntimeError(
+                    f"Could not update gs://{self.bucket_name}/{self.path}: "
+                    f"too many concurrent writers"
+                )
+            self._entries = entries
+            self._loaded_at = self._flushed_at = time.time()
+            self._written.clear()
+            self._hits.clear()
+            self._accessed.clear()
+            self._deleted.clear()
+            return dict(entries)
+
+    def entries(self, max_age: float = 0) -> Dict[str, Dict[str, Any]]:
+        """
+        Entries of the ledger, including unflushed hits.
+
+        Args:
+            max_age: Reuse entries read less than this many seconds ago
+        """
+        with self._lock:
+            if time.time() - self._loaded_at > max_age:
+                self._entries, _ = self._read(self._blob())
+                self._loaded_at = time.time()
+            entries = {k: dict(v) for k, v in self._entries.items()}
+            self._apply(entries)
+            return entries
+
+    # ── Recording ────────────────────────────────────────────────────────
+    def record_write(self, key: str, size: int) -> List[str]:
+        """
+        Record a newly written entry and enforce the byte budget.
+
+        Returns:
+            Keys evicted to stay within the budget
+        """
+        now = time.time()
+        with self._lock:
+            self._deleted.discard(key)
+            self._written[key] = {
+                "size": int(size),
+                "created": now,
+                "last_access": now,
+            }
+            entries = self.flush()
+        if self.max_bytes is None:
+            return []
+        victims = lru_victims(entries, self.max_bytes, keep={key})
+        if victims:
+            delete_entries(self, victims)
+        return victims
+
+    def record_hit(self, key: str) -> None:
+        """Count a cache hit; flushed with the next flush."""
+        with self._lock:
+            self._hits[key] = self._hits.get(key, 0) + 1
+            self._accessed[key] = time.time()
+            due = (
+                time.time() - self._flushed_at
+                >= settings.CACHE_LEDGER_FLUSH_SECONDS
+            )
+        if due:
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Could not flush {self.path}: {e}")
+
+    def record_delete(self, keys: Iterable[str]) -> None:
+        """Drop deleted entries from the ledger."""
+        with self._lock:
+            for key in keys:
+                self._deleted.add(key)
+                self._written.pop(key, None)
+            self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, total bytes and hits, from the ledger."""
+        entries = self.entries()
+        return {
+            "count": len(entries),
+            "total_bytes": sum(e.get("size", 0) for e in entries.values()),
+            "hits": sum(e.get("hits", 0) for e in entries.values()),
+            "max_bytes": self.max_bytes,
+        }
+
+
+def lru_victims(
+    entries: Dict[str, Dict[str, Any]],
+    max_bytes: int,
+    keep: Iterable[str] = (),
+) -> List[str]:
+    """Least recently used keys to drop to bring entries under max_bytes."""
+    total = sum(e.get("size", 0) for e in entries.values())
+    keep = set(keep)
+    victims = []
+    for key, entry in sorted(
+        entries.items(), key=lambda kv: kv[1].get("last_access", 0)
+    ):
+        if total <= max_bytes:
+            break
+        if key in keep:
+            continue
+        victims.append(key)
+        total -= entry.get("size", 0)
+    return victims
+
+
+def delete_blobs(
+    bucket_name: str, paths: List[str], batch_size: int = DELETE_BATCH_SIZE
+) -> int:
+    """
+    Delete objects with batched requests (missing objects are ignored).
+
+    Returns:
+        Number of objects requested for deletion
+    """
+    client = get_storage_client()
+    bucket = client.bucket(bucket_name)
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start : start + batch_size]
+        with track_gcs_op("cache_batch_delete"):
+            with client.batch(raise_exception=False):
+                for path in chunk:
+                    bucket.blob(path).delete()
+    return len(paths)
+
+
+def delete_entries(
+    ledger: CacheLedger,
+    keys: List[str],
+    batch_size: int = DELETE_BATCH_SIZE,
+) -> None:
+    """Delete cache entries and drop them from the ledger."""
+    delete_blobs(
+        ledger.bucket_name, [f"{ledger.prefix}{k}" for k in keys], batch_size
+    )
+    ledger.record_delete(keys)
+    logger.info(f"Deleted {len(keys)} entries from {ledger.prefix}")
+
+
+_ledgers: Dict[Tuple[str, str], CacheLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(
+    bucket_name: str, prefix: str, max_bytes: Optional[int] = None
+) -> CacheLedger:
+    """The process-wide ledger of a cache prefix."""
+    with _ledgers_lock:
+        ledger = _ledgers.get((bucket_name, prefix))
+        if ledger is None:
+            ledger = CacheLedger(bucket_name, prefix, max_bytes)
+            _ledgers[(bucket_name, prefix)] = ledger
+        ledger.max_bytes = max_bytes
+        return ledger
+
+
+def reconcile(ledger: CacheLedger) -> Dict[str, int]:
+    """
+    Make the ledger match a listing of its prefix.
+
+    Objects missing from the ledger are added (created/last access from the
+    ``cached_timestamp`` metadata or the upload time); entries whose object
+    is gone are dropped.
+
+    Returns:
+        Counts of added and dropped entries
+    """
+    listed = {}
+    with track_gcs_op("cache_ledger_scan"):
+        for blob in get_storage_client().list_blobs(
+            ledger.bucket_name, prefix=ledger.prefix
+        ):
+            key = blob.name[len(ledger.prefix) :]
+            if key and key != LEDGER_NAME and "/" not in key:
+                listed[key] = blob
+    entries = ledger.entries()
+    added = {k: b for k, b in listed.items() if k not in entries}
+    dropped = [k for k in entries if k not in listed]
+    with ledger._lock:
+        for key, blob in added.items():
+            meta = blob.metadata or {}
+            created = float(
+                meta.get("cached_timestamp")
+                or (blob.time_created.timestamp() if blob.time_created else 0)
+            )
+            ledger._written[key] = {
+                "size": int(blob.size or 0),
+                "created": created,
+                "last_access": created,
+            }
+        ledger._deleted.update(dropped)
+        ledger.flush()
+    return {"added": len(added), "dropped": len(dropped)}
+
+
+def run_janitor(
+    bucket_name: str,
+    prefix: str,
+    max_age_seconds: float,
+    max_bytes: Optional[int] = None,
+    batch_size: int = DELETE_BATCH_SIZE,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Delete expired entries of a cache prefix, then enforce its budget.
+
+    Args:
+        bucket_name: Bucket holding the cache
+        prefix: Cache prefix
+        max_age_seconds: Entries created longer ago than this are deleted
+        max_bytes: Byte budget (LRU eviction above it); None = unbounded
+        batch_size: Deletions per batch request
+        dry_run: Only report what would be deleted
+
+    Returns:
+        Counts of reconciled, expired and evicted entries and bytes left
+    """
+    ledger = get_ledger(bucket_name, prefix, max_bytes)
+    result = {"added": 0, "dropped": 0}
+    if not dry_run:
+        result = reconcile(ledger)
+    entries = ledger.entries()
+    cutoff = time.time() - max_age_seconds
+    expired = [k for k, e in entries.items() if e.get("created", 0) < cutoff]
+    remaining = {k: e for k, e in entries.items() if k not in set(expired)}
+    evicted = lru_victims(remaining, max_bytes) if max_bytes is not None else []
+    if not dry_run:
+        for start in range(0, len(expired + evicted), batch_size):
+            chunk = (expired + evicted)[start : start + batch_size]
+            delete_entries(ledger, chunk, batch_size)
+    left = sum(
+        e.get("size", 0) for k, e in remaining.items() if k not in set(evicted)
+    )
+    result.update(expired=len(expired), evicted=len(evicted), bytes_left=left)
+    return result
@@ -0,0 +1,322 @@
+"""
+Hit, miss and latency metrics of the caches, per namespace.
+
+@cached functions record under their namespace (the function name) and
+query caches under their source ("snowflake", "bigquery"):
+- Hits per tier (memory, shared, gcs, subsumed, stale, coalesced)
+- Misses, with a histogram of the seconds spent computing the result
+- Entries, bytes, evictions, expirations and invalidations, read from the
+  cache tiers registered with add_source() when a snapshot is taken
+
+The estimated time saved of a namespace is its hits times its mean
+compute time. Metrics are exposed as Prometheus text (render_prometheus,
+served by start_metrics_server on CACHE_METRICS_PORT), as a JSON snapshot
+(metrics_snapshot, dump_metrics_json) and on the Cache_Management page.
+"""
+
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the compute time histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Per-namespace statistics a tier source reports, exported as gauges or
+# counters (name -> Prometheus type)
+_SOURCE_METRICS = {
+    "entries": "gauge",
+    "bytes": "gauge",
+    "evictions": "counter",
+    "expirations": "counter",
+    "invalidations": "counter",
+}
+
+
+class _Namespace:
+    """Counters of one namespace."""
+
+    def __init__(self):
+        self.hits: Dict[str, int] = {}
+        self.misses = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.compute_seconds = 0.0
+
+
+class CacheMetrics:
+    """Thread-safe registry of cache hits, misses and compute times."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._sources: Dict[str, Callable[[], Dict[str, Dict[str, int]]]] = {}
+        self.started_at = time.time()
+
+    def _ns(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is None:
+            ns = self._namespaces[namespace] = _Namespace()
+        return ns
+
+    def record_hit(self, namespace: str, tier: str = "memory") -> None:
+        """Count a lookup answered by a cache tier."""
+        with self._lock:
+            hits = self._ns(namespace).hits
+            hits[tier] = hits.get(tier, 0) + 1
+
+    def record_miss(self, namespace: str, seconds: float) -> None:
+        """Count a lookup that computed its result in ``seconds``."""
+        with self._lock:
+            ns = self._ns(namespace)
+            ns.misses += 1
+            ns.compute_seconds += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    ns.buckets[i] += 1
+                    break
+
+    def add_source(
+        self, tier: str, stats: Callable[[], Dict[str, Dict[str, int]]]
+    ) -> None:
+        """
+        Register a cache tier's per-namespace statistics.
+
+        Args:
+            tier: Tier name (e.g. "memory", "shared")
+            stats: Returns {namespace: {"entries": ..., "bytes": ..., ...}}
+        """
+        with self._lock:
+            self._sources[tier] = stats
+
+    def reset(self) -> None:
+        """Forget all hits, misses and compute times."""
+        with self._lock:
+            self._namespaces.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        All metrics as plain data.
+
+        Returns:
+            {"started_at", "taken_at", "namespaces": {namespace: {...}}}
+            where each namespace has hits (total and per tier), misses,
+            hit_rate, compute_seconds, mean_compute_seconds,
+            est_seconds_saved, latency_buckets and per-tier statistics
+        """
+        with self._lock:
+            sources = dict(self._sources)
+            counters = {
+                name: (
+                    dict(ns.hits),
+                    ns.misses,
+                    list(ns.buckets),
+                    ns.compute_seconds,
+                )
+                for name, ns in self._namespaces.items()
+            }
+            started_at = self.started_at
+
+        tiers: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for tier, stats in sources.items():
+            try:
+                tiers[tier] = stats()
+            except Exception as e:
+                logger.warning(f"Cache metrics source {tier} failed: {e}")
+
+        names = set(counters)
+        for stats in tiers.values():
+            names |= set(stats)
+
+        namespaces = {}
+        for name in sorted(names):
+            hits, misses, buckets, seconds = counters.get(
+                name, ({}, 0, [0] * len(LATENCY_BUCKETS), 0.0)
+            )
+            total_hits = sum(hits.values())
+            mean = seconds / misses if misses else 0.0
+            lookups = total_hits + misses
+            namespaces[name] = {
+                "hits": total_hits,
+                "hits_by_tier": hits,
+                "misses": misses,
+                "hit_rate": total_hits / lookups if lookups else 0.0,
+                "compute_seconds": seconds,
+                "mean_compute_seconds": mean,
+                "est_seconds_saved": total_hits * mean,
+                "latency_buckets": dict(zip(LATENCY_BUCKETS, buckets)),
+                "tiers": {
+                    tier: stats[name]
+                    for tier, stats in tiers.items()
+                    if name in stats
+                },
+            }
+        return {
+            "started_at": started_at,
+            "taken_at": time.time(),
+            "namespaces": namespaces,
+        }
+
+
+metrics = CacheMetrics()
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """Snapshot of the process's cache metrics (see CacheMetrics)."""
+    return metrics.snapshot()
+
+
+def _label(value: str) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "")
+    )
+
+
+def render_prometheus(snapshot: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Metrics in the Prometheus text exposition format.
+
+    Args:
+        snapshot: Snapshot to render (default: a fresh one)
+    """
+    snapshot = snapshot or metrics_snapshot()
+    namespaces = snapshot["namespaces"]
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("mmm_cache_hits_total", "counter", "Lookups served by a tier")
+    for name, ns in namespaces.items():
+        for tier, count in sorted(ns["hits_by_tier"].items()):
+            lines.append(
+                f'mmm_cache_hits_total{{namespace="{_label(name)}",'
+                f'tier="{_label(tier)}"}} {count}'
+            )
+
+    family("mmm_cache_misses_total", "counter", "Lookups that computed")
+    for name, ns in namespaces.items():
+        lines.append(
+            f'mmm_cache_misses_total{{namespace="{_label(name)}"}} '
+            f'{ns["misses"]}'
+        )
+
+    family(
+        "mmm_cache_compute_seconds",
+        "histogram",
+        "Seconds spent computing results on a miss",
+    )
+    for name, ns in namespaces.items():
+        label = f'namespace="{_label(name)}"'
+        cumulative = 0
+        for bound, count in ns["latency_buckets"].items():
+            cumulative += count
+            lines.append(
+                f'mmm_cache_compute_seconds_bucket{{{label},le="{bound}"}} '
+                f"{cumulative}"
+            )
+        lines.append(
+            f'mmm_cache_compute_seconds_bucket{{{label},le="+Inf"}} '
+            f'{ns["misses"]}'
+        )
+        lines.append(
+            f"mmm_cache_compute_seconds_sum{{{label}}} "
+            f'{ns["compute_seconds"]:.6f}'
+        )
+        lines.append(
+            f'mmm_cache_compute_seconds_count{{{label}}} {ns["misses"]}'
+        )
+
+    for stat, kind in _SOURCE_METRICS.items():
+        metric = f"mmm_cache_{stat}" + ("_total" if kind == "counter" else "")
+        family(metric, kind, f"Cache {stat} per tier")
+        for name, ns in namespaces.items():
+            for tier, stats in sorted(ns["tiers"].items()):
+                if stat in stats:
+                    lines.append(
+                        f'{metric}{{namespace="{_label(name)}",'
+                        f'tier="{_label(tier)}"}} {stats[stat]}'
+                    )
+    return "\n".join(lines) + "\n"
+
+
+def dump_metrics_json(path: Optional[str] = None) -> str:
+    """
+    Serialize a snapshot as JSON for offline analysis.
+
+    Args:
+        path: If given, the JSON is also written to this file
+
+    Returns:
+        The JSON text
+    """
+    text = json.dumps(metrics_snapshot(), indent=2, default=str)
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+        logger.info(f"Wrote cache metrics to {path}")
+    return text
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body = render_prometheus().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body = dump_metrics_json().encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Metrics request: {format % args}")
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(
+    port: Optional[int] = None,
+) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics (Prometheus text) and /metrics.json on a port.
+
+    Does nothing if port is 0 or a server is already running; a port in
+    use (e.g. by another worker on the host) is logged, not raised.
+
+    Args:
+        port: Port to listen on (None = settings.CACHE_METRICS_PORT)
+    """
+    global _server
+    if port is None:
+        port = settings.CACHE_METRICS_PORT
+    if not port or _server is not None:
+        return _server
+    try:
+        _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Cache metrics server not started on {port}: {e}")
+        return None
+    threading.Thread(
+        target=_server.serve_forever, name="cache-metrics", daemon=True
+    ).start()
+    logger.info(f"Serving cache metrics on port {port}")
+    return _server
@@ -0,0 +1,167 @@
+"""
+Deterministic content hashes for cache keys.
+
+``hash(str(obj))`` is neither correct nor stable for cache keys: the repr of
+a DataFrame is truncated (frames with the same head and tail collide) and
+Python's string hashing is randomized per process. content_hash() instead
+digests the data itself, so the same value gives the same key in every
+worker:
+- DataFrames and Series: ``pd.util.hash_pandas_object`` of the values and
+  index, plus column names and dtypes
+- Arrow tables and arrays: digest of their IPC serialization after
+  combining chunks, so equal data hashes equal however it is chunked or
+  sliced
+- numpy arrays: digest of their bytes, dtype and shape
+- dicts, lists, tuples and sets: digest of canonical JSON (sorted keys);
+  nested frames are replaced by their own content hash
+- Anything else: digest of its type name and repr
+
+Hashes of Arrow objects, which are immutable, are memoized per object.
+Frames, Series and numpy arrays can be edited in place, so they are
+hashed again on every call.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# id(obj) -> (weak reference, digest), for immutable (Arrow) objects only
+_memo: Dict[int, Tuple[Any, str]] = {}
+_memo_lock = threading.Lock()
+
+
+def _memoized(value: Any, compute: Callable[[Any], str]) -> str:
+    """Return the memoized hash of an immutable value."""
+    key = id(value)
+    with _memo_lock:
+        cached = _memo.get(key)
+        if cached is not None and cached[0]() is value:
+            return cached[1]
+
+    digest = compute(value)
+
+    try:
+        ref = weakref.ref(value, lambda _, k=key: _memo.pop(k, None))
+    except TypeError:
+        return digest  # Not weak-referenceable: don't memoize
+    with _memo_lock:
+        _memo[key] = (ref, digest)
+    return digest
+
+
+def _hash_pandas(value: Any) -> str:
+    h = hashlib.sha256()
+    if isinstance(value, pd.DataFrame):
+        h.update(b"frame")
+        h.update(json.dumps(list(map(str, value.columns))).encode())
+        h.update(json.dumps(list(map(str, value.dtypes))).encode())
+    else:
+        h.update(b"series")
+        h.update(json.dumps([str(value.name), str(value.dtype)]).encode())
+    try:
+        row_hashes = pd.util.hash_pandas_object(value, index=True)
+        h.update(row_hashes.to_numpy().tobytes())
+    except TypeError:
+        # Unhashable cells (e.g. lists): fall back to Arrow buffers, or to
+        # canonical JSON of the cells if Arrow can't type them either
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=True)
+            h.update(_hash_arrow(table).encode())
+        except pa.ArrowException:
+            h.update(_canonical_json(frame.to_dict(orient="split")).encode())
+    return h.hexdigest()
+
+
+def _hash_arrow(value: Any) -> str:
+    h = hashlib.sha256()
+    if isinstance(value, pa.RecordBatch):
+        table = pa.Table.from_batches([value])
+    elif isinstance(value, pa.Table):
+        table = value
+    else:
+        h.update(b"array")
+        table = pa.table({"": value})
+    # One chunk per column, without schema metadata: the IPC writer then
+    # emits one batch whose buffers start at the data (slice offsets are
+    # resolved), so only the values and types reach the digest
+    table = table.replace_schema_metadata(None).combine_chunks()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    h.update(sink.getvalue())
+    return h.hexdigest()
+
+
+def _hash_numpy(value: np.ndarray) -> str:
+    h = hashlib.sha256()
+    h.update(f"{value.dtype.str}:{value.shape}".encode())
+    if value.dtype == object:
+        h.update(_canonical_json(value.tolist()).encode())
+    else:
+        h.update(np.ascontiguousarray(value).tobytes())
+    return h.hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical_json(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(
+        value,
+        (pd.DataFrame, pd.Series, np.ndarray, pa.Table, pa.Array),
+    ):
+        return {"__content_hash__": content_hash(value)}
+    return {"__repr__": f"{type(value).__qualname__}:{value!r}"}
+
+
+def _canonical_json(value: Any) -> str:
+    try:
+        return json.dumps(
+            value,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=_json_default,
+        )
+    except TypeError:
+        # Keys json can't sort (e.g. mixed int/str): stringify them
+        if isinstance(value, dict):
+            return _canonical_json(
+                {f"{type(k).__name__}:{k}": v for k, v in value.items()}
+            )
+        raise
+
+
+def content_hash(value: Any) -> str:
+    """
+    Deterministic hex digest of a value's content.
+
+    Equal values give equal digests in every process; see the module
+    docstring for how each type is hashed.
+
+    Args:
+        value: Value to hash
+
+    Returns:
+        SHA-256 hex digest
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _hash_pandas(value)
+    if isinstance(value, (pa.Table, pa.RecordBatch, pa.Array, pa.ChunkedArray)):
+        return _memoized(value, _hash_arrow)
+    if isinstance(value, np.ndarray):
+        return _hash_numpy(value)
+    if isinstance(value, (set, frozenset)):
+        value = {"__set__": sorted(_canonical_json(v) for v in value)}
+    payload = f"{type(value).__name__}:{_canonical_json(value)}"
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,164 @@
+"""
+Shared Google Cloud Storage client.
+
+Provides one process-wide storage client for all GCS helpers:
+- Lazy, lock-protected construction (credential discovery happens once)
+- Keep-alive HTTP connection pool sized via GCS_HTTP_POOL_SIZE
+- A shared pyarrow GCS filesystem for ranged (column/row-group) reads
+- Per-operation latency counters for diagnostics
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import pyarrow.fs as pafs
+import requests
+from google.cloud import storage
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[storage.Client] = None
+_client_lock = threading.Lock()
+
+_arrow_fs: Optional[pafs.FileSystem] = None
+
+_op_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+def _mount_connection_pool(client: storage.Client, pool_size: int) -> None:
+    """
+    Replace the default HTTP adapters with a larger keep-alive pool.
+
+    The default requests adapter keeps only 10 connections per host, which
+    makes concurrent helpers open and tear down TLS sessions repeatedly.
+    """
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session = client._http  # AuthorizedSession (requests.Session subclass)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def get_storage_client() -> storage.Client:
+    """
+    Get the shared storage client, creating it on first use.
+
+    Returns:
+        Process-wide google.cloud.storage.Client instance
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            start = time.perf_counter()
+            client = storage.Client()
+            try:
+                _mount_connection_pool(client, settings.GCS_HTTP_POOL_SIZE)
+            except Exception as e:
+                logger.warning(f"Could not resize GCS connection pool: {e}")
+            _client = client
+            logger.info(
+                f"Created shared GCS client in "
+                f"{time.perf_counter() - start:.2f}s "
+                f"(pool size: {settings.GCS_HTTP_POOL_SIZE})"
+            )
+    return _client
+
+
+def reset_storage_client() -> None:
+    """Drop the shared clients so the next call builds fresh ones."""
+    global _client, _arrow_fs
+    with _client_lock:
+        _client = None
+        _arrow_fs = None
+
+
+def get_arrow_filesystem() -> pafs.FileSystem:
+    """
+    Get the shared pyarrow GCS filesystem, creating it on first use.
+
+    Paths on this filesystem are "<bucket>/<blob_path>". Files opened through
+    it are read with HTTP range requests, so parquet readers only fetch the
+    footer plus the column chunks and row groups they need.
+
+    Returns:
+        Process-wide pyarrow.fs.GcsFileSystem instance
+    """
+    global _arrow_fs
+    if _arrow_fs is not None:
+        return _arrow_fs
+
+    with _client_lock:
+        if _arrow_fs is None:
+            _arrow_fs = pafs.GcsFileSystem()
+    return _arrow_fs
+
+
+@contextmanager
+def track_gcs_op(op_name: str):
+    """
+    Record the latency of a GCS operation under ``op_name``.
+
+    Example:
+        with track_gcs_op("read_json"):
+            data = blob.download_as_bytes()
+    """
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            entry = _op_stats.setdefault(
+                op_name,
+                {
+                    "count": 0,
+                    "errors": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                },
+            )
+            entry["count"] += 1
+            entry["total_seconds"] += elapsed
+            entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+            if failed:
+                entry["errors"] += 1
+
+
+def get_gcs_op_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get per-operation latency counters.
+
+    Returns:
+        Mapping of operation name to count, errors, total/avg/max seconds
+    """
+    with _stats_lock:
+        snapshot = {op: dict(entry) for op, entry in _op_stats.items()}
+
+    for entry in snapshot.values():
+        count = entry["count"]
+        entry["avg_seconds"] = entry["total_seconds"] / count if count else 0.0
+    return snapshot
+
+
+def reset_gcs_op_stats() -> None:
+    """Clear all per-operation latency counters."""
+    with _stats_lock:
+        _op_stats.clear()
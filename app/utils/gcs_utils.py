@@ -2,30 +2,75 @@
 Google Cloud Storage utility functions.
 
 Provides common operations for:
-- Uploading and downloading files
+- Uploading and downloading files (parallel parts for large files)
 - Reading and writing JSON/CSV data
+- Generation-revalidated reads of polled objects
+- Column-projected, row-filtered Parquet reads
 - Managing blob paths and URIs
 - Listing and searching blobs
-- Caching for performance
+- Cached folder (delimiter) listings
+- Concurrent bulk blob fetches
+- Caching for performance, invalidated per written object
 - Timezone utilities for GCS timestamps
 """
 
+import copy
 import io
 import json
 import logging
+import os
 import re
+import shutil
 import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import pandas as pd
 import pytz
-from google.cloud import storage
-
-from .cache import cached
+from google.api_core.exceptions import NotFound, NotModified
+from google.cloud.storage import transfer_manager
+
+from .cache import (
+    cached,
+    gcs_tag,
+    publish_invalidation,
+    subscribe_invalidations,
+    tags_match,
+)
+from .gcs_client import get_arrow_filesystem, get_storage_client, track_gcs_op
+from .parquet_decode import table_to_pandas
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+_subdir_cache: Dict[Tuple[str, str], Tuple[float, List[str]]] = {}
+_subdir_lock = threading.Lock()
+
+_REVALIDATE_MAX_ENTRIES = 512
+
+# (bucket, path, parser) -> (generation, parsed value) of the last read
+_revalidate_cache: "OrderedDict[tuple, Tuple[Any, Any]]" = OrderedDict()
+_revalidate_lock = threading.Lock()
+
 # CET timezone used by Google internally
 CET_TIMEZONE = pytz.timezone("Europe/Paris")
 
@@ -119,6 +164,25 @@ def normalize_gs_uri(uri: str) -> str:
     return f"gs://{bucket}/{obj}"
 
 
+def _object_tags(bucket_name: str, blob_path: str) -> List[str]:
+    """Tags of a cached read of one object."""
+    return [gcs_tag(bucket_name, normalize_blob_path(blob_path))]
+
+
+def _listing_tags(
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    delimiter: Optional[str] = None,
+) -> List[str]:
+    """Tags of a cached listing: everything under its prefix."""
+    return [gcs_tag(bucket_name, f"{prefix or ''}*")]
+
+
+def publish_gcs_write(bucket_name: str, blob_path: str) -> None:
+    """Invalidate cached reads and listings covering a written object."""
+    publish_invalidation(gcs_tag(bucket_name, normalize_blob_path(blob_path)))
+
+
 def upload_to_gcs(bucket_name: str, local_path: str, dest_blob: str) -> str:
     """
     Upload a file from local filesystem to GCS.
@@ -136,11 +200,8 @@ def upload_to_gcs(bucket_name: str, local_path: str, dest_blob: str) -> str:
         RuntimeError: If upload fails
     """
     try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
         blob_path = normalize_blob_path(dest_blob)
-        blob = bucket.blob(blob_path)
-        blob.upload_from_filename(local_path)
+        upload_large_file(bucket_name, local_path, blob_path)
         logger.info(f"Uploaded {local_path} to gs://{bucket_name}/{blob_path}")
         return f"gs://{bucket_name}/{blob_path}"
     except FileNotFoundError:
@@ -151,6 +212,90 @@ def upload_to_gcs(bucket_name: str, local_path: str, dest_blob: str) -> str:
         raise RuntimeError(f"GCS upload failed: {e}")
 
 
+def upload_large_file(
+    bucket_name: str,
+    source: Union[str, BinaryIO],
+    blob_path: str,
+    content_type: Optional[str] = None,
+) -> int:
+    """
+    Upload a file, in concurrent parts when it is large.
+
+    Files of at least GCS_PARALLEL_UPLOAD_THRESHOLD_MB are split into
+    GCS_UPLOAD_CHUNK_MB parts that GCS_UPLOAD_WORKERS threads upload at
+    once; GCS assembles the parts server-side and each part is retried on
+    its own. Smaller files go through a chunked resumable session, so a
+    failed chunk is resent instead of the whole file.
+
+    Cached reads and listings covering the object are invalidated once
+    the upload is done.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        source: Local file path or binary file object (read from the start)
+        blob_path: Destination blob path
+        content_type: Optional content type of the object
+
+    Returns:
+        Number of bytes uploaded
+    """
+    size = _upload_file(bucket_name, source, blob_path, content_type)
+    publish_gcs_write(bucket_name, blob_path)
+    return size
+
+
+def _upload_file(
+    bucket_name: str,
+    source: Union[str, BinaryIO],
+    blob_path: str,
+    content_type: Optional[str],
+) -> int:
+    """Upload without invalidation (see upload_large_file)."""
+    chunk_size = settings.GCS_UPLOAD_CHUNK_MB * 1024 * 1024
+    threshold = settings.GCS_PARALLEL_UPLOAD_THRESHOLD_MB * 1024 * 1024
+    blob = get_storage_client().bucket(bucket_name).blob(blob_path)
+
+    if not isinstance(source, str):
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(0)
+        if size < threshold:
+            blob.chunk_size = chunk_size if size > chunk_size else None
+            with track_gcs_op("upload_resumable"):
+                blob.upload_from_file(source, content_type=content_type)
+            return size
+        # Parallel parts are read from a file on disk
+        with tempfile.NamedTemporaryFile(suffix=".upload") as tmp:
+            shutil.copyfileobj(source, tmp)
+            tmp.flush()
+            return _upload_file(bucket_name, tmp.name, blob_path, content_type)
+
+    size = os.path.getsize(source)
+    if size < threshold:
+        blob.chunk_size = chunk_size if size > chunk_size else None
+        with track_gcs_op("upload_resumable"):
+            blob.upload_from_filename(source, content_type=content_type)
+        return size
+
+    start = time.perf_counter()
+    with track_gcs_op("upload_parallel"):
+        transfer_manager.upload_chunks_concurrently(
+            source,
+            blob,
+            content_type=content_type,
+            chunk_size=chunk_size,
+            max_workers=settings.GCS_UPLOAD_WORKERS,
+            worker_type=transfer_manager.THREAD,
+        )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Uploaded {size / 1024 / 1024:.1f} MB to gs://{bucket_name}/"
+        f"{blob_path} in {-(-size // chunk_size)} parts "
+        f"({size / 1024 / 1024 / max(elapsed, 1e-6):.1f} MB/s)"
+    )
+    return size
+
+
 def download_from_gcs(
     bucket_name: str, blob_path: str, local_path: str
 ) -> None:
@@ -167,17 +312,17 @@ def download_from_gcs(
         RuntimeError: If download fails
     """
     try:
-        client = storage.Client()
+        client = get_storage_client()
         bucket = client.bucket(bucket_name)
         blob_path = normalize_blob_path(blob_path)
         blob = bucket.blob(blob_path)
 
-        if not blob.exists():
-            raise FileNotFoundError(
-                f"Blob not found: gs://{bucket_name}/{blob_path}"
-            )
-
-        blob.download_to_filename(local_path)
+        with track_gcs_op("download_file"):
+            if not blob.exists():
+                raise FileNotFoundError(
+                    f"Blob not found: gs://{bucket_name}/{blob_path}"
+                )
+            blob.download_to_filename(local_path)
         logger.info(
             f"Downloaded gs://{bucket_name}/{blob_path} to {local_path}"
         )
@@ -188,7 +333,7 @@ def download_from_gcs(
         raise RuntimeError(f"GCS download failed: {e}")
 
 
-@cached(ttl_seconds=300)  # Cache for 5 minutes
+@cached(ttl_seconds=300, tags=_object_tags)  # Cache for 5 minutes
 def read_json_from_gcs(bucket_name: str, blob_path: str) -> dict:
     """
     Read and parse a JSON file from GCS.
@@ -207,13 +352,14 @@ def read_json_from_gcs(bucket_name: str, blob_path: str) -> dict:
         RuntimeError: If read fails
     """
     try:
-        client = storage.Client()
+        client = get_storage_client()
         blob = client.bucket(bucket_name).blob(blob_path)
-        if not blob.exists():
-            raise FileNotFoundError(
-                f"Blob not found: gs://{bucket_name}/{blob_path}"
-            )
-        data = json.loads(blob.download_as_bytes())
+        with track_gcs_op("read_json"):
+            if not blob.exists():
+                raise FileNotFoundError(
+                    f"Blob not found: gs://{bucket_name}/{blob_path}"
+                )
+            data = json.loads(blob.download_as_bytes())
         logger.debug(f"Read JSON from gs://{bucket_name}/{blob_path}")
         return data
     except FileNotFoundError:
@@ -229,6 +375,8 @@ def write_json_to_gcs(
     """
     Write dictionary data as JSON to GCS.
 
+    Cached reads and listings covering the object are invalidated.
+
     Args:
         bucket_name: Name of the GCS bucket
         blob_path: Destination blob path
@@ -238,13 +386,15 @@ def write_json_to_gcs(
     Returns:
         Full GCS URI (gs://bucket/path)
     """
-    client = storage.Client()
+    client = get_storage_client()
     bucket = client.bucket(bucket_name)
     blob_path = normalize_blob_path(blob_path)
     blob = bucket.blob(blob_path)
-    blob.upload_from_string(
-        json.dumps(data, indent=indent), content_type="application/json"
-    )
+    with track_gcs_op("write_json"):
+        blob.upload_from_string(
+            json.dumps(data, indent=indent), content_type="application/json"
+        )
+    publish_gcs_write(bucket_name, blob_path)
     return f"gs://{bucket_name}/{blob_path}"
 
 
@@ -259,11 +409,12 @@ def read_csv_from_gcs(bucket_name: str, blob_path: str) -> pd.DataFrame:
     Returns:
         DataFrame with CSV data
     """
-    client = storage.Client()
+    client = get_storage_client()
     blob = client.bucket(bucket_name).blob(blob_path)
-    if not blob.exists():
-        return pd.DataFrame()
-    raw = blob.download_as_bytes()
+    with track_gcs_op("read_csv"):
+        if not blob.exists():
+            return pd.DataFrame()
+        raw = blob.download_as_bytes()
     if not raw:
         return pd.DataFrame()
     return pd.read_csv(io.BytesIO(raw))
@@ -273,6 +424,8 @@ def write_csv_to_gcs(bucket_name: str, blob_path: str, df: pd.DataFrame) -> str:
     """
     Write a pandas DataFrame as CSV to GCS.
 
+    Cached reads and listings covering the object are invalidated.
+
     Args:
         bucket_name: Name of the GCS bucket
         blob_path: Destination blob path
@@ -285,88 +438,305 @@ def write_csv_to_gcs(bucket_name: str, blob_path: str, df: pd.DataFrame) -> str:
     df.to_csv(buffer, index=False)
     buffer.seek(0)
 
-    client = storage.Client()
+    client = get_storage_client()
     bucket = client.bucket(bucket_name)
     blob_path = normalize_blob_path(blob_path)
     blob = bucket.blob(blob_path)
-    blob.upload_from_file(buffer, content_type="text/csv")
+    with track_gcs_op("write_csv"):
+        blob.upload_from_file(buffer, content_type="text/csv")
+    publish_gcs_write(bucket_name, blob_path)
     return f"gs://{bucket_name}/{blob_path}"
 
 
-def read_parquet_from_gcs(bucket_name: str, blob_path: str) -> pd.DataFrame:
+def read_blob_if_changed(
+    bucket_name: str,
+    blob_path: str,
+    parse: Optional[Callable[[bytes], Any]] = None,
+    scope: Any = None,
+) -> Tuple[Any, bool]:
     """
-    Read a Parquet file from GCS into a pandas DataFrame.
+    Read a frequently polled object, skipping the body while unchanged.
+
+    The generation and parsed value of the last read are remembered per
+    object; later reads send ``if_generation_not_match`` so GCS answers
+    "304 Not Modified" without a body while the object is unchanged.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        blob_path: Path to the blob
+        parse: Converts the raw bytes (default: return them unchanged)
+        scope: Tracks changes separately, for callers acting on ``changed``
+            (e.g. one per session) whose changes other reads mustn't consume
+
+    Returns:
+        (parsed value or None if the object doesn't exist, changed) where
+        changed is True if the value differs from the previous read
+    """
+    parse = parse or bytes
+    key = (bucket_name, blob_path, parse, scope)
+    with _revalidate_lock:
+        cached_gen, cached_value = _revalidate_cache.get(key, (None, None))
+
+    blob = get_storage_client().bucket(bucket_name).blob(blob_path)
+    try:
+        with track_gcs_op("read_if_changed"):
+            raw = blob.download_as_bytes(if_generation_not_match=cached_gen)
+    except NotModified:
+        with _revalidate_lock:
+            # May have been evicted by another thread since the lookup
+            if key in _revalidate_cache:
+                _revalidate_cache.move_to_end(key)
+        return copy.deepcopy(cached_value), False
+    except NotFound:
+        with _revalidate_lock:
+            _revalidate_cache.pop(key, None)
+        return None, cached_gen is not None
+
+    value = parse(raw)
+    with _revalidate_lock:
+        _revalidate_cache[key] = (blob.generation, value)
+        _revalidate_cache.move_to_end(key)
+        while len(_revalidate_cache) > _REVALIDATE_MAX_ENTRIES:
+            _revalidate_cache.popitem(last=False)
+    return copy.deepcopy(value), True
+
+
+def _resolve_columns(
+    schema_names: Sequence[str], wanted: Sequence[str]
+) -> List[str]:
+    """Map requested column names onto the file schema (case-insensitive)."""
+    lower_map = {name.lower(): name for name in schema_names}
+    resolved = []
+    for name in wanted:
+        actual = name if name in schema_names else lower_map.get(name.lower())
+        if actual is not None and actual not in resolved:
+            resolved.append(actual)
+    return resolved
+
+
+def _filter_scalar(field_type, value, *, next_day: bool = False):
+    """
+    Build an Arrow scalar comparable with a date-like parquet column.
+
+    Returns None when the column type can't be compared with a date, in
+    which case the bound is not pushed down.
+    """
+    import pyarrow as pa
+
+    ts = pd.Timestamp(value).normalize()
+    if next_day:
+        ts = ts + pd.Timedelta(days=1)
+
+    if pa.types.is_timestamp(field_type):
+        if field_type.tz is not None:
+            ts = ts.tz_localize("UTC")
+        return pa.scalar(ts.to_pydatetime(), type=field_type)
+    if pa.types.is_date(field_type):
+        return pa.scalar(ts.date(), type=field_type)
+    if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+        # ISO dates ("YYYY-MM-DD[ ...]") sort lexicographically
+        return pa.scalar(ts.strftime("%Y-%m-%d"), type=field_type)
+    return None
+
+
+def parquet_row_filter(
+    schema,
+    date_col: Optional[str] = None,
+    start: Optional[Any] = None,
+    end: Optional[Any] = None,
+    countries: Optional[Sequence[str]] = None,
+    country_col: str = "COUNTRY",
+):
+    """
+    Build a pyarrow dataset filter for a date window and/or country list.
+
+    The filter is evaluated against parquet row-group statistics first, so
+    row groups entirely outside the window are never downloaded.
+
+    Args:
+        schema: pyarrow schema of the parquet file
+        date_col: Date column to restrict (matched case-insensitively)
+        start: First day to keep (inclusive)
+        end: Last day to keep (inclusive)
+        countries: Country codes to keep
+        country_col: Country column (matched case-insensitively)
+
+    Returns:
+        pyarrow.dataset.Expression, or None if nothing can be pushed down
+    """
+    import pyarrow.dataset as ds
+
+    expr = None
+
+    def _and(e):
+        nonlocal expr
+        expr = e if expr is None else expr & e
+
+    if date_col and (start is not None or end is not None):
+        resolved = _resolve_columns(schema.names, [date_col])
+        if resolved:
+            field = schema.field(resolved[0])
+            if start is not None:
+                lo = _filter_scalar(field.type, start)
+                if lo is not None:
+                    _and(ds.field(field.name) >= lo)
+            if end is not None:
+                hi = _filter_scalar(field.type, end, next_day=True)
+                if hi is not None:
+                    _and(ds.field(field.name) < hi)
+            if expr is None:
+                logger.debug(
+                    f"Date filter not pushed down for '{field.name}' "
+                    f"({field.type})"
+                )
+
+    if countries:
+        resolved = _resolve_columns(schema.names, [country_col])
+        if resolved:
+            _and(ds.field(resolved[0]).isin([str(c) for c in countries]))
+
+    return expr
+
+
+def _open_parquet_dataset(bucket_name: str, blob_path: str):
+    """Open a GCS parquet object as a pyarrow dataset (ranged reads)."""
+    import pyarrow.dataset as ds
+
+    fs = get_arrow_filesystem()
+    path = f"{bucket_name}/{normalize_blob_path(blob_path)}"
+    try:
+        return ds.dataset(path, filesystem=fs, format="parquet")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"gs://{bucket_name}/{blob_path} not found")
+
+
+def read_parquet_schema_from_gcs(bucket_name: str, blob_path: str):
+    """
+    Read only the schema (footer) of a Parquet file in GCS.
 
     Args:
         bucket_name: Name of the GCS bucket
         blob_path: Path to the Parquet blob
 
     Returns:
-        DataFrame with Parquet data
+        pyarrow.Schema of the file
 
     Raises:
         FileNotFoundError: If blob doesn't exist
     """
-    import pyarrow as pa
-    import pyarrow.parquet as pq
+    with track_gcs_op("read_parquet_schema"):
+        return _open_parquet_dataset(bucket_name, blob_path).schema
 
-    client = storage.Client()
-    blob = client.bucket(bucket_name).blob(blob_path)
-    if not blob.exists():
-        raise FileNotFoundError(f"gs://{bucket_name}/{blob_path} not found")
 
-    with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tmp:
-        blob.download_to_filename(tmp.name)
-        try:
-            # Read parquet file using PyArrow first to handle database-specific types
-            table = pq.read_table(tmp.name)
-
-            # Check for database-specific types and convert them
-            schema = table.schema
-            db_type_columns = []
-            for i, field in enumerate(schema):
-                field_type_str = str(field.type).lower()
-                # Check if the type string contains database-specific type indicators
-                if "db" in field_type_str and any(
-                    db_type in field_type_str
-                    for db_type in [
-                        "dbdate",
-                        "dbtime",
-                        "dbdecimal",
-                        "dbtimestamp",
-                    ]
-                ):
-                    db_type_columns.append(field.name)
-                    logger.warning(
-                        f"Column '{field.name}' has database-specific type '{field.type}'"
-                    )
-
-            # Convert to pandas with type mapping for database-specific types
-            if db_type_columns:
-                logger.info(
-                    f"Converting database-specific types in columns: {db_type_columns}"
+def read_parquet_table_from_gcs(
+    bucket_name: str,
+    blob_path: str,
+    columns: Optional[Sequence[str]] = None,
+    date_col: Optional[str] = None,
+    start: Optional[Any] = None,
+    end: Optional[Any] = None,
+    countries: Optional[Sequence[str]] = None,
+    country_col: str = "COUNTRY",
+):
+    """
+    Read a projected, filtered slice of a Parquet file in GCS as Arrow.
+
+    Only the footer, the requested column chunks and the row groups whose
+    statistics overlap the filter are fetched (HTTP range requests); the
+    object is never downloaded in full or written to local disk.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        blob_path: Path to the Parquet blob
+        columns: Columns to read (case-insensitive; unknown names are
+            skipped). None reads all columns.
+        date_col: Date column for the start/end window
+        start: First day to keep (inclusive)
+        end: Last day to keep (inclusive)
+        countries: Country codes to keep
+        country_col: Country column used with ``countries``
+
+    Returns:
+        pyarrow.Table with the selected columns and rows
+
+    Raises:
+        FileNotFoundError: If blob doesn't exist
+    """
+    with track_gcs_op("read_parquet"):
+        dataset = _open_parquet_dataset(bucket_name, blob_path)
+        schema = dataset.schema
+        if columns is not None:
+            resolved = _resolve_columns(schema.names, columns)
+            skipped = len(columns) - len(resolved)
+            if skipped:
+                logger.debug(
+                    f"{skipped} requested column(s) not in "
+                    f"gs://{bucket_name}/{blob_path}"
                 )
+            columns = resolved
+        row_filter = parquet_row_filter(
+            schema,
+            date_col=date_col,
+            start=start,
+            end=end,
+            countries=countries,
+            country_col=country_col,
+        )
+        return dataset.to_table(columns=columns, filter=row_filter)
 
-                # Create a types_mapper that converts unknown types to string
-                def types_mapper(pa_type):
-                    type_str = str(pa_type).lower()
-                    if "db" in type_str:
-                        # Map database types to string for safe conversion
-                        return pd.StringDtype()
-                    return None  # Use default mapping for other types
-
-                return table.to_pandas(types_mapper=types_mapper)
-            else:
-                # No database-specific types, use standard conversion
-                return table.to_pandas()
-        except Exception as e:
-            logger.error(
-                f"Error reading parquet file from gs://{bucket_name}/{blob_path}: {e}"
-            )
-            raise
 
+def read_parquet_from_gcs(
+    bucket_name: str,
+    blob_path: str,
+    columns: Optional[Sequence[str]] = None,
+    date_col: Optional[str] = None,
+    start: Optional[Any] = None,
+    end: Optional[Any] = None,
+    countries: Optional[Sequence[str]] = None,
+    country_col: str = "COUNTRY",
+) -> pd.DataFrame:
+    """
+    Read a Parquet file from GCS into a pandas DataFrame.
+
+    Accepts the same projection and row filters as
+    read_parquet_table_from_gcs.
 
-@cached(ttl_seconds=600)  # Cache for 10 minutes
+    Args:
+        bucket_name: Name of the GCS bucket
+        blob_path: Path to the Parquet blob
+        columns: Optional columns to read
+        date_col: Optional date column for the start/end window
+        start: First day to keep (inclusive)
+        end: Last day to keep (inclusive)
+        countries: Optional country codes to keep
+        country_col: Country column used with ``countries``
+
+    Returns:
+        DataFrame with Parquet data
+
+    Raises:
+        FileNotFoundError: If blob doesn't exist
+    """
+    table = read_parquet_table_from_gcs(
+        bucket_name,
+        blob_path,
+        columns=columns,
+        date_col=date_col,
+        start=start,
+        end=end,
+        countries=countries,
+        country_col=country_col,
+    )
+    try:
+        return table_to_pandas(table)
+    except Exception as e:
+        logger.error(
+            f"Error reading parquet file from gs://{bucket_name}/{blob_path}: {e}"
+        )
+        raise
+
+
+@cached(ttl_seconds=600, tags=_listing_tags)  # Cache for 10 minutes
 def list_blobs(
     bucket_name: str,
     prefix: Optional[str] = None,
@@ -389,11 +759,12 @@ def list_blobs(
         RuntimeError: If listing fails
     """
     try:
-        client = storage.Client()
-        blobs = client.list_blobs(
-            bucket_name, prefix=prefix, delimiter=delimiter
-        )
-        result = [blob.name for blob in blobs]
+        client = get_storage_client()
+        with track_gcs_op("list_blobs"):
+            blobs = client.list_blobs(
+                bucket_name, prefix=prefix, delimiter=delimiter
+            )
+            result = [blob.name for blob in blobs]
         logger.debug(
             f"Listed {len(result)} blobs from gs://{bucket_name}/{prefix or ''}"
         )
@@ -403,7 +774,72 @@ def list_blobs(
         raise RuntimeError(f"GCS list failed: {e}")
 
 
-@cached(ttl_seconds=300)  # Cache for 5 minutes
+def list_subdirs(
+    bucket_name: str, prefix: str = "", max_age: Optional[float] = None
+) -> List[str]:
+    """
+    List the immediate "folder" names under a prefix.
+
+    Uses a delimiter="/" listing, so only the common prefixes one level
+    down are returned by GCS instead of every object beneath them. Results
+    are cached per (bucket, prefix) and revalidated after a short TTL.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        prefix: Parent prefix (e.g. "mapped-datasets/")
+        max_age: Max age in seconds of a cached result; 0 forces a fresh
+            listing (default: GCS_SUBDIR_CACHE_TTL_SECONDS)
+
+    Returns:
+        Sorted child folder names (without the prefix or trailing "/")
+    """
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    if max_age is None:
+        max_age = settings.GCS_SUBDIR_CACHE_TTL_SECONDS
+
+    key = (bucket_name, prefix)
+    with _subdir_lock:
+        entry = _subdir_cache.get(key)
+    if entry is not None and time.monotonic() - entry[0] < max_age:
+        return list(entry[1])
+
+    client = get_storage_client()
+    with track_gcs_op("list_subdirs"):
+        it = client.list_blobs(bucket_name, prefix=prefix, delimiter="/")
+        for _ in it.pages:
+            pass  # prefixes are collected while paging
+        names = sorted(
+            {p[len(prefix) :].rstrip("/") for p in it.prefixes} - {""}
+        )
+
+    with _subdir_lock:
+        _subdir_cache[key] = (time.monotonic(), names)
+    logger.debug(
+        f"Listed {len(names)} folders under gs://{bucket_name}/{prefix}"
+    )
+    return list(names)
+
+
+def clear_subdir_cache() -> None:
+    """Forget all cached folder listings."""
+    with _subdir_lock:
+        _subdir_cache.clear()
+
+
+def _invalidate_subdirs(resources: List[str]) -> None:
+    """Forget folder listings under which a resource was written."""
+    with _subdir_lock:
+        for bucket_name, prefix in list(_subdir_cache):
+            tag = gcs_tag(bucket_name, f"{prefix}*")
+            if any(tags_match(tag, resource) for resource in resources):
+                del _subdir_cache[(bucket_name, prefix)]
+
+
+subscribe_invalidations(_invalidate_subdirs)
+
+
+@cached(ttl_seconds=300, tags=_object_tags)  # Cache for 5 minutes
 def blob_exists(bucket_name: str, blob_path: str) -> bool:
     """
     Check if a blob exists in GCS.
@@ -418,12 +854,97 @@ def blob_exists(bucket_name: str, blob_path: str) -> bool:
         True if blob exists, False otherwise
     """
     try:
-        client = storage.Client()
+        client = get_storage_client()
         blob = client.bucket(bucket_name).blob(blob_path)
-        exists = blob.exists()
+        with track_gcs_op("blob_exists"):
+            exists = blob.exists()
         logger.debug(f"Blob gs://{bucket_name}/{blob_path} exists: {exists}")
         return exists
     except Exception as e:
         logger.error(f"Failed to check blob existence: {e}")
         # Return False rather than raising on existence checks
         return False
+
+
+def _fetch_blob_or_none(bucket_name: str, blob_path: str) -> Optional[bytes]:
+    """Download one blob, returning None if it is missing or unreadable."""
+    client = get_storage_client()
+    blob = client.bucket(bucket_name).blob(normalize_blob_path(blob_path))
+    try:
+        with track_gcs_op("bulk_fetch"):
+            return blob.download_as_bytes()
+    except NotFound:
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to fetch gs://{bucket_name}/{blob_path}: {e}")
+        return None
+
+
+def fetch_blobs_bulk(
+    items: Sequence[Tuple[str, str]], max_workers: Optional[int] = None
+) -> List[Optional[bytes]]:
+    """
+    Download many blobs concurrently on a bounded thread pool.
+
+    Each download is a single GET; a 404 is reported as a missing object
+    instead of paying for a separate exists() round trip.
+
+    Args:
+        items: Sequence of (bucket_name, blob_path) pairs
+        max_workers: Max concurrent downloads
+                     (default: settings.GCS_BULK_FETCH_WORKERS)
+
+    Returns:
+        List of blob contents in input order (None for missing/failed blobs)
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    workers = max(
+        1, min(max_workers or settings.GCS_BULK_FETCH_WORKERS, len(items))
+    )
+    if workers == 1:
+        return [_fetch_blob_or_none(b, p) for b, p in items]
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="gcs-fetch"
+    ) as pool:
+        results = list(pool.map(lambda bp: _fetch_blob_or_none(*bp), items))
+
+    logger.debug(
+        f"Bulk fetched {len(items)} blobs "
+        f"({sum(r is not None for r in results)} found) with {workers} workers"
+    )
+    return results
+
+
+def fetch_json_bulk(
+    items: Sequence[Tuple[str, str]], max_workers: Optional[int] = None
+) -> List[Optional[Any]]:
+    """
+    Download and parse many JSON blobs concurrently.
+
+    Args:
+        items: Sequence of (bucket_name, blob_path) pairs
+        max_workers: Max concurrent downloads
+
+    Returns:
+        List of parsed JSON documents in input order
+        (None for missing, failed or unparseable blobs)
+    """
+    out: List[Optional[Any]] = []
+    for (bucket_name, blob_path), raw in zip(
+        items, fetch_blobs_bulk(items, max_workers=max_workers)
+    ):
+        if raw is None:
+            out.append(None)
+            continue
+        try:
+            out.append(json.loads(raw))
+        except Exception as e:
+            logger.warning(
+                f"Invalid JSON in gs://{bucket_name}/{blob_path}: {e}"
+            )
+            out.append(None)
+    return out
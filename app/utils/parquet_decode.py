@@ -0,0 +1,167 @@
+"""
+Parquet to pandas decoding with cached per-schema type plans.
+
+All parquet reads in the app go through table_to_pandas():
+- Database-specific column types (dbdate, dbtime, ...) from BigQuery and
+  Snowflake exports are decoded as strings
+- The type plan is resolved once per schema fingerprint and cached, so
+  repeated reads of the same layout skip the schema scan
+- Columns are converted without block consolidation, which lets pyarrow
+  hand over primitive buffers zero-copy; arrow_dtypes=True keeps every
+  column Arrow-backed (pd.ArrowDtype)
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+DB_TYPE_MARKERS = ("dbdate", "dbtime", "dbdecimal", "dbtimestamp")
+
+_MAX_PLANS = 256
+
+_plans: "OrderedDict[str, TypePlan]" = OrderedDict()
+_plans_lock = threading.Lock()
+_plan_stats = {"hits": 0, "misses": 0}
+
+
+@dataclass(frozen=True)
+class TypePlan:
+    """Resolved Arrow -> pandas conversion for one schema."""
+
+    fingerprint: str
+    db_type_columns: Tuple[str, ...] = ()
+    # Keyed by str(type): extension types are not always hashable
+    type_overrides: Dict[str, Any] = field(default_factory=dict)
+
+    def types_mapper(self, arrow_dtypes: bool = False):
+        """Build the ``types_mapper`` callable for Table.to_pandas."""
+        overrides = self.type_overrides
+        if arrow_dtypes:
+            return lambda t: overrides.get(str(t)) or pd.ArrowDtype(t)
+        if overrides:
+            return lambda t: overrides.get(str(t))
+        return None
+
+
+def schema_fingerprint(schema: pa.Schema) -> str:
+    """Stable digest of a schema's field names and types (metadata ignored)."""
+    payload = schema.remove_metadata().serialize().to_pybytes()
+    return hashlib.sha1(payload).hexdigest()
+
+
+def _resolve_plan(schema: pa.Schema, fingerprint: str) -> TypePlan:
+    db_type_columns = []
+    overrides: Dict[str, Any] = {}
+    for f in schema:
+        type_str = str(f.type).lower()
+        if any(marker in type_str for marker in DB_TYPE_MARKERS):
+            db_type_columns.append(f.name)
+            overrides[str(f.type)] = pd.StringDtype()
+
+    if db_type_columns:
+        logger.warning(
+            f"Converting database-specific types to string in columns: "
+            f"{db_type_columns}"
+        )
+    return TypePlan(fingerprint, tuple(db_type_columns), overrides)
+
+
+def get_type_plan(schema: pa.Schema) -> TypePlan:
+    """
+    Get the cached conversion plan for a schema, resolving it on first use.
+
+    Args:
+        schema: Arrow schema (e.g. from a parquet footer)
+
+    Returns:
+        TypePlan for the schema
+    """
+    fingerprint = schema_fingerprint(schema)
+    with _plans_lock:
+        plan = _plans.get(fingerprint)
+        if plan is not None:
+            _plans.move_to_end(fingerprint)
+            _plan_stats["hits"] += 1
+            return plan
+        _plan_stats["misses"] += 1
+
+    plan = _resolve_plan(schema, fingerprint)
+    with _plans_lock:
+        _plans[fingerprint] = plan
+        while len(_plans) > _MAX_PLANS:
+            _plans.popitem(last=False)
+    return plan
+
+
+def table_to_pandas(
+    table: pa.Table, arrow_dtypes: bool = False
+) -> pd.DataFrame:
+    """
+    Convert an Arrow table to pandas using the cached type plan.
+
+    Args:
+        table: Arrow table to convert
+        arrow_dtypes: Keep every column Arrow-backed (pd.ArrowDtype)
+            instead of converting to NumPy dtypes
+
+    Returns:
+        DataFrame with database-specific types decoded as strings
+    """
+    plan = get_type_plan(table.schema)
+    return table.to_pandas(
+        types_mapper=plan.types_mapper(arrow_dtypes), split_blocks=True
+    )
+
+
+def read_parquet(
+    source: Any,
+    columns: Optional[Sequence[str]] = None,
+    arrow_dtypes: bool = False,
+) -> pd.DataFrame:
+    """
+    Read a parquet file (path or file-like object) into pandas.
+
+    The footer is parsed once and reused for both the type plan and the
+    column read.
+
+    Args:
+        source: Local path or binary file-like object
+        columns: Optional columns to read (default: all)
+        arrow_dtypes: See table_to_pandas
+
+    Returns:
+        DataFrame with the parquet data
+    """
+    pf = pq.ParquetFile(source)
+    table = pf.read(
+        columns=list(columns) if columns is not None else None,
+        use_pandas_metadata=True,
+    )
+    return table_to_pandas(table, arrow_dtypes=arrow_dtypes)
+
+
+def clear_type_plans() -> None:
+    """Drop all cached type plans and reset the counters."""
+    with _plans_lock:
+        _plans.clear()
+        _plan_stats.update(hits=0, misses=0)
+
+
+def get_type_plan_stats() -> Dict[str, int]:
+    """
+    Get type-plan cache counters.
+
+    Returns:
+        Dictionary with hits, misses and cached plan count
+    """
+    with _plans_lock:
+        return {**_plan_stats, "plans": len(_plans)}
@@ -0,0 +1,736 @@
+"""
+Tiered query result cache, independent of the data source.
+
+Each source (Snowflake, BigQuery) has one QueryCache:
+1. In-memory cache for immediate access (TTL: 1 hour)
+2. Host-shared cache of all processes, if enabled (see shared_cache;
+   same TTL as in memory)
+3. GCS persistent cache under ``cache/<source>-queries/`` (TTL: 24 hours),
+   size-limited by a cache ledger (see cache_ledger)
+
+Queries are keyed by the source's hash function. If the source can parse
+simple SELECTs (sql_canonical), a query that a cached in-memory result
+subsumes is answered by filtering that result locally.
+
+Concurrent misses of the same query share one execution (single flight).
+A result up to STALE_WINDOW past its TTL is still returned at once while a
+background thread re-runs the query (stale-while-revalidate).
+
+Each result records what producing it cost: the bytes the source scanned
+if the execute function reports them in ``df.attrs["bytes_scanned"]``,
+otherwise the result's size. Every hit adds that to ``bytes_saved``.
+
+Results of simple SELECTs are tagged with their table (``table_tag``), so
+publish_invalidation() of that table drops them from memory, and GCS
+results cached before the invalidation are no longer served.
+"""
+
+import io
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .cache import (
+    _cache,
+    get_shared_tier,
+    shared_get,
+    shared_put,
+    subscribe_invalidations,
+    tags_match,
+)
+from .cache_ledger import CacheLedger, delete_blobs, get_ledger
+from .cache_metrics import metrics
+from .gcs_client import get_storage_client, track_gcs_op
+from .parquet_decode import read_parquet
+from .sql_canonical import SimpleSelect
+
+logger = logging.getLogger(__name__)
+
+IN_MEMORY_TTL = 3600  # 1 hour
+GCS_TTL = 86400  # 24 hours
+STALE_WINDOW = 21600  # Expired results are served this much longer (6 hours)
+
+STAT_NAMES = (
+    "memory_hits",
+    "subsumed_hits",
+    "shared_hits",
+    "gcs_hits",
+    "misses",
+    "coalesced",
+    "stale_hits",
+    "background_refreshes",
+    "background_failures",
+    "bytes_saved",
+)
+
+
+@dataclass
+class _Flight:
+    """An execution of a query that other callers can wait for."""
+
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Optional[pd.DataFrame] = None
+    error: Optional[BaseException] = None
+
+
+def result_cost(df: pd.DataFrame) -> int:
+    """Bytes scanned to produce a result, or its size if not reported."""
+    scanned = df.attrs.get("bytes_scanned")
+    if scanned is not None:
+        return int(scanned)
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+class QueryCache:
+    """
+    Result cache of one data source.
+
+    Args:
+        source: Source name ("snowflake", "bigquery"); names the in-memory
+            keys (``<source>_query_<hash>``) and the GCS prefix
+        hash_query: Query -> cache key
+        parse_simple: Query -> SimpleSelect or None, to answer subsumed
+            queries; None disables subsumption
+        max_mb: Callable returning the GCS budget in MB (read at each
+            write so settings can be patched)
+        table_tag: Table name -> resource tag (e.g. sf_tag), to invalidate
+            results of simple SELECTs when their table is written
+    """
+
+    def __init__(
+        self,
+        source: str,
+        hash_query: Callable[[str], str],
+        parse_simple: Optional[Callable[[str], Optional[SimpleSelect]]] = None,
+        max_mb: Optional[Callable[[], int]] = None,
+        table_tag: Optional[Callable[[str], str]] = None,
+    ):
+        self.source = source
+        self.prefix = f"cache/{source}-queries/"
+        self.bucket: Optional[str] = None
+        self.hash_query = hash_query
+        self.parse_simple = parse_simple or (lambda query: None)
+        self.max_mb = max_mb
+        self.stats: Dict[str, int] = {name: 0 for name in STAT_NAMES}
+        # Counters are also updated from background refresh threads
+        self._stats_lock = threading.Lock()
+        # Parsed simple SELECTs of in-memory entries, per table
+        self._simple_index: Dict[str, Dict[str, SimpleSelect]] = {}
+        self._index_lock = threading.Lock()
+        # Executions in progress, by query hash
+        self._inflight: Dict[str, _Flight] = {}
+        self._inflight_lock = threading.Lock()
+        self.table_tag = table_tag
+        # (resource, time) of invalidations within the GCS lifetime
+        self._invalidations: List[Tuple[str, float]] = []
+        if table_tag is not None:
+            subscribe_invalidations(self._on_invalidation)
+        _sources[source] = self
+
+    # ── Invalidation ─────────────────────────────────────────────────────
+    def _tag(self, simple: Optional[SimpleSelect]) -> Optional[str]:
+        if simple is None or self.table_tag is None:
+            return None
+        return self.table_tag(simple.table)
+
+    def _on_invalidation(self, resources: List[str]) -> None:
+        """Remember invalidations so older GCS results are skipped."""
+        now = time.time()
+        with self._index_lock:
+            self._invalidations = [
+                (resource, at)
+                for resource, at in self._invalidations
+                if now - at < GCS_TTL + STALE_WINDOW
+            ] + [(resource, now) for resource in resources]
+
+    def _invalidated_after(
+        self, tag: Optional[str], cached_time: float
+    ) -> bool:
+        """Whether a resource was invalidated after a result was cached."""
+        if tag is None:
+            return False
+        with self._index_lock:
+            return any(
+                at > cached_time and tags_match(tag, resource)
+                for resource, at in self._invalidations
+            )
+
+    # ── In-memory tier ───────────────────────────────────────────────────
+    def _memory_key(self, query_hash: str) -> str:
+        return f"{self.source}_query_{query_hash}"
+
+    def _memory_entry(
+        self, query_hash: str, max_age: float = IN_MEMORY_TTL
+    ) -> Optional[Dict[str, Any]]:
+        """In-memory entry for a query hash that is younger than max_age."""
+        entry = _cache.get(self._memory_key(query_hash))
+        if entry is None or time.time() - entry["timestamp"] >= max_age:
+            return None
+        return entry
+
+    def _store_in_memory(
+        self,
+        query_hash: str,
+        simple: Optional[SimpleSelect],
+        df: pd.DataFrame,
+        cost: int,
+        timestamp: Optional[float] = None,
+        share: bool = True,
+    ) -> None:
+        """
+        Store a result in memory and, with share, in the shared tier.
+
+        ``timestamp`` keeps the age of a result taken from the shared tier.
+        """
+        tag = self._tag(simple)
+        entry = {
+            "timestamp": timestamp or time.time(),
+            "value": df,
+            "cost": cost,
+        }
+        options = {
+            "namespace": self.source,
+            "ttl": IN_MEMORY_TTL + STALE_WINDOW,
+            "tags": [tag] if tag else [],
+        }
+        _cache.put(self._memory_key(query_hash), entry, **options)
+        if share:
+            shared_put(self._memory_key(query_hash), entry, **options)
+        if simple is not None:
+            with self._index_lock:
+                self._simple_index.setdefault(simple.table, {})[
+                    query_hash
+                ] = simple
+
+    def _answer_from_subsuming(
+        self, simple: SimpleSelect
+    ) -> Optional[Tuple[pd.DataFrame, int]]:
+        """
+        Derive a simple query's result from a cached result that contains
+        it, with the cost of that result.
+
+        Candidates are tried smallest first; index entries whose result has
+        expired or was cleared are dropped.
+        """
+        with self._index_lock:
+            candidates = list(self._simple_index.get(simple.table, {}).items())
+        frames = []
+        for cached_hash, cached in candidates:
+            entry = self._memory_entry(cached_hash)
+            if entry is None:
+                with self._index_lock:
+                    self._simple_index.get(simple.table, {}).pop(
+                        cached_hash, None
+                    )
+            elif cached.covers(simple):
+                frames.append((len(entry["value"]), cached_hash, cached, entry))
+        for _, cached_hash, cached, entry in sorted(
+            frames, key=lambda f: f[:2]
+        ):
+            df = entry["value"]
+            result = cached.answer(simple, df)
+            if result is not None:
+                logger.info(
+                    f"Answered query from cached result {cached_hash[:8]} "
+                    f"({len(df)} -> {len(result)} rows)"
+                )
+                return result, entry.get("cost", 0)
+        return None
+
+    @staticmethod
+    def _reorder(
+        simple: Optional[SimpleSelect], df: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Return a cached result in the query's column order.
+
+        Queries that differ only in column order share a cache entry, which
+        holds the columns in the order of whichever ran first.
+        """
+        if simple is None or simple.columns is None:
+            return df
+        wanted = [out for _, out in simple.columns]
+        if list(df.columns) == wanted or set(df.columns) != set(wanted):
+            return df
+        return df[wanted]
+
+    # ── Lookup ───────────────────────────────────────────────────────────
+    def lookup(
+        self, query: str, use_gcs_cache: bool = False
+    ) -> Optional[pd.DataFrame]:
+        """
+        Cached result for a query without executing it.
+
+        Args:
+            query: SQL query
+            use_gcs_cache: Also check the GCS cache (one metadata request)
+
+        Returns:
+            The exact cached result or one derived from a subsuming
+            in-memory result, or None
+        """
+        return self._lookup(query, use_gcs_cache)[0]
+
+    def _count(self, **increments: int) -> None:
+        with self._stats_lock:
+            for name, n in increments.items():
+                self.stats[name] += n
+
+    def _hit(self, kind: str, cost: int) -> None:
+        self._count(**{kind: 1, "bytes_saved": cost})
+        metrics.record_hit(self.source, kind[: -len("_hits")])
+
+    def _lookup(
+        self, query: str, use_gcs_cache: bool, allow_stale: bool = False
+    ) -> Tuple[Optional[pd.DataFrame], bool]:
+        """
+        Cached result for a query and whether it is past its TTL.
+
+        With allow_stale, results up to STALE_WINDOW past their TTL are
+        returned (after looking for a fresh one in each tier).
+        """
+        query_hash = self.hash_query(query)
+        simple = self.parse_simple(query)
+        entry = self._memory_entry(query_hash)
+        if entry is not None:
+            logger.info(f"In-memory cache hit for query hash {query_hash[:8]}")
+            self._hit("memory_hits", entry.get("cost", 0))
+            return self._reorder(simple, entry["value"]), False
+        if simple is not None:
+            derived = self._answer_from_subsuming(simple)
+            if derived is not None:
+                self._hit("subsumed_hits", derived[1])
+                return derived[0], False
+        shared = shared_get(self._memory_key(query_hash))
+        if shared is not None and (
+            time.time() - shared["timestamp"] < IN_MEMORY_TTL
+        ):
+            logger.info(f"Shared cache hit for query hash {query_hash[:8]}")
+            cost = shared.get("cost", 0)
+            self._store_in_memory(
+                query_hash,
+                simple,
+                shared["value"],
+                cost,
+                timestamp=shared["timestamp"],
+                share=False,
+            )
+            self._hit("shared_hits", cost)
+            return self._reorder(simple, shared["value"]), False
+        stale = None
+        if allow_stale:
+            stale = self._memory_entry(query_hash, IN_MEMORY_TTL + STALE_WINDOW)
+        if use_gcs_cache and stale is None:
+            gcs_result, expired, cost = self._read_from_gcs(
+                query_hash, allow_stale, self._tag(simple)
+            )
+            if gcs_result is not None and not expired:
+                self._store_in_memory(query_hash, simple, gcs_result, cost)
+                self._hit("gcs_hits", cost)
+                return self._reorder(simple, gcs_result), False
+            if gcs_result is not None:
+                stale = {"value": gcs_result, "cost": cost}
+        if stale is not None:
+            logger.info(f"Serving stale result for query hash {query_hash[:8]}")
+            self._hit("stale_hits", stale.get("cost", 0))
+            return self._reorder(simple, stale["value"]), True
+        return None, False
+
+    def store(
+        self, query: str, df: pd.DataFrame, use_gcs_cache: bool = True
+    ) -> None:
+        """
+        Store a result that was fetched outside get() (e.g. by an
+        asynchronous query).
+        """
+        query_hash = self.hash_query(query)
+        cost = result_cost(df)
+        self._store_in_memory(query_hash, self.parse_simple(query), df, cost)
+        if use_gcs_cache:
+            self._write_to_gcs(query_hash, df, cost)
+
+    # ── GCS tier ─────────────────────────────────────────────────────────
+    def gcs_path(self, query_hash: str) -> str:
+        """Get GCS path for cached query result."""
+        return f"{self.prefix}{query_hash}.parquet"
+
+    def _ledger(self) -> CacheLedger:
+        """Ledger of the GCS cache, with the source's size budget."""
+        max_bytes = self.max_mb() * 1024 * 1024 if self.max_mb else None
+        return get_ledger(self.bucket, self.prefix, max_bytes)
+
+    def _read_from_gcs(
+        self,
+        query_hash: str,
+        allow_stale: bool = False,
+        tag: Optional[str] = None,
+    ) -> Tuple[Optional[pd.DataFrame], bool, int]:
+        """
+        Read cached query result from GCS.
+
+        Args:
+            query_hash: Hash of the query
+            allow_stale: Also return results up to STALE_WINDOW past the TTL
+            tag: Resource tag of the query's table; results cached before
+                its last invalidation are treated as missing
+
+        Returns:
+            (DataFrame or None if not cached or expired, whether it is past
+            the TTL, cost of the result)
+        """
+        if not self.bucket:
+            return None, False, 0
+
+        try:
+            client = get_storage_client()
+            bucket = client.bucket(self.bucket)
+            blob = bucket.blob(self.gcs_path(query_hash))
+
+            with track_gcs_op(f"{self.source}_cache_lookup"):
+                exists = blob.exists()
+            if not exists:
+                logger.debug(f"GCS cache miss for query hash {query_hash[:8]}")
+                return None, False, 0
+
+            # Check if cache is expired
+            metadata = blob.metadata or {}
+            cached_time = float(metadata.get("cached_timestamp", 0))
+            age = time.time() - cached_time
+
+            expired = age > GCS_TTL
+            if expired and (not allow_stale or age > GCS_TTL + STALE_WINDOW):
+                logger.debug(
+                    f"GCS cache expired for query hash {query_hash[:8]} "
+                    f"(age: {age:.1f}s)"
+                )
+                # Past the stale window nobody can use it any more
+                if age > GCS_TTL + STALE_WINDOW:
+                    try:
+                        blob.delete()
+                        self._ledger().record_delete([f"{query_hash}.parquet"])
+                    except Exception:
+                        pass
+                return None, expired, 0
+
+            if self._invalidated_after(tag, cached_time):
+                logger.debug(
+                    f"GCS cache entry for query hash {query_hash[:8]} "
+                    f"predates an invalidation of {tag}"
+                )
+                return None, False, 0
+
+            logger.info(
+                f"GCS cache hit for query hash {query_hash[:8]} "
+                f"(age: {age:.1f}s)"
+            )
+
+            with track_gcs_op(f"{self.source}_cache_read"):
+                data = blob.download_as_bytes()
+            self._ledger().record_hit(f"{query_hash}.parquet")
+            df = read_parquet(io.BytesIO(data))
+            cost = int(metadata.get("cost_bytes", 0)) or result_cost(df)
+            return df, expired, cost
+
+        except Exception as e:
+            logger.warning(f"Failed to read from GCS cache: {e}")
+            return None, False, 0
+
+    def _write_to_gcs(self, query_hash: str, df: pd.DataFrame, cost: int):
+        """
+        Write query result to GCS cache.
+
+        Args:
+            query_hash: Hash of the query
+            df: DataFrame to cache
+            cost: Bytes scanned to produce it
+        """
+        if not self.bucket:
+            return
+
+        try:
+            client = get_storage_client()
+            bucket = client.bucket(self.bucket)
+            blob = bucket.blob(self.gcs_path(query_hash))
+
+            # Convert DataFrame to parquet bytes
+            buffer = io.BytesIO()
+            df.to_parquet(buffer, index=False, compression="snappy")
+            buffer.seek(0)
+
+            # Upload with metadata
+            blob.metadata = {
+                "cached_timestamp": str(time.time()),
+                "row_count": str(len(df)),
+                "column_count": str(len(df.columns)),
+                "cost_bytes": str(cost),
+            }
+            with track_gcs_op(f"{self.source}_cache_write"):
+                blob.upload_from_file(
+                    buffer, content_type="application/octet-stream"
+                )
+
+            logger.info(
+                f"Cached query result to GCS: {query_hash[:8]} "
+                f"({len(df)} rows, {len(df.columns)} cols)"
+            )
+            # Evicts least recently used results beyond the size budget
+            self._ledger().record_write(f"{query_hash}.parquet", buffer.tell())
+
+        except Exception as e:
+            logger.warning(f"Failed to write to GCS cache: {e}")
+
+    # ── Execution ────────────────────────────────────────────────────────
+    def get(
+        self,
+        query: str,
+        execute_func: Callable[[str], pd.DataFrame],
+        use_gcs_cache: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Get query result from cache or execute if not cached.
+
+        Tiers are checked in order:
+        1. In-memory cache (fast, TTL: 1 hour)
+        2. Host-shared cache of all processes, if enabled (TTL: 1 hour)
+        3. GCS cache (slower, TTL: 24 hours)
+        4. Execute query and cache result if not found
+
+        A result less than STALE_WINDOW past its TTL is returned immediately
+        and refreshed on a background thread. Concurrent calls for a query
+        that isn't cached wait for a single execution.
+
+        Args:
+            query: SQL query to execute
+            execute_func: Function to call if cache miss (takes query as
+                argument). May be called from a background thread.
+            use_gcs_cache: Whether to use GCS persistent cache
+
+        Returns:
+            DataFrame with query results
+        """
+        # Tier 1: in-memory cache (exact or subsuming), tier 2: GCS cache
+        cached, stale = self._lookup(query, use_gcs_cache, allow_stale=True)
+        if cached is not None:
+            if stale:
+                self._refresh_in_background(query, execute_func, use_gcs_cache)
+            return cached
+
+        # Cache miss - execute query (or wait for the caller executing it)
+        query_hash = self.hash_query(query)
+        flight, leader = self._join_flight(query_hash)
+        if not leader:
+            logger.info(
+                f"Waiting for running execution of query hash {query_hash[:8]}"
+            )
+            self._count(coalesced=1)
+            metrics.record_hit(self.source, "coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            self._count(bytes_saved=result_cost(flight.result))
+            return self._reorder(self.parse_simple(query), flight.result)
+
+        logger.info(
+            f"Cache miss for query hash {query_hash[:8]}, executing query"
+        )
+        self._count(misses=1)
+        start = time.perf_counter()
+        self._execute_flight(
+            query_hash, flight, query, execute_func, use_gcs_cache
+        )
+        metrics.record_miss(self.source, time.perf_counter() - start)
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _join_flight(self, query_hash: str) -> Tuple[_Flight, bool]:
+        """The execution in progress for a query, or a new one (leader)."""
+        with self._inflight_lock:
+            flight = self._inflight.get(query_hash)
+            if flight is not None:
+                return flight, False
+            flight = self._inflight[query_hash] = _Flight()
+            return flight, True
+
+    def _execute_flight(
+        self,
+        query_hash: str,
+        flight: _Flight,
+        query: str,
+        execute_func: Callable[[str], pd.DataFrame],
+        use_gcs_cache: bool,
+    ) -> None:
+        """Run a query, cache its result and release the waiting callers."""
+        try:
+            flight.result = execute_func(query)
+            # Cache result in memory and GCS (don't block on GCS failures)
+            try:
+                self.store(query, flight.result, use_gcs_cache)
+            except Exception as e:
+                logger.warning(f"Failed to cache result in GCS: {e}")
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(query_hash, None)
+            flight.done.set()
+
+    def _refresh_in_background(
+        self,
+        query: str,
+        execute_func: Callable[[str], pd.DataFrame],
+        use_gcs_cache: bool,
+    ) -> None:
+        """Re-run a query whose stale result was served, unless running."""
+        query_hash = self.hash_query(query)
+        flight, leader = self._join_flight(query_hash)
+        if not leader:
+            return
+        self._count(background_refreshes=1)
+
+        def _run():
+            self._execute_flight(
+                query_hash, flight, query, execute_func, use_gcs_cache
+            )
+            if flight.error is not None:
+                self._count(background_failures=1)
+                logger.warning(
+                    f"Background refresh of query hash {query_hash[:8]} "
+                    f"failed: {flight.error}"
+                )
+
+        threading.Thread(
+            target=_run,
+            name=f"{self.source[:2]}-refresh-{query_hash[:8]}",
+            daemon=True,
+        ).start()
+
+    # ── Maintenance ──────────────────────────────────────────────────────
+    def clear(self, query_hash: Optional[str] = None) -> None:
+        """
+        Clear the cache.
+
+        Args:
+            query_hash: If provided, clear only this specific query.
+                       If None, clear all cached queries.
+        """
+        # Clear in-memory cache
+        if query_hash:
+            cache_key = self._memory_key(query_hash)
+            if cache_key in _cache:
+                del _cache[cache_key]
+                logger.info(
+                    f"Cleared in-memory cache for query hash {query_hash[:8]}"
+                )
+        else:
+            count = _cache.clear(namespace=self.source)
+            with self._index_lock:
+                self._simple_index.clear()
+            logger.info(
+                f"Cleared {count} in-memory {self.source} cache entries"
+            )
+
+        # Clear the host-shared tier
+        shared = get_shared_tier()
+        if shared is not None:
+            try:
+                if query_hash:
+                    shared.delete(self._memory_key(query_hash))
+                else:
+                    shared.clear(namespace=self.source)
+            except Exception as e:
+                logger.warning(f"Failed to clear shared cache: {e}")
+
+        # Clear GCS cache
+        if not self.bucket:
+            return
+
+        try:
+            client = get_storage_client()
+            bucket = client.bucket(self.bucket)
+
+            if query_hash:
+                # Delete specific cache file
+                blob = bucket.blob(self.gcs_path(query_hash))
+                if blob.exists():
+                    blob.delete()
+                    logger.info(
+                        f"Deleted GCS cache for query hash {query_hash[:8]}"
+                    )
+                self._ledger().record_delete([f"{query_hash}.parquet"])
+            else:
+                # Delete all cache files (ledger included) in batches
+                with track_gcs_op(f"{self.source}_cache_list"):
+                    paths = [
+                        blob.name
+                        for blob in bucket.list_blobs(prefix=self.prefix)
+                    ]
+                count = delete_blobs(self.bucket, paths)
+                self._ledger().flush(reset=True)
+                logger.info(f"Deleted {count} GCS cache files")
+
+        except Exception as e:
+            logger.warning(f"Failed to clear GCS cache: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the cache.
+
+        Returns:
+            Dictionary with cache statistics
+        """
+        # In-memory stats
+        memory = _cache.namespace_stats().get(self.source, {})
+        memory_count = memory.get("entries", 0)
+
+        # GCS stats, from the ledger (one read instead of a listing)
+        ledger = {"count": 0, "total_bytes": 0, "hits": 0}
+
+        if self.bucket:
+            try:
+                ledger = self._ledger().stats()
+            except Exception as e:
+                logger.warning(f"Failed to get GCS cache stats: {e}")
+
+        with self._stats_lock:
+            counts = dict(self.stats)
+
+        # Calls that didn't execute the query, coalesced ones included
+        hits = sum(
+            counts[k]
+            for k in (
+                "memory_hits",
+                "subsumed_hits",
+                "shared_hits",
+                "gcs_hits",
+                "stale_hits",
+                "coalesced",
+            )
+        )
+        lookups = hits + counts["misses"]
+        return {
+            "source": self.source,
+            "in_memory_count": memory_count,
+            "gcs_count": ledger["count"],
+            "gcs_total_size_mb": round(ledger["total_bytes"] / 1024 / 1024, 2),
+            "gcs_max_size_mb": self.max_mb() if self.max_mb else None,
+            "gcs_entry_hits": ledger["hits"],
+            "in_memory_ttl_seconds": IN_MEMORY_TTL,
+            "gcs_ttl_seconds": GCS_TTL,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            **counts,
+        }
+
+
+# Caches by source name, in creation order
+_sources: Dict[str, QueryCache] = {}
+
+
+def get_source_stats() -> List[Dict[str, Any]]:
+    """Statistics of every source's cache (see QueryCache.get_stats)."""
+    return [cache.get_stats() for cache in list(_sources.values())]
@@ -0,0 +1,378 @@
+"""
+Weekly/monthly resampling pushed down into Snowflake SQL.
+
+Training jobs with ``resample_freq`` W or M pulled daily rows and had them
+aggregated per period afterwards (the R resampling step with
+``column_agg_strategies``, and the ``_CUSTOM`` aggregates built from
+``aggregation_sources``). build_resample_sql() wraps the job's query so
+Snowflake returns one row per period instead:
+
+    SELECT DATE_TRUNC('WEEK', src."DATE") AS "DATE", src."COUNTRY",
+           COALESCE(SUM(src."SPEND"), 0) AS "SPEND", ...
+    FROM (SELECT *, <custom aggregates> FROM (<query>) AS src) AS src
+    WHERE src."DATE" IS NOT NULL
+      AND TO_DATE(src."DATE") >= '<start_date>'
+      AND TO_DATE(src."DATE") <= '<end_date>'
+    GROUP BY 1, 2 ORDER BY 1, 2
+
+resample_frame() is the same aggregation in pandas; the two are kept in
+parity by tests. Jobs whose data was resampled here get
+``resampled_in_sql`` in their config: run_all.R then fills missing
+periods instead of days and skips its own resampling step, which would
+otherwise re-expand the periods into zero-filled days. Semantics follow
+the R step:
+
+- Only days in the job's training window (start_date..end_date) are
+  aggregated, as R filters the window before resampling, so the first
+  and last periods may be partial
+- Rows are aggregated per country: the columns R filters the country on
+  (filter_by_country: COUNTRY, COUNTRY_CODE, MARKET, COUNTRY_ISO, LOCALE)
+  are grouped by and returned, so a query over several countries still
+  gives R one series per country to pick from
+- Periods start on Monday (Snowflake's default WEEK_START) or on the first
+  of the month, and are labeled with that date
+- sum/mean/max/min skip missing values (an all-missing sum is 0);
+  ``auto`` (categorical columns) takes the period's first value by date;
+  unknown strategies fall back to sum; columns without a strategy use
+  ``auto`` so the R step still finds them
+- ``_CUSTOM`` columns are computed per row from their available source
+  columns before aggregating (see apply_custom_aggregations)
+
+Unlike the R step, missing days and NULLs within a period are skipped by
+mean/min/max; R's fill_day() counted them as 0.
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_PERIOD_UNITS = {"W": "WEEK", "M": "MONTH"}
+_PANDAS_PERIODS = {"W": "W-SUN", "M": "M"}
+_SQL_AGGS = {
+    "sum": "COALESCE(SUM({col}), 0)",
+    "mean": "AVG({col})",
+    "max": "MAX({col})",
+    "min": "MIN({col})",
+    "auto": "MIN_BY({col}, {date})",
+}
+
+
+# Columns run_all.R's filter_by_country() filters the job's country on
+COUNTRY_COLUMNS = ("COUNTRY", "COUNTRY_CODE", "MARKET", "COUNTRY_ISO", "LOCALE")
+
+_PLAIN_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+
+def quote_ident(name: str) -> str:
+    """
+    Quoted Snowflake identifier. Plain names are upper-cased, as Snowflake
+    resolves them unquoted (``date`` -> ``"DATE"``); others keep their case.
+    """
+    name = str(name)
+    if _PLAIN_IDENT.match(name):
+        name = name.upper()
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _strategy(agg: Optional[str]) -> str:
+    agg = (agg or "sum").strip().lower()
+    if agg == "avg":
+        return "mean"
+    if agg not in _SQL_AGGS:
+        logger.warning(f"Unsupported aggregation '{agg}', using sum")
+        return "sum"
+    return agg
+
+
+def apply_custom_aggregations(
+    df: pd.DataFrame, metadata: Dict
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Apply custom aggregations from metadata to create missing _CUSTOM columns.
+
+    If aggregation_sources is in metadata and the _CUSTOM column is missing
+    but source columns exist, create the aggregated column.
+
+    Returns: (updated_df, list of created columns)
+    """
+    aggregation_sources = metadata.get("aggregation_sources", {})
+    if not aggregation_sources:
+        return df, []
+
+    created_columns = []
+    skipped_columns = []
+    df = df.copy()
+
+    for custom_col, source_info in aggregation_sources.items():
+        # Skip if column already exists
+        if custom_col in df.columns:
+            continue
+
+        source_columns = source_info.get("source_columns", [])
+        agg_method = source_info.get("agg_method", "sum")
+
+        # Check if all source columns exist
+        available_sources = [c for c in source_columns if c in df.columns]
+        if not available_sources:
+            # Track skipped columns for potential debugging
+            skipped_columns.append(
+                f"{custom_col} (missing sources: {source_columns})"
+            )
+            continue
+
+        # Apply aggregation
+        try:
+            if agg_method == "sum":
+                df[custom_col] = df[available_sources].sum(axis=1)
+            elif agg_method == "mean":
+                df[custom_col] = df[available_sources].mean(axis=1)
+            elif agg_method == "max":
+                df[custom_col] = df[available_sources].max(axis=1)
+            elif agg_method == "min":
+                df[custom_col] = df[available_sources].min(axis=1)
+            else:
+                # Default to sum
+                df[custom_col] = df[available_sources].sum(axis=1)
+
+            created_columns.append(custom_col)
+        except (ValueError, TypeError) as e:
+            # Log specific errors that might occur during aggregation
+            logger.warning(
+                f"Failed to create {custom_col} from {available_sources}: {e}"
+            )
+
+    # Log skipped columns for debugging if any
+    if skipped_columns:
+        logger.info(
+            f"Skipped {len(skipped_columns)} custom column(s) due to missing "
+            "source columns"
+        )
+
+    return df, created_columns
+
+
+def _custom_sql(method: str, sources: Sequence[str]) -> str:
+    """Row-wise aggregate of source columns that skips NULLs like pandas."""
+    cols = [quote_ident(c) for c in sources]
+    if method == "mean":
+        present = " + ".join(
+            f"CASE WHEN {c} IS NULL THEN 0 ELSE 1 END" for c in cols
+        )
+        total = " + ".join(f"COALESCE({c}, 0)" for c in cols)
+        return f"({total}) * 1.0 / NULLIF({present}, 0)"
+    if method in ("max", "min"):
+        if len(cols) == 1:
+            return cols[0]
+        # GREATEST/LEAST return NULL if any argument is NULL: replace each
+        # NULL with another source's value, which doesn't change the result
+        fn = "GREATEST" if method == "max" else "LEAST"
+        args = ", ".join(f"COALESCE({c}, {', '.join(cols)})" for c in cols)
+        return f"{fn}({args})"
+    return " + ".join(f"COALESCE({c}, 0)" for c in cols)
+
+
+def _plan(
+    date_col: str,
+    agg_strategies: Dict[str, str],
+    aggregation_sources: Optional[Dict[str, Dict]],
+    columns: Optional[Iterable[str]],
+    data_types: Optional[Dict[str, str]],
+) -> Tuple[List[Tuple[str, str, List[str]]], List[Tuple[str, str]], List[str]]:
+    """
+    Custom columns to compute, output columns with their aggregation and
+    the country columns to group by.
+
+    Returns:
+        ([(custom column, method, available sources)],
+         [(output column, strategy)], [group column])
+    """
+    columns = None if columns is None else [str(c) for c in columns]
+    known = None if columns is None else set(columns)
+    groups = [
+        c
+        for c in (columns or [])
+        if c.upper() in COUNTRY_COLUMNS and c != date_col
+    ]
+    customs = []
+    for col, info in (aggregation_sources or {}).items():
+        if known is not None and col in known:
+            continue
+        sources = [
+            c
+            for c in info.get("source_columns", [])
+            if known is None or c in known
+        ]
+        if sources:
+            method = str(info.get("agg_method", "sum")).lower()
+            if method not in ("sum", "mean", "max", "min"):
+                method = "sum"
+            customs.append((col, method, sources))
+
+    available = None if known is None else known | {c for c, _, _ in customs}
+    outputs = []
+    names = list(agg_strategies) + [
+        c for c, _, _ in customs if c not in agg_strategies
+    ]
+    # Columns of the query without a strategy are kept, as their first value
+    unlisted = [c for c in columns or [] if c not in names]
+    for col in names + unlisted:
+        if col == date_col or col in groups:
+            continue
+        if available is not None and col not in available:
+            continue
+        if col in unlisted:
+            outputs.append((col, "auto"))
+            continue
+        strategy = _strategy(agg_strategies.get(col))
+        if data_types and data_types.get(col, "numeric") != "numeric":
+            strategy = "auto"
+        outputs.append((col, strategy))
+    return customs, outputs, groups
+
+
+def _window_bound(value) -> Optional[str]:
+    """ISO date of a window bound (None if unset)."""
+    if value is None or value == "":
+        return None
+    return pd.Timestamp(value).date().isoformat()
+
+
+def build_resample_sql(
+    sql: str,
+    date_col: str,
+    freq: str,
+    agg_strategies: Dict[str, str],
+    aggregation_sources: Optional[Dict[str, Dict]] = None,
+    columns: Optional[Iterable[str]] = None,
+    data_types: Optional[Dict[str, str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> str:
+    """
+    Wrap a query so it returns one aggregated row per week or month.
+
+    Args:
+        sql: Query returning daily rows
+        date_col: Date column to group by (kept as the period's start)
+        freq: "W" or "M"
+        agg_strategies: Column -> sum/mean/max/min/auto (metadata
+            ``agg_strategies``)
+        aggregation_sources: Metadata ``aggregation_sources`` for _CUSTOM
+            columns computed from other columns
+        columns: Columns the query returns (see describe_sql_columns).
+            Custom columns it already has are passed through and missing
+            sources are skipped, as in apply_custom_aggregations; columns
+            it lacks are left out, columns without a strategy use
+            ``auto`` and country columns are grouped by. If None, only
+            the columns in agg_strategies and the custom ones are returned
+            and nothing is grouped by country.
+        data_types: Metadata ``data_types``; non-numeric columns use
+            ``auto`` whatever their strategy
+        start_date: First day of the training window (inclusive)
+        end_date: Last day of the training window (inclusive)
+
+    Returns:
+        Snowflake SQL
+
+    Raises:
+        ValueError: If freq isn't W or M or a window bound isn't a date
+    """
+    if freq not in _PERIOD_UNITS:
+        raise ValueError(f"Can only resample to W or M, got {freq!r}")
+    start, end = _window_bound(start_date), _window_bound(end_date)
+    customs, outputs, groups = _plan(
+        date_col, agg_strategies, aggregation_sources, columns, data_types
+    )
+    # Qualified so they can't resolve to the output aliases of the same name
+    date = f"src.{quote_ident(date_col)}"
+    inner = sql.strip().rstrip(";")
+    if customs:
+        extra = ", ".join(
+            f"{_custom_sql(method, sources)} AS {quote_ident(col)}"
+            for col, method, sources in customs
+        )
+        inner = f"SELECT *, {extra} FROM ({inner}) AS src"
+
+    select = [
+        f"DATE_TRUNC('{_PERIOD_UNITS[freq]}', {date}) "
+        f"AS {quote_ident(date_col)}"
+    ]
+    select += [f"src.{quote_ident(col)}" for col in groups]
+    select += [
+        _SQL_AGGS[strategy].format(col=f"src.{quote_ident(col)}", date=date)
+        + f" AS {quote_ident(col)}"
+        for col, strategy in outputs
+    ]
+    conditions = [f"{date} IS NOT NULL"]
+    if start:
+        conditions.append(f"TO_DATE({date}) >= '{start}'")
+    if end:
+        conditions.append(f"TO_DATE({date}) <= '{end}'")
+    where = "\n  AND ".join(conditions)
+    keys = ", ".join(str(i) for i in range(1, len(groups) + 2))
+    return (
+        "SELECT " + ",\n       ".join(select) + f"\nFROM ({inner}) AS src"
+        f"\nWHERE {where}\nGROUP BY {keys}\nORDER BY {keys}"
+    )
+
+
+def resample_frame(
+    df: pd.DataFrame,
+    date_col: str,
+    freq: str,
+    agg_strategies: Dict[str, str],
+    aggregation_sources: Optional[Dict[str, Dict]] = None,
+    data_types: Optional[Dict[str, str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Resample daily rows in pandas like build_resample_sql() does in SQL.
+
+    Only periods that have rows are returned.
+    """
+    if freq not in _PERIOD_UNITS:
+        raise ValueError(f"Can only resample to W or M, got {freq!r}")
+    customs, outputs, keys = _plan(
+        date_col, agg_strategies, aggregation_sources, df.columns, data_types
+    )
+    data, _ = apply_custom_aggregations(
+        df,
+        {
+            "aggregation_sources": {
+                col: {"source_columns": sources, "agg_method": method}
+                for col, method, sources in customs
+            }
+        },
+    )
+    data[date_col] = pd.to_datetime(data[date_col], errors="coerce")
+    data = data.dropna(subset=[date_col]).sort_values(date_col, kind="stable")
+    day = data[date_col].dt.normalize()
+    start, end = _window_bound(start_date), _window_bound(end_date)
+    in_window = pd.Series(True, index=data.index)
+    if start:
+        in_window &= day >= pd.Timestamp(start)
+    if end:
+        in_window &= day <= pd.Timestamp(end)
+    data = data[in_window]
+    period = data[date_col].dt.to_period(_PANDAS_PERIODS[freq]).dt.start_time
+    groups = data.groupby(
+        [period.rename(date_col)] + [data[c] for c in keys],
+        sort=True,
+        dropna=False,
+    )
+
+    parts = {}
+    for col, strategy in outputs:
+        if strategy == "auto":
+            parts[col] = groups[col].nth(0).set_axis(groups.size().index)
+        elif strategy == "sum":
+            parts[col] = groups[col].sum(min_count=0)
+        else:
+            parts[col] = groups[col].agg(strategy)
+    result = pd.DataFrame(parts, index=groups.size().index)
+    return result.reset_index()
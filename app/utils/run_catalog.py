@@ -0,0 +1,420 @@
+"""
+Persistent catalog of Robyn runs under robyn/.
+
+One JSON line per (rev, country, stamp) with the run's artifact list and
+precomputed flags (has_allocator_plot, best_id, iterations, trials,
+dep_var), stored at RUN_CATALOG_PATH. Result pages load the catalog
+instead of listing every object of every run ever produced.
+
+- The queue records a run as soon as it sees the job finish
+- refresh_run_catalog() discovers new revisions with one folder listing
+  and only re-lists revisions that are still changing; revisions whose
+  newest object is older than RUN_CATALOG_SETTLE_HOURS are only listed
+  again by a forced refresh (``relist=True``, the pages' "Refresh
+  listing"), which picks up runs written into them outside the queue
+- Writes are guarded by the catalog's generation, so concurrent refreshes
+  merge instead of overwriting each other
+"""
+
+import json
+import logging
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from .gcs_client import get_storage_client, track_gcs_op
+from .gcs_utils import fetch_blobs_bulk, fetch_json_bulk, list_subdirs
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+RUNS_ROOT = "robyn"
+
+_MAX_UPDATE_ATTEMPTS = 8
+
+RunKey = Tuple[str, str, str]
+
+# Parsed catalog of the last generation read, per bucket
+_loaded: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}
+_loaded_lock = threading.Lock()
+
+
+def run_key(row: Dict[str, Any]) -> RunKey:
+    """(rev, country, stamp) of a catalog row."""
+    return row["rev"], row["country"], row["stamp"]
+
+
+def run_prefix(key: RunKey) -> str:
+    """GCS prefix of a run, e.g. robyn/gmv_1/de/0101_120000/."""
+    rev, country, stamp = key
+    return f"{RUNS_ROOT}/{rev}/{country}/{stamp}/"
+
+
+def parse_run_path(name: str) -> Optional[Tuple[RunKey, str]]:
+    """
+    Split robyn/<rev>/<country>/<stamp>/<file...> into (key, file).
+
+    Returns:
+        ((rev, country, stamp), relative file path) or None
+    """
+    parts = name.split("/")
+    if len(parts) < 5 or parts[0] != RUNS_ROOT or not all(parts[1:4]):
+        return None
+    rel = "/".join(parts[4:])
+    if not rel:
+        return None
+    return (parts[1], parts[2], parts[3]), rel
+
+
+def is_allocator_plot(name: str, size: int) -> bool:
+    """Historical allocator plot (PNG), excluding prediction plots."""
+    name_l = name.lower()
+    base = name_l.rsplit("/", 1)[-1]
+    if not name_l.endswith(".png") or size <= 1000:
+        return False
+    is_hist = "allocator_plots_" in name_l or (
+        base.startswith("allocator_") and "365d" in base
+    )
+    is_predicted = "allocator_pred_plots_" in name_l or base.startswith(
+        "allocator_pred_"
+    )
+    return is_hist and not is_predicted
+
+
+def parse_best_model_txt(text: str) -> Tuple[Any, Any, Any]:
+    """Return (best_id, iterations, trials) from best_model_id.txt."""
+    best_id, iters, trials = None, None, None
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    if lines:
+        best_id = lines[0].split()[0]
+    for ln in lines[1:]:
+        m = re.search(r"Iterations:\s*(\d+)", ln, re.I)
+        if m:
+            iters = int(m.group(1))
+        m = re.search(r"Trials:\s*(\d+)", ln, re.I)
+        if m:
+            trials = int(m.group(1))
+    return best_id, iters, trials
+
+
+def _iso(ts: Optional[datetime]) -> str:
+    return ts.astimezone(timezone.utc).isoformat() if ts else ""
+
+
+def build_rows(
+    bucket_name: str, grouped: Dict[RunKey, List[Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Build catalog rows from listed blobs grouped by run.
+
+    best_model_id.txt, job_config.json and model_summary.json are fetched
+    concurrently for all runs at once.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        grouped: Mapping of run key to the run's blobs
+
+    Returns:
+        Catalog rows
+    """
+    keys = sorted(grouped)
+    rows = {}
+    for key in keys:
+        rev, country, stamp = key
+        prefix = run_prefix(key)
+        artifacts = sorted(
+            [b.name[len(prefix) :], int(b.size or 0)] for b in grouped[key]
+        )
+        names = {a[0] for a in artifacts}
+        rows[key] = {
+            "rev": rev,
+            "country": country,
+            "stamp": stamp,
+            "updated": max((_iso(b.updated) for b in grouped[key]), default=""),
+            "artifacts": artifacts,
+            "has_allocator_plot": any(
+                is_allocator_plot(n, s) for n, s in artifacts
+            ),
+            "has_best_model": "best_model_id.txt" in names,
+            "best_id": None,
+            "iterations": None,
+            "trials": None,
+            "dep_var": None,
+        }
+
+    with_best = [k for k in keys if rows[k]["has_best_model"]]
+    texts = fetch_blobs_bulk(
+        [(bucket_name, run_prefix(k) + "best_model_id.txt") for k in with_best]
+    )
+    for key, raw in zip(with_best, texts):
+        if raw is not None:
+            best_id, iters, trials = parse_best_model_txt(
+                raw.decode("utf-8", errors="replace")
+            )
+            rows[key].update(best_id=best_id, iterations=iters, trials=trials)
+
+    # Goal: training config first, model summary as fallback
+    configs = fetch_json_bulk(
+        [
+            (bucket_name, f"training-configs/{k[2]}/job_config.json")
+            for k in keys
+        ]
+    )
+    missing = []
+    for key, config in zip(keys, configs):
+        goal = config.get("dep_var") if isinstance(config, dict) else None
+        if goal:
+            rows[key]["dep_var"] = goal
+        elif "model_summary.json" in {a[0] for a in rows[key]["artifacts"]}:
+            missing.append(key)
+    summaries = fetch_json_bulk(
+        [(bucket_name, run_prefix(k) + "model_summary.json") for k in missing]
+    )
+    for key, summary in zip(missing, summaries):
+        if isinstance(summary, dict):
+            meta = summary.get("input_metadata") or {}
+            rows[key]["dep_var"] = meta.get("dep_var")
+
+    return [rows[k] for k in keys]
+
+
+def _list_runs(bucket_name: str, prefix: str) -> Dict[RunKey, List[Any]]:
+    """List a prefix under robyn/ and group its blobs by run."""
+    grouped: Dict[RunKey, List[Any]] = {}
+    with track_gcs_op("run_catalog_list"):
+        for blob in get_storage_client().list_blobs(bucket_name, prefix=prefix):
+            parsed = parse_run_path(blob.name)
+            if parsed:
+                grouped.setdefault(parsed[0], []).append(blob)
+    return grouped
+
+
+def _catalog_blob(bucket_name: str):
+    return (
+        get_storage_client().bucket(bucket_name).blob(settings.RUN_CATALOG_PATH)
+    )
+
+
+def _read(blob) -> Tuple[List[Dict[str, Any]], int]:
+    """Return (rows, generation) of the catalog; generation 0 = none."""
+    try:
+        with track_gcs_op("run_catalog_read"):
+            raw = blob.download_as_bytes()
+    except NotFound:
+        return [], 0
+    rows = [json.loads(ln) for ln in raw.decode("utf-8").splitlines() if ln]
+    return rows, int(blob.generation or 0)
+
+
+def _write(blob, rows: Iterable[Dict[str, Any]], generation: int) -> None:
+    body = "".join(
+        json.dumps(r, separators=(",", ":")) + "\n"
+        for r in sorted(rows, key=run_key)
+    )
+    with track_gcs_op("run_catalog_write"):
+        blob.upload_from_string(
+            body,
+            content_type="application/x-ndjson",
+            if_generation_match=generation,
+        )
+
+
+def _merge(
+    bucket_name: str,
+    rows: List[Dict[str, Any]],
+    replace_revs: Iterable[str] = (),
+    full: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Upsert rows into the stored catalog with optimistic concurrency.
+
+    Stored rows of a revision in ``replace_revs`` are dropped first, so
+    runs deleted from a re-listed revision disappear; ``full`` replaces the
+    whole catalog. Other rows are upserted by run key.
+    """
+    replace_revs = set(replace_revs)
+    for _ in range(_MAX_UPDATE_ATTEMPTS):
+        blob = _catalog_blob(bucket_name)
+        current, generation = _read(blob)
+        merged = {
+            run_key(r): r
+            for r in current
+            if not full and r["rev"] not in replace_revs
+        }
+        merged.update((run_key(r), r) for r in rows)
+        result = sorted(merged.values(), key=run_key)
+        if generation and result == sorted(current, key=run_key):
+            return result
+        try:
+            _write(blob, result, generation)
+        except PreconditionFailed:
+            logger.debug(f"Run catalog of {bucket_name} changed, retrying")
+            continue
+        with _loaded_lock:
+            _loaded.pop(bucket_name, None)
+        return result
+    raise RuntimeError(
+        f"Could not update gs://{bucket_name}/{settings.RUN_CATALOG_PATH}: "
+        f"too many concurrent writers"
+    )
+
+
+def load_run_catalog(bucket_name: str) -> List[Dict[str, Any]]:
+    """
+    Read the run catalog, reusing the parsed copy while it's unchanged.
+
+    A metadata-only GET checks the generation; the body is only downloaded
+    and parsed again when the catalog was rewritten.
+
+    Returns:
+        Catalog rows (empty if there is no catalog yet)
+    """
+    blob = (
+        get_storage_client()
+        .bucket(bucket_name)
+        .get_blob(settings.RUN_CATALOG_PATH)
+    )
+    if blob is None:
+        return []
+    with _loaded_lock:
+        cached = _loaded.get(bucket_name)
+    if cached and cached[0] == blob.generation:
+        return cached[1]
+
+    rows, generation = _read(blob)
+    with _loaded_lock:
+        _loaded[bucket_name] = (generation, rows)
+    return rows
+
+
+def _open_revs(rows: List[Dict[str, Any]], now: datetime) -> set:
+    """Revisions with an object newer than the settle window."""
+    cutoff = _iso(now - timedelta(hours=settings.RUN_CATALOG_SETTLE_HOURS))
+    return {r["rev"] for r in rows if (r.get("updated") or "") >= cutoff}
+
+
+def refresh_run_catalog(
+    bucket_name: str, max_age: Optional[float] = None, relist: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Bring the run catalog up to date and return its rows.
+
+    Lists robyn/ with a delimiter to find revisions, then lists only the
+    revisions that are new or still changing (every revision if relist).
+    Creates the catalog with a full listing if it doesn't exist yet.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        max_age: Max age of the cached revision listing (see list_subdirs);
+            0 forces a fresh listing
+        relist: List settled revisions again too, to find runs added to
+            them without record_run()
+
+    Returns:
+        Catalog rows
+    """
+    rows = load_run_catalog(bucket_name)
+    revs = set(list_subdirs(bucket_name, f"{RUNS_ROOT}/", max_age=max_age))
+    known = {r["rev"] for r in rows}
+    if relist:
+        to_list = revs
+    else:
+        to_list = (revs - known) | (
+            _open_revs(rows, datetime.now(timezone.utc)) & revs
+        )
+    gone = known - revs
+    if not to_list and not gone:
+        return rows
+
+    grouped: Dict[RunKey, List[Any]] = {}
+    for rev in sorted(to_list):
+        grouped.update(_list_runs(bucket_name, f"{RUNS_ROOT}/{rev}/"))
+    logger.info(
+        f"Run catalog: listed {len(to_list)} revisions "
+        f"({len(grouped)} runs), dropped {len(gone)}"
+    )
+    return _merge(
+        bucket_name,
+        build_rows(bucket_name, grouped),
+        replace_revs=to_list | gone,
+    )
+
+
+def rebuild_run_catalog(bucket_name: str) -> List[Dict[str, Any]]:
+    """Rebuild the whole catalog from a full listing of robyn/."""
+    grouped = _list_runs(bucket_name, f"{RUNS_ROOT}/")
+    return _merge(bucket_name, build_rows(bucket_name, grouped), full=True)
+
+
+def record_run(bucket_name: str, gcs_prefix: str) -> bool:
+    """
+    Add or refresh a single run (e.g. when its job finished).
+
+    Errors are logged rather than raised; the next refresh repairs the
+    catalog.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        gcs_prefix: Run prefix, robyn/<rev>/<country>/<stamp>
+
+    Returns:
+        True if the catalog was updated
+    """
+    parsed = parse_run_path(f"{gcs_prefix.strip('/')}/_")
+    if parsed is None:
+        return False
+    key = parsed[0]
+    try:
+        grouped = _list_runs(bucket_name, run_prefix(key))
+        if key not in grouped:
+            return False
+        _merge(bucket_name, build_rows(bucket_name, {key: grouped[key]}))
+        return True
+    except Exception as e:
+        logger.error(f"Failed to record run {gcs_prefix} in catalog: {e}")
+        return False
+
+
+def catalog_runs(
+    bucket_name: str, rows: Iterable[Dict[str, Any]], prefix: str = "robyn/"
+) -> Dict[RunKey, List[Any]]:
+    """
+    Rebuild the pages' {(rev, country, stamp): [blobs]} mapping from rows.
+
+    Blob handles are created locally (no requests) with name and size set,
+    so they can be downloaded or linked like listed blobs.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        rows: Catalog rows
+        prefix: Only include artifacts under this prefix
+
+    Returns:
+        Mapping of run key to blob handles
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+    runs: Dict[RunKey, List[Any]] = {}
+    for row in rows:
+        base = run_prefix(run_key(row))
+        for rel, size in row["artifacts"]:
+            name = base + rel
+            if not name.startswith(prefix):
+                continue
+            blob = bucket.blob(name)
+            # Same as the listing iterator does for each returned item
+            blob._set_properties({"name": name, "size": str(size)})
+            runs.setdefault(run_key(row), []).append(blob)
+    return runs
+
+
+def catalog_goals(rows: Iterable[Dict[str, Any]]) -> Dict[RunKey, str]:
+    """Mapping of run key to dep_var for rows that have one."""
+    return {run_key(r): r["dep_var"] for r in rows if r.get("dep_var")}
@@ -0,0 +1,496 @@
+"""
+Cache tier shared by all processes on a host, and cross-instance
+invalidation.
+
+Each Streamlit server process has its own in-memory cache (see cache), so
+a new worker or a scaled-out instance rebuilds everything through GCS and
+Snowflake. SharedCache is a second tier in one SQLite file
+(SHARED_CACHE_PATH, WAL mode) that every process on the host reads
+before doing remote work:
+- Entries are pickled values with their namespace, tags, timestamp and
+  TTL; the file is kept under SHARED_CACHE_MAX_MB with LRU eviction
+- @cached functions and the query caches check it after their in-memory
+  miss and write their results to it
+
+Invalidations (publish_invalidation in cache) stay coherent:
+- Within a host, they are recorded in the SQLite file; each process
+  polls the table and drops its own in-memory entries
+- Across instances, they are appended to one GCS log
+  (``cache/_invalidations.json``) guarded by its generation; each
+  instance polls it with a conditional GET, so an unchanged log costs a
+  "304 Not Modified" and no body. Records carry the host ID, a random ID
+  kept in the SQLite file (hostnames of Cloud Run instances needn't be
+  unique), so an instance skips only its own records
+
+init_shared_cache() enables the tier for the process.
+"""
+
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from .cache import (
+    publish_invalidation,
+    set_shared_tier,
+    subscribe_invalidations,
+    tags_match,
+)
+from .cache_metrics import metrics
+from .gcs_client import get_storage_client, track_gcs_op
+from .gcs_utils import read_blob_if_changed
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+LOG_PATH = "cache/_invalidations.json"
+MAX_LOG_RECORDS = 1000  # Older invalidation records are dropped from the log
+
+_MAX_UPDATE_ATTEMPTS = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    expires REAL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE TABLE IF NOT EXISTS invalidations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    resource TEXT NOT NULL,
+    at REAL NOT NULL,
+    origin TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SharedCache:
+    """
+    SQLite-backed cache of entry dicts shared by the processes of a host.
+
+    Entries look like those of MemoryCache (``timestamp``, ``value`` and
+    optional extra fields); values must be picklable.
+
+    Args:
+        path: SQLite file (None = settings.SHARED_CACHE_PATH)
+        max_bytes: Size budget of the pickled values
+            (None = settings.SHARED_CACHE_MAX_MB)
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, max_bytes: Optional[int] = None
+    ):
+        self.path = path or settings.SHARED_CACHE_PATH
+        self.max_bytes = (
+            settings.SHARED_CACHE_MAX_MB * 1024 * 1024
+            if max_bytes is None
+            else max_bytes
+        )
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db().executescript(_SCHEMA)
+        self.host_id = self._host_id()
+
+    def _host_id(self) -> str:
+        """Random ID of the host, created by the first process to open it."""
+        db = self._db()
+        db.execute(
+            "INSERT OR IGNORE INTO meta VALUES ('host_id', ?)",
+            (uuid.uuid4().hex,),
+        )
+        row = db.execute("SELECT value FROM meta WHERE key = 'host_id'")
+        return row.fetchone()[0]
+
+    def _db(self) -> sqlite3.Connection:
+        """This thread's connection (sqlite3 connections aren't shared)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ── Entries ──────────────────────────────────────────────────────────
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Entry dict for a key, or None if missing, expired or unreadable."""
+        now = time.time()
+        db = self._db()
+        row = db.execute(
+            "SELECT value, expires FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] <= now:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        try:
+            entry = pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Dropping unreadable shared cache entry: {e}")
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        db.execute(
+            "UPDATE entries SET last_access = ? WHERE key = ?", (now, key)
+        )
+        return entry
+
+    def put(
+        self,
+        key: str,
+        entry: Dict[str, Any],
+        namespace: str,
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> bool:
+        """
+        Store an entry dict, evicting least recently used entries if needed.
+
+        Args:
+            key: Cache key
+            entry: Dict with ``timestamp`` and ``value``
+            namespace: Namespace the entry is counted and cleared under
+            ttl: Seconds after ``timestamp`` at which it expires
+            tags: Resources the entry depends on (see cache.tags_match)
+
+        Returns:
+            Whether the entry was stored (False if unpicklable or larger
+            than the budget)
+        """
+        try:
+            blob = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"Not sharing {namespace} entry: {e}")
+            return False
+        if len(blob) > self.max_bytes:
+            return False
+        timestamp = entry.get("timestamp", time.time())
+        expires = timestamp + ttl if ttl is not None else None
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT OR REPLACE INTO entries "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    namespace,
+                    json.dumps(sorted(set(tags))),
+                    timestamp,
+                    expires,
+                    time.time(),
+                    len(blob),
+                    blob,
+                ),
+            )
+            self._evict(db)
+        return True
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Delete expired, then least recently used entries over budget."""
+        db.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries")
+        total = total.fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in db.execute(
+            "SELECT key, size FROM entries ORDER BY last_access"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        logger.debug(f"Evicted {len(victims)} shared cache entries")
+
+    def invalidate(self, resources: Iterable[str]) -> int:
+        """Delete entries tagged with any of the resources."""
+        resources = list(resources)
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            victims = [
+                (key,)
+                for key, tags in db.execute(
+                    "SELECT key, tags FROM entries WHERE tags != '[]'"
+                )
+                if any(
+                    tags_match(tag, resource)
+                    for tag in json.loads(tags)
+                    for resource in resources
+                )
+            ]
+            db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        return len(victims)
+
+    def delete(self, key: str) -> None:
+        """Delete one entry."""
+        self._db().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """Delete all entries, or those of one namespace."""
+        db = self._db()
+        with db:
+            if namespace is None:
+                cur = db.execute("DELETE FROM entries")
+            else:
+                cur = db.execute(
+                    "DELETE FROM entries WHERE namespace = ?", (namespace,)
+                )
+        return cur.rowcount
+
+    def namespace_stats(self) -> Dict[str, Dict[str, int]]:
+        """Entries and bytes per namespace."""
+        return {
+            namespace: {"entries": count, "bytes": size}
+            for namespace, count, size in self._db().execute(
+                "SELECT namespace, COUNT(*), SUM(size) FROM entries "
+                "GROUP BY namespace"
+            )
+        }
+
+    # ── Host-local invalidation records ─────────────────────────────────
+    def record_invalidations(self, resources: Iterable[str], origin: str):
+        """Append invalidation records for the other processes."""
+        now = time.time()
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT INTO invalidations (resource, at, origin) "
+                "VALUES (?, ?, ?)",
+                [(resource, now, origin) for resource in resources],
+            )
+            # Records only matter until every process has polled them
+            db.execute("DELETE FROM invalidations WHERE at < ?", (now - 86400,))
+
+    def invalidations_since(self, seq: int) -> List[Tuple[int, str, str]]:
+        """(seq, resource, origin) of the records after seq."""
+        return list(
+            self._db().execute(
+                "SELECT seq, resource, origin FROM invalidations "
+                "WHERE seq > ? ORDER BY seq",
+                (seq,),
+            )
+        )
+
+    def last_invalidation(self) -> int:
+        """Sequence number of the newest invalidation record."""
+        row = self._db().execute("SELECT MAX(seq) FROM invalidations")
+        return row.fetchone()[0] or 0
+
+
+# ── Process integration ─────────────────────────────────────────────────────
+_ORIGIN = f"pid:{os.getpid()}"  # Within a host, processes differ by PID
+
+_shared: Optional[SharedCache] = None
+_bucket: Optional[str] = None
+_state_lock = threading.Lock()
+_pending: List[str] = []  # Local invalidations not yet in the GCS log
+_last_local_seq = 0
+_last_log_seq: Optional[int] = None  # None until the log was first read
+_applying = threading.local()  # Set while applying others' invalidations
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """The process's shared tier, or None if init_shared_cache wasn't run."""
+    return _shared
+
+
+def _on_invalidation(resources: List[str]) -> None:
+    """Share an invalidation published in this process."""
+    if _shared is None or getattr(_applying, "active", False):
+        return
+    try:
+        _shared.invalidate(resources)
+        _shared.record_invalidations(resources, _ORIGIN)
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to share invalidation of {resources}: {e}")
+    if _bucket:
+        with _state_lock:
+            _pending.extend(resources)
+
+
+def _apply_remote(resources: List[str]) -> None:
+    """Apply invalidations from another process without re-sharing them."""
+    _applying.active = True
+    try:
+        if _shared is not None:
+            _shared.invalidate(resources)
+        publish_invalidation(*resources)
+    finally:
+        _applying.active = False
+
+
+def _read_log(blob) -> Tuple[Dict[str, Any], int]:
+    """Return (log, generation) of the GCS log; generation 0 = none."""
+    try:
+        with track_gcs_op("invalidation_log_read"):
+            raw = blob.download_as_bytes()
+    except NotFound:
+        return {"seq": 0, "records": []}, 0
+    return json.loads(raw or b"{}"), int(blob.generation or 0)
+
+
+def _append_to_log(resources: List[str]) -> None:
+    """Append records to the GCS log, guarded by its generation."""
+    bucket = get_storage_client().bucket(_bucket)
+    for _ in range(_MAX_UPDATE_ATTEMPTS):
+        blob = bucket.blob(LOG_PATH)
+        log, generation = _read_log(blob)
+        seq = int(log.get("seq", 0))
+        records = list(log.get("records", []))
+        for resource in resources:
+            seq += 1
+            records.append(
+                {"seq": seq, "resource": resource, "host": _shared.host_id}
+            )
+        payload = {"seq": seq, "records": records[-MAX_LOG_RECORDS:]}
+        try:
+            with track_gcs_op("invalidation_log_write"):
+                blob.upload_from_string(
+                    json.dumps(payload, separators=(",", ":")),
+                    content_type="application/json",
+                    if_generation_match=generation,
+                )
+            return
+        except PreconditionFailed:
+            logger.debug(f"{LOG_PATH} changed, retrying")
+    raise RuntimeError(
+        f"Could not update gs://{_bucket}/{LOG_PATH}: "
+        f"too many concurrent writers"
+    )
+
+
+def poll_invalidations() -> int:
+    """
+    Apply invalidations published elsewhere and share pending local ones.
+
+    Returns:
+        Number of resources invalidated by other processes or instances
+    """
+    global _last_local_seq, _last_log_seq
+    if _shared is None:
+        return 0
+    applied = 0
+
+    # Other processes on this host
+    rows = _shared.invalidations_since(_last_local_seq)
+    if rows:
+        _last_local_seq = rows[-1][0]
+        remote = [r for _, r, origin in rows if origin != _ORIGIN]
+        if remote:
+            _apply_remote(remote)
+            applied += len(remote)
+
+    if not _bucket:
+        return applied
+
+    # Other instances, through the GCS log
+    with _state_lock:
+        pending = list(_pending)
+        _pending.clear()
+    if pending:
+        try:
+            _append_to_log(pending)
+        except Exception as e:
+            logger.warning(f"Failed to publish invalidations to GCS: {e}")
+            with _state_lock:
+                _pending[:0] = pending
+    log, changed = read_blob_if_changed(_bucket, LOG_PATH, json.loads)
+    log = log or {"seq": 0, "records": []}
+    if _last_log_seq is None:
+        # Records written before this process started are already
+        # reflected in what it will load
+        _last_log_seq = int(log.get("seq", 0))
+        return applied
+    if changed:
+        records = [
+            r
+            for r in log.get("records", [])
+            if r.get("seq", 0) > _last_log_seq
+            and r.get("host") != _shared.host_id
+        ]
+        _last_log_seq = max(int(log.get("seq", 0)), _last_log_seq)
+        if records:
+            _apply_remote([r["resource"] for r in records])
+            applied += len(records)
+    return applied
+
+
+def _poll_forever(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            poll_invalidations()
+        except Exception as e:
+            logger.warning(f"Shared cache invalidation poll failed: {e}")
+
+
+def init_shared_cache(
+    bucket_name: Optional[str] = None,
+    path: Optional[str] = None,
+    poll_seconds: Optional[float] = None,
+) -> Optional[SharedCache]:
+    """
+    Enable the shared tier for this process.
+
+    Args:
+        bucket_name: Bucket of the cross-instance invalidation log
+            (None = invalidations stay on this host)
+        path: SQLite file (None = settings.SHARED_CACHE_PATH)
+        poll_seconds: Interval of the invalidation poll
+            (None = settings.SHARED_CACHE_POLL_SECONDS, 0 = no poll thread)
+
+    Returns:
+        The shared cache, or None if SHARED_CACHE_MAX_MB is 0 or the file
+        can't be opened
+    """
+    global _shared, _bucket, _last_local_seq
+    if settings.SHARED_CACHE_MAX_MB <= 0:
+        return None
+    if poll_seconds is None:
+        poll_seconds = settings.SHARED_CACHE_POLL_SECONDS
+    with _state_lock:
+        if _shared is not None:
+            return _shared
+        try:
+            shared = SharedCache(path)
+            _last_local_seq = shared.last_invalidation()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache unavailable ({e}); not using it")
+            return None
+        _shared, _bucket = shared, bucket_name
+    subscribe_invalidations(_on_invalidation)
+    set_shared_tier(shared)
+    metrics.add_source("shared", shared.namespace_stats)
+    if poll_seconds:
+        threading.Thread(
+            target=_poll_forever,
+            args=(poll_seconds,),
+            name="shared-cache-poller",
+            daemon=True,
+        ).start()
+    logger.info(f"Shared cache tier enabled at {shared.path}")
+    return shared
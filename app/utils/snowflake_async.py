@@ -0,0 +1,229 @@
+"""
+Concurrent Snowflake queries tracked by query ID.
+
+Queries are submitted with ``cursor.execute_async()`` so they all run on
+the warehouse at once; the caller polls their status and fetches each
+result with ``get_results_from_sfqid()`` as it finishes. Loading N
+countries then takes about as long as the slowest query instead of the
+sum of all of them.
+
+- Results can be fetched through any connection of the same user, so
+  submitting and polling each lease a pooled connection only briefly
+- cancel() stops queries that haven't finished (SYSTEM$CANCEL_QUERY), e.g.
+  when the page that submitted them stops running
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+@dataclass
+class AsyncQuery:
+    """One query of a batch and its outcome."""
+
+    key: str
+    sql: str
+    sfqid: Optional[str] = None
+    status: str = PENDING
+    result: Optional[pd.DataFrame] = None
+    error: Optional[Exception] = None
+    submitted_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds from submission to completion (or until now)."""
+        return (self.finished_at or time.monotonic()) - self.submitted_at
+
+
+class QueryBatch:
+    """
+    A set of named queries running concurrently on Snowflake.
+
+    Args:
+        connection: Returns a context manager that yields a connection
+            (e.g. app_shared.sf_connection)
+        on_result: Called with each query that completes successfully
+            (e.g. to cache its result)
+    """
+
+    def __init__(
+        self,
+        connection: Callable[[], ContextManager],
+        on_result: Optional[Callable[[AsyncQuery], None]] = None,
+    ):
+        self._connection = connection
+        self._on_result = on_result
+        self.queries: Dict[str, AsyncQuery] = {}
+        self._yielded: set = set()
+
+    def add_result(self, key: str, sql: str, df: pd.DataFrame) -> None:
+        """Add a query whose result is already known (e.g. cached)."""
+        q = AsyncQuery(key, sql, status=DONE, result=df)
+        q.finished_at = q.submitted_at
+        self.queries[key] = q
+
+    def submit(self, queries: Dict[str, str]) -> None:
+        """
+        Start queries without waiting for them.
+
+        Args:
+            queries: Mapping of key (e.g. country) to SQL
+        """
+        if not queries:
+            return
+        with self._connection() as conn:
+            for key, sql in queries.items():
+                q = AsyncQuery(key, sql)
+                self.queries[key] = q
+                cur = conn.cursor()
+                try:
+                    cur.execute_async(sql)
+                    q.sfqid = cur.sfqid
+                    q.status = RUNNING
+                except Exception as e:
+                    self._finish(q, FAILED, error=e)
+                finally:
+                    cur.close()
+        logger.info(f"Submitted {len(queries)} Snowflake queries")
+
+    @property
+    def running(self) -> List[AsyncQuery]:
+        return [q for q in self.queries.values() if q.status == RUNNING]
+
+    @property
+    def done(self) -> bool:
+        return not self.running
+
+    def _finish(
+        self,
+        q: AsyncQuery,
+        status: str,
+        result: Optional[pd.DataFrame] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        q.status, q.result, q.error = status, result, error
+        q.finished_at = time.monotonic()
+        if status == DONE and self._on_result is not None:
+            try:
+                self._on_result(q)
+            except Exception as e:
+                logger.warning(f"Result callback failed for {q.key}: {e}")
+
+    def poll(self) -> List[AsyncQuery]:
+        """
+        Check running queries once and fetch the results of finished ones.
+
+        Returns:
+            Queries that finished during this poll
+        """
+        running = self.running
+        if not running:
+            return []
+        finished = []
+        with self._connection() as conn:
+            for q in running:
+                try:
+                    status = conn.get_query_status_throw_if_error(q.sfqid)
+                    if conn.is_still_running(status):
+                        continue
+                    cur = conn.cursor()
+                    try:
+                        cur.get_results_from_sfqid(q.sfqid)
+                        df = cur.fetch_pandas_all()
+                    finally:
+                        cur.close()
+                    self._finish(q, DONE, result=df)
+                except Exception as e:
+                    self._finish(q, FAILED, error=e)
+                finished.append(q)
+        return finished
+
+    def as_completed(
+        self,
+        timeout: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+    ) -> Iterator[AsyncQuery]:
+        """
+        Yield queries as they finish (already known results first).
+
+        Args:
+            timeout: Cancel what is still running and raise TimeoutError
+                after this many seconds
+            poll_interval: Seconds between polls (SF_ASYNC_POLL_SECONDS)
+        """
+        interval = (
+            settings.SF_ASYNC_POLL_SECONDS
+            if poll_interval is None
+            else poll_interval
+        )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            for key, q in self.queries.items():
+                if q.finished and key not in self._yielded:
+                    self._yielded.add(key)
+                    yield q
+            if self.done:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                cancelled = self.cancel()
+                raise TimeoutError(
+                    f"Cancelled {cancelled} Snowflake queries still running "
+                    f"after {timeout}s"
+                )
+            time.sleep(interval)
+            self.poll()
+
+    def cancel(self) -> int:
+        """
+        Cancel queries that are still running.
+
+        Returns:
+            Number of queries cancelled
+        """
+        running = self.running
+        if not running:
+            return 0
+        with self._connection() as conn:
+            cur = conn.cursor()
+            try:
+                for q in running:
+                    try:
+                        cur.execute(
+                            "SELECT SYSTEM$CANCEL_QUERY(%s)", (q.sfqid,)
+                        )
+                    except Exception as e:
+                        logger.warning(f"Could not cancel {q.sfqid}: {e}")
+                    self._finish(q, CANCELLED)
+            finally:
+                cur.close()
+        logger.info(f"Cancelled {len(running)} Snowflake queries")
+        return len(running)
+
+    def results(self) -> Dict[str, pd.DataFrame]:
+        """Results of the queries that completed successfully."""
+        return {
+            k: q.result for k, q in self.queries.items() if q.status == DONE
+        }
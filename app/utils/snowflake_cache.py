@@ -7,32 +7,64 @@ Implements a two-tier caching strategy:
 
 This reduces Snowflake compute costs by avoiding repeated execution of identical queries.
 Expected savings: 70% reduction in Snowflake costs with typical usage patterns.
+
+Queries are keyed by their canonical form (see sql_canonical): keyword and
+identifier case, whitespace, column order and redundant aliases don't
+matter, literals do. A query that a cached in-memory result subsumes (same
+table, subset of its columns, narrower filter) is answered by filtering
+that result locally.
+
+Concurrent misses of the same query share one execution (single flight).
+A result up to STALE_WINDOW past its TTL is still returned at once while a
+background thread re-runs the query (stale-while-revalidate).
+
+The caching itself is the source-agnostic QueryCache (see query_cache);
+this module is its Snowflake instance.
 """
 
-import hashlib
-import json
 import logging
-import time
 from typing import Optional
 
 import pandas as pd
-from google.cloud import storage
 
-from .cache import _cache, _get_cache_key
+from .cache import sf_tag
+
+# TTLs are shared by the caches of all sources (re-exported here)
+from .query_cache import (  # noqa: F401
+    GCS_TTL,
+    IN_MEMORY_TTL,
+    STALE_WINDOW,
+    QueryCache,
+)
+from .sql_canonical import parse_simple_select
+from .sql_canonical import query_hash as canonical_query_hash
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
 
 logger = logging.getLogger(__name__)
 
 # Configuration
 CACHE_BUCKET = None  # Will be set from settings
 CACHE_PREFIX = "cache/snowflake-queries/"
-IN_MEMORY_TTL = 3600  # 1 hour
-GCS_TTL = 86400  # 24 hours
+
+_query_cache = QueryCache(
+    "snowflake",
+    canonical_query_hash,
+    parse_simple=parse_simple_select,
+    max_mb=lambda: settings.SF_CACHE_GCS_MAX_MB,
+    table_tag=sf_tag,
+)
 
 
 def init_cache(bucket_name: str):
     """Initialize the cache with GCS bucket name."""
     global CACHE_BUCKET
     CACHE_BUCKET = bucket_name
+    _query_cache.bucket = bucket_name
     logger.info(f"Snowflake query cache initialized with bucket: {bucket_name}")
 
 
@@ -40,155 +72,43 @@ def _get_query_hash(query: str) -> str:
     """
     Generate a stable hash for a SQL query.
 
+    Keywords and identifiers are case-normalized but string literals are
+    not, so ``WHERE country = 'DE'`` and ``WHERE country = 'de'`` differ.
+
     Args:
         query: SQL query string
 
     Returns:
-        MD5 hash of the normalized query
+        MD5 hash of the canonical query
     """
-    # Normalize query: strip whitespace, lowercase
-    normalized = " ".join(query.strip().lower().split())
-    return hashlib.md5(normalized.encode()).hexdigest()
-
+    return canonical_query_hash(query)
 
-def _get_gcs_cache_path(query_hash: str) -> str:
-    """Get GCS path for cached query result."""
-    return f"{CACHE_PREFIX}{query_hash}.parquet"
 
-
-def _read_from_gcs_cache(query_hash: str) -> Optional[pd.DataFrame]:
+def lookup_cached_result(
+    query: str, use_gcs_cache: bool = False
+) -> Optional[pd.DataFrame]:
     """
-    Read cached query result from GCS.
+    Cached result for a query without executing it.
 
     Args:
-        query_hash: Hash of the query
+        query: SQL query
+        use_gcs_cache: Also check the GCS cache (one metadata request)
 
     Returns:
-        DataFrame if cache hit and not expired, None otherwise
-    """
-    if not CACHE_BUCKET:
-        return None
-
-    try:
-        import io
-
-        import pyarrow as pa
-        import pyarrow.parquet as pq
-
-        client = storage.Client()
-        bucket = client.bucket(CACHE_BUCKET)
-        blob_path = _get_gcs_cache_path(query_hash)
-        blob = bucket.blob(blob_path)
-
-        if not blob.exists():
-            logger.debug(f"GCS cache miss for query hash {query_hash[:8]}")
-            return None
-
-        # Check if cache is expired
-        metadata = blob.metadata or {}
-        cached_time = float(metadata.get("cached_timestamp", 0))
-        age = time.time() - cached_time
-
-        if age > GCS_TTL:
-            logger.debug(
-                f"GCS cache expired for query hash {query_hash[:8]} (age: {age:.1f}s)"
-            )
-            # Optionally delete expired cache
-            try:
-                blob.delete()
-            except Exception:
-                pass
-            return None
-
-        # Read parquet data
-        logger.info(
-            f"GCS cache hit for query hash {query_hash[:8]} (age: {age:.1f}s)"
-        )
-
-        data = blob.download_as_bytes()
-        buffer = io.BytesIO(data)
-
-        # Read using PyArrow to handle database-specific types
-        table = pq.read_table(buffer)
-
-        # Check for database-specific types and convert them
-        schema = table.schema
-        db_type_columns = []
-        for i, field in enumerate(schema):
-            field_type_str = str(field.type).lower()
-            # Check if the type string contains database-specific type indicators
-            if "db" in field_type_str and any(
-                db_type in field_type_str
-                for db_type in ["dbdate", "dbtime", "dbdecimal", "dbtimestamp"]
-            ):
-                db_type_columns.append(field.name)
-                logger.warning(
-                    f"Column '{field.name}' has database-specific type '{field.type}'"
-                )
-
-        # Convert to pandas with type mapping for database-specific types
-        if db_type_columns:
-            logger.info(
-                f"Converting database-specific types in columns: {db_type_columns}"
-            )
-
-            # Create a types_mapper that converts unknown types to string
-            def types_mapper(pa_type):
-                type_str = str(pa_type).lower()
-                if "db" in type_str:
-                    # Map database types to string for safe conversion
-                    return pd.StringDtype()
-                return None  # Use default mapping for other types
-
-            return table.to_pandas(types_mapper=types_mapper)
-        else:
-            # No database-specific types, use standard conversion
-            return table.to_pandas()
-
-    except Exception as e:
-        logger.warning(f"Failed to read from GCS cache: {e}")
-        return None
-
-
-def _write_to_gcs_cache(query_hash: str, df: pd.DataFrame):
+        The exact cached result or one derived from a subsuming in-memory
+        result, or None
     """
-    Write query result to GCS cache.
+    return _query_cache.lookup(query, use_gcs_cache)
 
-    Args:
-        query_hash: Hash of the query
-        df: DataFrame to cache
-    """
-    if not CACHE_BUCKET:
-        return
-
-    try:
-        client = storage.Client()
-        bucket = client.bucket(CACHE_BUCKET)
-        blob_path = _get_gcs_cache_path(query_hash)
-        blob = bucket.blob(blob_path)
-
-        # Convert DataFrame to parquet bytes
-        import io
-
-        buffer = io.BytesIO()
-        df.to_parquet(buffer, index=False, compression="snappy")
-        buffer.seek(0)
 
-        # Upload with metadata
-        blob.metadata = {
-            "cached_timestamp": str(time.time()),
-            "row_count": str(len(df)),
-            "column_count": str(len(df.columns)),
-        }
-        blob.upload_from_file(buffer, content_type="application/octet-stream")
-
-        logger.info(
-            f"Cached query result to GCS: {query_hash[:8]} "
-            f"({len(df)} rows, {len(df.columns)} cols)"
-        )
-
-    except Exception as e:
-        logger.warning(f"Failed to write to GCS cache: {e}")
+def cache_query_result(
+    query: str, df: pd.DataFrame, use_gcs_cache: bool = True
+) -> None:
+    """
+    Store a result that was fetched outside get_cached_query_result()
+    (e.g. by an asynchronous query).
+    """
+    _query_cache.store(query, df, use_gcs_cache)
 
 
 def get_cached_query_result(
@@ -199,65 +119,26 @@ def get_cached_query_result(
     """
     Get query result from cache or execute if not cached.
 
-    This implements a two-tier caching strategy:
-    1. Check in-memory cache (fast, TTL: 1 hour)
-    2. Check GCS cache (slower, TTL: 24 hours)
-    3. Execute query and cache result if not found
+    Tiers are checked in order:
+    1. In-memory cache (fast, TTL: 1 hour)
+    2. Host-shared cache of all processes, if enabled (TTL: 1 hour)
+    3. GCS cache (slower, TTL: 24 hours)
+    4. Execute query and cache result if not found
+
+    A result less than STALE_WINDOW past its TTL is returned immediately
+    and refreshed on a background thread. Concurrent calls for a query
+    that isn't cached wait for a single execution.
 
     Args:
         query: SQL query to execute
-        execute_func: Function to call if cache miss (takes query as argument)
+        execute_func: Function to call if cache miss (takes query as
+            argument). May be called from a background thread.
         use_gcs_cache: Whether to use GCS persistent cache
 
     Returns:
         DataFrame with query results
     """
-    query_hash = _get_query_hash(query)
-    cache_key = f"snowflake_query_{query_hash}"
-
-    # Tier 1: Check in-memory cache
-    if cache_key in _cache:
-        entry = _cache[cache_key]
-        age = time.time() - entry["timestamp"]
-        if age < IN_MEMORY_TTL:
-            logger.info(
-                f"In-memory cache hit for query hash {query_hash[:8]} (age: {age:.1f}s)"
-            )
-            return entry["value"]
-        else:
-            logger.debug(
-                f"In-memory cache expired for query hash {query_hash[:8]} (age: {age:.1f}s)"
-            )
-
-    # Tier 2: Check GCS cache
-    if use_gcs_cache:
-        gcs_result = _read_from_gcs_cache(query_hash)
-        if gcs_result is not None:
-            # Store in memory cache for faster subsequent access
-            _cache[cache_key] = {
-                "timestamp": time.time(),
-                "value": gcs_result,
-            }
-            return gcs_result
-
-    # Cache miss - execute query
-    logger.info(f"Cache miss for query hash {query_hash[:8]}, executing query")
-    result = execute_func(query)
-
-    # Cache result in memory
-    _cache[cache_key] = {
-        "timestamp": time.time(),
-        "value": result,
-    }
-
-    # Cache result in GCS (async, don't block on failures)
-    if use_gcs_cache:
-        try:
-            _write_to_gcs_cache(query_hash, result)
-        except Exception as e:
-            logger.warning(f"Failed to cache result in GCS: {e}")
-
-    return result
+    return _query_cache.get(query, execute_func, use_gcs_cache)
 
 
 def clear_snowflake_cache(query_hash: Optional[str] = None):
@@ -268,52 +149,7 @@ def clear_snowflake_cache(query_hash: Optional[str] = None):
         query_hash: If provided, clear only this specific query.
                    If None, clear all cached queries.
     """
-    # Clear in-memory cache
-    if query_hash:
-        cache_key = f"snowflake_query_{query_hash}"
-        if cache_key in _cache:
-            del _cache[cache_key]
-            logger.info(
-                f"Cleared in-memory cache for query hash {query_hash[:8]}"
-            )
-    else:
-        keys_to_remove = [
-            k for k in _cache.keys() if k.startswith("snowflake_query_")
-        ]
-        for key in keys_to_remove:
-            del _cache[key]
-        logger.info(
-            f"Cleared {len(keys_to_remove)} in-memory Snowflake cache entries"
-        )
-
-    # Clear GCS cache
-    if not CACHE_BUCKET:
-        return
-
-    try:
-        client = storage.Client()
-        bucket = client.bucket(CACHE_BUCKET)
-
-        if query_hash:
-            # Delete specific cache file
-            blob_path = _get_gcs_cache_path(query_hash)
-            blob = bucket.blob(blob_path)
-            if blob.exists():
-                blob.delete()
-                logger.info(
-                    f"Deleted GCS cache for query hash {query_hash[:8]}"
-                )
-        else:
-            # Delete all cache files
-            blobs = bucket.list_blobs(prefix=CACHE_PREFIX)
-            count = 0
-            for blob in blobs:
-                blob.delete()
-                count += 1
-            logger.info(f"Deleted {count} GCS cache files")
-
-    except Exception as e:
-        logger.warning(f"Failed to clear GCS cache: {e}")
+    _query_cache.clear(query_hash)
 
 
 def get_cache_stats() -> dict:
@@ -323,28 +159,4 @@ def get_cache_stats() -> dict:
     Returns:
         Dictionary with cache statistics
     """
-    # In-memory stats
-    memory_keys = [k for k in _cache.keys() if k.startswith("snowflake_query_")]
-    memory_count = len(memory_keys)
-
-    # GCS stats
-    gcs_count = 0
-    gcs_total_size = 0
-
-    if CACHE_BUCKET:
-        try:
-            client = storage.Client()
-            bucket = client.bucket(CACHE_BUCKET)
-            blobs = list(bucket.list_blobs(prefix=CACHE_PREFIX))
-            gcs_count = len(blobs)
-            gcs_total_size = sum(blob.size for blob in blobs)
-        except Exception as e:
-            logger.warning(f"Failed to get GCS cache stats: {e}")
-
-    return {
-        "in_memory_count": memory_count,
-        "gcs_count": gcs_count,
-        "gcs_total_size_mb": round(gcs_total_size / 1024 / 1024, 2),
-        "in_memory_ttl_seconds": IN_MEMORY_TTL,
-        "gcs_ttl_seconds": GCS_TTL,
-    }
+    return _query_cache.get_stats()
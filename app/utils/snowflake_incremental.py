@@ -0,0 +1,245 @@
+"""
+Incremental refresh of date-partitioned Snowflake query results.
+
+Reloading a country table re-ran the full SELECT over years of daily rows
+although only the last few days change. For a simple query
+(``SELECT ... FROM table WHERE <filters>``, see sql_canonical) the merged
+result is kept per (table, filter) key at
+``cache/snowflake-incremental/<hash>.parquet`` together with the max date
+it holds (the watermark):
+
+- plan_refresh() builds the delta query: the original query restricted to
+  ``<date column> >= watermark - look-back days``, so late corrections
+  inside the look-back window are picked up
+- apply_refresh() replaces the stored rows from the cutoff on with the
+  delta and writes the result back, guarded by the object's generation
+
+Without stored state (or with full=True) the plan is the original query;
+it still replaces the stored result, written against the generation read
+when planning.
+"""
+
+import io
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+from google.api_core.exceptions import PreconditionFailed
+
+from .blob_cache import cached_blob_path
+from .gcs_client import get_storage_client, track_gcs_op
+from .parquet_decode import read_parquet
+from .snowflake_cache import cache_query_result
+from .sql_canonical import (
+    _ident_name,
+    parse_simple_select,
+    query_hash,
+    tokenize,
+)
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_PREFIX = "cache/snowflake-incremental/"
+
+
+class SchemaChanged(ValueError):
+    """The delta's columns differ from the stored result's."""
+
+
+@dataclass
+class IncrementalPlan:
+    """What to run for a refresh and how to merge its result."""
+
+    sql: str
+    base_sql: str
+    date_column: str
+    date_output: str
+    state_path: str
+    generation: int = 0
+    base: Optional[pd.DataFrame] = None
+    cutoff: Optional[str] = None
+
+    @property
+    def full(self) -> bool:
+        """Whether the plan runs the whole query."""
+        return self.cutoff is None
+
+
+def state_path(sql: str) -> str:
+    """GCS path of the stored result of a query."""
+    return f"{STATE_PREFIX}{query_hash(sql)}.parquet"
+
+
+def _date_names(sql: str, date_column: str) -> Tuple[str, str]:
+    """(column name in SQL, column name in the result) of the date column."""
+    simple = parse_simple_select(sql)
+    if simple is None:
+        raise ValueError(
+            "Incremental refresh needs a plain SELECT ... FROM table "
+            "[WHERE column = value AND ...] query"
+        )
+    tokens = tokenize(date_column)
+    if len(tokens) != 1 or tokens[0][0] not in ("word", "qident"):
+        raise ValueError(f"Invalid date column: {date_column!r}")
+    source = _ident_name(tokens[0])
+    if simple.columns is None:
+        return tokens[0][1], source
+    for src, out in simple.columns:
+        if src == source:
+            return tokens[0][1], out
+    raise ValueError(f"The query must select the date column {date_column}")
+
+
+def _watermark(df: pd.DataFrame, column: str) -> Optional[pd.Timestamp]:
+    dates = pd.to_datetime(df[column], errors="coerce")
+    latest = dates.max()
+    return None if pd.isna(latest) else latest
+
+
+def plan_refresh(
+    bucket_name: str,
+    sql: str,
+    date_column: str,
+    lookback_days: Optional[int] = None,
+    full: bool = False,
+) -> IncrementalPlan:
+    """
+    Decide which query a refresh has to run.
+
+    Args:
+        bucket_name: Bucket holding the stored results
+        sql: The full query (simple SELECT including the date column)
+        date_column: Date column to track (as written in SQL)
+        lookback_days: Days before the watermark to fetch again
+            (SF_INCREMENTAL_LOOKBACK_DAYS)
+        full: Ignore the stored result and run the whole query
+
+    Returns:
+        IncrementalPlan whose ``sql`` is the delta or the full query
+
+    Raises:
+        ValueError: If the query or date column can't be refreshed
+            incrementally
+    """
+    sql = sql.strip().rstrip(";").strip()
+    sql_column, output = _date_names(sql, date_column)
+    plan = IncrementalPlan(
+        sql=sql,
+        base_sql=sql,
+        date_column=sql_column,
+        date_output=output,
+        state_path=state_path(sql),
+    )
+
+    with track_gcs_op("sf_incremental_check"):
+        blob = (
+            get_storage_client().bucket(bucket_name).get_blob(plan.state_path)
+        )
+    if blob is None:
+        return plan
+    # A full refresh replaces the stored result, so it writes against the
+    # current generation too
+    plan.generation = int(blob.generation or 0)
+    if full:
+        return plan
+    try:
+        base = read_parquet(cached_blob_path(bucket_name, plan.state_path))
+    except FileNotFoundError:
+        return plan
+    latest = _watermark(base, output) if output in base.columns else None
+    if latest is None:
+        return plan
+
+    days = (
+        settings.SF_INCREMENTAL_LOOKBACK_DAYS
+        if lookback_days is None
+        else lookback_days
+    )
+    plan.cutoff = (latest - timedelta(days=days)).date().isoformat()
+    plan.base = base
+    keyword = "AND" if parse_simple_select(sql).predicates else "WHERE"
+    plan.sql = f"{sql} {keyword} {sql_column} >= '{plan.cutoff}'"
+    return plan
+
+
+def _store(bucket_name: str, plan: IncrementalPlan, df: pd.DataFrame) -> bool:
+    blob = get_storage_client().bucket(bucket_name).blob(plan.state_path)
+    latest = _watermark(df, plan.date_output)
+    blob.metadata = {
+        "query": plan.base_sql,
+        "date_column": plan.date_column,
+        "watermark": latest.isoformat() if latest is not None else "",
+        "row_count": str(len(df)),
+    }
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, compression="snappy")
+    buffer.seek(0)
+    try:
+        with track_gcs_op("sf_incremental_write"):
+            blob.upload_from_file(
+                buffer,
+                content_type="application/octet-stream",
+                if_generation_match=plan.generation,
+            )
+        return True
+    except PreconditionFailed:
+        logger.info(
+            f"gs://{bucket_name}/{plan.state_path} was refreshed concurrently; "
+            f"keeping the other refresh"
+        )
+        return False
+
+
+def apply_refresh(
+    bucket_name: str, plan: IncrementalPlan, result: pd.DataFrame
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Merge a refresh's result into the stored one and save it.
+
+    Stored rows on or after the cutoff are replaced by the delta (rows
+    without a date are kept). The merged frame is also put in the query
+    result cache under the full query.
+
+    Returns:
+        (merged DataFrame, info with mode, cutoff, delta_rows, rows and
+        watermark)
+
+    Raises:
+        SchemaChanged: If the delta's columns differ from the stored
+            result's; run a full refresh instead
+    """
+    if plan.full:
+        merged = result.reset_index(drop=True)
+    else:
+        if list(result.columns) != list(plan.base.columns):
+            raise SchemaChanged(
+                f"Columns of {plan.base_sql!r} changed since the last refresh"
+            )
+        dates = pd.to_datetime(plan.base[plan.date_output], errors="coerce")
+        cutoff = pd.Timestamp(plan.cutoff)
+        if getattr(dates.dt, "tz", None) is not None:
+            cutoff = cutoff.tz_localize(dates.dt.tz)
+        keep = plan.base[dates.isna() | (dates < cutoff)]
+        merged = pd.concat([keep, result], ignore_index=True)
+
+    stored = _store(bucket_name, plan, merged)
+    cache_query_result(plan.base_sql, merged)
+    latest = _watermark(merged, plan.date_output)
+    info = {
+        "mode": "full" if plan.full else "delta",
+        "cutoff": plan.cutoff,
+        "delta_rows": len(result),
+        "rows": len(merged),
+        "watermark": latest.date().isoformat() if latest is not None else None,
+        "stored": stored,
+    }
+    logger.info(f"Incremental refresh of {plan.state_path}: {info}")
+    return merged, info
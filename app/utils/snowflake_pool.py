@@ -0,0 +1,333 @@
+"""
+Process-wide Snowflake connection pool.
+
+Connections are shared by every Streamlit session in the process that
+connects with the same credentials, instead of one connection per session:
+- Pools are keyed by a fingerprint of the connection parameters and the
+  key/password, so sessions never borrow each other's identities
+- Each pool holds at most SF_POOL_SIZE connections; callers lease one for
+  the duration of a query and wait when all are in use
+- A background thread pings idle connections every
+  SF_POOL_HEALTH_INTERVAL_SECONDS, drops dead ones and closes connections
+  unused for SF_POOL_IDLE_SECONDS, so pages never run health checks
+- Decoded private keys are cached for SF_KEY_CACHE_TTL_SECONDS, so
+  reconnects don't fetch and parse the secret again
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Import from parent config module (app.config)
+try:
+    from config import settings
+except ImportError:
+    from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Connection parameters that identify a pool (besides the secret)
+_KEY_FIELDS = ("user", "account", "warehouse", "database", "schema", "role")
+
+
+@dataclass
+class _Pool:
+    idle: List[Tuple[Any, float]] = field(default_factory=list)
+    in_use: int = 0
+
+
+_pools: Dict[str, _Pool] = {}
+_cond = threading.Condition()
+_stats = {
+    "opened": 0,
+    "reused": 0,
+    "closed_idle": 0,
+    "closed_dead": 0,
+    "waits": 0,
+}
+
+_health_thread: Optional[threading.Thread] = None
+_health_stop = threading.Event()
+
+_key_cache: Dict[str, Tuple[float, bytes]] = {}
+_key_lock = threading.Lock()
+
+
+def pool_key(params: Dict[str, Any]) -> str:
+    """
+    Fingerprint of a set of connection parameters.
+
+    The private key or password is hashed together with the identifying
+    parameters; neither is kept in the pool.
+    """
+    h = hashlib.sha256()
+    for name in _KEY_FIELDS:
+        h.update(f"{name}={params.get(name) or ''}\0".encode())
+    secret = params.get("private_key") or params.get("password") or b""
+    if isinstance(secret, str):
+        secret = secret.encode()
+    h.update(hashlib.sha256(secret).digest())
+    return h.hexdigest()
+
+
+def _is_closed(conn) -> bool:
+    try:
+        return bool(conn.is_closed())
+    except Exception:
+        return True
+
+
+def _close(conn) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _ping(conn) -> bool:
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchall()
+        return True
+    except Exception:
+        return False
+
+
+def _take(key: str) -> Any:
+    """
+    Reserve a slot in a pool and return an idle connection, or None when
+    the caller should open a new one. Waits while the pool is full.
+    """
+    deadline = time.monotonic() + settings.SF_POOL_WAIT_SECONDS
+    with _cond:
+        pool = _pools.setdefault(key, _Pool())
+        while True:
+            while pool.idle:
+                conn, _ = pool.idle.pop()  # most recently used first
+                if _is_closed(conn):
+                    _stats["closed_dead"] += 1
+                    continue
+                pool.in_use += 1
+                _stats["reused"] += 1
+                return conn
+            if pool.in_use < max(1, settings.SF_POOL_SIZE):
+                pool.in_use += 1
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"No Snowflake connection became free within "
+                    f"{settings.SF_POOL_WAIT_SECONDS}s "
+                    f"(pool size {settings.SF_POOL_SIZE})"
+                )
+            _stats["waits"] += 1
+            _cond.wait(remaining)
+
+
+def _give_back(key: str, conn: Any) -> None:
+    with _cond:
+        pool = _pools.setdefault(key, _Pool())
+        pool.in_use = max(0, pool.in_use - 1)
+        if conn is not None:
+            if _is_closed(conn):
+                _stats["closed_dead"] += 1
+            else:
+                pool.idle.append((conn, time.monotonic()))
+        _cond.notify()
+
+
+@contextmanager
+def lease_connection(
+    params: Dict[str, Any], connect: Callable[..., Any]
+) -> Iterator[Any]:
+    """
+    Lease a pooled connection for the given credentials.
+
+    Args:
+        params: Keyword arguments for ``connect`` (user, account, warehouse,
+            database, schema, role and private_key or password)
+        connect: Opens a new connection from ``params``
+
+    Yields:
+        An open connection, returned to the pool on exit (a connection
+        closed while leased is dropped instead)
+    """
+    key = pool_key(params)
+    conn = _take(key)
+    try:
+        if conn is None:
+            conn = connect(**params)
+            with _cond:
+                _stats["opened"] += 1
+        _ensure_health_thread()
+        yield conn
+    finally:
+        _give_back(key, conn)
+
+
+def check_pool_health() -> Dict[str, int]:
+    """
+    Ping idle connections and close dead or long-unused ones.
+
+    Connections are taken out of their pool while being pinged, so no
+    caller can lease one mid-check. Runs on the background thread; can be
+    called directly.
+
+    Returns:
+        Counts of pinged, closed idle and closed dead connections
+    """
+    now = time.monotonic()
+    result = {"pinged": 0, "closed_idle": 0, "closed_dead": 0}
+    to_close: List[Any] = []
+    to_ping: List[Tuple[str, Any, float]] = []
+    with _cond:
+        for key, pool in _pools.items():
+            keep = []
+            for conn, last_used in pool.idle:
+                idle_for = now - last_used
+                if idle_for >= settings.SF_POOL_IDLE_SECONDS:
+                    to_close.append(conn)
+                    result["closed_idle"] += 1
+                elif idle_for >= settings.SF_POOL_HEALTH_INTERVAL_SECONDS:
+                    to_ping.append((key, conn, last_used))
+                    pool.in_use += 1
+                else:
+                    keep.append((conn, last_used))
+            pool.idle = keep
+
+    for conn in to_close:
+        _close(conn)
+    for key, conn, last_used in to_ping:
+        result["pinged"] += 1
+        alive = _ping(conn)
+        if not alive:
+            _close(conn)
+            result["closed_dead"] += 1
+        with _cond:
+            pool = _pools.setdefault(key, _Pool())
+            pool.in_use = max(0, pool.in_use - 1)
+            if alive:
+                # A ping is not use: keep the idle clock running
+                pool.idle.insert(0, (conn, last_used))
+            _cond.notify()
+
+    with _cond:
+        _stats["closed_idle"] += result["closed_idle"]
+        _stats["closed_dead"] += result["closed_dead"]
+        for key in [
+            k for k, p in _pools.items() if not p.idle and not p.in_use
+        ]:
+            del _pools[key]
+    return result
+
+
+def _health_loop() -> None:
+    interval = max(1, settings.SF_POOL_HEALTH_INTERVAL_SECONDS)
+    while not _health_stop.wait(interval):
+        try:
+            result = check_pool_health()
+            if result["closed_idle"] or result["closed_dead"]:
+                logger.info(f"Snowflake pool health check: {result}")
+        except Exception as e:
+            logger.warning(f"Snowflake pool health check failed: {e}")
+
+
+def _ensure_health_thread() -> None:
+    global _health_thread
+    if _health_thread is not None and _health_thread.is_alive():
+        return
+    with _cond:
+        if _health_thread is None or not _health_thread.is_alive():
+            _health_stop.clear()
+            _health_thread = threading.Thread(
+                target=_health_loop,
+                name="snowflake-pool-health",
+                daemon=True,
+            )
+            _health_thread.start()
+
+
+def close_connections(params: Dict[str, Any]) -> int:
+    """
+    Close the idle connections of one set of credentials (e.g. when the
+    user disconnects). Connections leased at the time go back to the pool
+    and are closed by the idle eviction.
+
+    Returns:
+        Number of connections closed
+    """
+    key = pool_key(params)
+    with _cond:
+        pool = _pools.get(key)
+        idle = [c for c, _ in pool.idle] if pool else []
+        if pool:
+            pool.idle = []
+    for conn in idle:
+        _close(conn)
+    return len(idle)
+
+
+def clear_pool() -> int:
+    """Close every idle connection and stop the health thread."""
+    global _health_thread
+    _health_stop.set()
+    with _cond:
+        idle = [c for p in _pools.values() for c, _ in p.idle]
+        _pools.clear()
+        thread, _health_thread = _health_thread, None
+    for conn in idle:
+        _close(conn)
+    if thread is not None and thread is not threading.current_thread():
+        thread.join(timeout=1)
+    return len(idle)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool sizes and lifetime counters for diagnostics."""
+    with _cond:
+        return {
+            "pools": len(_pools),
+            "idle": sum(len(p.idle) for p in _pools.values()),
+            "in_use": sum(p.in_use for p in _pools.values()),
+            "max_size": settings.SF_POOL_SIZE,
+            **_stats,
+        }
+
+
+def cached_private_key(secret_id: str, load: Callable[[], bytes]) -> bytes:
+    """
+    Return a decoded private key, loading it at most once per TTL.
+
+    Args:
+        secret_id: Cache key (the Secret Manager secret)
+        load: Fetches and decodes the key to PKCS#8 DER bytes
+
+    Returns:
+        PKCS#8 DER bytes
+    """
+    now = time.monotonic()
+    with _key_lock:
+        cached = _key_cache.get(secret_id)
+    if cached and cached[0] > now:
+        return cached[1]
+    key_bytes = load()
+    with _key_lock:
+        _key_cache[secret_id] = (
+            now + settings.SF_KEY_CACHE_TTL_SECONDS,
+            key_bytes,
+        )
+    return key_bytes
+
+
+def clear_private_key_cache(secret_id: Optional[str] = None) -> None:
+    """Forget one cached key (e.g. after it was deleted) or all of them."""
+    with _key_lock:
+        if secret_id is None:
+            _key_cache.clear()
+        else:
+            _key_cache.pop(secret_id, None)
@@ -0,0 +1,427 @@
+"""
+SQL canonicalization and subsumption for the query result cache.
+
+Cache keys are built from a token-level canonical form of the query:
+- Keywords and unquoted identifiers are upper-cased (Snowflake resolves
+  them case-insensitively); string literals and quoted identifiers are
+  kept exactly, so 'DE' and 'de' stay different queries
+- Comments, whitespace and a trailing semicolon are dropped
+
+Queries of the form ``SELECT <columns|*> FROM <table> [WHERE <p> AND ...]``
+with simple column-vs-literal predicates are additionally parsed into a
+SimpleSelect. Their key ignores column order, redundant aliases and
+predicate order, and a cached result can answer another query on the same
+table when it selected a superset of the columns with a weaker filter
+(e.g. a narrower date window): the cached table is filtered and projected
+locally with pyarrow.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+Token = Tuple[str, str]  # (kind, text): word, qident, str, num, op
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|//[^\n]*|/\*.*?\*/)
+    | (?P<str>'(?:[^'\\]|\\.|'')*'|\$\$.*?\$\$)
+    | (?P<qident>"(?:[^"]|"")*"|`[^`]*`)
+    | (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>\$?[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<op>::|<=|>=|<>|!=|\|\||=>|->>|->|[^\s])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_UNQUOTED_SAFE = re.compile(r"^[A-Z_][A-Z0-9_$]*$")
+
+# Words that end a column or table reference in the simple grammar
+_RESERVED = frozenset(
+    """
+    ALL AND ANY AS ASC AT BEFORE BETWEEN BY CASE CHANGES CONNECT CROSS
+    DESC DISTINCT EXCEPT FETCH FOR FROM FULL GROUP HAVING ILIKE IN INNER
+    INTERSECT IS JOIN LATERAL LEFT LIKE LIMIT MATCH_RECOGNIZE MINUS
+    NATURAL NOT NULL OFFSET ON OR ORDER OVER PIVOT QUALIFY RIGHT RLIKE
+    SAMPLE SELECT START TABLESAMPLE TOP UNION UNPIVOT USING WHERE WINDOW
+    WITH
+    """.split()
+)
+
+_ARROW_OPS = {
+    "=": pc.equal,
+    "!=": pc.not_equal,
+    ">": pc.greater,
+    ">=": pc.greater_equal,
+    "<": pc.less,
+    "<=": pc.less_equal,
+}
+
+
+class SqlTokenizeError(ValueError):
+    """Raised for SQL the tokenizer can't split (e.g. an open quote)."""
+
+
+def tokenize(sql: str) -> List[Token]:
+    """
+    Split SQL into canonical tokens, dropping whitespace and comments.
+
+    Words are upper-cased. Quoted identifiers that Snowflake would resolve
+    to the same name unquoted (e.g. "COUNTRY") are unquoted.
+    """
+    tokens: List[Token] = []
+    pos = 0
+    while pos < len(sql):
+        m = _TOKEN_RE.match(sql, pos)
+        if not m or m.end() == pos:
+            raise SqlTokenizeError(f"Cannot tokenize SQL at offset {pos}")
+        pos = m.end()
+        kind = m.lastgroup
+        text = m.group()
+        if kind in ("ws", "comment"):
+            continue
+        if kind == "word":
+            tokens.append(("word", text.upper()))
+        elif kind == "qident" and text[0] == '"':
+            name = text[1:-1].replace('""', '"')
+            if _UNQUOTED_SAFE.match(name):
+                tokens.append(("word", name))
+            else:
+                tokens.append(("qident", text))
+        else:
+            tokens.append((kind, text))
+    while tokens and tokens[-1] == ("op", ";"):
+        tokens.pop()
+    return tokens
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Canonical text of a query: normalized keywords and identifiers, exact
+    literals, single spaces. Falls back to whitespace normalization for SQL
+    that can't be tokenized.
+    """
+    try:
+        return " ".join(text for _, text in tokenize(sql))
+    except SqlTokenizeError:
+        return " ".join(sql.split())
+
+
+def _ident_name(token: Token) -> str:
+    """Column name as the result reports it."""
+    kind, text = token
+    if kind == "qident":
+        return text[1:-1].replace('""', '"').replace("``", "`")
+    return text
+
+
+def _literal_value(kind: str, text: str) -> Any:
+    if kind == "num":
+        return float(text) if any(c in text for c in ".eE") else int(text)
+    if text.startswith("$$"):
+        return text[2:-2]
+    return re.sub(r"\\(.)", r"\1", text[1:-1].replace("''", "'"))
+
+
+def _as_date(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _compare(a: Any, b: Any) -> Optional[int]:
+    """-1/0/1 for comparable literals, None when the order is unknown."""
+    if a == b and type(a) is type(b):
+        return 0
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return (a > b) - (a < b)
+    # Dates only in the same format, so string columns order them the same
+    da, db = _as_date(a), _as_date(b)
+    if da is not None and db is not None and len(a) == len(b):
+        return (da > db) - (da < db)
+    return None
+
+
+def _implies(q: Tuple[str, str, Any], e: Tuple[str, str, Any]) -> bool:
+    """Whether predicate ``q`` implies ``e`` (both on the same column)."""
+    (_, qop, qv), (_, eop, ev) = q, e
+    if (qop, qv) == (eop, ev):
+        return True
+    cmp = _compare(qv, ev)
+    if cmp is None:
+        return False
+    if eop == ">=":
+        return qop in (">=", ">", "=") and cmp >= 0
+    if eop == ">":
+        return (qop == ">" and cmp >= 0) or (qop in (">=", "=") and cmp > 0)
+    if eop == "<=":
+        return qop in ("<=", "<", "=") and cmp <= 0
+    if eop == "<":
+        return (qop == "<" and cmp <= 0) or (qop in ("<=", "=") and cmp < 0)
+    if eop == "!=":
+        return qop == "=" and cmp != 0
+    return qop == "=" and cmp == 0
+
+
+@dataclass(frozen=True)
+class SimpleSelect:
+    """
+    Parsed ``SELECT cols FROM table WHERE col op literal AND ...`` query.
+
+    ``columns`` holds (source, output) name pairs in select order, or is
+    None for ``SELECT *``; ``predicates`` holds (column, op, value) with
+    BETWEEN split into >= and <=.
+    """
+
+    table: str
+    columns: Optional[Tuple[Tuple[str, str], ...]]
+    predicates: Tuple[Tuple[str, str, Any], ...]
+
+    def key(self) -> str:
+        """Order-insensitive canonical form used as the cache key."""
+        cols = (
+            "*"
+            if self.columns is None
+            else ", ".join(
+                src if src == out else f"{src} AS {out}"
+                for src, out in sorted(self.columns)
+            )
+        )
+        where = " AND ".join(
+            f"{c} {op} {v!r}"
+            for c, op, v in sorted(set(self.predicates), key=repr)
+        )
+        return f"SELECT {cols} FROM {self.table}" + (
+            f" WHERE {where}" if where else ""
+        )
+
+    def covers(self, other: "SimpleSelect") -> bool:
+        """
+        Whether this query's result contains ``other``'s result.
+
+        True when both read the same table, every predicate here is implied
+        by one of ``other``'s, and every column ``other`` selects or filters
+        on is selected here.
+        """
+        if self.table != other.table:
+            return False
+        for e in self.predicates:
+            if not any(
+                q[0] == e[0] and _implies(q, e) for q in other.predicates
+            ):
+                return False
+        if self.columns is None:
+            return True
+        if other.columns is None:
+            return False
+        have = {src for src, _ in self.columns}
+        need = {src for src, _ in other.columns}
+        need.update(c for c, _, _ in other.predicates)
+        return need <= have
+
+    def answer(
+        self, other: "SimpleSelect", df: pd.DataFrame
+    ) -> Optional[pd.DataFrame]:
+        """
+        Compute ``other``'s result from this query's cached result.
+
+        Returns:
+            The filtered and projected frame, or None when it can't be
+            derived safely (missing columns, literal that doesn't convert
+            to the column type, ...)
+        """
+        if not self.covers(other):
+            return None
+        out_of = (
+            {src: out for src, out in self.columns}
+            if self.columns is not None
+            else {c: c for c in df.columns}
+        )
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            mask = None
+            for col, op, value in other.predicates:
+                if (col, op, value) in self.predicates:
+                    continue
+                column = table.column(out_of[col])
+                if not isinstance(value, str) and not (
+                    pa.types.is_integer(column.type)
+                    or pa.types.is_floating(column.type)
+                    or pa.types.is_decimal(column.type)
+                ):
+                    # Snowflake would compare as numbers, Arrow as strings
+                    return None
+                scalar = pa.scalar(value).cast(column.type)
+                cond = _ARROW_OPS[op](column, scalar)
+                mask = cond if mask is None else pc.and_(mask, cond)
+            if mask is not None:
+                table = table.filter(mask)
+            if other.columns is not None:
+                table = table.select([out_of[src] for src, _ in other.columns])
+                table = table.rename_columns([out for _, out in other.columns])
+            return table.to_pandas()
+        except (KeyError, pa.ArrowException, ValueError, TypeError):
+            return None
+
+
+class _Parser:
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else None
+
+    def next(self) -> Token:
+        tok = self.peek()
+        if tok is None:
+            raise ValueError("unexpected end")
+        self.pos += 1
+        return tok
+
+    def accept(self, kind: str, text: str) -> bool:
+        if self.peek() == (kind, text):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, kind: str, text: str) -> None:
+        if not self.accept(kind, text):
+            raise ValueError(f"expected {text}")
+
+    def ident(self) -> Token:
+        tok = self.next()
+        if tok[0] == "qident" or (
+            tok[0] == "word" and tok[1] not in _RESERVED and tok[1][0] != "$"
+        ):
+            return tok
+        raise ValueError(f"not an identifier: {tok[1]}")
+
+    def is_ident(self, offset: int = 0) -> bool:
+        tok = self.peek(offset)
+        return tok is not None and (
+            tok[0] == "qident" or (tok[0] == "word" and tok[1] not in _RESERVED)
+        )
+
+    def literal(self) -> Any:
+        tok = self.next()
+        if tok[0] == "word" and tok[1] in ("DATE", "TIMESTAMP"):
+            tok = self.next()
+            if tok[0] != "str":
+                raise ValueError("expected date literal")
+            return _literal_value(*tok)
+        if tok == ("op", "-"):
+            tok = self.next()
+            if tok[0] != "num":
+                raise ValueError("expected number")
+            return -_literal_value(*tok)
+        if tok[0] in ("str", "num"):
+            return _literal_value(*tok)
+        raise ValueError(f"not a literal: {tok[1]}")
+
+
+def parse_simple_select(sql: str) -> Optional[SimpleSelect]:
+    """
+    Parse a single-table SELECT with a conjunction of column-vs-literal
+    predicates. Returns None for anything else (joins, functions,
+    aggregates, ORDER BY/LIMIT, OR, IN, ...).
+    """
+    try:
+        p = _Parser(tokenize(sql))
+        p.expect("word", "SELECT")
+
+        raw_cols: Optional[List[Tuple[List[Token], Optional[Token]]]] = None
+        if not p.accept("op", "*"):
+            raw_cols = []
+            while True:
+                ref = [p.ident()]
+                while p.accept("op", "."):
+                    ref.append(p.ident())
+                alias = None
+                if p.accept("word", "AS") or (
+                    p.is_ident() and p.peek() != ("word", "FROM")
+                ):
+                    alias = p.ident()
+                raw_cols.append((ref, alias))
+                if not p.accept("op", ","):
+                    break
+        p.expect("word", "FROM")
+
+        table_parts = [p.ident()]
+        while p.accept("op", "."):
+            table_parts.append(p.ident())
+        if len(table_parts) > 3:
+            return None
+        table = ".".join(text for _, text in table_parts)
+        qualifiers = {_ident_name(table_parts[-1])}
+        if p.accept("word", "AS") or (
+            p.is_ident() and p.peek() != ("word", "WHERE")
+        ):
+            qualifiers = {_ident_name(p.ident())}
+
+        def column(ref: List[Token]) -> str:
+            if len(ref) == 2 and _ident_name(ref[0]) in qualifiers:
+                ref = ref[1:]
+            if len(ref) != 1:
+                raise ValueError("unsupported column reference")
+            return _ident_name(ref[0])
+
+        predicates: List[Tuple[str, str, Any]] = []
+        if p.accept("word", "WHERE"):
+            while True:
+                ref = [p.ident()]
+                while p.accept("op", "."):
+                    ref.append(p.ident())
+                col = column(ref)
+                if p.accept("word", "BETWEEN"):
+                    lo = p.literal()
+                    p.expect("word", "AND")
+                    hi = p.literal()
+                    predicates += [(col, ">=", lo), (col, "<=", hi)]
+                else:
+                    op = p.next()
+                    text = "!=" if op[1] == "<>" else op[1]
+                    if op[0] != "op" or text not in _ARROW_OPS:
+                        return None
+                    predicates.append((col, text, p.literal()))
+                if not p.accept("word", "AND"):
+                    break
+        if p.peek() is not None:
+            return None
+
+        columns = None
+        if raw_cols is not None:
+            columns = tuple(
+                (column(ref), _ident_name(alias) if alias else column(ref))
+                for ref, alias in raw_cols
+            )
+            if len({out for _, out in columns}) != len(columns):
+                return None
+        return SimpleSelect(table, columns, tuple(predicates))
+    except (ValueError, SqlTokenizeError):
+        return None
+
+
+def query_key(sql: str) -> str:
+    """
+    Canonical key text of a query: the SimpleSelect form when the query
+    parses as one, the canonical token text otherwise.
+    """
+    simple = parse_simple_select(sql)
+    return simple.key() if simple is not None else canonicalize_sql(sql)
+
+
+def query_hash(sql: str) -> str:
+    """MD5 of query_key()."""
+    return hashlib.md5(query_key(sql).encode()).hexdigest()
@@ -0,0 +1,321 @@
+"""
+Version manifests for versioned GCS prefixes.
+
+Each versioned collection keeps an ``_index.json`` next to its versions,
+e.g. ``datasets/de/_index.json`` lists every ``datasets/de/<ts>/`` folder
+holding a ``raw.parquet``. Version dropdowns read the manifest with one
+small GET instead of listing a prefix that grows with bucket history.
+
+- Writers call record_versions()/record_version_blob() after saving
+- Updates are read-modify-write guarded by the manifest's generation, so
+  concurrent saves never drop each other's entries
+- A missing manifest is rebuilt from a listing on first read;
+  rebuild_all_version_indexes() backfills existing buckets
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from .gcs_client import get_storage_client, track_gcs_op
+from .gcs_utils import list_subdirs
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "_index.json"
+
+_MAX_UPDATE_ATTEMPTS = 8
+
+
+@dataclass(frozen=True)
+class VersionCollection:
+    """
+    Layout of a versioned collection.
+
+    Objects look like ``<root>/<scope...>/<version...>/<filename>``; one
+    manifest is kept per ``<root>/<scope...>`` prefix and lists the
+    ``<version...>`` part (``version_depth`` path segments).
+    """
+
+    root: str
+    filename: str
+    scope_depth: int = 1
+    version_depth: int = 1
+
+
+COLLECTIONS = (
+    # datasets/<country>/<ts>/raw.parquet
+    VersionCollection("datasets", "raw.parquet"),
+    # mapped-datasets/<country>/<ts>/raw.parquet
+    VersionCollection("mapped-datasets", "raw.parquet"),
+    # metadata/<country|universal>/<ts>/mapping.json
+    VersionCollection("metadata", "mapping.json"),
+    # training_data/<country>/<goal>/<ts>/selected_columns.json
+    VersionCollection(
+        "training_data",
+        "selected_columns.json",
+        scope_depth=0,
+        version_depth=3,
+    ),
+)
+
+
+def _collection_for_prefix(prefix: str) -> VersionCollection:
+    parts = prefix.strip("/").split("/")
+    for c in COLLECTIONS:
+        if parts[0] == c.root and len(parts) == 1 + c.scope_depth:
+            return c
+    raise ValueError(f"'{prefix}' is not a versioned collection prefix")
+
+
+def index_blob_path(prefix: str) -> str:
+    """Manifest path for a collection prefix."""
+    return f"{prefix.strip('/')}/{INDEX_NAME}"
+
+
+def parse_version_blob(blob_path: str) -> Optional[tuple]:
+    """
+    Split a versioned object path into (collection prefix, version).
+
+    Returns:
+        (prefix, version) or None if the path isn't a versioned object
+    """
+    parts = blob_path.strip("/").split("/")
+    for c in COLLECTIONS:
+        expected = 1 + c.scope_depth + c.version_depth + 1
+        if (
+            len(parts) == expected
+            and parts[0] == c.root
+            and parts[-1] == c.filename
+            and all(parts[1:-1])
+        ):
+            split = 1 + c.scope_depth
+            return "/".join(parts[:split]), "/".join(parts[split:-1])
+    return None
+
+
+def _load(blob) -> tuple:
+    """Return (versions, generation) of a manifest blob; generation 0 = none."""
+    try:
+        with track_gcs_op("version_index_read"):
+            raw = blob.download_as_bytes()
+    except NotFound:
+        return [], 0
+    data = json.loads(raw or b"{}")
+    return list(data.get("versions", [])), int(blob.generation or 0)
+
+
+def _store(blob, versions: Iterable[str], generation: int) -> None:
+    payload = {
+        "versions": sorted(set(versions)),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with track_gcs_op("version_index_write"):
+        blob.upload_from_string(
+            json.dumps(payload, indent=2),
+            content_type="application/json",
+            if_generation_match=generation,
+        )
+
+
+def _update_index(
+    bucket_name: str, prefix: str, mutate: Callable[[Set[str]], Set[str]]
+) -> List[str]:
+    """
+    Apply ``mutate`` to a manifest with optimistic concurrency.
+
+    The write only succeeds if the manifest is still at the generation we
+    read (or still absent); otherwise it is re-read and retried.
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+    path = index_blob_path(prefix)
+    for _ in range(_MAX_UPDATE_ATTEMPTS):
+        blob = bucket.blob(path)
+        current, generation = _load(blob)
+        updated = mutate(set(current))
+        if generation and updated == set(current):
+            return sorted(updated)
+        try:
+            _store(blob, updated, generation)
+            return sorted(updated)
+        except PreconditionFailed:
+            logger.debug(f"gs://{bucket_name}/{path} changed, retrying")
+    raise RuntimeError(
+        f"Could not update gs://{bucket_name}/{path}: "
+        f"too many concurrent writers"
+    )
+
+
+def add_versions(
+    bucket_name: str, prefix: str, versions: Iterable[str]
+) -> List[str]:
+    """
+    Add versions to a collection manifest.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        prefix: Collection prefix (e.g. "datasets/de")
+        versions: Version entries to add
+
+    Returns:
+        Updated list of versions
+    """
+    new = set(versions)
+    return _update_index(bucket_name, prefix, lambda cur: cur | new)
+
+
+def remove_versions(
+    bucket_name: str, prefix: str, versions: Iterable[str]
+) -> List[str]:
+    """Remove versions from a collection manifest (e.g. after deletion)."""
+    gone = set(versions)
+    return _update_index(bucket_name, prefix, lambda cur: cur - gone)
+
+
+def record_versions(
+    bucket_name: str, prefix: str, versions: Iterable[str]
+) -> bool:
+    """
+    Register just-written versions in a collection manifest.
+
+    Manifest errors are logged rather than raised: the objects themselves
+    were saved, and the rebuild command can repair the manifest.
+
+    Returns:
+        True if the manifest was updated
+    """
+    try:
+        add_versions(bucket_name, prefix, versions)
+        return True
+    except Exception as e:
+        logger.error(
+            f"Failed to update gs://{bucket_name}/{index_blob_path(prefix)}: "
+            f"{e}"
+        )
+        return False
+
+
+def record_version_blob(bucket_name: str, blob_path: str) -> bool:
+    """
+    Register a just-written versioned object in its collection manifest.
+
+    Does nothing for paths outside the known collections.
+
+    Returns:
+        True if a manifest was updated
+    """
+    parsed = parse_version_blob(blob_path)
+    if parsed is None:
+        return False
+    prefix, version = parsed
+    return record_versions(bucket_name, prefix, [version])
+
+
+def scan_versions(bucket_name: str, prefix: str) -> List[str]:
+    """List a collection prefix and return the versions found in it."""
+    collection = _collection_for_prefix(prefix)
+    client = get_storage_client()
+    versions = set()
+    with track_gcs_op("version_index_scan"):
+        for blob in client.list_blobs(
+            bucket_name, prefix=f"{prefix.strip('/')}/"
+        ):
+            parsed = parse_version_blob(blob.name)
+            if parsed and parsed[0] == prefix.strip("/"):
+                versions.add(parsed[1])
+    logger.debug(
+        f"Scanned {len(versions)} versions under gs://{bucket_name}/{prefix} "
+        f"({collection.filename})"
+    )
+    return sorted(versions)
+
+
+def rebuild_version_index(bucket_name: str, prefix: str) -> List[str]:
+    """
+    Rebuild a collection manifest from a full listing of its prefix.
+
+    Returns:
+        Versions written to the manifest
+    """
+    # Scan after each manifest read: a save that lands during the scan
+    # bumps the generation, so the write fails and the scan is redone
+    return _update_index(
+        bucket_name, prefix, lambda _: set(scan_versions(bucket_name, prefix))
+    )
+
+
+def list_versions(bucket_name: str, prefix: str) -> List[str]:
+    """
+    Get the versions of a collection from its manifest.
+
+    Falls back to a listing (and writes the manifest) when the manifest
+    doesn't exist yet.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        prefix: Collection prefix (e.g. "metadata/universal")
+
+    Returns:
+        Sorted list of versions (including "latest" pointers if present)
+    """
+    _collection_for_prefix(prefix)
+    blob = (
+        get_storage_client().bucket(bucket_name).blob(index_blob_path(prefix))
+    )
+    versions, generation = _load(blob)
+    if generation:
+        return versions
+
+    # Nothing saved under this prefix yet: don't create a manifest, or the
+    # empty folder would show up as a country with data in folder listings
+    found = scan_versions(bucket_name, prefix)
+    if not found:
+        return []
+
+    logger.info(f"No manifest for gs://{bucket_name}/{prefix}; rebuilding")
+    try:
+        # Merge rather than overwrite: a save may have created the manifest
+        # since the scan, and its entries must survive
+        return add_versions(bucket_name, prefix, found)
+    except Exception as e:
+        logger.warning(f"Could not write manifest for {prefix}: {e}")
+        return found
+
+
+def rebuild_all_version_indexes(
+    bucket_name: str, dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Rebuild every collection manifest in a bucket.
+
+    Args:
+        bucket_name: Name of the GCS bucket
+        dry_run: Only report what would be written
+
+    Returns:
+        Mapping of collection prefix to number of versions
+    """
+    prefixes = []
+    for c in COLLECTIONS:
+        # One delimiter listing per level finds the scope folders
+        level = [c.root]
+        for _ in range(c.scope_depth):
+            level = [
+                f"{p}/{name}"
+                for p in level
+                for name in list_subdirs(bucket_name, f"{p}/", max_age=0)
+            ]
+        prefixes.extend(sorted(level))
+
+    result = {}
+    for prefix in prefixes:
+        if dry_run:
+            result[prefix] = len(scan_versions(bucket_name, prefix))
+        else:
+            result[prefix] = len(rebuild_version_index(bucket_name, prefix))
+        logger.info(f"{prefix}: {result[prefix]} versions")
+    return result
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark parquet decoding: plain to_pandas() vs the shared decoder.
+
+Builds a synthetic wide MMM table (daily rows per country, hundreds of
+numeric spend/impression/click columns plus a few categoricals), writes it
+to a local parquet file and times:
+
+- baseline:   pq.read_table(path).to_pandas()
+- decoder:    utils.parquet_decode.read_parquet(path)
+- arrow:      utils.parquet_decode.read_parquet(path, arrow_dtypes=True)
+
+Usage:
+    python scripts/benchmark_parquet_decode.py --days 1095 --countries 8 \\
+        --columns 400 --repeat 5
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from utils.parquet_decode import (  # noqa: E402
+    clear_type_plans,
+    get_type_plan_stats,
+    read_parquet,
+)
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def build_table(days: int, countries: int, columns: int) -> pa.Table:
+    """Synthetic wide MMM table: DATE x COUNTRY rows, numeric metrics."""
+    rng = np.random.default_rng(42)
+    dates = pd.date_range("2022-01-01", periods=days, freq="D")
+    n_rows = days * countries
+
+    data = {
+        "DATE": np.tile(dates.values, countries),
+        "COUNTRY": np.repeat(
+            [f"c{i:02d}" for i in range(countries)], days
+        ).astype(object),
+        "CAMPAIGN_TYPE": rng.choice(
+            ["brand", "performance", "retargeting"], n_rows
+        ).astype(object),
+    }
+    kinds = ["COST", "IMPRESSIONS", "CLICKS", "SESSIONS"]
+    for i in range(columns):
+        name = f"CHANNEL_{i // len(kinds):03d}_{kinds[i % len(kinds)]}"
+        if kinds[i % len(kinds)] == "COST":
+            data[name] = rng.gamma(2.0, 50.0, n_rows)
+        else:
+            data[name] = rng.poisson(200, n_rows).astype("int64")
+    return pa.Table.from_pandas(pd.DataFrame(data), preserve_index=False)
+
+
+def time_it(fn, repeat: int):
+    """Return (median seconds, last result) over ``repeat`` runs."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--days", type=int, default=1095)
+    parser.add_argument("--countries", type=int, default=8)
+    parser.add_argument("--columns", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    table = build_table(args.days, args.countries, args.columns)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "wide.parquet")
+        pq.write_table(table, path)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        logger.info(
+            f"Table: {table.num_rows:,} rows x {table.num_columns} columns "
+            f"({size_mb:.1f} MB parquet)"
+        )
+
+        clear_type_plans()
+        cases = {
+            "baseline to_pandas()": lambda: pq.read_table(path).to_pandas(),
+            "decoder": lambda: read_parquet(path),
+            "decoder arrow_dtypes": lambda: read_parquet(
+                path, arrow_dtypes=True
+            ),
+        }
+
+        baseline = None
+        for label, fn in cases.items():
+            seconds, df = time_it(fn, args.repeat)
+            mem_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+            if baseline is None:
+                baseline = seconds
+            logger.info(
+                f"{label:<24} {seconds * 1000:8.1f} ms  "
+                f"({baseline / seconds:4.2f}x)  {mem_mb:8.1f} MB in pandas"
+            )
+
+        logger.info(f"Type plan cache: {get_type_plan_stats()}")
+
+
+if __name__ == "__main__":
+    main()
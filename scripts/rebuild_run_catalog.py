@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Rebuild the run catalog from a full listing of robyn/.
+
+Result pages read the catalog (RUN_CATALOG_PATH, one JSON line per
+robyn/<rev>/<country>/<stamp> run) instead of listing every run object.
+The app keeps it up to date incrementally; run this once for buckets that
+predate it, or after deleting runs outside the app.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from utils.run_catalog import rebuild_run_catalog  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Rebuild the robyn/ run catalog",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python scripts/rebuild_run_catalog.py --bucket mmm-app-output
+        """,
+    )
+    parser.add_argument(
+        "--bucket",
+        default=os.getenv("GCS_BUCKET", "mmm-app-output"),
+        help="GCS bucket name (default: mmm-app-output)",
+    )
+    args = parser.parse_args()
+
+    rows = rebuild_run_catalog(args.bucket)
+    revs = {r["rev"] for r in rows}
+    logger.info(
+        f"Wrote {len(rows)} runs ({len(revs)} revisions) to the catalog "
+        f"of gs://{args.bucket}"
+    )
+
+
+if __name__ == "__main__":
+    main()
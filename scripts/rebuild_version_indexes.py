@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Rebuild the version manifests (_index.json) of an existing bucket.
+
+The app keeps one manifest per versioned prefix so version dropdowns need
+a single GET instead of a listing:
+
+  datasets/<country>/_index.json
+  mapped-datasets/<country>/_index.json
+  metadata/<country|universal>/_index.json
+  training_data/_index.json
+
+New saves update the manifests automatically. Run this once for buckets
+that predate them, or after deleting versions outside the app.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from utils.version_index import rebuild_all_version_indexes  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Rebuild GCS version manifests (_index.json)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Show what would be written
+  python scripts/rebuild_version_indexes.py --dry-run
+
+  # Rebuild all manifests
+  python scripts/rebuild_version_indexes.py --bucket mmm-app-output
+        """,
+    )
+    parser.add_argument(
+        "--bucket",
+        default=os.getenv("GCS_BUCKET", "mmm-app-output"),
+        help="GCS bucket name (default: mmm-app-output)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only scan and report version counts",
+    )
+    args = parser.parse_args()
+
+    result = rebuild_all_version_indexes(args.bucket, dry_run=args.dry_run)
+    action = "Would write" if args.dry_run else "Wrote"
+    logger.info(
+        f"{action} {len(result)} manifests "
+        f"({sum(result.values())} versions) in gs://{args.bucket}"
+    )
+
+
+if __name__ == "__main__":
+    main()
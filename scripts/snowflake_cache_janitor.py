@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Delete expired query results from the GCS cache.
+
+Results under cache/snowflake-queries/ (or cache/bigquery-queries/ with
+--prefix) are only deleted when a lookup finds them past their TTL plus
+the stale window, so results that are never asked for again stay forever.
+This script:
+
+  1. Reconciles the cache ledger (_ledger.json) with a listing of the prefix
+  2. Deletes results older than the TTL plus the stale window
+  3. Evicts least recently used results beyond the size budget
+
+Deletions are sent in batch requests. Run it on a schedule, e.g. daily.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from config import settings  # noqa: E402
+from utils.cache_ledger import DELETE_BATCH_SIZE, run_janitor  # noqa: E402
+from utils.snowflake_cache import (  # noqa: E402
+    CACHE_PREFIX,
+    GCS_TTL,
+    STALE_WINDOW,
+)
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Size budget setting of each query cache prefix
+PREFIX_MAX_MB = {
+    CACHE_PREFIX: "SF_CACHE_GCS_MAX_MB",
+    "cache/bigquery-queries/": "BQ_CACHE_GCS_MAX_MB",
+}
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Delete expired query results from the GCS cache",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Show what would be deleted
+  python scripts/snowflake_cache_janitor.py --dry-run
+
+  # Delete results older than 2 days and keep the cache under 1 GB
+  python scripts/snowflake_cache_janitor.py --max-age-hours 48 --max-mb 1024
+
+  # Expire the BigQuery query cache
+  python scripts/snowflake_cache_janitor.py --prefix cache/bigquery-queries/
+        """,
+    )
+    parser.add_argument(
+        "--bucket",
+        default=os.getenv("GCS_BUCKET", "mmm-app-output"),
+        help="GCS bucket name (default: mmm-app-output)",
+    )
+    parser.add_argument(
+        "--prefix",
+        default=CACHE_PREFIX,
+        help=f"Cache prefix (default: {CACHE_PREFIX})",
+    )
+    parser.add_argument(
+        "--max-age-hours",
+        type=float,
+        default=(GCS_TTL + STALE_WINDOW) / 3600,
+        help="Delete results cached longer ago than this (default: TTL "
+        "plus stale window)",
+    )
+    parser.add_argument(
+        "--max-mb",
+        type=int,
+        default=None,
+        help="Size budget in MB (default: SF_CACHE_GCS_MAX_MB, or "
+        "BQ_CACHE_GCS_MAX_MB for the BigQuery prefix; unbounded for "
+        "other prefixes)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DELETE_BATCH_SIZE,
+        help="Deletions per batch request (max 100)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be deleted",
+    )
+    args = parser.parse_args()
+
+    prefix = args.prefix.rstrip("/") + "/"
+    max_mb = args.max_mb
+    if max_mb is None and prefix in PREFIX_MAX_MB:
+        max_mb = getattr(settings, PREFIX_MAX_MB[prefix])
+
+    result = run_janitor(
+        args.bucket,
+        prefix,
+        max_age_seconds=args.max_age_hours * 3600,
+        max_bytes=max_mb * 1024 * 1024 if max_mb is not None else None,
+        batch_size=min(args.batch_size, DELETE_BATCH_SIZE),
+        dry_run=args.dry_run,
+    )
+    action = "Would delete" if args.dry_run else "Deleted"
+    logger.info(
+        f"{action} {result['expired']} expired and {result['evicted']} "
+        f"evicted results in gs://{args.bucket}/{prefix} "
+        f"({result['bytes_left'] / 1024 / 1024:.1f} MB left; ledger: "
+        f"{result['added']} added, {result['dropped']} dropped)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+In-memory GCS bucket shared by the storage tests.
+
+Objects keep a generation, metadata and update time. Writes honour
+if_generation_match, deletes inside client.batch() are recorded per batch
+and listings support delimiters.
+"""
+
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+from unittest.mock import MagicMock
+
+from google.api_core import exceptions
+
+
+class StoredObject(NamedTuple):
+    generation: int
+    data: bytes
+    metadata: Optional[dict]
+    updated: datetime
+
+
+class Listing(list):
+    """list_blobs result: the blobs, plus the delimiter prefixes."""
+
+    def __init__(self, blobs, prefixes):
+        super().__init__(blobs)
+        self.prefixes = prefixes
+        self.pages = iter([[]])
+
+
+class FakeBucket:
+    """In-memory bucket with generations, listings and batch deletes."""
+
+    # Raised errors; override if the module under test imported other classes
+    NotFound = exceptions.NotFound
+    PreconditionFailed = exceptions.PreconditionFailed
+
+    def __init__(self):
+        self.objects = {}  # path -> StoredObject
+        self.listed = []  # (prefix, delimiter) of each listing
+        self.batches = []  # paths deleted in each client.batch()
+        self.downloads = 0  # download_to_filename calls
+        self.download_error = None  # raised by download_to_filename
+        self.on_write = None  # hook to simulate a concurrent writer
+        self._batch = None
+
+    def put(self, path, data=b"x", metadata=None, updated=None):
+        """Write an object, bumping its generation."""
+        gen = self.generation(path) + 1
+        updated = updated or datetime.now(timezone.utc)
+        self.objects[path] = StoredObject(gen, data, metadata, updated)
+
+    def generation(self, path):
+        """Current generation of an object (0 if missing)."""
+        obj = self.objects.get(path)
+        return obj.generation if obj else 0
+
+    def client(self):
+        """Storage client whose bucket() is this bucket."""
+        client = MagicMock()
+        client.bucket.return_value = self
+        client.list_blobs.side_effect = self.list_blobs
+        client.batch.side_effect = self.batch
+        return client
+
+    def blob(self, path):
+        store = self
+        blob = MagicMock()
+        blob.name = path
+        blob.generation = blob.size = blob.metadata = None
+        blob.updated = blob.time_created = None
+        if path in self.objects:
+            obj = self.objects[path]
+            blob.generation, blob.size = obj.generation, len(obj.data)
+            blob.metadata = obj.metadata
+            blob.updated = blob.time_created = obj.updated
+
+        def download():
+            if path not in store.objects:
+                raise store.NotFound(path)
+            blob.generation = store.generation(path)
+            return store.objects[path].data
+
+        def download_to_filename(filename, if_generation_match=None):
+            store.downloads += 1
+            if store.download_error is not None:
+                # Like the client: the partial file is removed on errors
+                os.remove(filename)
+                raise store.download_error
+            with open(filename, "wb") as f:
+                f.write(download())
+            # The client sets the file's mtime to blob.updated
+            stamp = store.objects[path].updated.timestamp()
+            os.utime(filename, (stamp, stamp))
+
+        def write(data, if_generation_match):
+            if store.on_write:
+                hook, store.on_write = store.on_write, None
+                hook()
+            if (
+                if_generation_match is not None
+                and if_generation_match != store.generation(path)
+            ):
+                raise store.PreconditionFailed(path)
+            if isinstance(data, str):
+                data = data.encode()
+            store.put(
+                path, data, blob.metadata, updated=datetime.now(timezone.utc)
+            )
+            blob.generation = store.generation(path)
+
+        def upload_from_string(
+            data, content_type=None, if_generation_match=None
+        ):
+            write(data, if_generation_match)
+
+        def upload_from_file(
+            buffer, content_type=None, if_generation_match=None
+        ):
+            write(buffer.read(), if_generation_match)
+
+        def delete():
+            if store._batch is not None:
+                store._batch.append(path)
+            store.objects.pop(path, None)
+
+        blob.download_as_bytes.side_effect = download
+        blob.download_to_filename.side_effect = download_to_filename
+        blob.upload_from_string.side_effect = upload_from_string
+        blob.upload_from_file.side_effect = upload_from_file
+        blob.delete.side_effect = delete
+        return blob
+
+    def get_blob(self, path):
+        return self.blob(path) if path in self.objects else None
+
+    def list_blobs(self, bucket_name=None, prefix="", delimiter=None):
+        prefix = prefix or ""
+        self.listed.append((prefix, delimiter))
+        names = sorted(p for p in self.objects if p.startswith(prefix))
+        prefixes = set()
+        if delimiter:
+            prefixes = {
+                prefix + n[len(prefix) :].split(delimiter)[0] + delimiter
+                for n in names
+                if delimiter in n[len(prefix) :]
+            }
+            names = [n for n in names if delimiter not in n[len(prefix) :]]
+        return Listing([self.blob(n) for n in names], prefixes)
+
+    @contextmanager
+    def batch(self, raise_exception=True):
+        self._batch = []
+        yield
+        self.batches.append(self._batch)
+        self._batch = None
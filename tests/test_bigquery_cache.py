@@ -0,0 +1,116 @@
+"""
+Tests for the BigQuery query cache and its dry-run cost checks.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils import bigquery_cache, snowflake_cache
+from utils.bigquery_cache import QueryTooLarge, format_bytes, run_query
+from utils.query_cache import get_source_stats
+
+GB = 1024**3
+
+
+def _client(project="proj", estimate=2 * GB):
+    """BigQuery client whose dry runs report ``estimate`` bytes."""
+    client = MagicMock()
+    client.project = project
+    client.executed = []
+
+    def query(sql, job_config=None):
+        job = MagicMock()
+        job.total_bytes_processed = estimate
+        if not job_config.dry_run:
+            client.executed.append((sql, job_config))
+            job.result.return_value.to_arrow.return_value = pa.table(
+                {"COUNTRY": ["DE", "FR"], "SPEND": [1.0, 2.0]}
+            )
+        return job
+
+    client.query.side_effect = query
+    return client
+
+
+class TestBigQueryCache(unittest.TestCase):
+    def setUp(self):
+        cache = bigquery_cache._query_cache
+        bucket, cache.bucket = cache.bucket, None
+        self.addCleanup(setattr, cache, "bucket", bucket)
+        bigquery_cache.clear_bigquery_cache()
+        self.addCleanup(bigquery_cache.clear_bigquery_cache)
+
+    def test_identical_query_served_from_cache(self):
+        client = _client()
+        estimates = []
+        before = bigquery_cache.get_cache_stats()
+
+        first = run_query(
+            client, "SELECT * FROM ds.t", on_estimate=estimates.append
+        )
+        second = run_query(
+            client, "SELECT *\n  FROM ds.t;", on_estimate=estimates.append
+        )
+
+        self.assertEqual(len(client.executed), 1)
+        self.assertEqual(client.query.call_count, 2)  # one dry run, one job
+        self.assertEqual(estimates, [2 * GB])
+        self.assertEqual(first.attrs["bytes_scanned"], 2 * GB)
+        self.assertEqual(second["SPEND"].tolist(), [1.0, 2.0])
+        after = bigquery_cache.get_cache_stats()
+        self.assertEqual(after["misses"], before["misses"] + 1)
+        self.assertEqual(after["bytes_saved"], before["bytes_saved"] + 2 * GB)
+
+    def test_limit_enforced_on_job(self):
+        client = _client()
+
+        run_query(client, "SELECT 1", max_bytes=5 * GB)
+
+        _, job_config = client.executed[0]
+        self.assertEqual(job_config.maximum_bytes_billed, 5 * GB)
+
+    def test_query_over_limit_is_refused_and_not_cached(self):
+        client = _client(estimate=80 * GB)
+
+        with self.assertRaises(QueryTooLarge) as ctx:
+            run_query(client, "SELECT * FROM ds.huge", max_bytes=10 * GB)
+
+        self.assertIn("80.0 GB", str(ctx.exception))
+        self.assertEqual(client.executed, [])
+        with self.assertRaises(QueryTooLarge):
+            run_query(client, "SELECT * FROM ds.huge", max_bytes=10 * GB)
+
+    def test_cache_is_scoped_by_project(self):
+        run_query(_client("a"), "SELECT * FROM ds.t")
+        other = _client("b")
+
+        run_query(other, "SELECT * FROM ds.t")
+
+        self.assertEqual(len(other.executed), 1)
+
+    def test_stats_per_source(self):
+        run_query(_client(), "SELECT * FROM ds.t")
+        run_query(_client(), "SELECT * FROM ds.t")
+
+        stats = {s["source"]: s for s in get_source_stats()}
+
+        self.assertEqual(
+            stats["snowflake"]["misses"],
+            snowflake_cache.get_cache_stats()["misses"],
+        )
+        self.assertGreater(stats["bigquery"]["hit_rate"], 0)
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(1536), "1.5 KB")
+        self.assertEqual(format_bytes(3 * 1024**5), "3072.0 TB")
+
+
+if __name__ == "__main__":
+    unittest.main()
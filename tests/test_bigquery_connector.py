@@ -1,25 +1,68 @@
 """
 Tests for BigQuery connector utilities.
 
-This module tests the BigQuery connection and query functionality.
+This module tests the BigQuery connection and query functionality, the
+client cache, previews and Storage Read API reads.
 """
 
 import json
 import unittest
 from unittest.mock import MagicMock, patch
 
+import pyarrow as pa
+
+from app.utils import bigquery_connector as bq
 from app.utils.bigquery_connector import (
     create_bigquery_client,
     execute_query,
     load_credentials_from_secret_manager,
 )
 
+CREDS = {"type": "service_account", "client_email": "a@b.c"}
+SCHEMA = pa.schema([("COUNTRY", pa.string()), ("SPEND", pa.float64())])
+
+
+def _batch(n, start=0):
+    return pa.RecordBatch.from_pydict(
+        {"COUNTRY": ["DE"] * n, "SPEND": [float(start + i) for i in range(n)]},
+        schema=SCHEMA,
+    )
+
+
+class FakeReadClient:
+    """Storage Read API client serving fixed pages per stream."""
+
+    def __init__(self, streams):
+        self.streams = streams  # list of lists of RecordBatches
+        self.requests = []
+
+    def create_read_session(self, parent, read_session, max_stream_count):
+        self.requests.append((parent, read_session, max_stream_count))
+        session = MagicMock()
+        session.streams = [
+            MagicMock(name=f"s{i}") for i in range(len(self.streams))
+        ]
+        for i, stream in enumerate(session.streams):
+            stream.name = f"stream-{i}"
+        session.arrow_schema.serialized_schema = SCHEMA.serialize().to_pybytes()
+        return session
+
+    def read_rows(self, name):
+        pages = self.streams[int(name.split("-")[1])]
+        reader = MagicMock()
+        reader.rows.return_value.pages = [
+            MagicMock(to_arrow=MagicMock(return_value=b)) for b in pages
+        ]
+        return reader
+
 
 class TestBigQueryConnector(unittest.TestCase):
     """Test cases for BigQuery connector functions."""
 
     def setUp(self):
         """Set up test fixtures."""
+        bq.clear_client_cache()
+        self.addCleanup(bq.clear_client_cache)
         self.test_project_id = "test-project"
         self.test_credentials = {
             "type": "service_account",
@@ -146,5 +189,151 @@ class TestBigQueryConnector(unittest.TestCase):
         self.assertIsNone(result)
 
 
+class TestClientCache(unittest.TestCase):
+    def setUp(self):
+        bq.clear_client_cache()
+        self.addCleanup(bq.clear_client_cache)
+        patches = [
+            patch.object(
+                bq.service_account.Credentials, "from_service_account_info"
+            ),
+            patch.object(
+                bq.bigquery, "Client", side_effect=lambda **kw: MagicMock()
+            ),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_same_credentials_reuse_client(self):
+        first = bq.create_bigquery_client("p", credentials_dict=CREDS)
+        # Same credentials, different key order
+        second = bq.create_bigquery_client(
+            "p", credentials_json=json.dumps(dict(reversed(CREDS.items())))
+        )
+        other = bq.create_bigquery_client("q", credentials_dict=CREDS)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+    @patch.object(
+        bq, "load_credentials_from_secret_manager", return_value=CREDS
+    )
+    def test_secret_loaded_once(self, load):
+        first = bq.create_bigquery_client("p", secret_id="bq-creds")
+        second = bq.create_bigquery_client("p", secret_id="bq-creds")
+
+        self.assertIs(first, second)
+        load.assert_called_once_with("bq-creds")
+
+    def test_requires_credentials(self):
+        with self.assertRaises(RuntimeError):
+            bq.create_bigquery_client("p")
+
+
+class TestReads(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.project = "billing"
+        self.client.get_table.return_value.table_type = "TABLE"
+
+    def test_preview_uses_list_rows(self):
+        self.client.list_rows.return_value.to_arrow.return_value = (
+            pa.Table.from_batches([_batch(3)])
+        )
+
+        df = bq.get_table_preview(self.client, "`proj.ds.t`", limit=3)
+
+        self.client.query.assert_not_called()
+        self.client.list_rows.assert_called_once_with(
+            "proj.ds.t", max_results=3
+        )
+        self.assertEqual(len(df), 3)
+
+    def test_storage_read_projects_and_filters(self):
+        fake = FakeReadClient([[_batch(2), _batch(2, 2)], [_batch(1, 4)]])
+
+        with patch.object(bq, "_read_client", return_value=fake):
+            df = bq.read_table(
+                self.client,
+                "ds.t",
+                columns=["COUNTRY", "SPEND"],
+                row_restriction="COUNTRY = 'DE'",
+                max_streams=2,
+            )
+            batches = list(bq.iter_record_batches(self.client, "ds.t"))
+
+        parent, session, streams = fake.requests[0]
+        self.assertEqual(parent, "projects/billing")
+        self.assertEqual(session.table, "projects/billing/datasets/ds/tables/t")
+        self.assertEqual(
+            list(session.read_options.selected_fields), ["COUNTRY", "SPEND"]
+        )
+        self.assertEqual(session.read_options.row_restriction, "COUNTRY = 'DE'")
+        self.assertEqual(streams, 2)
+        self.assertEqual(df["SPEND"].tolist(), [0.0, 1.0, 2.0, 3.0, 4.0])
+        self.assertEqual([b.num_rows for b in batches], [2, 2, 1])
+        self.client.query.assert_not_called()
+
+    def test_empty_read_keeps_schema(self):
+        fake = FakeReadClient([])
+
+        with patch.object(bq, "_read_client", return_value=fake):
+            df = bq.read_table(self.client, "p.ds.t")
+
+        self.assertEqual(list(df.columns), ["COUNTRY", "SPEND"])
+        self.assertTrue(df.empty)
+
+    def test_falls_back_to_query_without_storage_api(self):
+        result = self.client.query.return_value.result.return_value
+        result.to_arrow.return_value = pa.Table.from_batches([_batch(2)])
+
+        with patch.object(bq, "_read_client", return_value=None):
+            df = bq.read_table(
+                self.client, "p.ds.t", ["SPEND"], "COUNTRY = 'DE'"
+            )
+
+        self.client.query.assert_called_once_with(
+            "SELECT `SPEND` FROM `p.ds.t` WHERE COUNTRY = 'DE'"
+        )
+        self.assertEqual(len(df), 2)
+
+    def test_view_preview_uses_query(self):
+        self.client.get_table.return_value.table_type = "VIEW"
+        result = self.client.query.return_value.result.return_value
+        result.to_arrow.return_value = pa.Table.from_batches([_batch(3)])
+
+        df = bq.get_table_preview(self.client, "proj.ds.v", limit=3)
+
+        self.client.list_rows.assert_not_called()
+        self.client.query.assert_called_once_with(
+            "SELECT * FROM `proj.ds.v` LIMIT 3"
+        )
+        self.assertEqual(len(df), 3)
+
+    def test_view_read_uses_query(self):
+        self.client.get_table.return_value.table_type = "VIEW"
+        result = self.client.query.return_value.result.return_value
+        result.to_arrow.return_value = pa.Table.from_batches([_batch(2)])
+        result.to_arrow_iterable.return_value = iter([_batch(2)])
+        fake = FakeReadClient([[_batch(5)]])
+
+        with patch.object(bq, "_read_client", return_value=fake):
+            df = bq.read_table(self.client, "ds.v", ["SPEND"])
+            batches = list(bq.iter_record_batches(self.client, "ds.v"))
+
+        self.assertEqual(fake.requests, [])
+        self.assertEqual(
+            self.client.query.call_args_list[0].args,
+            ("SELECT `SPEND` FROM `billing.ds.v`",),
+        )
+        self.assertEqual(len(df), 2)
+        self.assertEqual([b.num_rows for b in batches], [2])
+
+    def test_invalid_table_id(self):
+        with self.assertRaises(ValueError):
+            bq.read_table(self.client, "just_a_table")
+
+
 if __name__ == "__main__":
     unittest.main()
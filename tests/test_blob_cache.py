@@ -0,0 +1,129 @@
+"""
+Tests for the generation-keyed on-disk blob cache.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from google.api_core.exceptions import NotFound
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from fake_gcs import FakeBucket
+from utils import blob_cache
+from utils.blob_cache import (
+    cached_blob_path,
+    clear_blob_cache,
+    get_blob_cache_stats,
+    read_cached_blob,
+)
+
+# blob.updated of objects older than every cache entry
+UPDATED = datetime.fromtimestamp(1, timezone.utc)
+
+
+class TestBlobCache(unittest.TestCase):
+    """Tests for cache hits, generation changes and eviction."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.bucket = FakeBucket()
+        client = self.bucket.client()
+        self.patches = [
+            patch.object(
+                blob_cache.settings, "BLOB_CACHE_DIR", self.tmpdir.name
+            ),
+            patch.object(blob_cache.settings, "BLOB_CACHE_MAX_MB", 1),
+            patch("utils.blob_cache.get_storage_client", return_value=client),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmpdir.cleanup()
+
+    def test_second_read_is_served_from_disk(self):
+        """An unchanged generation is not downloaded again."""
+        self.bucket.put("a.json", b'{"x": 1}')
+
+        self.assertEqual(read_cached_blob("b", "a.json"), b'{"x": 1}')
+        self.assertEqual(read_cached_blob("b", "a.json"), b'{"x": 1}')
+        self.assertEqual(self.bucket.downloads, 1)
+
+    def test_new_generation_is_downloaded(self):
+        """A changed object is fetched again and the old copy dropped."""
+        self.bucket.put("a.json", b"v1")
+        first = cached_blob_path("b", "a.json")
+
+        self.bucket.put("a.json", b"v2")
+        second = cached_blob_path("b", "a.json")
+
+        self.assertNotEqual(first, second)
+        self.assertFalse(os.path.exists(first))
+        self.assertEqual(read_cached_blob("b", "a.json"), b"v2")
+        self.assertEqual(self.bucket.downloads, 2)
+
+    def test_missing_blob_raises(self):
+        """Missing objects raise FileNotFoundError."""
+        with self.assertRaises(FileNotFoundError):
+            cached_blob_path("b", "nope.json")
+
+    def test_download_error_is_not_masked(self):
+        """Errors after the client removed the partial file propagate."""
+        self.bucket.put("a.json", b"v1")
+        self.bucket.download_error = NotFound("gone")
+
+        with self.assertRaises(NotFound):
+            cached_blob_path("b", "a.json")
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_new_entry_is_most_recently_used(self):
+        """A fresh download isn't evicted first for an old blob.updated."""
+        chunk = b"x" * (400 * 1024)
+        for name in ("one", "two", "three"):
+            self.bucket.put(name, chunk, updated=UPDATED)
+
+        first = cached_blob_path("b", "one")
+        os.utime(first, (2, 2))
+        second = cached_blob_path("b", "two")
+        cached_blob_path("b", "three")
+
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+    def test_lru_eviction_under_budget(self):
+        """Least recently used entries are evicted above the size budget."""
+        chunk = b"x" * (400 * 1024)
+        for name in ("one", "two", "three"):
+            self.bucket.put(name, chunk)
+
+        first = cached_blob_path("b", "one")
+        cached_blob_path("b", "two")
+        os.utime(first, (0, 0))  # make "one" the least recently used
+        cached_blob_path("b", "three")
+
+        self.assertFalse(os.path.exists(first))
+        stats = get_blob_cache_stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertGreaterEqual(stats["evictions"], 1)
+
+    def test_clear_blob_cache(self):
+        """Clearing removes all entries."""
+        self.bucket.put("a", b"1")
+        self.bucket.put("b", b"2")
+        cached_blob_path("b", "a")
+        cached_blob_path("b", "b")
+
+        self.assertEqual(clear_blob_cache(), 2)
+        self.assertEqual(get_blob_cache_stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,14 +2,24 @@
 Tests for caching utilities.
 """
 
+import threading
 import time
 import unittest
 
+import numpy as np
+import pandas as pd
+
 from app.utils.cache import (
+    MemoryCache,
     cached,
     clear_cache,
+    estimate_size,
+    gcs_tag,
     get_cache_stats,
     invalidate_on_write,
+    publish_invalidation,
+    subscribe_invalidations,
+    tags_match,
 )
 
 
@@ -76,6 +86,25 @@ class TestCaching(unittest.TestCase):
         self.assertEqual(result2, 10)
         self.assertEqual(call_count["count"], 2)
 
+    def test_cached_function_dataframe_args(self):
+        """Frames with the same repr but different content don't collide."""
+        call_count = {"count": 0}
+
+        @cached(ttl_seconds=10)
+        def total(df, options=None):
+            call_count["count"] += 1
+            return int(df["x"].sum())
+
+        a = pd.DataFrame({"x": np.arange(1000)})
+        b = a.copy()
+        b.loc[500, "x"] = 0
+
+        self.assertEqual(total(a), int(a["x"].sum()))
+        self.assertEqual(total(b), int(b["x"].sum()))
+        self.assertEqual(total(a.copy(), options={"k": 1}), int(a["x"].sum()))
+        total(a.copy(), options={"k": 1})
+        self.assertEqual(call_count["count"], 3)
+
     def test_clear_cache_all(self):
         """Test clearing all cache entries."""
 
@@ -170,5 +199,153 @@ class TestCaching(unittest.TestCase):
         self.assertEqual(stats["size"], 0)
 
 
+class TestMemoryCache(unittest.TestCase):
+    """Tests for the byte budget, namespaces and sweeping."""
+
+    def _entry(self, value, age=0):
+        return {"timestamp": time.time() - age, "value": value}
+
+    def test_lru_eviction_within_budget(self):
+        cache = MemoryCache(max_bytes=250, sweep_seconds=0)
+        cache.put("a", self._entry(b"x" * 100))
+        cache.put("b", self._entry(b"x" * 100))
+        cache.get("a")  # b is now least recently used
+
+        cache.put("c", self._entry(b"x" * 100))
+
+        self.assertEqual(sorted(cache.keys()), ["a", "c"])
+        self.assertEqual(cache.total_bytes, 200)
+        self.assertEqual(cache.namespace_stats()["default"]["evictions"], 1)
+
+    def test_entry_larger_than_budget_not_stored(self):
+        cache = MemoryCache(max_bytes=50, sweep_seconds=0)
+        cache.put("small", self._entry(b"x" * 10))
+
+        self.assertFalse(cache.put("big", self._entry(b"x" * 100)))
+        self.assertEqual(cache.keys(), ["small"])
+
+    def test_namespaces_cleared_and_counted_separately(self):
+        cache = MemoryCache(max_bytes=10_000, sweep_seconds=0)
+        cache.put("k1", self._entry("a"), namespace="snowflake")
+        cache.put("k2", self._entry("b"), namespace="snowflake")
+        cache.put("k3", self._entry("c"), namespace="list_blobs")
+
+        self.assertEqual(cache.namespace_stats()["snowflake"]["entries"], 2)
+        self.assertEqual(cache.clear(namespace="snowflake"), 2)
+        self.assertEqual(cache.keys(), ["k3"])
+        self.assertEqual(cache.clear(pattern="list_"), 1)
+
+    def test_sweep_drops_expired_entries(self):
+        cache = MemoryCache(max_bytes=10_000, sweep_seconds=0)
+        cache.put("old", self._entry("a", age=20), ttl=10)
+        cache.put("new", self._entry("b"), ttl=10)
+        cache.put("forever", self._entry("c", age=1000))
+
+        self.assertEqual(cache.sweep(), 1)
+        self.assertEqual(sorted(cache.keys()), ["forever", "new"])
+        self.assertEqual(cache.namespace_stats()["default"]["expirations"], 1)
+
+    def test_dataframe_size_from_arrow_buffers(self):
+        df = pd.DataFrame(
+            {
+                "x": np.arange(10_000, dtype="float64"),
+                "s": ["abcd"] * 10_000,
+            }
+        )
+
+        size = estimate_size(df)
+
+        # 80 KB of floats plus ~40 KB of string data and 40 KB of offsets
+        self.assertGreater(size, 150_000)
+        self.assertLess(size, 250_000)
+        self.assertLess(estimate_size(df.head(10)), size / 100)
+
+    def test_concurrent_puts_stay_within_budget(self):
+        cache = MemoryCache(max_bytes=5_000, sweep_seconds=0)
+
+        def worker(n):
+            for i in range(200):
+                cache.put(f"{n}-{i}", self._entry(b"x" * 100))
+                cache.get(f"{n}-{i // 2}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertLessEqual(cache.total_bytes, 5_000)
+        self.assertEqual(cache.total_bytes, 100 * len(cache))
+
+    def test_cached_functions_get_own_namespace(self):
+        clear_cache()
+
+        @cached(ttl_seconds=10)
+        def load_rows(x):
+            return [x] * 3
+
+        load_rows(1)
+
+        stats = get_cache_stats()
+        self.assertEqual(stats["namespaces"]["load_rows"]["entries"], 1)
+        self.assertGreater(stats["total_bytes"], 0)
+        self.assertEqual(clear_cache(pattern="load_rows"), 1)
+
+
+class TestTaggedInvalidation(unittest.TestCase):
+    """Tests for dependency-tagged invalidation."""
+
+    def setUp(self):
+        clear_cache()
+
+    def test_tags_match_globs_on_either_side(self):
+        listing = gcs_tag("b", "metadata/de/*")
+        self.assertTrue(tags_match(listing, "gcs://b/metadata/de/x.json"))
+        self.assertFalse(tags_match(listing, "gcs://b/metadata/fr/x.json"))
+        self.assertTrue(tags_match("gcs://b/metadata/de/x.json", listing))
+        self.assertTrue(tags_match(listing, "gcs://b/metadata/*"))
+
+    def test_only_dependent_entries_are_dropped(self):
+        calls = []
+
+        @cached(ttl_seconds=60, tags=lambda country: [f"gcs://b/{country}/*"])
+        def load(country):
+            calls.append(country)
+            return country.upper()
+
+        load("de")
+        load("fr")
+        self.assertEqual(publish_invalidation("gcs://b/de/mapping.json"), 1)
+        load("de")
+        load("fr")
+
+        self.assertEqual(calls, ["de", "fr", "de"])
+        stats = get_cache_stats()["namespaces"]["load"]
+        self.assertEqual(stats["invalidations"], 1)
+
+    def test_invalidate_on_write_with_tags(self):
+        @cached(ttl_seconds=60, tags=lambda name: [f"gcs://b/{name}"])
+        def read(name):
+            return name
+
+        @invalidate_on_write(tags=lambda name: [f"gcs://b/{name}"])
+        def write(name):
+            return name
+
+        read("a.json")
+        read("b.json")
+        write("a.json")
+
+        self.assertEqual(get_cache_stats()["size"], 1)
+
+    def test_listeners_are_notified(self):
+        seen = []
+        subscribe_invalidations(seen.append)
+
+        publish_invalidation("sf://DB.S.T")
+
+        self.assertIn(["sf://DB.S.T"], seen)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,159 @@
+"""
+Tests for the GCS cache ledger: bookkeeping, LRU eviction and the janitor.
+"""
+
+import json
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from fake_gcs import FakeBucket
+from utils import cache_ledger
+from utils.cache_ledger import CacheLedger, lru_victims, run_janitor
+
+PREFIX = "cache/snowflake-queries/"
+LEDGER = f"{PREFIX}_ledger.json"
+
+
+class FakeStore(FakeBucket):
+    def ledger(self):
+        return json.loads(self.objects[LEDGER].data)["entries"]
+
+
+class LedgerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = FakeStore()
+        p = patch.object(
+            cache_ledger, "get_storage_client", return_value=self.store.client()
+        )
+        p.start()
+        self.addCleanup(p.stop)
+        cache_ledger._ledgers.clear()
+
+    def _write(self, ledger, key, size):
+        self.store.put(f"{PREFIX}{key}", b"x" * size)
+        return ledger.record_write(key, size)
+
+
+class TestCacheLedger(LedgerTestCase):
+    def test_records_size_access_and_hits(self):
+        ledger = CacheLedger("b", PREFIX)
+        self._write(ledger, "a.parquet", 10)
+        self._write(ledger, "b.parquet", 5)
+
+        ledger.record_hit("a.parquet")
+        ledger.record_hit("a.parquet")
+
+        self.assertEqual(
+            ledger.stats(),
+            {"count": 2, "total_bytes": 15, "hits": 2, "max_bytes": None},
+        )
+        # Hits are held until the next flush
+        self.assertEqual(self.store.ledger()["a.parquet"]["hits"], 0)
+        ledger.flush()
+        stored = self.store.ledger()["a.parquet"]
+        self.assertEqual((stored["size"], stored["hits"]), (10, 2))
+        self.assertGreaterEqual(stored["last_access"], stored["created"])
+
+    def test_hits_flushed_after_interval(self):
+        ledger = CacheLedger("b", PREFIX)
+        self._write(ledger, "a.parquet", 10)
+        ledger._flushed_at = time.time() - 3600
+
+        ledger.record_hit("a.parquet")
+
+        self.assertEqual(self.store.ledger()["a.parquet"]["hits"], 1)
+
+    def test_lru_eviction_over_budget(self):
+        ledger = CacheLedger("b", PREFIX, max_bytes=25)
+        self._write(ledger, "old.parquet", 10)
+        self._write(ledger, "used.parquet", 10)
+        ledger.record_hit("old.parquet")  # now more recent than used
+
+        evicted = self._write(ledger, "new.parquet", 10)
+
+        self.assertEqual(evicted, ["used.parquet"])
+        self.assertNotIn(f"{PREFIX}used.parquet", self.store.objects)
+        self.assertEqual(
+            sorted(self.store.ledger()), ["new.parquet", "old.parquet"]
+        )
+
+    def test_lru_victims_keeps_new_entry(self):
+        entries = {
+            "a": {"size": 50, "last_access": 1},
+            "b": {"size": 10, "last_access": 2},
+        }
+
+        self.assertEqual(lru_victims(entries, 40, keep={"a"}), ["b"])
+        self.assertEqual(lru_victims(entries, 100), [])
+
+    def test_concurrent_ledgers_merge(self):
+        first = CacheLedger("b", PREFIX)
+        second = CacheLedger("b", PREFIX)
+        self._write(first, "a.parquet", 10)
+        self._write(second, "b.parquet", 20)
+        second.record_hit("a.parquet")
+
+        second.flush()
+
+        entries = self.store.ledger()
+        self.assertEqual(sorted(entries), ["a.parquet", "b.parquet"])
+        self.assertEqual(entries["a.parquet"]["hits"], 1)
+        self.assertEqual(first.stats()["total_bytes"], 30)
+
+
+class TestJanitor(LedgerTestCase):
+    def test_deletes_expired_in_batches(self):
+        old = str(time.time() - 10 * 86400)
+        for i in range(5):
+            self.store.put(
+                f"{PREFIX}old{i}.parquet", b"xx", {"cached_timestamp": old}
+            )
+        self.store.put(
+            f"{PREFIX}fresh.parquet",
+            b"xxx",
+            {"cached_timestamp": str(time.time())},
+        )
+
+        result = run_janitor("b", PREFIX, max_age_seconds=86400, batch_size=2)
+
+        self.assertEqual(result["added"], 6)
+        self.assertEqual(result["expired"], 5)
+        self.assertEqual(result["bytes_left"], 3)
+        self.assertEqual([len(b) for b in self.store.batches], [2, 2, 1])
+        self.assertEqual(
+            sorted(self.store.objects), [LEDGER, f"{PREFIX}fresh.parquet"]
+        )
+        self.assertEqual(list(self.store.ledger()), ["fresh.parquet"])
+
+    def test_dry_run_and_budget(self):
+        ledger = CacheLedger("b", PREFIX)
+        self._write(ledger, "a.parquet", 10)
+        self._write(ledger, "b.parquet", 10)
+
+        result = run_janitor("b", PREFIX, 86400, max_bytes=15, dry_run=True)
+
+        self.assertEqual((result["expired"], result["evicted"]), (0, 1))
+        self.assertEqual(self.store.batches, [])
+
+        run_janitor("b", PREFIX, 86400, max_bytes=15)
+
+        self.assertEqual(list(self.store.ledger()), ["b.parquet"])
+
+    def test_drops_entries_of_missing_objects(self):
+        ledger = CacheLedger("b", PREFIX)
+        self._write(ledger, "a.parquet", 10)
+        del self.store.objects[f"{PREFIX}a.parquet"]
+
+        result = run_janitor("b", PREFIX, 86400)
+
+        self.assertEqual(result["dropped"], 1)
+        self.assertEqual(self.store.ledger(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Tests for cache hit, miss and latency metrics.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from app.utils.cache import cached, clear_cache
+from app.utils.cache_metrics import (
+    CacheMetrics,
+    dump_metrics_json,
+    metrics,
+    render_prometheus,
+)
+
+
+class TestCacheMetrics(unittest.TestCase):
+    """Tests for the metrics registry and its exports."""
+
+    def test_hits_misses_and_latency_buckets(self):
+        registry = CacheMetrics()
+        registry.record_miss("load", 0.2)
+        registry.record_miss("load", 3.0)
+        registry.record_hit("load")
+        registry.record_hit("load", "shared")
+        registry.record_hit("load")
+
+        ns = registry.snapshot()["namespaces"]["load"]
+
+        self.assertEqual(ns["hits"], 3)
+        self.assertEqual(ns["hits_by_tier"], {"memory": 2, "shared": 1})
+        self.assertEqual(ns["misses"], 2)
+        self.assertAlmostEqual(ns["hit_rate"], 0.6)
+        self.assertAlmostEqual(ns["mean_compute_seconds"], 1.6)
+        self.assertAlmostEqual(ns["est_seconds_saved"], 4.8)
+        self.assertEqual(ns["latency_buckets"][0.25], 1)
+        self.assertEqual(ns["latency_buckets"][5], 1)
+
+    def test_tier_sources_are_merged(self):
+        registry = CacheMetrics()
+        registry.add_source(
+            "memory", lambda: {"load": {"entries": 2, "bytes": 100}}
+        )
+        registry.add_source("broken", lambda: 1 / 0)
+
+        ns = registry.snapshot()["namespaces"]["load"]
+
+        self.assertEqual(ns["misses"], 0)
+        self.assertEqual(ns["tiers"], {"memory": {"entries": 2, "bytes": 100}})
+
+    def test_prometheus_text(self):
+        registry = CacheMetrics()
+        registry.record_miss("snowflake", 0.03)
+        registry.record_miss("snowflake", 45)
+        registry.record_hit("snowflake", "gcs")
+        registry.add_source(
+            "memory", lambda: {"snowflake": {"entries": 1, "evictions": 4}}
+        )
+
+        text = render_prometheus(registry.snapshot())
+
+        self.assertIn("# TYPE mmm_cache_compute_seconds histogram", text)
+        self.assertIn(
+            'mmm_cache_hits_total{namespace="snowflake",tier="gcs"} 1', text
+        )
+        self.assertIn(
+            'mmm_cache_compute_seconds_bucket{namespace="snowflake",le="0.05"}'
+            " 1",
+            text,
+        )
+        self.assertIn(
+            'mmm_cache_compute_seconds_bucket{namespace="snowflake",le="60"}'
+            " 2",
+            text,
+        )
+        self.assertIn(
+            'mmm_cache_evictions_total{namespace="snowflake",tier="memory"} 4',
+            text,
+        )
+        self.assertIn('mmm_cache_entries{namespace="snowflake"', text)
+
+    def test_cached_records_hits_and_misses(self):
+        clear_cache()
+        metrics.reset()
+
+        @cached(ttl_seconds=60)
+        def load_metric_rows(x):
+            return [x] * 3
+
+        load_metric_rows(1)
+        load_metric_rows(1)
+        load_metric_rows(2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.json")
+            dump_metrics_json(path)
+            with open(path) as f:
+                snapshot = json.load(f)
+
+        ns = snapshot["namespaces"]["load_metric_rows"]
+        self.assertEqual(ns["hits_by_tier"], {"memory": 1})
+        self.assertEqual(ns["misses"], 2)
+        self.assertEqual(ns["tiers"]["memory"]["entries"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
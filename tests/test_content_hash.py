@@ -0,0 +1,137 @@
+"""
+Tests for deterministic content hashing of cache key arguments.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils import content_hash as content_hash_module
+from utils.content_hash import content_hash
+
+
+class TestContentHash(unittest.TestCase):
+    def test_frames_with_same_repr_differ(self):
+        # Same head, tail and shape: identical truncated reprs
+        a = pd.DataFrame({"x": np.arange(1000)})
+        b = a.copy()
+        b.loc[500, "x"] = -1
+
+        self.assertEqual(repr(a), repr(b))
+        self.assertNotEqual(content_hash(a), content_hash(b))
+
+    def test_equal_frames_hash_equal(self):
+        a = pd.DataFrame({"x": [1, 2], "s": ["a", "b"]})
+        b = pd.DataFrame({"x": [1, 2], "s": ["a", "b"]})
+
+        self.assertEqual(content_hash(a), content_hash(b))
+
+    def test_column_names_and_dtypes_count(self):
+        a = pd.DataFrame({"x": [1, 2]})
+
+        renamed = a.rename(columns={"x": "y"})
+
+        self.assertNotEqual(content_hash(a), content_hash(renamed))
+        self.assertNotEqual(content_hash(a), content_hash(a.astype("int32")))
+
+    def test_unhashable_cells(self):
+        a = pd.DataFrame({"x": [[1, 2], [3]]})
+        b = pd.DataFrame({"x": [[1, 2], [4]]})
+
+        self.assertNotEqual(content_hash(a), content_hash(b))
+
+    def test_dict_key_order_is_ignored(self):
+        self.assertEqual(
+            content_hash({"a": 1, "b": [1, 2]}),
+            content_hash({"b": [1, 2], "a": 1}),
+        )
+        self.assertNotEqual(content_hash([1, 2]), content_hash([2, 1]))
+        self.assertNotEqual(content_hash([1, 2]), content_hash((1, 2)))
+
+    def test_arrow_tables(self):
+        a = pa.table({"x": [1, 2, 3]})
+        b = pa.table({"x": [1, 2, 4]})
+
+        self.assertEqual(
+            content_hash(a), content_hash(pa.table({"x": [1, 2, 3]}))
+        )
+        self.assertNotEqual(content_hash(a), content_hash(b))
+        self.assertNotEqual(
+            content_hash(a.slice(0, 2)), content_hash(a.slice(1, 2))
+        )
+
+    def test_arrow_chunking_and_slices_are_normalized(self):
+        table = pa.table({"x": [1, 2, 3, 4], "s": ["a", None, "c", "d"]})
+        rechunked = pa.concat_tables([table.slice(0, 1), table.slice(1)])
+        padded = pa.table(
+            {"x": [0, 1, 2, 3, 4], "s": ["z", "a", None, "c", "d"]}
+        ).slice(1)
+
+        self.assertTrue(rechunked.equals(table) and padded.equals(table))
+        self.assertEqual(content_hash(rechunked), content_hash(table))
+        self.assertEqual(content_hash(padded), content_hash(table))
+
+    def test_in_place_edits_change_the_hash(self):
+        df = pd.DataFrame({"a": [1, 2]})
+        array = np.arange(3)
+        before = content_hash(df), content_hash(array)
+
+        df.loc[0, "a"] = 99
+        array[0] = 99
+
+        self.assertNotEqual(content_hash(df), before[0])
+        self.assertNotEqual(content_hash(array), before[1])
+
+    def test_arrow_hash_is_memoized(self):
+        table = pa.table({"x": np.arange(10)})
+        calls = []
+        original = content_hash_module._hash_arrow
+
+        def counting(value):
+            calls.append(1)
+            return original(value)
+
+        content_hash_module._hash_arrow = counting
+        try:
+            first = content_hash(table)
+            second = content_hash(table)
+        finally:
+            content_hash_module._hash_arrow = original
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+
+    def test_stable_across_processes(self):
+        code = (
+            "import sys; sys.path.insert(0, 'app');"
+            "import pandas as pd;"
+            "from utils.content_hash import content_hash;"
+            "print(content_hash(pd.DataFrame({'s': ['a', 'b']})),"
+            " content_hash({'k': ('x', 1.5)}))"
+        )
+        root = Path(__file__).parent.parent
+        outputs = {
+            subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=root,
+                capture_output=True,
+                text=True,
+                check=True,
+                env={**os.environ, "PYTHONHASHSEED": seed},
+            ).stdout
+            for seed in ("1", "2")
+        }
+
+        self.assertEqual(len(outputs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Tests for streaming Arrow batches to Parquet in DataProcessor.
+"""
+
+import decimal
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from data_processor import DataProcessor, stream_schema
+
+
+def _batch(start: int, n: int) -> pa.RecordBatch:
+    return pa.RecordBatch.from_pydict(
+        {
+            "DATE": pa.array(range(start, start + n), pa.int32()),
+            "COUNTRY": pa.array(["de"] * n, pa.large_string()),
+            "SPEND": pa.array(
+                [decimal.Decimal("1.25")] * n, pa.decimal128(12, 2)
+            ),
+            "CLICKS": pa.array(
+                [decimal.Decimal(i) for i in range(n)], pa.decimal128(38, 0)
+            ),
+        }
+    )
+
+
+class TestArrowBatchesToParquet(unittest.TestCase):
+    def setUp(self):
+        with patch("data_processor.get_storage_client"):
+            self.processor = DataProcessor(gcs_bucket="b")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "out.parquet")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_stream_schema(self):
+        schema = stream_schema(_batch(0, 1).schema)
+        self.assertEqual(
+            [str(t) for t in schema.types],
+            ["int64", "string", "double", "int64"],
+        )
+
+    def test_batches_become_row_groups(self):
+        batches = (_batch(i * 100, 100) for i in range(5))
+
+        stats = self.processor.arrow_batches_to_parquet(batches, self.path)
+
+        self.assertEqual(stats["rows"], 500)
+        self.assertEqual(stats["batches"], 5)
+        self.assertEqual(stats["bytes"], os.path.getsize(self.path))
+        pf = pq.ParquetFile(self.path)
+        self.assertEqual(pf.metadata.num_row_groups, 5)
+        table = pf.read()
+        self.assertEqual(table.column("DATE").to_pylist(), list(range(500)))
+        self.assertEqual(table.column("SPEND")[0].as_py(), 1.25)
+
+    def test_int_widths_vary_between_batches(self):
+        # Snowflake picks each chunk's int width from its values
+        batches = [
+            pa.RecordBatch.from_pydict(
+                {"CLICKS": pa.array([1, 2], pa.int8()), "CTR": [0.5, 1.0]}
+            ),
+            pa.RecordBatch.from_pydict(
+                {
+                    "CLICKS": pa.array([1000], pa.int16()),
+                    "CTR": pa.array([0.25], pa.float32()),
+                }
+            ),
+            pa.RecordBatch.from_pydict(
+                {
+                    "CLICKS": pa.array(
+                        [decimal.Decimal(2**40)], pa.decimal128(38, 0)
+                    ),
+                    "CTR": [0.75],
+                }
+            ),
+        ]
+
+        stats = self.processor.arrow_batches_to_parquet(batches, self.path)
+
+        self.assertEqual(stats["rows"], 4)
+        table = pq.read_table(self.path)
+        self.assertEqual(table.schema.field("CLICKS").type, pa.int64())
+        self.assertEqual(
+            table.column("CLICKS").to_pylist(), [1, 2, 1000, 2**40]
+        )
+        self.assertEqual(
+            table.column("CTR").to_pylist(), [0.5, 1.0, 0.25, 0.75]
+        )
+
+    def test_number_beyond_int64_fails_loudly(self):
+        batches = [
+            _batch(0, 1),
+            pa.RecordBatch.from_pydict(
+                {
+                    "DATE": pa.array([1], pa.int8()),
+                    "COUNTRY": pa.array(["de"], pa.large_string()),
+                    "SPEND": pa.array(
+                        [decimal.Decimal("1.25")], pa.decimal128(12, 2)
+                    ),
+                    "CLICKS": pa.array(
+                        [decimal.Decimal(2**70)], pa.decimal128(38, 0)
+                    ),
+                }
+            ),
+        ]
+
+        with self.assertRaisesRegex(ValueError, "Column 'CLICKS'"):
+            self.processor.arrow_batches_to_parquet(batches, self.path)
+
+    def test_no_batches_writes_nothing(self):
+        stats = self.processor.arrow_batches_to_parquet(iter([]), self.path)
+
+        self.assertEqual(stats, {"rows": 0, "batches": 0, "bytes": 0})
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
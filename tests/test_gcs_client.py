@@ -0,0 +1,101 @@
+"""
+Tests for the shared GCS client layer.
+"""
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils import gcs_client
+from utils.gcs_client import (
+    get_gcs_op_stats,
+    get_storage_client,
+    reset_gcs_op_stats,
+    reset_storage_client,
+    track_gcs_op,
+)
+
+
+class TestSharedStorageClient(unittest.TestCase):
+    """Tests for the process-wide storage client."""
+
+    def setUp(self):
+        reset_storage_client()
+
+    def tearDown(self):
+        reset_storage_client()
+
+    @patch("utils.gcs_client.storage.Client")
+    def test_client_created_once(self, mock_client_cls):
+        """Repeated calls return the same client instance."""
+        first = get_storage_client()
+        second = get_storage_client()
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_client_cls.call_count, 1)
+
+    @patch("utils.gcs_client.storage.Client")
+    def test_client_created_once_across_threads(self, mock_client_cls):
+        """Concurrent first use still builds a single client."""
+        results = []
+
+        def worker():
+            results.append(get_storage_client())
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(mock_client_cls.call_count, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    @patch("utils.gcs_client.storage.Client")
+    def test_connection_pool_mounted(self, mock_client_cls):
+        """The client's HTTP session gets a resized adapter."""
+        session = MagicMock()
+        mock_client_cls.return_value._http = session
+
+        with patch.object(gcs_client.settings, "GCS_HTTP_POOL_SIZE", 7):
+            get_storage_client()
+
+        adapter = session.mount.call_args_list[0][0][1]
+        self.assertEqual(adapter._pool_maxsize, 7)
+
+
+class TestOpStats(unittest.TestCase):
+    """Tests for per-operation latency counters."""
+
+    def setUp(self):
+        reset_gcs_op_stats()
+
+    def test_track_success(self):
+        """Successful operations are counted."""
+        with track_gcs_op("read_json"):
+            pass
+        with track_gcs_op("read_json"):
+            pass
+
+        stats = get_gcs_op_stats()["read_json"]
+        self.assertEqual(stats["count"], 2)
+        self.assertEqual(stats["errors"], 0)
+        self.assertGreaterEqual(stats["avg_seconds"], 0.0)
+
+    def test_track_error(self):
+        """Failed operations are counted and the error propagates."""
+        with self.assertRaises(ValueError):
+            with track_gcs_op("upload"):
+                raise ValueError("boom")
+
+        stats = get_gcs_op_stats()["upload"]
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,432 @@
+"""
+Tests for GCS utility functions.
+"""
+
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from google.api_core.exceptions import NotFound, NotModified
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils import gcs_utils
+from utils.gcs_utils import (
+    clear_subdir_cache,
+    fetch_blobs_bulk,
+    fetch_json_bulk,
+    list_subdirs,
+    read_blob_if_changed,
+    read_json_from_gcs,
+    read_parquet_from_gcs,
+    read_parquet_schema_from_gcs,
+    upload_large_file,
+    write_json_to_gcs,
+)
+
+
+def _fake_client(contents: dict) -> MagicMock:
+    """Build a storage client mock serving {(bucket, path): bytes}."""
+    client = MagicMock()
+
+    def make_blob(bucket_name, path):
+        blob = MagicMock()
+        blob.name = path
+
+        def download():
+            if (bucket_name, path) not in contents:
+                raise NotFound(f"{path} not found")
+            return contents[(bucket_name, path)]
+
+        blob.download_as_bytes.side_effect = download
+        return blob
+
+    def make_bucket(bucket_name):
+        bucket = MagicMock()
+        bucket.blob.side_effect = lambda p: make_blob(bucket_name, p)
+        return bucket
+
+    client.bucket.side_effect = make_bucket
+    return client
+
+
+class TestFetchBlobsBulk(unittest.TestCase):
+    """Tests for concurrent bulk blob downloads."""
+
+    @patch("utils.gcs_utils.get_storage_client")
+    def test_results_in_input_order(self, mock_get_client):
+        """Results line up with the requested (bucket, path) pairs."""
+        contents = {("b", f"run/{i}.json"): str(i).encode() for i in range(50)}
+        mock_get_client.return_value = _fake_client(contents)
+
+        items = [("b", f"run/{i}.json") for i in reversed(range(50))]
+        results = fetch_blobs_bulk(items, max_workers=8)
+
+        self.assertEqual(
+            results, [str(i).encode() for i in reversed(range(50))]
+        )
+
+    @patch("utils.gcs_utils.get_storage_client")
+    def test_missing_blobs_are_none(self, mock_get_client):
+        """A 404 yields None without a separate exists() call."""
+        mock_get_client.return_value = _fake_client({("b", "a.json"): b"{}"})
+
+        results = fetch_blobs_bulk([("b", "a.json"), ("b", "missing.json")])
+
+        self.assertEqual(results, [b"{}", None])
+
+    def test_empty_input(self):
+        """No items means no work."""
+        self.assertEqual(fetch_blobs_bulk([]), [])
+
+    @patch("utils.gcs_utils.get_storage_client")
+    def test_fetch_json_bulk(self, mock_get_client):
+        """JSON payloads are parsed; invalid or missing ones become None."""
+        mock_get_client.return_value = _fake_client(
+            {
+                ("b", "ok.json"): json.dumps({"dep_var": "revenue"}).encode(),
+                ("b", "bad.json"): b"not json",
+            }
+        )
+
+        results = fetch_json_bulk(
+            [("b", "ok.json"), ("b", "bad.json"), ("b", "gone.json")]
+        )
+
+        self.assertEqual(results, [{"dep_var": "revenue"}, None, None])
+
+
+def _listing_client(prefixes_by_parent: dict) -> MagicMock:
+    """Storage client mock answering delimiter listings per parent prefix."""
+    client = MagicMock()
+
+    def list_blobs(bucket_name, prefix="", delimiter=None):
+        it = MagicMock()
+        it.pages = iter([[]])
+        it.prefixes = set(prefixes_by_parent.get(prefix, []))
+        return it
+
+    client.list_blobs.side_effect = list_blobs
+    return client
+
+
+@patch("utils.gcs_utils.get_storage_client")
+class TestListSubdirs(unittest.TestCase):
+    """Tests for cached delimiter folder listings."""
+
+    def setUp(self):
+        clear_subdir_cache()
+
+    def test_child_names(self, mock_get_client):
+        """Only immediate folder names are returned, sorted."""
+        mock_get_client.return_value = _listing_client(
+            {"datasets/": ["datasets/us/", "datasets/de/"]}
+        )
+
+        self.assertEqual(list_subdirs("b", "datasets"), ["de", "us"])
+        mock_get_client.return_value.list_blobs.assert_called_once_with(
+            "b", prefix="datasets/", delimiter="/"
+        )
+
+    def test_cached_within_ttl(self, mock_get_client):
+        """Repeated calls reuse the listing until it is revalidated."""
+        client = _listing_client({"robyn/": ["robyn/r_1/"]})
+        mock_get_client.return_value = client
+
+        list_subdirs("b", "robyn/")
+        list_subdirs("b", "robyn/")
+        self.assertEqual(client.list_blobs.call_count, 1)
+
+        list_subdirs("b", "robyn/", max_age=0)
+        self.assertEqual(client.list_blobs.call_count, 2)
+
+    def test_write_below_prefix_drops_listing(self, mock_get_client):
+        """A write under a listed prefix forces a fresh listing."""
+        client = _listing_client(
+            {"metadata/": ["metadata/de/"], "robyn/": ["robyn/r_1/"]}
+        )
+        mock_get_client.return_value = client
+        list_subdirs("b", "metadata/")
+        list_subdirs("b", "robyn/")
+
+        write_json_to_gcs("b", "metadata/fr/2024/mapping.json", {})
+        list_subdirs("b", "metadata/")
+        list_subdirs("b", "robyn/")
+
+        self.assertEqual(client.list_blobs.call_count, 3)
+
+
+@patch("utils.gcs_utils.get_storage_client")
+class TestWriteInvalidation(unittest.TestCase):
+    """Tests for per-object invalidation of cached reads on write."""
+
+    def setUp(self):
+        from utils.cache import clear_cache
+
+        clear_cache()
+
+    def test_write_drops_only_that_object(self, mock_get_client):
+        client = _fake_client(
+            {
+                ("b", "metadata/de/latest/mapping.json"): b'{"v": 1}',
+                ("b", "metadata/fr/latest/mapping.json"): b'{"v": 1}',
+            }
+        )
+        mock_get_client.return_value = client
+        read_json_from_gcs("b", "metadata/de/latest/mapping.json")
+        read_json_from_gcs("b", "metadata/fr/latest/mapping.json")
+        client.bucket.reset_mock()
+
+        write_json_to_gcs("b", "metadata/de/latest/mapping.json", {"v": 2})
+        client.bucket.reset_mock()
+        read_json_from_gcs("b", "metadata/de/latest/mapping.json")
+        read_json_from_gcs("b", "metadata/fr/latest/mapping.json")
+
+        # Only the written object is fetched again
+        self.assertEqual(client.bucket.call_count, 1)
+
+
+class _VersionedBlob:
+    """Blob stand-in honouring if_generation_not_match."""
+
+    def __init__(self, store, path):
+        self.store, self.path, self.generation = store, path, None
+
+    def download_as_bytes(self, if_generation_not_match=None):
+        if self.path not in self.store.objects:
+            raise NotFound(self.path)
+        generation, data = self.store.objects[self.path]
+        if generation == if_generation_not_match:
+            raise NotModified(self.path)
+        self.store.bodies += 1
+        self.generation = generation
+        return data
+
+
+@patch("utils.gcs_utils.get_storage_client")
+class TestReadBlobIfChanged(unittest.TestCase):
+    """Tests for generation-revalidated reads."""
+
+    def setUp(self):
+        self.objects = {}
+        self.bodies = 0
+
+    def _client(self):
+        client = MagicMock()
+        client.bucket.return_value.blob.side_effect = lambda p: _VersionedBlob(
+            self, p
+        )
+        return client
+
+    def test_unchanged_object_skips_body(self, mock_get_client):
+        mock_get_client.return_value = self._client()
+        self.objects["q.json"] = (1, b'{"entries": [1]}')
+
+        first = read_blob_if_changed("b", "q.json", json.loads)
+        second = read_blob_if_changed("b", "q.json", json.loads)
+
+        self.assertEqual(first, ({"entries": [1]}, True))
+        self.assertEqual(second, ({"entries": [1]}, False))
+        self.assertEqual(self.bodies, 1)
+
+        # Callers get copies, so mutating one can't corrupt the cache
+        second[0]["entries"].append(2)
+        self.assertEqual(
+            read_blob_if_changed("b", "q.json", json.loads)[0],
+            {"entries": [1]},
+        )
+
+        self.objects["q.json"] = (2, b'{"entries": []}')
+        self.assertEqual(
+            read_blob_if_changed("b", "q.json", json.loads),
+            ({"entries": []}, True),
+        )
+
+    def test_scopes_track_changes_separately(self, mock_get_client):
+        mock_get_client.return_value = self._client()
+        self.objects["h.csv"] = (1, b"a")
+        read_blob_if_changed("b", "h.csv", scope="s1")
+        read_blob_if_changed("b", "h.csv", scope="s2")
+
+        self.objects["h.csv"] = (2, b"b")
+
+        # Another reader seeing the change first doesn't hide it from s1
+        self.assertEqual(read_blob_if_changed("b", "h.csv"), (b"b", True))
+        self.assertEqual(
+            read_blob_if_changed("b", "h.csv", scope="s1"), (b"b", True)
+        )
+        self.assertEqual(
+            read_blob_if_changed("b", "h.csv", scope="s1"), (b"b", False)
+        )
+
+    def test_evicted_entry_on_not_modified(self, mock_get_client):
+        mock_get_client.return_value = self._client()
+        self.objects["q.json"] = (1, b"x")
+        read_blob_if_changed("b", "q.json")
+        blob_download = _VersionedBlob.download_as_bytes
+
+        def evict_then_download(blob, if_generation_not_match=None):
+            gcs_utils._revalidate_cache.clear()
+            return blob_download(blob, if_generation_not_match)
+
+        with patch.object(
+            _VersionedBlob, "download_as_bytes", evict_then_download
+        ):
+            self.assertEqual(read_blob_if_changed("b", "q.json"), (b"x", False))
+
+    def test_missing_object(self, mock_get_client):
+        mock_get_client.return_value = self._client()
+        self.assertEqual(read_blob_if_changed("b", "none.json"), (None, False))
+
+        self.objects["gone.json"] = (1, b"x")
+        read_blob_if_changed("b", "gone.json")
+        del self.objects["gone.json"]
+        self.assertEqual(read_blob_if_changed("b", "gone.json"), (None, True))
+
+
+@patch.object(gcs_utils.settings, "GCS_UPLOAD_CHUNK_MB", 1)
+@patch.object(gcs_utils.settings, "GCS_PARALLEL_UPLOAD_THRESHOLD_MB", 4)
+@patch("utils.gcs_utils.transfer_manager.upload_chunks_concurrently")
+@patch("utils.gcs_utils.get_storage_client")
+class TestUploadLargeFile(unittest.TestCase):
+    """Tests for parallel/resumable upload selection."""
+
+    def _file(self, mb: float) -> str:
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".parquet")
+        tmp.write(b"\0" * int(mb * 1024 * 1024))
+        tmp.close()
+        self.addCleanup(Path(tmp.name).unlink)
+        return tmp.name
+
+    def test_large_file_uploads_in_parts(self, mock_get_client, mock_parts):
+        path = self._file(5)
+        blob = (
+            mock_get_client.return_value.bucket.return_value.blob.return_value
+        )
+
+        size = upload_large_file("b", path, "training-data/x.parquet")
+
+        self.assertEqual(size, 5 * 1024 * 1024)
+        mock_parts.assert_called_once()
+        args, kwargs = mock_parts.call_args
+        self.assertEqual(args, (path, blob))
+        self.assertEqual(kwargs["chunk_size"], 1024 * 1024)
+        blob.upload_from_filename.assert_not_called()
+
+    def test_small_file_uses_chunked_resumable(
+        self, mock_get_client, mock_parts
+    ):
+        path = self._file(2)
+        blob = (
+            mock_get_client.return_value.bucket.return_value.blob.return_value
+        )
+
+        upload_large_file("b", path, "x.parquet")
+
+        mock_parts.assert_not_called()
+        blob.upload_from_filename.assert_called_once()
+        self.assertEqual(blob.chunk_size, 1024 * 1024)
+
+    def test_large_buffer_is_spooled(self, mock_get_client, mock_parts):
+        buffer = io.BytesIO(b"\1" * (5 * 1024 * 1024))
+        buffer.seek(100)
+
+        size = upload_large_file("b", buffer, "x.parquet")
+
+        self.assertEqual(size, 5 * 1024 * 1024)
+        mock_parts.assert_called_once()
+
+
+@patch(
+    "utils.gcs_utils.get_arrow_filesystem",
+    return_value=pafs.LocalFileSystem(),
+)
+class TestProjectedParquetRead(unittest.TestCase):
+    """Tests for column projection and row filters on parquet reads.
+
+    A local directory stands in for the bucket: "<bucket>/<path>" resolves
+    to a file on the local filesystem.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bucket = self.tmp.name
+        dates = pd.date_range("2022-01-01", periods=730, freq="D")
+        df = pd.DataFrame(
+            {
+                "DATE": dates,
+                "DATE_STR": dates.strftime("%Y-%m-%d"),
+                "COUNTRY": ["de", "fr"] * 365,
+                "SPEND": range(730),
+                "CLICKS": range(730),
+            }
+        )
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False),
+            f"{self.bucket}/data.parquet",
+            row_group_size=50,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_full_read(self, _):
+        df = read_parquet_from_gcs(self.bucket, "data.parquet")
+        self.assertEqual(df.shape, (730, 5))
+
+    def test_column_projection_is_case_insensitive(self, _):
+        """Unknown columns are skipped rather than failing the read."""
+        df = read_parquet_from_gcs(
+            self.bucket, "data.parquet", columns=["date", "SPEND", "NOPE"]
+        )
+        self.assertEqual(list(df.columns), ["DATE", "SPEND"])
+
+    def test_date_window_inclusive(self, _):
+        df = read_parquet_from_gcs(
+            self.bucket,
+            "data.parquet",
+            date_col="DATE",
+            start="2023-03-01",
+            end="2023-03-31",
+        )
+        self.assertEqual(len(df), 31)
+        self.assertEqual(df["DATE"].min(), pd.Timestamp("2023-03-01"))
+        self.assertEqual(df["DATE"].max(), pd.Timestamp("2023-03-31"))
+
+    def test_date_window_on_string_column(self, _):
+        df = read_parquet_from_gcs(
+            self.bucket,
+            "data.parquet",
+            date_col="DATE_STR",
+            start="2023-12-01",
+        )
+        self.assertEqual(len(df), 31)
+
+    def test_country_filter(self, _):
+        df = read_parquet_from_gcs(
+            self.bucket, "data.parquet", countries=["fr"]
+        )
+        self.assertEqual(set(df["COUNTRY"]), {"fr"})
+        self.assertEqual(len(df), 365)
+
+    def test_schema_only(self, _):
+        schema = read_parquet_schema_from_gcs(self.bucket, "data.parquet")
+        self.assertEqual(
+            schema.names, ["DATE", "DATE_STR", "COUNTRY", "SPEND", "CLICKS"]
+        )
+
+    def test_missing_file(self, _):
+        with self.assertRaises(FileNotFoundError):
+            read_parquet_from_gcs(self.bucket, "missing.parquet")
+
+
+if __name__ == "__main__":
+    unittest.main()
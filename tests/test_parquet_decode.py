@@ -0,0 +1,110 @@
+"""
+Tests for the shared parquet decoding path.
+"""
+
+import io
+import sys
+import unittest
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils.parquet_decode import (
+    clear_type_plans,
+    get_type_plan,
+    get_type_plan_stats,
+    read_parquet,
+    schema_fingerprint,
+    table_to_pandas,
+)
+
+
+class DbDateType(pa.ExtensionType):
+    """Stand-in for the dbdate type found in BigQuery exports."""
+
+    def __init__(self):
+        super().__init__(pa.string(), "dbdate")
+
+    def __arrow_ext_serialize__(self):
+        return b""
+
+    @classmethod
+    def __arrow_ext_deserialize__(cls, storage_type, serialized):
+        return cls()
+
+
+class TestParquetDecode(unittest.TestCase):
+    def setUp(self):
+        clear_type_plans()
+
+    def _table(self):
+        return pa.table(
+            {
+                "DATE": pa.array(pd.date_range("2024-01-01", periods=3)),
+                "SPEND": pa.array([1.0, 2.0, 3.0]),
+                "COUNTRY": pa.array(["de", "fr", "de"]),
+            }
+        )
+
+    def test_plain_table_matches_to_pandas(self):
+        table = self._table()
+        pd.testing.assert_frame_equal(table_to_pandas(table), table.to_pandas())
+
+    def test_plan_is_cached_per_schema(self):
+        table = self._table()
+        first = get_type_plan(table.schema)
+        second = get_type_plan(self._table().schema)
+
+        self.assertIs(first, second)
+        stats = get_type_plan_stats()
+        self.assertEqual((stats["misses"], stats["plans"]), (1, 1))
+
+    def test_fingerprint_ignores_metadata(self):
+        schema = self._table().schema
+        with_meta = schema.with_metadata({b"pandas": b"{}"})
+        self.assertEqual(
+            schema_fingerprint(schema), schema_fingerprint(with_meta)
+        )
+        self.assertNotEqual(
+            schema_fingerprint(schema),
+            schema_fingerprint(schema.remove(0)),
+        )
+
+    def test_db_types_decoded_as_string(self):
+        storage = pa.array(["2024-01-01", "2024-01-02"])
+        table = pa.table(
+            {
+                "DATE": pa.ExtensionArray.from_storage(DbDateType(), storage),
+                "SPEND": pa.array([1.0, 2.0]),
+            }
+        )
+
+        df = table_to_pandas(table)
+
+        self.assertEqual(get_type_plan(table.schema).db_type_columns, ("DATE",))
+        self.assertIsInstance(df["DATE"].dtype, pd.StringDtype)
+        self.assertEqual(df["DATE"].tolist(), ["2024-01-01", "2024-01-02"])
+
+    def test_arrow_dtypes(self):
+        df = table_to_pandas(self._table(), arrow_dtypes=True)
+        self.assertTrue(
+            all(isinstance(t, pd.ArrowDtype) for t in df.dtypes), df.dtypes
+        )
+
+    def test_read_parquet_from_buffer_with_columns(self):
+        buffer = io.BytesIO()
+        pq.write_table(self._table(), buffer)
+        buffer.seek(0)
+
+        df = read_parquet(buffer, columns=["SPEND"])
+
+        self.assertEqual(list(df.columns), ["SPEND"])
+        self.assertEqual(df["SPEND"].sum(), 6.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
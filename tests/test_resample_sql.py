@@ -0,0 +1,481 @@
+"""
+Parity tests: resampling pushed down into SQL vs. the pandas implementation.
+
+The generated Snowflake SQL runs on SQLite, with the Snowflake functions
+SQLite lacks (DATE_TRUNC, TO_DATE, MIN_BY, GREATEST, LEAST) registered
+with Snowflake's semantics. run_all.R's steps on the query's rows are
+reproduced in pandas (r_pipeline).
+"""
+
+import datetime as dt
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils.resample_sql import (
+    apply_custom_aggregations,
+    build_resample_sql,
+    quote_ident,
+    resample_frame,
+)
+
+
+def _date_trunc(unit, value):
+    if value is None:
+        return None
+    day = dt.date.fromisoformat(value[:10])
+    if unit.upper() == "WEEK":  # WEEK_START = 0 (Monday)
+        return (day - dt.timedelta(days=day.weekday())).isoformat()
+    return day.replace(day=1).isoformat()
+
+
+class _MinBy:
+    def __init__(self):
+        self.best = None
+
+    def step(self, value, key):
+        if key is not None and (self.best is None or key < self.best[0]):
+            self.best = (key, value)
+
+    def finalize(self):
+        return None if self.best is None else self.best[1]
+
+
+def _extreme(pick):
+    def fn(*args):
+        return None if any(a is None for a in args) else pick(args)
+
+    return fn
+
+
+def run_on_sqlite(sql, df):
+    conn = sqlite3.connect(":memory:")
+    conn.create_function("DATE_TRUNC", 2, _date_trunc)
+    conn.create_function("TO_DATE", 1, lambda v: None if v is None else v[:10])
+    conn.create_function("GREATEST", -1, _extreme(max))
+    conn.create_function("LEAST", -1, _extreme(min))
+    conn.create_aggregate("MIN_BY", 2, _MinBy)
+    table = df.copy()
+    table["DATE"] = table["DATE"].map(
+        lambda d: None if pd.isna(d) else pd.Timestamp(d).date().isoformat()
+    )
+    table.to_sql("daily", conn, index=False)
+    result = pd.read_sql(sql, conn)
+    conn.close()
+    result["DATE"] = pd.to_datetime(result["DATE"])
+    return result
+
+
+def _daily(days=75, start="2024-01-03"):
+    rng = np.random.default_rng(7)
+    dates = pd.date_range(start, periods=days, freq="D")
+    spend = rng.uniform(0, 100, days).round(2)
+    spend[[3, 10, 11]] = np.nan
+    return pd.DataFrame(
+        {
+            "DATE": dates.date,
+            "GA_COST": spend,
+            "META_COST": rng.uniform(0, 50, days).round(2),
+            "TV_COST": np.where(np.arange(days) % 9 == 0, np.nan, 20.0),
+            "SESSIONS": rng.integers(100, 1000, days).astype(float),
+            "TEMPERATURE": rng.normal(10, 5, days).round(1),
+            "PROMO": np.where(np.arange(days) % 5 == 0, "sale", "none"),
+            "EMPTY": np.nan,
+        }
+    )
+
+
+STRATEGIES = {
+    "DATE": "sum",
+    "GA_COST": "sum",
+    "META_COST": "sum",
+    "TV_COST": "max",
+    "SESSIONS": "sum",
+    "TEMPERATURE": "mean",
+    "PROMO": "auto",
+    "EMPTY": "sum",
+}
+
+
+class TestResampleParity(unittest.TestCase):
+    def assert_parity(
+        self, df, freq, strategies, sources=None, types=None, window=(None,) * 2
+    ):
+        sql = build_resample_sql(
+            "SELECT * FROM daily",
+            "DATE",
+            freq,
+            strategies,
+            aggregation_sources=sources,
+            columns=df.columns,
+            data_types=types,
+            start_date=window[0],
+            end_date=window[1],
+        )
+        expected = resample_frame(
+            df, "DATE", freq, strategies, sources, types, *window
+        )
+        actual = run_on_sqlite(sql, df)
+        pd.testing.assert_frame_equal(
+            actual, expected, check_dtype=False, atol=1e-9
+        )
+        return expected
+
+    def test_weekly(self):
+        df = _daily()
+
+        result = self.assert_parity(df, "W", STRATEGIES)
+
+        self.assertEqual(len(result), 11)
+        self.assertTrue((result["DATE"].dt.dayofweek == 0).all())
+        self.assertEqual(result["DATE"].iloc[0], pd.Timestamp("2024-01-01"))
+        self.assertEqual(result["EMPTY"].tolist(), [0.0] * len(result))
+
+    def test_monthly(self):
+        result = self.assert_parity(_daily(), "M", STRATEGIES)
+
+        self.assertEqual(
+            result["DATE"].dt.strftime("%Y-%m-%d").tolist(),
+            ["2024-01-01", "2024-02-01", "2024-03-01"],
+        )
+
+    def test_gaps_and_missing_dates(self):
+        df = _daily()
+        df = df[~df["DATE"].between(dt.date(2024, 1, 15), dt.date(2024, 1, 28))]
+        df.loc[df.index[5], "DATE"] = None
+
+        result = self.assert_parity(df, "W", STRATEGIES)
+
+        # Weeks without rows are left out rather than filled
+        self.assertNotIn(pd.Timestamp("2024-01-15"), set(result["DATE"]))
+
+    def test_training_window(self):
+        df = _daily()
+
+        result = self.assert_parity(
+            df, "W", STRATEGIES, window=("2024-01-10", "2024-02-06")
+        )
+
+        # Partial edge weeks keep only the window's days
+        self.assertEqual(len(result), 5)
+        in_window = df.iloc[7:12]  # Wednesday 10th to Sunday 14th
+        self.assertEqual(
+            result["SESSIONS"].iloc[0], in_window["SESSIONS"].sum()
+        )
+        self.assertEqual(result["DATE"].iloc[-1], pd.Timestamp("2024-02-05"))
+
+    def test_custom_aggregates(self):
+        df = _daily()
+        sources = {
+            "ALL_COST_CUSTOM": {
+                "source_columns": ["GA_COST", "META_COST", "TV_COST"],
+                "agg_method": "sum",
+            },
+            "AVG_COST_CUSTOM": {
+                "source_columns": ["GA_COST", "TV_COST"],
+                "agg_method": "mean",
+            },
+            "MAX_COST_CUSTOM": {
+                "source_columns": ["GA_COST", "TV_COST", "YT_COST"],
+                "agg_method": "max",
+            },
+            "MIN_COST_CUSTOM": {
+                "source_columns": ["GA_COST", "TV_COST"],
+                "agg_method": "min",
+            },
+            "NO_SOURCES_CUSTOM": {
+                "source_columns": ["YT_COST"],
+                "agg_method": "sum",
+            },
+        }
+        strategies = dict(
+            STRATEGIES, AVG_COST_CUSTOM="mean", NO_SOURCES_CUSTOM="sum"
+        )
+
+        result = self.assert_parity(df, "W", strategies, sources)
+
+        self.assertIn("MIN_COST_CUSTOM", result.columns)
+        self.assertNotIn("NO_SOURCES_CUSTOM", result.columns)
+        first_week = df[df["DATE"] < dt.date(2024, 1, 8)]
+        self.assertAlmostEqual(
+            result["ALL_COST_CUSTOM"].iloc[0],
+            first_week[["GA_COST", "META_COST", "TV_COST"]].sum().sum(),
+        )
+
+    def test_custom_column_already_present_is_passed_through(self):
+        df = _daily().assign(ALL_COST_CUSTOM=1.0)
+        sources = {
+            "ALL_COST_CUSTOM": {
+                "source_columns": ["GA_COST", "META_COST"],
+                "agg_method": "sum",
+            }
+        }
+
+        result = self.assert_parity(
+            df, "W", dict(STRATEGIES, ALL_COST_CUSTOM="sum"), sources
+        )
+
+        self.assertEqual(result["ALL_COST_CUSTOM"].iloc[1], 7.0)
+
+    def test_countries_are_aggregated_separately(self):
+        de = _daily().assign(COUNTRY="DE")
+        fr = _daily(days=40, start="2024-01-10").assign(COUNTRY="FR")
+        df = pd.concat([de, fr], ignore_index=True).sort_values(
+            "DATE", kind="stable"
+        )
+
+        result = self.assert_parity(df, "W", STRATEGIES)
+
+        # R's filter_by_country still finds each country's own series
+        self.assertEqual(set(result["COUNTRY"]), {"DE", "FR"})
+        resampled_de = result[result["COUNTRY"] == "DE"]
+        expected_de = resample_frame(de, "DATE", "W", STRATEGIES)
+        self.assertEqual(
+            resampled_de["SESSIONS"].tolist(), expected_de["SESSIONS"].tolist()
+        )
+
+    def test_columns_without_strategy_are_kept(self):
+        df = _daily().drop(columns="EMPTY").assign(CHANNEL_NOTE="x")
+
+        result = self.assert_parity(
+            df, "W", {"GA_COST": "sum", "SESSIONS": "sum"}
+        )
+
+        self.assertIn("CHANNEL_NOTE", result.columns)
+        self.assertEqual(result["TEMPERATURE"].iloc[0], df["TEMPERATURE"][0])
+
+    def test_missing_sources_and_present_custom_columns(self):
+        df = _daily().assign(ALL_COST_CUSTOM=1.0)
+        sources = {
+            "ALL_COST_CUSTOM": {
+                "source_columns": ["GA_COST"],
+                "agg_method": "sum",
+            },
+            "YT_CUSTOM": {"source_columns": ["YT_COST"], "agg_method": "sum"},
+        }
+
+        sql = build_resample_sql(
+            "SELECT * FROM daily",
+            "DATE",
+            "W",
+            dict(STRATEGIES, ALL_COST_CUSTOM="sum"),
+            sources,
+            columns=df.columns,
+        )
+
+        self.assertEqual(sql.count('AS "ALL_COST_CUSTOM"'), 1)
+        self.assertNotIn("YT_COST", sql)
+        run_on_sqlite(sql, df)
+
+    def test_non_numeric_types_take_first_value(self):
+        df = _daily()
+        types = {"TEMPERATURE": "categorical"}
+
+        result = self.assert_parity(df, "W", STRATEGIES, types=types)
+
+        self.assertEqual(result["TEMPERATURE"].iloc[0], df["TEMPERATURE"][0])
+
+    def test_custom_aggregates_match_row_wise_pandas(self):
+        # One row per week, so the weekly value is the row's value
+        df = pd.DataFrame(
+            {
+                "DATE": pd.date_range("2024-01-01", periods=4, freq="7D"),
+                "A": [1.0, np.nan, np.nan, 4.0],
+                "B": [2.0, 3.0, np.nan, np.nan],
+            }
+        )
+        for method in ("sum", "mean", "max", "min"):
+            sources = {
+                "X_CUSTOM": {"source_columns": ["A", "B"], "agg_method": method}
+            }
+            expected, _ = apply_custom_aggregations(
+                df, {"aggregation_sources": sources}
+            )
+            sql = build_resample_sql(
+                "SELECT * FROM daily",
+                "DATE",
+                "W",
+                {"X_CUSTOM": "auto"},
+                sources,
+                columns=df.columns,
+            )
+
+            actual = run_on_sqlite(sql, df)
+
+            pd.testing.assert_series_equal(
+                actual["X_CUSTOM"], expected["X_CUSTOM"], check_dtype=False
+            )
+
+
+_PERIODS = {"W": "W-SUN", "M": "M"}
+
+
+def r_pipeline(df, freq, strategies, start, end, resampled_in_sql=False):
+    """
+    run_all.R from fill_day() to the resampling step: fill missing days (or
+    periods) with numeric 0, keep the training window, then resample with
+    the per-column strategies unless the rows were resampled in SQL.
+    """
+    df = df.assign(DATE=pd.to_datetime(df["DATE"]))
+    rule = {"W": "W-MON", "M": "MS"}[freq] if resampled_in_sql else "D"
+    full = pd.DataFrame(
+        {"DATE": pd.date_range(df["DATE"].min(), df["DATE"].max(), freq=rule)}
+    ).merge(df, on="DATE", how="left")
+    numeric = [c for c in full.columns[1:] if is_numeric_dtype(full[c])]
+    full[numeric] = full[numeric].fillna(0)
+
+    start = pd.Timestamp(start)
+    if resampled_in_sql:
+        start = start.to_period(_PERIODS[freq]).start_time
+    full = full[full["DATE"].between(start, pd.Timestamp(end))]
+    if resampled_in_sql:
+        return full.reset_index(drop=True)
+
+    period = full["DATE"].dt.to_period(_PERIODS[freq]).dt.start_time
+    groups = full.groupby(period.rename("DATE"))
+    aggs = {"sum": "sum", "mean": "mean", "max": "max", "min": "min"}
+    parts = {
+        c: groups[c].agg(aggs.get(strategies.get(c, "sum"), "first"))
+        for c in full.columns[1:]
+        if c in numeric
+    }
+    parts.update(
+        {c: groups[c].first() for c in full.columns[1:] if c not in numeric}
+    )
+    return pd.DataFrame(parts).reset_index()
+
+
+class TestRunAllAfterPushdown(unittest.TestCase):
+    """run_all.R on SQL-resampled rows matches run_all.R on daily rows."""
+
+    def assert_same_as_r(self, df, freq, start, end):
+        strategies = dict(STRATEGIES, TEMPERATURE="mean", SESSIONS="min")
+        expected = r_pipeline(df, freq, strategies, start, end)
+        sql = build_resample_sql(
+            "SELECT * FROM daily",
+            "DATE",
+            freq,
+            strategies,
+            columns=df.columns,
+            start_date=start,
+            end_date=end,
+        )
+        pushed = r_pipeline(
+            run_on_sqlite(sql, df),
+            freq,
+            strategies,
+            start,
+            end,
+            resampled_in_sql=True,
+        )
+        pd.testing.assert_frame_equal(
+            pushed[expected.columns], expected, check_dtype=False, atol=1e-9
+        )
+        return pushed
+
+    def test_weekly_partial_first_and_last_week(self):
+        # Wednesday to Tuesday: both edge weeks are partial
+        result = self.assert_same_as_r(
+            _daily(), "W", "2024-01-10", "2024-03-05"
+        )
+
+        self.assertEqual(result["DATE"].iloc[0], pd.Timestamp("2024-01-08"))
+        self.assertEqual(result["DATE"].iloc[-1], pd.Timestamp("2024-03-04"))
+
+    def test_monthly_window(self):
+        result = self.assert_same_as_r(
+            _daily(), "M", "2024-01-20", "2024-02-10"
+        )
+
+        self.assertEqual(len(result), 2)
+
+    def test_missing_weeks_are_zero_filled(self):
+        df = _daily()
+        df = df[~df["DATE"].between(dt.date(2024, 1, 15), dt.date(2024, 1, 28))]
+        # TV_COST's max over the missing weeks' zero-filled days is 0
+        df = df.assign(TV_COST=df["TV_COST"].fillna(20.0))
+
+        result = self.assert_same_as_r(df, "W", "2024-01-01", "2024-03-17")
+
+        gap = result[result["DATE"] == pd.Timestamp("2024-01-15")]
+        self.assertEqual(gap["SESSIONS"].tolist(), [0.0])
+
+    def test_resampling_pushed_down_rows_again_would_break_means(self):
+        # What run_all.R did before resampled_in_sql: days refilled with 0
+        sql = build_resample_sql(
+            "SELECT * FROM daily",
+            "DATE",
+            "W",
+            dict(STRATEGIES, TEMPERATURE="mean"),
+            columns=_daily().columns,
+        )
+        weekly = run_on_sqlite(sql, _daily())
+
+        redone = r_pipeline(
+            weekly, "W", {"TEMPERATURE": "mean"}, "2024-01-01", "2024-03-17"
+        )
+
+        self.assertAlmostEqual(
+            redone["TEMPERATURE"].iloc[1], weekly["TEMPERATURE"].iloc[1] / 7
+        )
+
+
+class TestBuildResampleSql(unittest.TestCase):
+    def test_sql_shape(self):
+        sql = build_resample_sql(
+            "SELECT * FROM db.s.daily WHERE country = 'DE';",
+            "date",
+            "W",
+            {"ga_cost": "sum", "promo": "auto", "temp": "avg", "x": "median"},
+        )
+
+        self.assertTrue(
+            sql.startswith('SELECT DATE_TRUNC(\'WEEK\', src."DATE") AS "DATE"')
+        )
+        self.assertIn('COALESCE(SUM(src."GA_COST"), 0) AS "GA_COST"', sql)
+        self.assertIn('MIN_BY(src."PROMO", src."DATE") AS "PROMO"', sql)
+        self.assertIn('AVG(src."TEMP") AS "TEMP"', sql)
+        self.assertIn('COALESCE(SUM(src."X"), 0) AS "X"', sql)
+        self.assertIn(
+            "FROM (SELECT * FROM db.s.daily WHERE country = 'DE')", sql
+        )
+        self.assertTrue(sql.endswith("GROUP BY 1\nORDER BY 1"))
+
+    def test_window_filters_days_before_grouping(self):
+        sql = build_resample_sql(
+            "SELECT * FROM t",
+            "DATE",
+            "M",
+            {},
+            start_date="2024-01-10",
+            end_date=dt.date(2024, 3, 31),
+        )
+
+        self.assertIn(
+            'WHERE src."DATE" IS NOT NULL\n'
+            "  AND TO_DATE(src.\"DATE\") >= '2024-01-10'\n"
+            "  AND TO_DATE(src.\"DATE\") <= '2024-03-31'\nGROUP BY 1",
+            sql,
+        )
+        with self.assertRaises(ValueError):
+            build_resample_sql("SELECT 1", "DATE", "W", {}, start_date="x'")
+
+    def test_quote_ident(self):
+        self.assertEqual(quote_ident("spend"), '"SPEND"')
+        self.assertEqual(quote_ident("Spend EUR"), '"Spend EUR"')
+        self.assertEqual(quote_ident('a"b'), '"a""b"')
+
+    def test_rejects_other_frequencies(self):
+        with self.assertRaises(ValueError):
+            build_resample_sql("SELECT * FROM t", "DATE", "none", {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Tests for the incremental robyn/ run catalog.
+"""
+
+import json
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from fake_gcs import FakeBucket
+from utils import run_catalog
+from utils.gcs_utils import clear_subdir_cache
+from utils.run_catalog import (
+    catalog_runs,
+    load_run_catalog,
+    parse_run_path,
+    record_run,
+    refresh_run_catalog,
+    run_key,
+)
+
+CATALOG = "run-catalog/robyn_runs.jsonl"
+
+OLD = datetime.now(timezone.utc) - timedelta(days=30)
+NEW = datetime.now(timezone.utc)
+
+
+class FakeStore(FakeBucket):
+    def put(self, path, data=b"x", metadata=None, updated=OLD):
+        super().put(path, data, metadata, updated)
+
+    def rows(self):
+        raw = self.objects[CATALOG].data.decode()
+        return [json.loads(ln) for ln in raw.splitlines()]
+
+
+class TestRunCatalog(unittest.TestCase):
+    def setUp(self):
+        clear_subdir_cache()
+        run_catalog._loaded.clear()
+        self.store = FakeStore()
+        client = self.store.client()
+        self.patches = [
+            patch(f"utils.{m}.get_storage_client", return_value=client)
+            for m in ("run_catalog", "gcs_utils")
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def _add_run(self, rev, country, stamp, updated=OLD):
+        base = f"robyn/{rev}/{country}/{stamp}"
+        self.store.put(
+            f"{base}/best_model_id.txt",
+            b"1_23_4\nIterations: 2000\nTrials: 5\n",
+            updated=updated,
+        )
+        self.store.put(f"{base}/model_summary.json", b"{}", updated=updated)
+        self.store.put(
+            f"{base}/allocator_plots_0101/allocator_1_23_4_365d.png",
+            b"p" * 2000,
+            updated=updated,
+        )
+        self.store.put(
+            f"training-configs/{stamp}/job_config.json",
+            json.dumps({"dep_var": "REVENUE"}).encode(),
+        )
+
+    def test_parse_run_path(self):
+        self.assertEqual(
+            parse_run_path("robyn/gmv_1/de/0101_120000/plots/a.png"),
+            (("gmv_1", "de", "0101_120000"), "plots/a.png"),
+        )
+        self.assertIsNone(parse_run_path("robyn/gmv_1/de/0101_120000/"))
+        self.assertIsNone(parse_run_path("datasets/de/x/raw.parquet"))
+
+    def test_first_refresh_builds_rows(self):
+        self._add_run("gmv_1", "de", "0101_120000")
+
+        rows = refresh_run_catalog("b")
+
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(run_key(row), ("gmv_1", "de", "0101_120000"))
+        self.assertTrue(row["has_allocator_plot"])
+        self.assertEqual(row["best_id"], "1_23_4")
+        self.assertEqual((row["iterations"], row["trials"]), (2000, 5))
+        self.assertEqual(row["dep_var"], "REVENUE")
+        self.assertEqual(self.store.rows(), rows)
+
+    def test_settled_revisions_are_not_listed_again(self):
+        self._add_run("gmv_1", "de", "0101_120000")
+        refresh_run_catalog("b")
+
+        self._add_run("gmv_2", "fr", "0202_120000", updated=NEW)
+        self.store.listed.clear()
+        rows = refresh_run_catalog("b", max_age=0)
+
+        self.assertEqual(len(rows), 2)
+        run_listings = [p for p, d in self.store.listed if d is None]
+        self.assertEqual(run_listings, ["robyn/gmv_2/"])
+
+        # gmv_2 is still changing, so the next refresh lists it again
+        self.store.listed.clear()
+        refresh_run_catalog("b", max_age=0)
+        run_listings = [p for p, d in self.store.listed if d is None]
+        self.assertEqual(run_listings, ["robyn/gmv_2/"])
+
+    def test_forced_refresh_finds_runs_in_settled_revisions(self):
+        self._add_run("gmv_1", "de", "0101_120000")
+        refresh_run_catalog("b")
+
+        # A run written into the settled revision without record_run()
+        self._add_run("gmv_1", "fr", "0301_120000")
+        self.assertEqual(len(refresh_run_catalog("b", max_age=0)), 1)
+
+        rows = refresh_run_catalog("b", max_age=0, relist=True)
+
+        self.assertEqual(
+            [run_key(r) for r in rows],
+            [("gmv_1", "de", "0101_120000"), ("gmv_1", "fr", "0301_120000")],
+        )
+
+    def test_record_run_and_catalog_runs(self):
+        self._add_run("gmv_1", "de", "0101_120000", updated=NEW)
+
+        self.assertTrue(record_run("b", "robyn/gmv_1/de/0101_120000"))
+        self.assertFalse(record_run("b", "robyn/gmv_1/de/missing"))
+
+        runs = catalog_runs("b", load_run_catalog("b"))
+        blobs = runs[("gmv_1", "de", "0101_120000")]
+        self.assertEqual(len(blobs), 3)
+        self.assertIn(2000, [b.size for b in blobs])
+
+    def test_deleted_revision_is_dropped(self):
+        self._add_run("gmv_1", "de", "0101_120000")
+        self._add_run("gmv_2", "de", "0102_120000")
+        refresh_run_catalog("b")
+
+        for path in [p for p in self.store.objects if "gmv_1" in p]:
+            del self.store.objects[path]
+        rows = refresh_run_catalog("b", max_age=0)
+
+        self.assertEqual([r["rev"] for r in rows], ["gmv_2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+"""
+Tests for the host-shared cache tier and cross-instance invalidation.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils import shared_cache
+from utils.cache import (
+    _cache,
+    cached,
+    clear_cache,
+    publish_invalidation,
+    set_shared_tier,
+    subscribe_invalidations,
+)
+from utils.shared_cache import SharedCache, poll_invalidations
+
+
+def _entry(value, age=0):
+    return {"timestamp": time.time() - age, "value": value}
+
+
+class TestSharedCache(unittest.TestCase):
+    """Tests for the SQLite-backed store."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "shared.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_entries_visible_to_other_instances(self):
+        df = pd.DataFrame({"a": [1, 2]})
+        SharedCache(self.path).put("k", _entry(df), namespace="ns", ttl=60)
+
+        # A second SharedCache on the same file stands in for a process
+        entry = SharedCache(self.path).get("k")
+
+        pd.testing.assert_frame_equal(entry["value"], df)
+
+    def test_expired_entries_are_missing(self):
+        cache = SharedCache(self.path)
+        cache.put("old", _entry("a", age=120), namespace="ns", ttl=60)
+
+        self.assertIsNone(cache.get("old"))
+
+    def test_unpicklable_values_are_not_stored(self):
+        cache = SharedCache(self.path)
+
+        self.assertFalse(
+            cache.put("lock", _entry(threading.Lock()), namespace="ns")
+        )
+        self.assertIsNone(cache.get("lock"))
+
+    def test_least_recently_used_evicted_over_budget(self):
+        cache = SharedCache(self.path, max_bytes=2500)
+        cache.put("a", _entry(b"x" * 1000), namespace="ns")
+        cache.put("b", _entry(b"x" * 1000), namespace="ns")
+        cache.get("a")  # b is now least recently used
+
+        cache.put("c", _entry(b"x" * 1000), namespace="ns")
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_invalidate_by_tag(self):
+        cache = SharedCache(self.path)
+        cache.put("de", _entry(1), "ns", tags=["gcs://b/metadata/de/*"])
+        cache.put("fr", _entry(2), "ns", tags=["gcs://b/metadata/fr/*"])
+
+        self.assertEqual(cache.invalidate(["gcs://b/metadata/de/x.json"]), 1)
+        self.assertIsNone(cache.get("de"))
+        self.assertIsNotNone(cache.get("fr"))
+
+    def test_host_id_shared_by_processes_of_a_host(self):
+        host_id = SharedCache(self.path).host_id
+
+        self.assertEqual(SharedCache(self.path).host_id, host_id)
+        other = SharedCache(os.path.join(self.tmp.name, "other.sqlite"))
+        self.assertNotEqual(other.host_id, host_id)
+
+    def test_namespace_stats_and_clear(self):
+        cache = SharedCache(self.path)
+        cache.put("a", _entry(1), "snowflake")
+        cache.put("b", _entry(2), "list_blobs")
+
+        self.assertEqual(cache.namespace_stats()["snowflake"]["entries"], 1)
+        self.assertEqual(cache.clear(namespace="snowflake"), 1)
+        self.assertEqual(list(cache.namespace_stats()), ["list_blobs"])
+
+
+class TestCachedUsesSharedTier(unittest.TestCase):
+    """Tests for @cached reading and writing the shared tier."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.shared = SharedCache(os.path.join(self.tmp.name, "s.sqlite"))
+        set_shared_tier(self.shared)
+        clear_cache()
+
+    def tearDown(self):
+        set_shared_tier(None)
+        clear_cache()
+        self.tmp.cleanup()
+
+    def test_result_reused_by_another_process(self):
+        calls = []
+
+        @cached(ttl_seconds=60)
+        def load(x):
+            calls.append(x)
+            return {"x": x}
+
+        load(1)
+        clear_cache()  # Another process: empty memory, same host file
+        result = load(1)
+
+        self.assertEqual(result, {"x": 1})
+        self.assertEqual(calls, [1])
+
+
+class TestInvalidationPropagation(unittest.TestCase):
+    """Tests for polling invalidations of other processes and instances."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.shared = SharedCache(os.path.join(self.tmp.name, "s.sqlite"))
+        patcher = patch.multiple(
+            shared_cache,
+            _shared=self.shared,
+            _bucket=None,
+            _last_local_seq=0,
+            _last_log_seq=None,
+            _pending=[],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Done by init_shared_cache; a no-op while no tier is enabled
+        subscribe_invalidations(shared_cache._on_invalidation)
+        clear_cache()
+
+    def tearDown(self):
+        clear_cache()
+        self.tmp.cleanup()
+
+    def test_local_process_invalidation_drops_memory_entry(self):
+        _cache.put("k", _entry(1), tags=["sf://DB.S.T"])
+        self.shared.record_invalidations(["sf://DB.S.T"], "host:other-pid")
+
+        self.assertEqual(poll_invalidations(), 1)
+        self.assertNotIn("k", _cache)
+
+    def test_own_invalidations_are_not_reapplied(self):
+        self.shared.record_invalidations(["sf://T"], shared_cache._ORIGIN)
+
+        self.assertEqual(poll_invalidations(), 0)
+
+    def test_other_instances_via_gcs_log(self):
+        store = {}
+
+        def make_blob(path):
+            blob = MagicMock()
+            blob.generation = store.get("generation", 0)
+
+            def download():
+                if "data" not in store:
+                    raise NotFound(path)
+                return store["data"]
+
+            def upload(data, content_type=None, if_generation_match=None):
+                if if_generation_match != store.get("generation", 0):
+                    raise PreconditionFailed("changed")
+                store["data"] = data.encode()
+                store["generation"] = store.get("generation", 0) + 1
+
+            blob.download_as_bytes.side_effect = download
+            blob.upload_from_string.side_effect = upload
+            return blob
+
+        client = MagicMock()
+        client.bucket.return_value.blob.side_effect = make_blob
+
+        def read_log(bucket, path, parse):
+            return (parse(store["data"]) if "data" in store else None), True
+
+        with patch.object(shared_cache, "_bucket", "b"), patch.object(
+            shared_cache, "get_storage_client", return_value=client
+        ), patch.object(
+            shared_cache, "read_blob_if_changed", side_effect=read_log
+        ):
+            poll_invalidations()  # First poll sets the watermark
+
+            # A write in this process is appended to the log...
+            publish_invalidation("gcs://b/metadata/de/x.json")
+            poll_invalidations()
+            log = json.loads(store["data"])
+            self.assertEqual(log["records"][0]["host"], self.shared.host_id)
+
+            # ...and a write on another instance is applied here
+            _cache.put("k", _entry(1), tags=["gcs://b/metadata/fr/*"])
+            log["seq"] += 1
+            log["records"].append(
+                {
+                    "seq": log["seq"],
+                    "resource": "gcs://b/metadata/fr/y.json",
+                    "host": "other-instance",
+                }
+            )
+            store["data"] = json.dumps(log).encode()
+            self.assertEqual(poll_invalidations(), 1)
+
+        self.assertNotIn("k", _cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
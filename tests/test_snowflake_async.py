@@ -0,0 +1,99 @@
+"""
+Tests for concurrent Snowflake queries tracked by query ID.
+"""
+
+import sys
+import unittest
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils.snowflake_async import CANCELLED, DONE, FAILED, QueryBatch
+
+
+class FakeWarehouse:
+    """Queries finish after a set number of status polls."""
+
+    def __init__(self, polls_needed):
+        self.polls_needed = polls_needed  # sql -> polls until done
+        self.polls = {}
+        self.cancelled = []
+        self.submitted = []
+
+    def cursor(self):
+        cur = MagicMock()
+        warehouse = self
+
+        def execute_async(sql):
+            warehouse.submitted.append(sql)
+            cur.sfqid = sql
+
+        def get_results(sfqid):
+            cur.fetch_pandas_all.return_value = pd.DataFrame({"Q": [sfqid]})
+
+        def execute(sql, params=None):
+            warehouse.cancelled.append(params[0])
+
+        cur.execute_async.side_effect = execute_async
+        cur.get_results_from_sfqid.side_effect = get_results
+        cur.execute.side_effect = execute
+        return cur
+
+    def get_query_status_throw_if_error(self, sfqid):
+        if sfqid.startswith("bad"):
+            raise RuntimeError("SQL compilation error")
+        self.polls[sfqid] = self.polls.get(sfqid, 0) + 1
+        return self.polls[sfqid] >= self.polls_needed[sfqid]
+
+    def is_still_running(self, finished):
+        return not finished
+
+
+class TestQueryBatch(unittest.TestCase):
+    def setUp(self):
+        self.warehouse = FakeWarehouse({"de": 3, "fr": 1, "bad": 1, "slow": 99})
+        self.cached = []
+
+        @contextmanager
+        def connection():
+            yield self.warehouse
+
+        self.batch = QueryBatch(connection, on_result=self.cached.append)
+
+    def test_results_arrive_as_queries_finish(self):
+        self.batch.add_result("it", "it", pd.DataFrame({"Q": ["cached"]}))
+        self.batch.submit({"de": "de", "fr": "fr", "xx": "bad"})
+
+        order = [q.key for q in self.batch.as_completed(poll_interval=0)]
+
+        self.assertEqual(order, ["it", "fr", "xx", "de"])
+        self.assertEqual(self.warehouse.submitted, ["de", "fr", "bad"])
+        self.assertEqual(self.batch.queries["de"].status, DONE)
+        self.assertEqual(self.batch.queries["xx"].status, FAILED)
+        self.assertEqual(self.batch.results()["de"]["Q"].tolist(), ["de"])
+        # Only fetched results go to the callback, not known ones
+        self.assertEqual(sorted(q.key for q in self.cached), ["de", "fr"])
+
+    def test_cancel_running_queries(self):
+        self.batch.submit({"fr": "fr", "slow": "slow"})
+        self.batch.poll()
+
+        self.assertEqual(self.batch.cancel(), 1)
+        self.assertEqual(self.warehouse.cancelled, ["slow"])
+        self.assertEqual(self.batch.queries["slow"].status, CANCELLED)
+        self.assertTrue(self.batch.done)
+
+    def test_timeout_cancels(self):
+        self.batch.submit({"slow": "slow"})
+
+        with self.assertRaises(TimeoutError):
+            list(self.batch.as_completed(timeout=0, poll_interval=0))
+        self.assertEqual(self.warehouse.cancelled, ["slow"])
+
+
+if __name__ == "__main__":
+    unittest.main()
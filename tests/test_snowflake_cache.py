@@ -11,6 +11,7 @@ import io
 
 # Add parent directory to path for imports
 import sys
+import threading
 import time
 import unittest
 from pathlib import Path
@@ -20,6 +21,8 @@ import pandas as pd
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
 
+from utils import snowflake_cache
+from utils.cache import _cache, publish_invalidation, sf_tag
 from utils.snowflake_cache import (
     _get_query_hash,
     clear_snowflake_cache,
@@ -67,6 +70,57 @@ class TestSnowflakeCache(unittest.TestCase):
 
         self.assertNotEqual(hash1, hash2)
 
+    def test_query_hash_keeps_literal_case(self):
+        """Test that string literals are not case-normalized."""
+        hash1 = _get_query_hash("SELECT * FROM t WHERE country = 'DE'")
+        hash2 = _get_query_hash("SELECT * FROM t WHERE country = 'de'")
+
+        self.assertNotEqual(hash1, hash2)
+
+    def test_subsumed_query_answered_from_cache(self):
+        """Test that a narrower query is filtered from a cached result."""
+        wide = pd.DataFrame(
+            {
+                "DATE": ["2024-01-01", "2024-02-01", "2024-03-01"],
+                "COUNTRY": ["DE", "DE", "DE"],
+                "SPEND": [1.0, 2.0, 3.0],
+            }
+        )
+        execute_func = Mock(return_value=wide)
+        before = get_cache_stats()["subsumed_hits"]
+        get_cached_query_result(
+            "SELECT * FROM t WHERE country = 'DE'",
+            execute_func,
+            use_gcs_cache=False,
+        )
+
+        result = get_cached_query_result(
+            "select spend, date from t "
+            "where country = 'DE' and date >= '2024-02-01'",
+            execute_func,
+            use_gcs_cache=False,
+        )
+
+        self.assertEqual(execute_func.call_count, 1)
+        self.assertEqual(list(result.columns), ["SPEND", "DATE"])
+        self.assertEqual(result["SPEND"].tolist(), [2.0, 3.0])
+        self.assertEqual(get_cache_stats()["subsumed_hits"], before + 1)
+
+    def test_reordered_columns_share_entry(self):
+        """Test that column order doesn't change the cache entry."""
+        df = pd.DataFrame({"A": [1], "B": [2]})
+        execute_func = Mock(return_value=df)
+        get_cached_query_result(
+            "SELECT a, b FROM t", execute_func, use_gcs_cache=False
+        )
+
+        result = get_cached_query_result(
+            "SELECT b, a FROM t", execute_func, use_gcs_cache=False
+        )
+
+        self.assertEqual(execute_func.call_count, 1)
+        self.assertEqual(list(result.columns), ["B", "A"])
+
     def test_in_memory_cache_hit(self):
         """Test that in-memory cache returns cached results."""
         query = "SELECT * FROM test_table"
@@ -113,7 +167,7 @@ class TestSnowflakeCache(unittest.TestCase):
         pd.testing.assert_frame_equal(result1, df1)
         pd.testing.assert_frame_equal(result2, df2)
 
-    @patch("utils.snowflake_cache.storage.Client")
+    @patch("utils.query_cache.get_storage_client")
     def test_gcs_cache_write(self, mock_storage_client):
         """Test that results are written to GCS cache."""
         # Set up mocks
@@ -156,6 +210,23 @@ class TestSnowflakeCache(unittest.TestCase):
         stats = get_cache_stats()
         self.assertEqual(stats["in_memory_count"], 2)
 
+    @patch.object(snowflake_cache._query_cache, "_ledger")
+    def test_cache_stats_read_from_ledger(self, mock_ledger):
+        """Test that GCS statistics come from the ledger, not a listing."""
+        mock_ledger.return_value.stats.return_value = {
+            "count": 3,
+            "total_bytes": 3 * 1024 * 1024,
+            "hits": 7,
+        }
+
+        with patch("utils.query_cache.get_storage_client") as client:
+            stats = get_cache_stats()
+
+        client.assert_not_called()
+        self.assertEqual(stats["gcs_count"], 3)
+        self.assertEqual(stats["gcs_total_size_mb"], 3.0)
+        self.assertEqual(stats["gcs_entry_hits"], 7)
+
     def test_clear_cache(self):
         """Test that clearing cache removes all entries."""
         query = "SELECT * FROM test_table"
@@ -177,6 +248,193 @@ class TestSnowflakeCache(unittest.TestCase):
         get_cached_query_result(query, execute_func, use_gcs_cache=False)
         self.assertEqual(execute_func.call_count, 1)
 
+    def test_concurrent_misses_execute_once(self):
+        """Identical misses running at the same time share one execution."""
+        query = "SELECT * FROM slow_table"
+        df = pd.DataFrame({"col1": [1]})
+        started = threading.Event()
+        release = threading.Event()
+
+        def execute(q):
+            started.set()
+            release.wait(5)
+            return df
+
+        execute_func = Mock(side_effect=execute)
+        coalesced = get_cache_stats()["coalesced"]
+        results = []
+
+        def call():
+            results.append(get_cached_query_result(query, execute_func, False))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=call) for _ in range(3)]
+        for t in followers:
+            t.start()
+        while get_cache_stats()["coalesced"] < coalesced + 3:
+            time.sleep(0.01)
+        release.set()
+        for t in [leader] + followers:
+            t.join(5)
+
+        self.assertEqual(execute_func.call_count, 1)
+        self.assertEqual(len(results), 4)
+        for result in results:
+            pd.testing.assert_frame_equal(result, df)
+
+    def test_concurrent_miss_error_reaches_waiters(self):
+        """Waiters see the error of the execution they waited for."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def execute(q):
+            started.set()
+            release.wait(5)
+            raise RuntimeError("warehouse suspended")
+
+        errors = []
+
+        def call():
+            try:
+                get_cached_query_result("SELECT * FROM t", execute, False)
+            except RuntimeError as e:
+                errors.append(e)
+
+        coalesced = get_cache_stats()["coalesced"]
+        threads = [threading.Thread(target=call)]
+        threads[0].start()
+        started.wait(5)
+        threads.append(threading.Thread(target=call))
+        threads[1].start()
+        while get_cache_stats()["coalesced"] < coalesced + 1:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(len(errors), 2)
+
+    def test_concurrent_miss_keeps_waiter_column_order(self):
+        """A waiter gets the shared result in its own column order."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def execute(q):
+            started.set()
+            release.wait(5)
+            return pd.DataFrame({"A": [1], "B": [2]})
+
+        results = {}
+
+        def call(query):
+            results[query] = get_cached_query_result(query, execute, False)
+
+        coalesced = get_cache_stats()["coalesced"]
+        leader = threading.Thread(target=call, args=("SELECT A, B FROM T",))
+        leader.start()
+        started.wait(5)
+        waiter = threading.Thread(target=call, args=("SELECT B, A FROM T",))
+        waiter.start()
+        while get_cache_stats()["coalesced"] < coalesced + 1:
+            time.sleep(0.01)
+        release.set()
+        for t in (leader, waiter):
+            t.join(5)
+
+        self.assertEqual(
+            list(results["SELECT A, B FROM T"].columns), ["A", "B"]
+        )
+        self.assertEqual(
+            list(results["SELECT B, A FROM T"].columns), ["B", "A"]
+        )
+
+    def test_stale_result_served_while_refreshing(self):
+        """An expired entry is returned at once and refreshed in background."""
+        query = "SELECT * FROM daily"
+        old = pd.DataFrame({"col1": [1]})
+        new = pd.DataFrame({"col1": [2]})
+        get_cached_query_result(query, Mock(return_value=old), False)
+        key = f"snowflake_query_{_get_query_hash(query)}"
+        _cache[key]["timestamp"] -= snowflake_cache.IN_MEMORY_TTL + 1
+
+        refreshed = threading.Event()
+
+        def execute(q):
+            refreshed.set()
+            return new
+
+        before = get_cache_stats()
+        result = get_cached_query_result(query, execute, False)
+
+        pd.testing.assert_frame_equal(result, old)
+        self.assertTrue(refreshed.wait(5))
+        after = get_cache_stats()
+        self.assertEqual(after["stale_hits"], before["stale_hits"] + 1)
+        self.assertEqual(
+            after["background_refreshes"], before["background_refreshes"] + 1
+        )
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            if _cache[key]["value"] is new:
+                break
+            time.sleep(0.01)
+        pd.testing.assert_frame_equal(
+            get_cached_query_result(query, Mock(), False), new
+        )
+
+    def test_result_past_stale_window_is_executed(self):
+        """Entries older than the stale window are a plain miss."""
+        query = "SELECT * FROM daily"
+        get_cached_query_result(
+            query, Mock(return_value=pd.DataFrame({"a": [1]})), False
+        )
+        key = f"snowflake_query_{_get_query_hash(query)}"
+        _cache[key]["timestamp"] -= (
+            snowflake_cache.IN_MEMORY_TTL + snowflake_cache.STALE_WINDOW + 1
+        )
+        execute_func = Mock(return_value=pd.DataFrame({"a": [2]}))
+
+        result = get_cached_query_result(query, execute_func, False)
+
+        self.assertEqual(execute_func.call_count, 1)
+        self.assertEqual(result["a"].tolist(), [2])
+
+    def test_table_invalidation_drops_its_results(self):
+        """Writing a table drops its results and keeps other tables'."""
+        execute_func = Mock(return_value=pd.DataFrame({"a": [1]}))
+        get_cached_query_result("SELECT * FROM db.s.t", execute_func, False)
+        get_cached_query_result("SELECT * FROM db.s.u", execute_func, False)
+
+        publish_invalidation(sf_tag("db.s.t"))
+        get_cached_query_result("SELECT * FROM db.s.t", execute_func, False)
+        get_cached_query_result("SELECT * FROM db.s.u", execute_func, False)
+
+        self.assertEqual(execute_func.call_count, 3)
+
+    @patch.object(snowflake_cache._query_cache, "_ledger")
+    @patch("utils.query_cache.get_storage_client")
+    def test_gcs_result_older_than_invalidation_skipped(
+        self, mock_storage_client, _
+    ):
+        """GCS results cached before a table write are not served."""
+        blob = MagicMock()
+        blob.exists.return_value = True
+        blob.metadata = {"cached_timestamp": str(time.time() - 10)}
+        buffer = io.BytesIO()
+        pd.DataFrame({"a": [1]}).to_parquet(buffer, index=False)
+        blob.download_as_bytes.return_value = buffer.getvalue()
+        bucket = mock_storage_client.return_value.bucket.return_value
+        bucket.blob.return_value = blob
+        query = "SELECT * FROM db.s.gcs_t"
+
+        self.assertIsNotNone(snowflake_cache.lookup_cached_result(query, True))
+        clear_snowflake_cache()
+        publish_invalidation(sf_tag("db.s.gcs_t"))
+
+        self.assertIsNone(snowflake_cache.lookup_cached_result(query, True))
+
 
 class TestCacheIntegration(unittest.TestCase):
     """Integration tests for caching with app_shared."""
@@ -0,0 +1,197 @@
+"""
+Tests for incremental refresh of date-partitioned Snowflake results.
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from fake_gcs import FakeBucket
+from utils import snowflake_incremental as inc
+
+SQL = "SELECT * FROM db.s.daily WHERE country = 'DE'"
+
+
+class FakeStore(FakeBucket):
+    def __init__(self):
+        super().__init__()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def local_path(self, bucket_name, path):
+        if path not in self.objects:
+            raise FileNotFoundError(path)
+        local = Path(self.tmp.name) / path.replace("/", "_")
+        local.write_bytes(self.objects[path].data)
+        return str(local)
+
+    def frame(self, path):
+        return pd.read_parquet(io.BytesIO(self.objects[path].data))
+
+
+def _days(start, n, value):
+    return pd.DataFrame(
+        {
+            "DATE": pd.date_range(start, periods=n, freq="D").date,
+            "COUNTRY": "DE",
+            "SPEND": [float(value)] * n,
+        }
+    )
+
+
+class TestIncrementalRefresh(unittest.TestCase):
+    def setUp(self):
+        self.bucket = FakeStore()
+        client = self.bucket.client()
+        patches = [
+            patch.object(inc, "get_storage_client", return_value=client),
+            patch.object(
+                inc, "cached_blob_path", side_effect=self.bucket.local_path
+            ),
+            patch.object(inc, "cache_query_result"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self.bucket.tmp.cleanup)
+
+    def test_first_refresh_runs_full_query(self):
+        plan = inc.plan_refresh("b", SQL, "date")
+
+        self.assertTrue(plan.full)
+        self.assertEqual(plan.sql, SQL)
+
+        df, info = inc.apply_refresh("b", plan, _days("2024-01-01", 30, 1))
+
+        self.assertEqual(info["mode"], "full")
+        self.assertEqual(info["watermark"], "2024-01-30")
+        self.assertEqual(len(self.bucket.frame(plan.state_path)), 30)
+        meta = self.bucket.objects[plan.state_path].metadata
+        self.assertEqual(meta["watermark"][:10], "2024-01-30")
+
+    def test_delta_replaces_lookback_window(self):
+        plan = inc.plan_refresh("b", SQL, "date")
+        inc.apply_refresh("b", plan, _days("2024-01-01", 30, 1))
+
+        plan = inc.plan_refresh("b", SQL, "date", lookback_days=3)
+
+        self.assertFalse(plan.full)
+        self.assertEqual(plan.cutoff, "2024-01-27")
+        self.assertEqual(plan.sql, f"{SQL} AND DATE >= '2024-01-27'")
+
+        # Corrected values for the last 4 days plus 2 new days
+        df, info = inc.apply_refresh("b", plan, _days("2024-01-27", 6, 2))
+
+        self.assertEqual(info["mode"], "delta")
+        self.assertEqual(info["delta_rows"], 6)
+        self.assertEqual(info["rows"], 32)
+        self.assertEqual(info["watermark"], "2024-02-01")
+        self.assertEqual(df["DATE"].is_unique, True)
+        self.assertEqual(df["SPEND"].sum(), 26 * 1.0 + 6 * 2.0)
+        self.assertEqual(len(self.bucket.frame(plan.state_path)), 32)
+
+    def test_where_clause_added_without_filters(self):
+        sql = "SELECT date, spend FROM t"
+        plan = inc.plan_refresh("b", sql, "date")
+        inc.apply_refresh(
+            "b", plan, _days("2024-01-01", 5, 1)[["DATE", "SPEND"]]
+        )
+
+        plan = inc.plan_refresh("b", sql, "date", lookback_days=0)
+
+        self.assertEqual(plan.sql, f"{sql} WHERE DATE >= '2024-01-05'")
+
+    def test_schema_change_is_reported(self):
+        plan = inc.plan_refresh("b", SQL, "date")
+        inc.apply_refresh("b", plan, _days("2024-01-01", 5, 1))
+        plan = inc.plan_refresh("b", SQL, "date")
+
+        delta = _days("2024-01-05", 1, 1).assign(CLICKS=1)
+        with self.assertRaises(inc.SchemaChanged):
+            inc.apply_refresh("b", plan, delta)
+
+    def test_full_refresh_replaces_stored_result(self):
+        plan = inc.plan_refresh("b", SQL, "date")
+        inc.apply_refresh("b", plan, _days("2024-01-01", 5, 1))
+
+        plan = inc.plan_refresh("b", SQL, "date", full=True)
+        df, info = inc.apply_refresh(
+            "b", plan, _days("2024-01-01", 7, 1).assign(CLICKS=1)
+        )
+
+        self.assertTrue(info["stored"])
+        stored = self.bucket.frame(plan.state_path)
+        self.assertEqual(len(stored), 7)
+        self.assertIn("CLICKS", stored.columns)
+
+        # The next refresh is a delta against the new columns
+        plan = inc.plan_refresh("b", SQL, "date")
+        _, info = inc.apply_refresh(
+            "b", plan, _days("2024-01-07", 2, 1).assign(CLICKS=1)
+        )
+        self.assertEqual(info["mode"], "delta")
+
+    def test_run_sql_incremental_falls_back_to_full_query(self):
+        import app_shared
+
+        plan = inc.plan_refresh("b", SQL, "date")
+        inc.apply_refresh("b", plan, _days("2024-01-01", 5, 1))
+        results = [
+            _days("2024-01-05", 1, 1).assign(CLICKS=1),
+            _days("2024-01-01", 6, 1).assign(CLICKS=1),
+        ]
+        queries = []
+
+        def run_sql(sql, use_cache=True):
+            queries.append(sql)
+            return results.pop(0)
+
+        with patch.object(app_shared, "run_sql", side_effect=run_sql):
+            df, info = app_shared.run_sql_incremental(
+                SQL, "date", lookback_days=0, bucket_name="b"
+            )
+            self.assertEqual(info["mode"], "full")
+            self.assertTrue(info["stored"])
+
+            # Only the delta runs on the next refresh
+            results.append(_days("2024-01-06", 1, 1).assign(CLICKS=1))
+            _, info = app_shared.run_sql_incremental(
+                SQL, "date", lookback_days=0, bucket_name="b"
+            )
+
+        self.assertEqual(info["mode"], "delta")
+        self.assertEqual(
+            queries,
+            [
+                f"{SQL} AND DATE >= '2024-01-05'",
+                SQL,
+                f"{SQL} AND DATE >= '2024-01-06'",
+            ],
+        )
+
+    def test_concurrent_refresh_keeps_other_result(self):
+        first = inc.plan_refresh("b", SQL, "date")
+        second = inc.plan_refresh("b", SQL, "date")
+        inc.apply_refresh("b", first, _days("2024-01-01", 5, 1))
+
+        df, info = inc.apply_refresh("b", second, _days("2024-01-01", 6, 1))
+
+        self.assertFalse(info["stored"])
+        self.assertEqual(len(df), 6)
+        self.assertEqual(len(self.bucket.frame(first.state_path)), 5)
+
+    def test_rejects_queries_it_cannot_extend(self):
+        with self.assertRaises(ValueError):
+            inc.plan_refresh("b", "SELECT SUM(spend) FROM t", "date")
+        with self.assertRaises(ValueError):
+            inc.plan_refresh("b", "SELECT spend FROM t", "date")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Tests for the process-wide Snowflake connection pool.
+"""
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils import snowflake_pool
+from utils.snowflake_pool import (
+    cached_private_key,
+    check_pool_health,
+    clear_pool,
+    clear_private_key_cache,
+    get_pool_stats,
+    lease_connection,
+    pool_key,
+)
+
+PARAMS = dict(
+    user="u",
+    account="a",
+    warehouse="w",
+    database="d",
+    schema="s",
+    role=None,
+    private_key=b"key-1",
+)
+
+
+class FakeConnection:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+        self.alive = True
+        self.pings = 0
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        cur = MagicMock()
+        cur.__enter__.return_value = cur
+
+        def execute(sql):
+            self.pings += 1
+            if not self.alive:
+                raise RuntimeError("session expired")
+
+        cur.execute.side_effect = execute
+        return cur
+
+
+def _lease_and_return(params, connect):
+    """Lease a connection, give it back and return it (to compare)."""
+    with lease_connection(params, connect) as conn:
+        return conn
+
+
+class TestSnowflakePool(unittest.TestCase):
+    def setUp(self):
+        clear_pool()
+        clear_private_key_cache()
+        self.opened = []
+        self.clock = [1000.0]
+        self.patches = [
+            patch.object(
+                snowflake_pool.time, "monotonic", lambda: self.clock[0]
+            ),
+            patch.object(snowflake_pool, "_ensure_health_thread"),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        clear_pool()
+
+    def connect(self, **kwargs):
+        conn = FakeConnection(**kwargs)
+        self.opened.append(conn)
+        return conn
+
+    def test_pool_key_depends_on_secret(self):
+        self.assertEqual(pool_key(PARAMS), pool_key(dict(PARAMS)))
+        self.assertNotEqual(
+            pool_key(PARAMS), pool_key({**PARAMS, "private_key": b"key-2"})
+        )
+        self.assertEqual(pool_key(PARAMS), pool_key({**PARAMS, "role": ""}))
+
+    def test_connections_are_reused_per_credentials(self):
+        with lease_connection(PARAMS, self.connect) as first:
+            pass
+        self.assertIs(_lease_and_return(PARAMS, self.connect), first)
+
+        other = _lease_and_return(
+            {**PARAMS, "private_key": b"key-2"}, self.connect
+        )
+
+        self.assertIsNot(other, first)
+        self.assertEqual(len(self.opened), 2)
+        self.assertEqual(get_pool_stats()["idle"], 2)
+
+    def test_concurrent_leases_open_up_to_pool_size(self):
+        with patch.object(snowflake_pool.settings, "SF_POOL_SIZE", 2):
+            with lease_connection(PARAMS, self.connect) as a:
+                with lease_connection(PARAMS, self.connect) as b:
+                    self.assertIsNot(a, b)
+                    with patch.object(
+                        snowflake_pool.settings, "SF_POOL_WAIT_SECONDS", 0
+                    ):
+                        with self.assertRaises(TimeoutError):
+                            with lease_connection(PARAMS, self.connect):
+                                pass
+        self.assertEqual(len(self.opened), 2)
+        self.assertEqual(get_pool_stats()["in_use"], 0)
+
+    def test_waiting_lease_gets_returned_connection(self):
+        with patch.object(snowflake_pool.settings, "SF_POOL_SIZE", 1):
+            got = []
+            waits = snowflake_pool._stats["waits"]
+            with lease_connection(PARAMS, self.connect) as first:
+                waiter = threading.Thread(
+                    target=lambda: got.append(
+                        _lease_and_return(PARAMS, self.connect)
+                    )
+                )
+                waiter.start()
+                while snowflake_pool._stats["waits"] == waits:
+                    waiter.join(0.01)
+            waiter.join(5)
+        self.assertEqual(got, [first])
+
+    def test_closed_connection_is_replaced(self):
+        conn = _lease_and_return(PARAMS, self.connect)
+        conn.close()
+
+        self.assertIsNot(_lease_and_return(PARAMS, self.connect), conn)
+        self.assertEqual(len(self.opened), 2)
+
+    def test_health_check_pings_evicts_and_drops_dead(self):
+        with patch.multiple(
+            snowflake_pool.settings,
+            SF_POOL_HEALTH_INTERVAL_SECONDS=60,
+            SF_POOL_IDLE_SECONDS=600,
+        ):
+            with lease_connection(PARAMS, self.connect) as a:
+                with lease_connection(PARAMS, self.connect) as b:
+                    pass
+            self.clock[0] += 30
+            self.assertEqual(check_pool_health()["pinged"], 0)
+
+            self.clock[0] += 60
+            b.alive = False
+            result = check_pool_health()
+            self.assertEqual(result["pinged"], 2)
+            self.assertEqual(result["closed_dead"], 1)
+            self.assertTrue(b.closed)
+            self.assertFalse(a.closed)
+
+            self.clock[0] += 600
+            self.assertEqual(check_pool_health()["closed_idle"], 1)
+            self.assertTrue(a.closed)
+        self.assertEqual(get_pool_stats()["pools"], 0)
+
+    def test_private_key_cached_for_ttl(self):
+        load = MagicMock(return_value=b"der")
+        with patch.object(
+            snowflake_pool.settings, "SF_KEY_CACHE_TTL_SECONDS", 60
+        ):
+            self.assertEqual(cached_private_key("sf-key", load), b"der")
+            cached_private_key("sf-key", load)
+            self.clock[0] += 61
+            cached_private_key("sf-key", load)
+        self.assertEqual(load.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Tests for SQL canonicalization and subsumption.
+"""
+
+import datetime as dt
+import sys
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils.sql_canonical import (
+    canonicalize_sql,
+    parse_simple_select,
+    query_hash,
+)
+
+
+class TestCanonicalize(unittest.TestCase):
+    def test_keywords_and_identifiers_only(self):
+        self.assertEqual(
+            canonicalize_sql(
+                "select *\n  from db.s.t -- all\n where country = 'de';"
+            ),
+            "SELECT * FROM DB . S . T WHERE COUNTRY = 'de'",
+        )
+
+    def test_literal_case_is_kept(self):
+        self.assertNotEqual(
+            query_hash("SELECT * FROM t WHERE country = 'DE'"),
+            query_hash("SELECT * FROM t WHERE country = 'de'"),
+        )
+
+    def test_quoted_identifiers(self):
+        self.assertEqual(
+            canonicalize_sql('SELECT "COUNTRY" FROM t'),
+            canonicalize_sql("SELECT country FROM t"),
+        )
+        self.assertNotEqual(
+            canonicalize_sql('SELECT "country" FROM t'),
+            canonicalize_sql("SELECT country FROM t"),
+        )
+
+    def test_column_order_and_aliases(self):
+        self.assertEqual(
+            query_hash("SELECT a, b AS b FROM t WHERE x > 1 AND y = 'q'"),
+            query_hash("select b, a from T where y = 'q' and x > 1"),
+        )
+        self.assertNotEqual(
+            query_hash("SELECT a AS x FROM t"), query_hash("SELECT a FROM t")
+        )
+
+
+class TestSimpleSelect(unittest.TestCase):
+    def test_parse(self):
+        q = parse_simple_select(
+            "SELECT t.spend, date d FROM db.s.tbl t "
+            "WHERE t.date BETWEEN '2024-01-01' AND '2024-02-01'"
+        )
+        self.assertEqual(q.table, "DB.S.TBL")
+        self.assertEqual(q.columns, (("SPEND", "SPEND"), ("DATE", "D")))
+        self.assertEqual(
+            q.predicates,
+            (("DATE", ">=", "2024-01-01"), ("DATE", "<=", "2024-02-01")),
+        )
+
+    def test_not_simple(self):
+        for sql in (
+            "SELECT DISTINCT a FROM t",
+            "SELECT a FROM t ORDER BY a",
+            "SELECT a FROM t WHERE a = 1 OR b = 2",
+            "SELECT SUM(a) FROM t",
+            "SELECT a FROM t JOIN u ON t.id = u.id",
+            "SELECT * FROM t LIMIT 20",
+        ):
+            self.assertIsNone(parse_simple_select(sql), sql)
+
+    def test_covers(self):
+        wide = parse_simple_select(
+            "SELECT * FROM t WHERE country = 'DE' "
+            "AND date BETWEEN '2024-01-01' AND '2024-12-31'"
+        )
+        narrow = parse_simple_select(
+            "SELECT spend FROM t WHERE country = 'DE' "
+            "AND date >= '2024-06-01' AND date < '2024-07-01'"
+        )
+        other_country = parse_simple_select(
+            "SELECT spend FROM t WHERE country = 'FR' "
+            "AND date >= '2024-06-01' AND date < '2024-07-01'"
+        )
+        self.assertTrue(wide.covers(narrow))
+        self.assertFalse(narrow.covers(wide))
+        self.assertFalse(wide.covers(other_country))
+
+        # Filter column must be selected by the cached query
+        cols = parse_simple_select("SELECT spend FROM t")
+        self.assertFalse(cols.covers(narrow))
+
+    def test_answer_filters_and_projects(self):
+        wide = parse_simple_select(
+            "SELECT * FROM t WHERE date BETWEEN '2024-01-01' AND '2024-12-31'"
+        )
+        narrow = parse_simple_select(
+            "SELECT spend AS s, date FROM t WHERE date >= '2024-06-01' "
+            "AND date <= '2024-06-30' AND country = 'DE'"
+        )
+        df = pd.DataFrame(
+            {
+                "DATE": [
+                    dt.date(2024, 5, 31),
+                    dt.date(2024, 6, 1),
+                    dt.date(2024, 6, 30),
+                    dt.date(2024, 6, 15),
+                ],
+                "COUNTRY": ["DE", "DE", "DE", "de"],
+                "SPEND": [1.0, 2.0, 3.0, 4.0],
+            }
+        )
+
+        result = wide.answer(narrow, df)
+
+        self.assertEqual(list(result.columns), ["S", "DATE"])
+        self.assertEqual(result["S"].tolist(), [2.0, 3.0])
+
+    def test_answer_refuses_type_mismatch(self):
+        wide = parse_simple_select("SELECT * FROM t")
+        narrow = parse_simple_select("SELECT * FROM t WHERE code = 10")
+        df = pd.DataFrame({"CODE": ["9", "10"]})
+
+        self.assertIsNone(wide.answer(narrow, df))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Tests for the per-prefix version manifests.
+"""
+
+import json
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+# test_track_daily_costs.py replaces google.api_core with MagicMocks at
+# import time; drop those stubs so the module under test gets real classes.
+for _name in ("google.api_core", "google.api_core.exceptions"):
+    if isinstance(sys.modules.get(_name), MagicMock):
+        del sys.modules[_name]
+
+from fake_gcs import FakeBucket
+from utils import version_index
+from utils.version_index import (
+    add_versions,
+    index_blob_path,
+    list_versions,
+    parse_version_blob,
+    rebuild_all_version_indexes,
+    record_version_blob,
+)
+
+
+class FakeStore(FakeBucket):
+    NotFound = version_index.NotFound
+    PreconditionFailed = version_index.PreconditionFailed
+
+    def versions(self, prefix):
+        path = index_blob_path(prefix)
+        return json.loads(self.objects[path].data)["versions"]
+
+
+class TestVersionIndex(unittest.TestCase):
+    def setUp(self):
+        self.store = FakeStore()
+        client = self.store.client()
+        self.patch = patch(
+            "utils.version_index.get_storage_client", return_value=client
+        )
+        self.patch.start()
+        self.listing_patch = patch(
+            "utils.gcs_utils.get_storage_client", return_value=client
+        )
+        self.listing_patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.listing_patch.stop()
+
+    def test_parse_version_blob(self):
+        self.assertEqual(
+            parse_version_blob("datasets/de/20240101_120000/raw.parquet"),
+            ("datasets/de", "20240101_120000"),
+        )
+        self.assertEqual(
+            parse_version_blob(
+                "training_data/de/REVENUE/20240101/selected_columns.json"
+            ),
+            ("training_data", "de/REVENUE/20240101"),
+        )
+        self.assertIsNone(parse_version_blob("datasets/de/raw.parquet"))
+        self.assertIsNone(parse_version_blob("robyn/r1/de/x/model.json"))
+
+    def test_missing_manifest_is_rebuilt_from_listing(self):
+        self.store.put("metadata/de/20240101/mapping.json")
+        self.store.put("metadata/de/latest/mapping.json")
+        self.store.put("metadata/de/20240101/other.json")
+
+        self.assertEqual(
+            list_versions("b", "metadata/de"), ["20240101", "latest"]
+        )
+        self.assertEqual(len(self.store.listed), 1)
+
+        # Second read is served by the manifest alone
+        list_versions("b", "metadata/de")
+        self.assertEqual(len(self.store.listed), 1)
+
+    def test_empty_prefix_writes_no_manifest(self):
+        self.assertEqual(list_versions("b", "datasets/xx"), [])
+        self.assertNotIn(index_blob_path("datasets/xx"), self.store.objects)
+
+    def test_record_version_blob(self):
+        record_version_blob("b", "mapped-datasets/fr/20240202/raw.parquet")
+        record_version_blob("b", "mapped-datasets/fr/20240303/raw.parquet")
+
+        self.assertEqual(
+            self.store.versions("mapped-datasets/fr"), ["20240202", "20240303"]
+        )
+        self.assertFalse(record_version_blob("b", "robyn/r1/x.json"))
+
+    def test_concurrent_update_is_not_lost(self):
+        """A write racing ours forces a re-read instead of clobbering it."""
+        add_versions("b", "datasets/de", ["v1"])
+        self.store.on_write = lambda: self.store.put(
+            index_blob_path("datasets/de"),
+            json.dumps({"versions": ["v1", "v2"]}).encode(),
+        )
+
+        add_versions("b", "datasets/de", ["v3"])
+
+        self.assertEqual(self.store.versions("datasets/de"), ["v1", "v2", "v3"])
+
+    def test_rebuild_all(self):
+        self.store.put("datasets/de/20240101/raw.parquet")
+        self.store.put("datasets/fr/20240101/raw.parquet")
+        self.store.put("metadata/universal/20240101/mapping.json")
+        self.store.put("training_data/de/REV/20240101/selected_columns.json")
+
+        result = rebuild_all_version_indexes("b")
+
+        self.assertEqual(
+            result,
+            {
+                "datasets/de": 1,
+                "datasets/fr": 1,
+                "metadata/universal": 1,
+                "training_data": 1,
+            },
+        )
+        self.assertEqual(
+            self.store.versions("training_data"), ["de/REV/20240101"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()